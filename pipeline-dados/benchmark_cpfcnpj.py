@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark — extração de CPF/CNPJ (CPFECNPJ.py).
+Compara a versão antiga (2x Series.apply com regex por linha) com a
+vetorizada (extrair_cpf_cnpj) em N linhas sintéticas de credores.
+
+Uso:
+  python benchmark_cpfcnpj.py [linhas] [seed]
+
+Padrão: 1.000.000 linhas, seed 42.
+"""
+
+import os
+import re
+import sys
+import time
+
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "scripts"))
+from CPFECNPJ import extrair_cpf_cnpj  # noqa: E402
+from gerador_sintetico import gerar_coluna_cpf_cnpj  # noqa: E402
+
+
+# ==========================================================
+# Versão antiga (referência para tempo e resultado)
+# ==========================================================
+def extrair_digitos_antigo(texto):
+    if pd.isna(texto):
+        return None
+    s = re.sub(r"\D", "", str(texto))
+    if len(s) in (11, 14):
+        return s
+    return None
+
+def tipo_doc_antigo(valor):
+    if pd.isna(valor) or not str(valor).strip():
+        return None
+    s = re.sub(r"\D", "", str(valor))
+    if len(s) == 11:
+        return "CPF"
+    elif len(s) == 14:
+        return "CNPJ"
+    return None
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    seed = int(sys.argv[2]) if len(sys.argv) > 2 else 42
+
+    print(f"Gerando {n:,} linhas sintéticas (seed={seed})...")
+    col = gerar_coluna_cpf_cnpj(n, seed)
+
+    t0 = time.perf_counter()
+    ant_doc = col.apply(extrair_digitos_antigo)
+    ant_tipo = ant_doc.apply(tipo_doc_antigo)
+    t_ant = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    doc, tipo, valido = extrair_cpf_cnpj(col)
+    t_vet = time.perf_counter() - t0
+
+    iguais = ant_doc.fillna("").equals(doc.fillna("")) and ant_tipo.fillna("").equals(tipo.fillna(""))
+
+    print(f"{'Versão':<12}{'tempo (s)':>12}{'linhas/s':>16}")
+    print(f"{'apply':<12}{t_ant:>12.2f}{n / t_ant:>16,.0f}")
+    print(f"{'vetorizada':<12}{t_vet:>12.2f}{n / t_vet:>16,.0f}")
+    print(f"Ganho: {t_ant / t_vet:.1f}x | CPF_CNPJ/Tipo idênticos: {'SIM' if iguais else 'NÃO'}")
+    print(f"Documentos com DV inválido: {int((doc.notna() & ~valido).sum()):,} de {int(doc.notna().sum()):,}")
+    sys.exit(0 if iguais else 1)
+
+
+if __name__ == "__main__":
+    main()
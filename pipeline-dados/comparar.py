@@ -1,19 +1,41 @@
 # -*- coding: utf-8 -*-
 """
-Comparador de planilhas Excel — célula a célula.
+Comparador de planilhas Excel — célula a célula (vetorizado por coluna).
 Compara o resultado gerado pelo JS com o resultado esperado (Python).
 
 Uso:
-  python comparar.py <arquivo_js.xlsx> <arquivo_python.xlsx> [aba_js] [aba_python]
-
-Se as abas não forem informadas, compara a primeira aba de cada arquivo.
+  python comparar.py <arquivo_js.xlsx> <arquivo_python.xlsx> [aba_js] [aba_python] [--amostras N]
+                     [--chave COLUNA ...] [--alinhar] [--processos N] [--bloco N]
+
+Se as abas não forem informadas, compara TODAS as abas, casadas pelo nome
+(cada par num processo separado), e imprime um resumo por aba. Informando as
+abas, compara só esse par. Conta TODAS as diferenças (por coluna) e mostra as
+N primeiras (padrão 30). Código de saída 0 = tudo igual, 1 = há diferença.
+
+As planilhas são lidas em streaming (XML direto do .xlsx), em blocos de
+--bloco linhas comparados lado a lado: a memória não cresce com o tamanho da
+aba.
+
+Por padrão compara a linha i com a linha i. Com --chave (ex.: --chave "Nr emp."
+--chave "Seq. Liq.") as linhas são casadas pela chave (hash join); com
+--alinhar, sem chave, pelo hash da linha inteira (maior subsequência comum).
+Nesses modos uma linha a mais/a menos aparece como adicionada/removida em vez
+de deslocar todas as seguintes (a aba é carregada inteira para alinhar).
 """
 
+import argparse
 import sys
 import os
-import math
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
 import pandas as pd
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "scripts"))
+from utils_transformacao import ler_blocos_xlsx, listar_abas_xlsx  # noqa: E402
+
+AMOSTRAS_PADRAO = 30
+BLOCO_PADRAO = 50_000
+
 
 def normalizar_valor(v):
     """Normaliza valor para comparação tolerante."""
@@ -53,103 +75,532 @@ def valores_iguais(a, b):
     return False
 
 
-def comparar_planilhas(path_js, path_python, aba_js=0, aba_python=0):
-    """Compara duas planilhas célula a célula."""
-    print(f"\n{'='*60}")
-    print(f"COMPARANDO PLANILHAS")
-    print(f"{'='*60}")
-    print(f"JS     : {path_js}")
-    print(f"Python : {path_python}")
-    print()
+def _normalizar_coluna(valores):
+    """normalizar_valor aplicado à coluna inteira (np.ndarray de str)."""
+    s = pd.Series(valores, dtype=object).fillna("").astype(str).str.strip()
+    s = s.mask(s.str.lower().isin(["nan", "none", "null"]), "")
+    return s.to_numpy(dtype=object)
+
+
+def _como_numero(valores):
+    return pd.to_numeric(pd.Series(valores, dtype=object).str.replace(",", ".", regex=False),
+                         errors="coerce").to_numpy(dtype="float64")
+
+
+def _sem_caixa_espacos(valores):
+    return pd.Series(valores, dtype=object).str.lower().str.replace(" ", "", regex=False).to_numpy(dtype=object)
+
+
+def diferencas_coluna(a, b):
+    """
+    Mesma regra de valores_iguais, em passadas vetorizadas sobre a coluna:
+    0) igualdade exata do valor bruto (a maioria das células; nada a normalizar)
+    1) igualdade exata do texto normalizado, só no que sobrou
+    2) tolerância numérica (0.01) no que sobrou e for número dos dois lados
+    3) igualdade sem caixa/espaços no restante
+    Retorna máscara booleana: True = diferente.
+    """
+    diff = a != b
+    idx = np.flatnonzero(diff)
+    if idx.size:
+        na, nb = _normalizar_coluna(a[idx]), _normalizar_coluna(b[idx])
+        iguais = na == nb
+        diff[idx[iguais]] = False
+        idx, na, nb = idx[~iguais], na[~iguais], nb[~iguais]
+    if idx.size:
+        with np.errstate(invalid="ignore"):
+            iguais = np.abs(_como_numero(na) - _como_numero(nb)) < 0.01
+        diff[idx[iguais]] = False
+        idx, na, nb = idx[~iguais], na[~iguais], nb[~iguais]
+    if idx.size:
+        iguais = _sem_caixa_espacos(na) == _sem_caixa_espacos(nb)
+        diff[idx[iguais]] = False
+    return diff
+
+
+def _coluna_ou_vazio(df, c, n):
+    """Coluna c (valores brutos) completada com "" até n linhas (planilhas de tamanhos diferentes)."""
+    out = np.full(n, "", dtype=object)
+    if c < df.shape[1]:
+        out[:df.shape[0]] = df.iloc[:, c].to_numpy(dtype=object)
+    return out
+
+
+def comparar_dataframes(df_js, df_py, amostras=AMOSTRAS_PADRAO, linhas_js=None, linhas_py=None):
+    """
+    Compara dois DataFrames coluna a coluna (linha i com linha i).
+    linhas_js / linhas_py: nº da linha no Excel de cada posição, quando os
+    DataFrames vierem de um alinhamento (padrão: posição + 2).
+    Retorna dict com: total, linhas_diferentes, por_coluna [(col_idx, nome, qtd)],
+    amostras (as N primeiras diferenças em ordem de linha/coluna).
+    """
+    rows = max(df_js.shape[0], df_py.shape[0])
+    cols = max(df_js.shape[1], df_py.shape[1])
+
+    por_coluna = []
+    posicoes = []
+    linha_diferente = np.zeros(rows, dtype=bool)
+    for c in range(cols):
+        a = _coluna_ou_vazio(df_js, c, rows)
+        b = _coluna_ou_vazio(df_py, c, rows)
+        diff = diferencas_coluna(a, b)
+        qtd = int(diff.sum())
+        if not qtd:
+            continue
+        linha_diferente |= diff
+        nome = df_py.columns[c] if c < df_py.shape[1] else f"Col{c}"
+        por_coluna.append((c, nome, qtd))
+        linhas = np.flatnonzero(diff)[:amostras]
+        va, vb = _normalizar_coluna(a[linhas]), _normalizar_coluna(b[linhas])
+        posicoes.extend((int(r), c, nome, x, y) for r, x, y in zip(linhas, va, vb))
+
+    posicoes.sort(key=lambda p: (p[0], p[1]))
+    amostras_out = []
+    for r, c, nome, vj, vp in posicoes[:amostras]:
+        d = {
+            "linha": int(linhas_py[r]) if linhas_py is not None else r + 2,  # +2: Excel começa em 1 e tem header
+            "coluna": nome,
+            "col_idx": c,
+            "js": str(vj)[:60],
+            "python": str(vp)[:60],
+        }
+        if linhas_js is not None:
+            d["linha_js"] = int(linhas_js[r])
+        amostras_out.append(d)
+
+    return {
+        "total": sum(q for _, _, q in por_coluna),
+        "linhas_diferentes": int(linha_diferente.sum()),
+        "por_coluna": por_coluna,
+        "amostras": amostras_out,
+    }
+
+
+# ==========================================================
+# Alinhamento de linhas (chave / hash de linha)
+# ==========================================================
+def _encontrar_coluna(df, nome):
+    """Índice da coluna pelo nome (exato após strip; senão sem caixa). -1 se não achar."""
+    nomes = [str(c).strip() for c in df.columns]
+    if nome.strip() in nomes:
+        return nomes.index(nome.strip())
+    baixo = [n.lower() for n in nomes]
+    return baixo.index(nome.strip().lower()) if nome.strip().lower() in baixo else -1
+
+
+def _hashes_colunas(df, n_colunas):
+    """Hash uint64 do texto normalizado de cada coluna (completa com "" até n_colunas)."""
+    vazio = pd.util.hash_array(np.array([""], dtype=object))[0]
+    hashes = []
+    for c in range(n_colunas):
+        if c < df.shape[1]:
+            # normaliza/hasheia só os valores distintos e espalha pelos códigos
+            codigos, distintos = pd.factorize(df.iloc[:, c].to_numpy(dtype=object), use_na_sentinel=False)
+            norm = _normalizar_coluna(np.asarray(distintos, dtype=object))
+            hashes.append(pd.util.hash_array(norm, categorize=False)[codigos])
+        else:
+            hashes.append(np.full(len(df), vazio, dtype=np.uint64))
+    return hashes
+
+
+def _combinar_hashes(hashes, colunas):
+    h = np.zeros(len(hashes[0]) if hashes else 0, dtype=np.uint64)
+    for c in colunas:
+        h = (h * np.uint64(1000003)) ^ hashes[c]
+    return h
+
+
+def hash_linhas(df, colunas=None, n_colunas=None):
+    """
+    Hash uint64 de cada linha (uma passada), sobre o texto normalizado.
+    colunas: índices a considerar (padrão: todas; completa com "" até n_colunas
+    para planilhas com quantidades de colunas diferentes).
+    """
+    n = n_colunas if n_colunas is not None else df.shape[1]
+    if colunas is None:
+        colunas = list(range(n))
+    return _combinar_hashes(_hashes_colunas(df, max([n, *[c + 1 for c in colunas]])), colunas)
+
+
+def alinhar_por_chave(h_js, h_py):
+    """
+    Hash join das chaves (O(n)). Chaves repetidas casam pela ordem de ocorrência.
+    Retorna (pares_js, pares_py, so_js, so_py) como arrays de posições.
+    """
+    a = pd.DataFrame({"h": h_js, "n": pd.Series(h_js).groupby(h_js).cumcount().to_numpy(), "i_js": np.arange(len(h_js))})
+    b = pd.DataFrame({"h": h_py, "n": pd.Series(h_py).groupby(h_py).cumcount().to_numpy(), "i_py": np.arange(len(h_py))})
+    m = a.merge(b, on=["h", "n"], how="outer", sort=False)
+    pares = m.dropna(subset=["i_js", "i_py"]).sort_values("i_py")
+    so_js = np.sort(m.loc[m["i_py"].isna(), "i_js"].to_numpy(dtype=np.int64))
+    so_py = np.sort(m.loc[m["i_js"].isna(), "i_py"].to_numpy(dtype=np.int64))
+    return pares["i_js"].to_numpy(dtype=np.int64), pares["i_py"].to_numpy(dtype=np.int64), so_js, so_py
+
+
+def alinhar_por_lcs(h_js, h_py):
+    """
+    Sem chave: alinha as sequências de hashes de linha pela maior subsequência
+    comum (difflib). Blocos "replace" viram pares (linhas alteradas) até o
+    menor tamanho; o excedente é adicionado/removido.
+    Retorna (pares_js, pares_py, so_js, so_py).
+    """
+    from difflib import SequenceMatcher
+
+    sm = SequenceMatcher(None, h_js.tolist(), h_py.tolist())
+    pares_js, pares_py, so_js, so_py = [], [], [], []
+    for op, i1, i2, j1, j2 in sm.get_opcodes():
+        if op == "equal" or op == "replace":
+            k = min(i2 - i1, j2 - j1)
+            pares_js.extend(range(i1, i1 + k))
+            pares_py.extend(range(j1, j1 + k))
+            so_js.extend(range(i1 + k, i2))
+            so_py.extend(range(j1 + k, j2))
+        elif op == "delete":
+            so_js.extend(range(i1, i2))
+        elif op == "insert":
+            so_py.extend(range(j1, j2))
+    return tuple(np.asarray(x, dtype=np.int64) for x in (pares_js, pares_py, so_js, so_py))
+
+
+def comparar_alinhado(df_js, df_py, chaves=None, amostras=AMOSTRAS_PADRAO):
+    """
+    Alinha as linhas (por chave ou, sem chave, por hash de linha + LCS) e
+    separa: adicionadas (só no JS), removidas (só no Python) e alteradas.
+    Retorna dict com so_js, so_py (nºs de linha no Excel), alteradas e o
+    resultado de comparar_dataframes sobre os pares alterados.
+    """
+    n_cols = max(df_js.shape[1], df_py.shape[1])
+    hc_js = _hashes_colunas(df_js, n_cols)
+    hc_py = _hashes_colunas(df_py, n_cols)
+    hl_js = _combinar_hashes(hc_js, range(n_cols))
+    hl_py = _combinar_hashes(hc_py, range(n_cols))
+
+    if chaves:
+        idx_js = [_encontrar_coluna(df_js, k) for k in chaves]
+        idx_py = [_encontrar_coluna(df_py, k) for k in chaves]
+        faltando = [k for k, a, b in zip(chaves, idx_js, idx_py) if a < 0 or b < 0]
+        if faltando:
+            raise KeyError(f"Coluna(s) chave não encontrada(s): {faltando}")
+        pares_js, pares_py, so_js, so_py = alinhar_por_chave(
+            _combinar_hashes(hc_js, idx_js), _combinar_hashes(hc_py, idx_py))
+    else:
+        pares_js, pares_py, so_js, so_py = alinhar_por_lcs(hl_js, hl_py)
+
+    # pares com hash idêntico não precisam de comparação célula a célula
+    suspeitos = hl_js[pares_js] != hl_py[pares_py]
+    pj, pp = pares_js[suspeitos], pares_py[suspeitos]
+    res = comparar_dataframes(
+        df_js.iloc[pj].reset_index(drop=True), df_py.iloc[pp].reset_index(drop=True),
+        amostras, linhas_js=pj + 2, linhas_py=pp + 2,
+    )
+    return {
+        "pares": len(pares_js),
+        "so_js": so_js + 2,
+        "so_py": so_py + 2,
+        "alteradas": res["linhas_diferentes"],
+        "detalhe": res,
+    }
+
+
+# ==========================================================
+# Comparação de uma aba (roda em processo separado)
+# ==========================================================
+def _texto(v):
+    """Célula lida em streaming -> texto, como read_excel(dtype=str, keep_default_na=False)."""
+    if v is None:
+        return ""
+    if isinstance(v, float) and v.is_integer():
+        return str(int(v))
+    return str(v)
+
+
+def _bloco_para_df(linhas, colunas):
+    largura = max([len(colunas), *map(len, linhas)]) if linhas else len(colunas)
+    nomes = list(colunas) + [f"Unnamed: {i}" for i in range(len(colunas), largura)]
+    dados = [[_texto(v) for v in linha] + [""] * (largura - len(linha)) for linha in linhas]
+    return pd.DataFrame(dados, columns=nomes, dtype=object)
+
+
+def _ler_aba(caminho, aba, bloco):
+    """(cabeçalho, gerador de DataFrames de texto com até `bloco` linhas)."""
+    blocos = ler_blocos_xlsx(caminho, aba, bloco)
+    primeiro = next(blocos, [])
+    cabecalho = [_texto(v) for v in primeiro[0]] if primeiro else []
+
+    def gerar():
+        if len(primeiro) > 1:
+            yield _bloco_para_df(primeiro[1:], cabecalho)
+        for b in blocos:
+            yield _bloco_para_df(b, cabecalho)
+
+    return cabecalho, gerar()
+
+
+def _acumular(total, res, amostras):
+    total["total"] += res["total"]
+    total["linhas_diferentes"] += res["linhas_diferentes"]
+    for c, nome, qtd in res["por_coluna"]:
+        anterior = total["por_coluna"].get(c, (nome, 0))
+        total["por_coluna"][c] = (anterior[0], anterior[1] + qtd)
+    falta = amostras - len(total["amostras"])
+    if falta > 0:
+        total["amostras"].extend(res["amostras"][:falta])
+
+
+def comparar_aba(path_js, path_python, aba_js=0, aba_python=0, amostras=AMOSTRAS_PADRAO,
+                 chaves=None, alinhar=False, bloco=BLOCO_PADRAO):
+    """
+    Compara um par de abas e devolve um dict com o resultado (sem imprimir):
+    linhas/colunas de cada lado, headers diferentes, total, por_coluna,
+    amostras e, nos modos alinhados, adicionadas/removidas/alteradas.
+    """
+    cab_js, blocos_js = _ler_aba(path_js, aba_js, bloco)
+    cab_py, blocos_py = _ler_aba(path_python, aba_python, bloco)
+
+    headers = []
+    for c in range(max(len(cab_js), len(cab_py))):
+        h_js = cab_js[c] if c < len(cab_js) else "(ausente)"
+        h_py = cab_py[c] if c < len(cab_py) else "(ausente)"
+        if not valores_iguais(h_js, h_py):
+            headers.append((c, h_js, h_py))
+
+    r = {"aba_js": aba_js, "aba_python": aba_python, "headers": headers, "modo": "posicional", "aviso": ""}
+
+    if chaves or alinhar:
+        df_js = pd.concat(list(blocos_js) or [_bloco_para_df([], cab_js)], ignore_index=True)
+        df_py = pd.concat(list(blocos_py) or [_bloco_para_df([], cab_py)], ignore_index=True)
+        try:
+            al = comparar_alinhado(df_js, df_py, chaves, amostras)
+            r["modo"] = "chave " + " + ".join(chaves) if chaves else "hash da linha"
+        except KeyError as e:
+            al = comparar_alinhado(df_js, df_py, None, amostras)
+            r["modo"], r["aviso"] = "hash da linha", e.args[0]
+        det = al["detalhe"]
+        r.update(linhas_js=len(df_js), linhas_py=len(df_py), cols_js=df_js.shape[1], cols_py=df_py.shape[1],
+                 pares=al["pares"], so_js=al["so_js"][:amostras].tolist(), so_py=al["so_py"][:amostras].tolist(),
+                 qtd_so_js=len(al["so_js"]), qtd_so_py=len(al["so_py"]), alteradas=al["alteradas"],
+                 total=det["total"], por_coluna=det["por_coluna"], amostras=det["amostras"])
+        r["ok"] = not headers and not r["qtd_so_js"] and not r["qtd_so_py"] and not r["alteradas"] \
+            and r["cols_js"] == r["cols_py"]
+        return r
+
+    # posicional: blocos i de cada lado comparados juntos (memória limitada a um bloco)
+    acc = {"total": 0, "linhas_diferentes": 0, "por_coluna": {}, "amostras": []}
+    linhas_js = linhas_py = 0
+    cols_js, cols_py = len(cab_js), len(cab_py)
+    vazio_js, vazio_py = _bloco_para_df([], cab_js), _bloco_para_df([], cab_py)
+    while True:
+        b_js = next(blocos_js, None)
+        b_py = next(blocos_py, None)
+        if b_js is None and b_py is None:
+            break
+        b_js = vazio_js if b_js is None else b_js
+        b_py = vazio_py if b_py is None else b_py
+        inicio = linhas_py if len(b_py) else linhas_js
+        n = max(len(b_js), len(b_py))
+        res = comparar_dataframes(b_js, b_py, amostras, linhas_py=np.arange(inicio, inicio + n) + 2)
+        _acumular(acc, res, amostras)
+        linhas_js += len(b_js)
+        linhas_py += len(b_py)
+        cols_js, cols_py = max(cols_js, b_js.shape[1]), max(cols_py, b_py.shape[1])
+
+    r.update(linhas_js=linhas_js, linhas_py=linhas_py, cols_js=cols_js, cols_py=cols_py,
+             total=acc["total"], linhas_diferentes=acc["linhas_diferentes"],
+             por_coluna=[(c, nome, q) for c, (nome, q) in sorted(acc["por_coluna"].items())],
+             amostras=acc["amostras"])
+    r["ok"] = not headers and r["total"] == 0 and linhas_js == linhas_py and cols_js == cols_py
+    return r
+
+
+# ==========================================================
+# Relatório
+# ==========================================================
+def _imprimir_linhas(titulo, linhas, total, amostras):
+    if not total:
+        return
+    mostrar = ", ".join(str(int(x)) for x in linhas[:amostras])
+    resto = f" ... (+{total - len(linhas[:amostras]):,})" if total > len(linhas[:amostras]) else ""
+    print(f"  {titulo} ({total:,}): {mostrar}{resto}")
+
+
+def _imprimir_detalhe(res):
+    if res["por_coluna"]:
+        print("  Diferenças por coluna:")
+        for c, nome, qtd in res["por_coluna"]:
+            print(f"    [{c}] {str(nome)[:40]:<40} {qtd:>10,}")
+        print()
+
+    for d in res["amostras"]:
+        linha = f"{d['linha_js']} (JS) / {d['linha']} (Python)" if "linha_js" in d else d["linha"]
+        print(f"  Linha {linha}, Col '{d['coluna']}' [{d['col_idx']}]:")
+        print(f"    JS     = '{d['js']}'")
+        print(f"    Python = '{d['python']}'")
 
-    df_js = pd.read_excel(path_js, sheet_name=aba_js, dtype=str, keep_default_na=False)
-    df_py = pd.read_excel(path_python, sheet_name=aba_python, dtype=str, keep_default_na=False)
+    if res["total"] > len(res["amostras"]):
+        print(f"\n  ... e mais {res['total'] - len(res['amostras']):,} diferenças")
 
-    rows_js, cols_js = df_js.shape
-    rows_py, cols_py = df_py.shape
 
+def _imprimir_resultado(r, amostras):
+    rows_js, cols_js, rows_py, cols_py = r["linhas_js"], r["cols_js"], r["linhas_py"], r["cols_py"]
     print(f"JS     : {rows_js:,} linhas x {cols_js} colunas")
     print(f"Python : {rows_py:,} linhas x {cols_py} colunas")
     print()
 
-    # Comparar headers
-    diffs_header = []
-    max_cols = max(cols_js, cols_py)
-    for c in range(max_cols):
-        h_js = df_js.columns[c] if c < cols_js else "(ausente)"
-        h_py = df_py.columns[c] if c < cols_py else "(ausente)"
-        if not valores_iguais(h_js, h_py):
-            diffs_header.append((c, h_js, h_py))
-
-    if diffs_header:
-        print(f"HEADERS diferentes: {len(diffs_header)}")
-        for c, hj, hp in diffs_header[:10]:
+    if r["headers"]:
+        print(f"HEADERS diferentes: {len(r['headers'])}")
+        for c, hj, hp in r["headers"][:10]:
             print(f"  Col {c}: JS='{hj}' vs Python='{hp}'")
         print()
 
-    # Comparar dados
-    max_rows = max(rows_js, rows_py)
-    diffs = []
-
-    for r in range(max_rows):
-        for c in range(max_cols):
-            v_js = normalizar_valor(df_js.iloc[r, c]) if r < rows_js and c < cols_js else ""
-            v_py = normalizar_valor(df_py.iloc[r, c]) if r < rows_py and c < cols_py else ""
-
-            if not valores_iguais(v_js, v_py):
-                col_name = df_py.columns[c] if c < cols_py else f"Col{c}"
-                diffs.append({
-                    "linha": r + 2,  # +2 porque Excel começa em 1 e tem header
-                    "coluna": col_name,
-                    "col_idx": c,
-                    "js": v_js[:60],
-                    "python": v_py[:60]
-                })
-
-            if len(diffs) >= 200:
-                break
-        if len(diffs) >= 200:
-            break
-
-    # Resultado
     print(f"{'='*60}")
-    if len(diffs) == 0 and rows_js == rows_py and cols_js == cols_py:
+    if r["aviso"]:
+        print(f"Aviso: {r['aviso']} — usando o hash da linha")
+    if r["modo"] != "posicional":
+        print(f"Alinhamento por {r['modo']}: {r['pares']:,} linhas casadas")
+        if r["ok"]:
+            print("RESULTADO: IDENTICOS!")
+        else:
+            print(f"RESULTADO: {r['qtd_so_js']:,} adicionada(s) no JS, {r['qtd_so_py']:,} removida(s) "
+                  f"(só no Python), {r['alteradas']:,} alterada(s)")
+            _imprimir_linhas("Adicionadas (linha no JS)", r["so_js"], r["qtd_so_js"], amostras)
+            _imprimir_linhas("Removidas (linha no Python)", r["so_py"], r["qtd_so_py"], amostras)
+            print()
+            _imprimir_detalhe(r)
+    elif r["ok"]:
         print("RESULTADO: IDENTICOS!")
         print(f"Todas as {rows_js:,} linhas x {cols_js} colunas são iguais.")
-        print(f"{'='*60}")
-        return True
     else:
-        print(f"RESULTADO: {len(diffs)} DIFERENCA(S) ENCONTRADA(S)")
+        print(f"RESULTADO: {r['total']:,} DIFERENCA(S) ENCONTRADA(S)")
         if rows_js != rows_py:
             print(f"  Linhas: JS={rows_js:,} vs Python={rows_py:,} (diff={abs(rows_js-rows_py)})")
         if cols_js != cols_py:
             print(f"  Colunas: JS={cols_js} vs Python={cols_py} (diff={abs(cols_js-cols_py)})")
         print()
+        _imprimir_detalhe(r)
+    print(f"{'='*60}")
+
 
-        for d in diffs[:30]:
-            print(f"  Linha {d['linha']}, Col '{d['coluna']}' [{d['col_idx']}]:")
-            print(f"    JS     = '{d['js']}'")
-            print(f"    Python = '{d['python']}'")
+def _cabecalho(path_js, path_python):
+    print(f"\n{'='*60}")
+    print(f"COMPARANDO PLANILHAS")
+    print(f"{'='*60}")
+    print(f"JS     : {path_js}")
+    print(f"Python : {path_python}")
+    print()
 
-        if len(diffs) > 30:
-            print(f"\n  ... e mais {len(diffs) - 30} diferenças")
 
-        print(f"{'='*60}")
-        return False
+def comparar_planilhas(path_js, path_python, aba_js=0, aba_python=0, amostras=AMOSTRAS_PADRAO,
+                       chaves=None, alinhar=False, bloco=BLOCO_PADRAO):
+    """Compara um par de abas e imprime o relatório. Retorna True se iguais."""
+    _cabecalho(path_js, path_python)
+    r = comparar_aba(path_js, path_python, aba_js, aba_python, amostras, chaves, alinhar, bloco)
+    _imprimir_resultado(r, amostras)
+    return r["ok"]
+
+
+# ==========================================================
+# Todas as abas (casadas pelo nome, em paralelo)
+# ==========================================================
+def casar_abas(nomes_js, nomes_py):
+    """
+    Casa as abas pelo nome (exato; depois sem caixa/espaços nas pontas).
+    Se cada arquivo tiver uma única aba, casa as duas mesmo com nomes diferentes.
+    Retorna (pares [(aba_js, aba_py)], só_js, só_py).
+    """
+    if len(nomes_js) == 1 and len(nomes_py) == 1:
+        return [(nomes_js[0], nomes_py[0])], [], []
+    chave = lambda n: n.strip().lower()  # noqa: E731
+    restantes = list(nomes_py)
+    pares = []
+    for n in nomes_js:
+        if n in restantes:
+            pares.append((n, n))
+            restantes.remove(n)
+    for n in [n for n in nomes_js if n not in [a for a, _ in pares]]:
+        par = next((m for m in restantes if chave(m) == chave(n)), None)
+        if par is not None:
+            pares.append((n, par))
+            restantes.remove(par)
+    casadas = [a for a, _ in pares]
+    ordem = {n: i for i, n in enumerate(nomes_js)}
+    pares.sort(key=lambda p: ordem[p[0]])
+    return pares, [n for n in nomes_js if n not in casadas], restantes
+
+
+def comparar_pastas_de_trabalho(path_js, path_python, amostras=AMOSTRAS_PADRAO, chaves=None,
+                                alinhar=False, bloco=BLOCO_PADRAO, processos=None):
+    """
+    Compara todas as abas casadas pelo nome, cada par num processo.
+    Imprime o detalhe das abas com diferença e um resumo por aba.
+    Retorna True se todas as abas existem dos dois lados e são iguais.
+    """
+    _cabecalho(path_js, path_python)
+    pares, so_js, so_py = casar_abas([n for n, _ in listar_abas_xlsx(path_js)],
+                                     [n for n, _ in listar_abas_xlsx(path_python)])
+
+    processos = processos or min(len(pares), os.cpu_count() or 1) or 1
+    args = [(path_js, path_python, a, b, amostras, chaves, alinhar, bloco) for a, b in pares]
+    if processos > 1 and len(pares) > 1:
+        with ProcessPoolExecutor(max_workers=processos) as ex:
+            resultados = list(ex.map(comparar_aba, *zip(*args)))
+    else:
+        resultados = [comparar_aba(*a) for a in args]
+
+    for r in resultados:
+        if not r["ok"]:
+            nome = r["aba_js"] if r["aba_js"] == r["aba_python"] else f"{r['aba_js']} x {r['aba_python']}"
+            print(f"\n--- Aba: {nome} ---")
+            _imprimir_resultado(r, amostras)
+
+    print(f"\n{'='*60}")
+    print("RESUMO POR ABA")
+    print(f"{'='*60}")
+    print(f"{'Aba':<32}{'Linhas JS':>11}{'Linhas Py':>11}{'Diferenças':>12}  Status")
+    for r in resultados:
+        difs = r["total"] + r.get("qtd_so_js", 0) + r.get("qtd_so_py", 0) + len(r["headers"])
+        print(f"{str(r['aba_js'])[:31]:<32}{r['linhas_js']:>11,}{r['linhas_py']:>11,}{difs:>12,}  "
+              f"{'OK' if r['ok'] else 'DIFERENTE'}")
+    for n in so_js:
+        print(f"{n[:31]:<32}{'':>11}{'-':>11}{'':>12}  SÓ NO JS")
+    for n in so_py:
+        print(f"{n[:31]:<32}{'-':>11}{'':>11}{'':>12}  SÓ NO PYTHON")
+
+    ok = not so_js and not so_py and all(r["ok"] for r in resultados)
+    print(f"{'='*60}")
+    print(f"RESULTADO GERAL: {'IDENTICOS!' if ok else 'HÁ DIFERENÇAS'}")
+    print(f"{'='*60}")
+    return ok
+
+
+def _aba(v):
+    """Aba por índice (0, 1, ...) ou por nome."""
+    return int(v) if v.lstrip("-").isdigit() else v
 
 
 if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Compara duas planilhas célula a célula.")
+    ap.add_argument("arquivo_js")
+    ap.add_argument("arquivo_python")
+    ap.add_argument("aba_js", nargs="?", default=None)
+    ap.add_argument("aba_python", nargs="?", default=None)
+    ap.add_argument("--amostras", type=int, default=AMOSTRAS_PADRAO, help="diferenças exibidas (padrão 30)")
+    ap.add_argument("--chave", action="append", default=[], metavar="COLUNA",
+                    help="coluna chave para casar as linhas (repetir para chave composta)")
+    ap.add_argument("--alinhar", action="store_true",
+                    help="sem chave: casa as linhas pelo hash da linha inteira")
+    ap.add_argument("--processos", type=int, default=None,
+                    help="processos para comparar as abas (padrão: nº de CPUs)")
+    ap.add_argument("--bloco", type=int, default=BLOCO_PADRAO,
+                    help=f"linhas lidas por vez de cada aba (padrão {BLOCO_PADRAO:,})")
     if len(sys.argv) < 3:
-        print("Uso: python comparar.py <arquivo_js.xlsx> <arquivo_python.xlsx> [aba_js] [aba_python]")
+        print("Uso: python comparar.py <arquivo_js.xlsx> <arquivo_python.xlsx> [aba_js] [aba_python] [--amostras N]")
         print()
         print("Exemplo:")
         print('  python comparar.py "resultado_js.xlsx" "processados/Relacao_de_Credores_Fornecedores (1)_FILTRADO_TIPO.xlsx"')
         sys.exit(1)
+    args = ap.parse_args()
 
-    path_js = sys.argv[1]
-    path_py = sys.argv[2]
-    aba_js = int(sys.argv[3]) if len(sys.argv) > 3 else 0
-    aba_py = int(sys.argv[4]) if len(sys.argv) > 4 else 0
+    path_js = args.arquivo_js
+    path_py = args.arquivo_python
 
     if not os.path.exists(path_js):
         print(f"Arquivo não encontrado: {path_js}")
@@ -158,5 +609,15 @@ if __name__ == "__main__":
         print(f"Arquivo não encontrado: {path_py}")
         sys.exit(1)
 
-    ok = comparar_planilhas(path_js, path_py, aba_js, aba_py)
+    try:
+        if args.aba_js is None:
+            ok = comparar_pastas_de_trabalho(path_js, path_py, args.amostras, chaves=args.chave,
+                                             alinhar=args.alinhar, bloco=args.bloco, processos=args.processos)
+        else:
+            aba_py = args.aba_python if args.aba_python is not None else args.aba_js
+            ok = comparar_planilhas(path_js, path_py, _aba(args.aba_js), _aba(aba_py), args.amostras,
+                                    chaves=args.chave, alinhar=args.alinhar, bloco=args.bloco)
+    except (KeyError, IndexError) as e:
+        print(f"Erro: aba ou coluna não encontrada: {e}")
+        sys.exit(1)
     sys.exit(0 if ok else 1)
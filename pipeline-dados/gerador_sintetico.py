@@ -0,0 +1,453 @@
+# -*- coding: utf-8 -*-
+"""
+Gerador de relatórios SIGEF sintéticos (.xlsx) — um por layout de entrada.
+
+Produz planilhas no mesmo formato que cada script espera, com dados
+inventados (nenhum dado real): blocos de várias linhas, linhas de totais,
+marcadores "Unidade gestora:", históricos MEMO/PAD/prestador com as variações
+e erros de digitação que aparecem nos relatórios (MOEMORANDO, MEO, MWMO,
+MEMRANDO, ano duplicado "/2025/2025", parênteses duplos...).
+
+Uso:
+  python gerador_sintetico.py <layout|todos> [registros] [--seed N] [--saida PASTA]
+
+Layouts: credores, liquidados, a-pagar, emitidos, pagos, retidos
+(os mesmos nomes dos casos do regressao.py; a saída padrão é fixtures/<layout>.xlsx).
+"registros" = empenhos/liquidações/retenções/credores gerados (padrão 1.000);
+alguns layouts usam várias linhas físicas por registro. As linhas são geradas
+sob demanda e gravadas com xlsxwriter em constant_memory, então milhões de
+registros cabem em memória constante (só as colunas numpy ficam em RAM).
+"""
+
+import argparse
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "scripts"))
+from CPFECNPJ import _PESOS_CNPJ_DV1, _PESOS_CNPJ_DV2, _PESOS_CPF_DV1, _PESOS_CPF_DV2  # noqa: E402
+
+PASTA_PADRAO = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+ANO = 2025
+
+# ==========================================================
+# Vocabulário
+# ==========================================================
+UNIDADES_GESTORAS = [
+    "SECRETARIA MUNICIPAL DE SAÚDE",
+    "SECRETARIA MUNICIPAL DE EDUCAÇÃO",
+    "FUNDO MUNICIPAL DE ASSISTÊNCIA SOCIAL",
+    "SECRETARIA DE OBRAS E SERVIÇOS PÚBLICOS",
+    "SECRETARIA DA FAZENDA MUNICIPAL",
+]
+UNIDADES_ORCAMENTARIAS = ["02.01 - GABINETE", "05.01 - FMS", "06.02 - FUNDEB", "08.01 - FMAS", "10.03 - SEINFRA"]
+ESPECIES = ["Ordinário", "Global", "Estimativa"]
+DESPESAS = ["3.3.90.39", "3.3.90.30", "3.3.90.36", "3.3.90.35", "3.1.90.11", "3.3.90.79", "4.4.90.52"]
+FONTES = ["1.500.0000", "1.600.0000", "1.540.0000", "1.550.0000", "1.700.0000"]
+RETENCOES = ["ISS", "IRRF", "INSS", "ISS - RETIDO NA FONTE", "IRRF - SERVIÇOS"]
+CONSIGNACOES = ["CONSIGNADO BANCO DO BRASIL", "CONSIGNADO CAIXA", "PENSÃO ALIMENTÍCIA", "SINDICATO SINDSERV"]
+CIDADES = ["CARUARU - PE", "RECIFE - PE", "GRAVATÁ - PE", "BEZERROS - PE", "SÃO PAULO - SP", "JOÃO PESSOA - PB"]
+
+_NOMES = ["MARIA", "JOSÉ", "ANA", "JOÃO", "ANTÔNIO", "FRANCISCA", "CARLOS", "PAULO", "LUCIANA", "RAFAEL"]
+_SOBRENOMES = ["SILVA", "SANTOS", "OLIVEIRA", "SOUZA", "LIMA", "PEREIRA", "FERREIRA", "ALMEIDA", "BARBOSA"]
+_EMPRESAS = ["COMERCIAL", "DISTRIBUIDORA", "CONSTRUTORA", "SERVIÇOS MÉDICOS", "TECNOLOGIA", "TRANSPORTES"]
+_SUFIXOS = ["LTDA", "EIRELI", "ME", "S/A", "LTDA - EPP"]
+
+_OBJETOS = [
+    "AQUISIÇÃO DE MATERIAL DE EXPEDIENTE",
+    "LOCAÇÃO DE VEÍCULOS PARA A SECRETARIA",
+    "PRESTAÇÃO DE SERVIÇOS DE MANUTENÇÃO PREDIAL",
+    "FORNECIMENTO DE MEDICAMENTOS",
+    "SERVIÇOS DE LIMPEZA URBANA",
+    "AQUISIÇÃO DE GÊNEROS ALIMENTÍCIOS PARA MERENDA ESCOLAR",
+]
+# (modelo, peso) — {n} número, {a} ano, {o} objeto
+_MODELOS_HISTORICO = [
+    ("MEMORANDO Nº {n}/{a} - {o}", 20),
+    ("MEMO {n}/{a} {o}", 8),
+    ("(MEMORANDO Nº {n}/{a}) {o}", 6),
+    ("((MEMO Nº {n}/{a}) {o}", 2),
+    ("MEMORANDO Nº {n}/{a}/{a} - {o}", 3),
+    ("MOEMORANDO {n}/{a} - {o}", 2),
+    ("MEO {n}/{a} {o}", 1),
+    ("MWMO {n}/{a} {o}", 1),
+    ("MEMRANDO {n}/{a} - {o}", 1),
+    ("MEMRANDOO {n}/{a} - {o}", 1),
+    ("MEMORANDO {n.} - {o}", 2),
+    ("PAD {p}/{a} - {o}", 10),
+    ("PROCESSO ADMINISTRATIVO Nº {p}/{a} {o}", 8),
+    ("PROCESSO ADMINSTRATIVO {p} - {o}", 2),
+    ("PA {p}/{a} {o}", 2),
+    ("PAA {p}/{a} - {o}", 1),
+    ("CONTRATO {p}/{a} PROCESSO ADMINISTRATIVO {p}/{a} - {o}", 3),
+    ("{n}/{a}", 3),
+    ("{o}", 18),
+    ("PRESTAÇÃO DE SERVIÇOS - {o}", 6),
+]
+
+
+# ==========================================================
+# Geradores de colunas (vetorizados)
+# ==========================================================
+def _escolher(rng, opcoes, n, pesos=None):
+    p = None if pesos is None else np.asarray(pesos, dtype=float) / np.sum(pesos)
+    return np.asarray(opcoes, dtype=object)[rng.choice(len(opcoes), n, p=p)]
+
+
+def _com_dvs(base, pesos1, pesos2, cpf):
+    dv1 = base @ pesos1
+    dv1 = dv1 * 10 % 11 % 10 if cpf else np.where(dv1 % 11 < 2, 0, 11 - dv1 % 11)
+    m = np.column_stack([base, dv1])
+    dv2 = m @ pesos2
+    dv2 = dv2 * 10 % 11 % 10 if cpf else np.where(dv2 % 11 < 2, 0, 11 - dv2 % 11)
+    return np.column_stack([m, dv2])
+
+
+def _para_texto(m):
+    """Matriz de dígitos -> Series de strings (sem loop Python)."""
+    buf = (np.ascontiguousarray(m, dtype=np.uint8) + 48).tobytes()
+    return pd.Series(np.frombuffer(buf, dtype=f"S{m.shape[1]}").astype(str))
+
+
+def gerar_coluna_cpf_cnpj(n, seed=42):
+    """Coluna F de credores: CPF/CNPJ formatados, DV errado, vazios e lixo."""
+    rng = np.random.default_rng(seed)
+    n_cpf, n_cnpj = int(n * 0.45), int(n * 0.35)
+    n_erro = int(n * 0.10)
+    n_resto = n - n_cpf - n_cnpj - n_erro
+
+    cpf = _para_texto(_com_dvs(rng.integers(0, 10, (n_cpf, 9)), _PESOS_CPF_DV1, _PESOS_CPF_DV2, True))
+    cpf = cpf.str[:3] + "." + cpf.str[3:6] + "." + cpf.str[6:9] + "-" + cpf.str[9:]
+    cnpj = _para_texto(_com_dvs(rng.integers(0, 10, (n_cnpj, 12)), _PESOS_CNPJ_DV1, _PESOS_CNPJ_DV2, False))
+    cnpj = cnpj.str[:2] + "." + cnpj.str[2:5] + "." + cnpj.str[5:8] + "/" + cnpj.str[8:12] + "-" + cnpj.str[12:]
+    erro = _para_texto(rng.integers(0, 10, (n_erro, 11)))
+    resto = pd.Series(rng.choice(["", "EXTERIOR", "123.456", "sem documento"], n_resto))
+
+    col = pd.concat([cpf, cnpj, erro, resto], ignore_index=True)
+    return col.iloc[rng.permutation(n)].reset_index(drop=True)
+
+
+def gerar_nomes_credores(rng, n):
+    """Metade pessoas físicas, metade empresas."""
+    pessoa = rng.random(n) < 0.5
+    nome = _escolher(rng, _NOMES, n) + " " + _escolher(rng, _SOBRENOMES, n) + " " + _escolher(rng, _SOBRENOMES, n)
+    empresa = (_escolher(rng, _EMPRESAS, n) + " " + _escolher(rng, _SOBRENOMES, n) + " "
+               + _escolher(rng, _SUFIXOS, n))
+    return np.where(pessoa, nome, empresa)
+
+
+def gerar_historicos(rng, n, ano=ANO):
+    """Históricos de empenho/liquidação com a distribuição MEMO / PAD / prestador (e erros de digitação)."""
+    modelos = [m for m, _ in _MODELOS_HISTORICO]
+    idx = rng.choice(len(modelos), n, p=np.array([p for _, p in _MODELOS_HISTORICO], float)
+                     / sum(p for _, p in _MODELOS_HISTORICO))
+    numeros = rng.integers(1, 3000, n)
+    processos = rng.integers(1, 400, n)
+    objetos = _escolher(rng, _OBJETOS, n)
+    out = np.empty(n, dtype=object)
+    for i in range(n):
+        n_i = int(numeros[i])
+        out[i] = modelos[idx[i]].replace("{n.}", f"{n_i:,}".replace(",", ".")).format(
+            n=n_i, p=f"{int(processos[i]):03d}", a=ano, o=objetos[i])
+    return out
+
+
+def gerar_datas(rng, n, ano=ANO):
+    """Datas em ordem crescente (relatórios são por data) dentro do ano."""
+    dias = np.sort(rng.integers(0, 365, n))
+    base = datetime(ano, 1, 1)
+    return [base + timedelta(days=int(d)) for d in dias]
+
+
+def gerar_valores(rng, n):
+    """Valores com 2 casas, cauda longa (muitos pequenos, poucos grandes)."""
+    return np.round(rng.lognormal(mean=7.0, sigma=1.4, size=n), 2)
+
+
+def _ug_por_registro(rng, n):
+    """Unidade gestora de cada registro, em blocos contíguos (relatório agrupa por UG)."""
+    k = min(len(UNIDADES_GESTORAS), max(1, n // 50))
+    cortes = np.sort(rng.choice(np.arange(1, n), k - 1, replace=False)) if k > 1 and n > k else np.array([], int)
+    return np.repeat(np.arange(k), np.diff(np.r_[0, cortes, n]))
+
+
+# ==========================================================
+# Layouts (geradores de linhas — memória constante no nº de registros)
+# ==========================================================
+def linhas_credores(rng, n):
+    """Relação de Credores/Fornecedores: CPF/CNPJ na coluna F (B, D, E, H e I são descartadas)."""
+    cab = ["Código", None, "Credor/Fornecedor", None, None, "CPF/CNPJ", "Cidade - UF", "Telefone", "E-mail"]
+    docs = gerar_coluna_cpf_cnpj(n, int(rng.integers(1 << 31)))
+    nomes = gerar_nomes_credores(rng, n)
+    cidades = _escolher(rng, CIDADES, n)
+    telefones = rng.integers(30_000_000, 99_999_999, n)
+    yield cab
+    for i in range(n):
+        tel = f"(81) 9{int(telefones[i])}" if telefones[i] % 3 else None
+        yield [i + 1, None, nomes[i], None, None, docs[i] or None, cidades[i], tel, None]
+
+
+def linhas_a_pagar(rng, n):
+    """Empenhos a Pagar por Data de Emissão: linhas sem "Av. liquid." são marcadores/totais."""
+    cab = ["Data", "Nr emp.", "Espécie", "Credor/Fornecedor", None, "Despesa", "Fonte de recursos",
+           "Av. liquid.", "Dt. liquid.", "Valor liquidado", "Valor retido", "Valor a pagar"]
+    datas = gerar_datas(rng, n)
+    ug = _ug_por_registro(rng, n)
+    nomes = gerar_nomes_credores(rng, n)
+    valores = gerar_valores(rng, n)
+    retidos = np.round(valores * rng.choice([0, 0, 0.05, 0.11], n), 2)
+    especies = _escolher(rng, ESPECIES, n)
+    despesas = _escolher(rng, DESPESAS, n)
+    fontes = _escolher(rng, FONTES, n)
+    liq = rng.integers(1, 9_999_999, n)
+
+    yield cab
+    ultima_data = ultima_ug = None
+    total_dia = 0.0
+    for i in range(n):
+        if ug[i] != ultima_ug:
+            yield ["Unidade gestora:", None, UNIDADES_GESTORAS[ug[i]]] + [None] * 9
+            ultima_ug = ug[i]
+        mostrar_data = datas[i] if datas[i] != ultima_data else None
+        if mostrar_data is not None and ultima_data is not None:
+            yield ["Total do dia"] + [None] * 10 + [round(total_dia, 2)]
+            total_dia = 0.0
+        ultima_data = datas[i]
+        a_pagar = round(float(valores[i] - retidos[i]), 2)
+        total_dia += a_pagar
+        yield [mostrar_data, f"{i + 1}/{ANO}", especies[i], nomes[i], None, despesas[i], fontes[i],
+               f"{int(liq[i]):07d}-{int(liq[i]) % 10}/{ANO}", datas[i] + timedelta(days=int(i % 20)),
+               float(valores[i]), float(retidos[i]), a_pagar]
+    yield ["Total Geral"] + [None] * 10 + [round(float((valores - retidos).sum()), 2)]
+
+
+def linhas_pagos(rng, n):
+    """
+    Empenhos Pagos Sintético por Nr de Empenho: 1+ pagamentos por empenho,
+    credor só na 1ª linha do empenho e linhas de total (ALVOS_A).
+    """
+    cab = ["Data", "Nr emp.", "Credor/Fornecedor", "Seq. Liq.", "Nr pagamento", "Fonte de recursos", "Valor (R$)"]
+    n_emp = max(1, n // 2)
+    pag_por_emp = rng.integers(1, 4, n_emp)
+    n_pag = int(pag_por_emp.sum())
+    nomes = gerar_nomes_credores(rng, n_emp)
+    fontes = _escolher(rng, FONTES, n_emp)
+    datas = gerar_datas(rng, n_pag)
+    valores = gerar_valores(rng, n_pag)
+    seqs = rng.integers(1, 9_999_999, n_pag)
+
+    # 2ª linha (descartada pelo script) identifica a unidade gestora
+    ug = UNIDADES_GESTORAS[int(rng.integers(len(UNIDADES_GESTORAS)))]
+    yield cab
+    yield [f"Unidade Gestora: {ug}"] + [None] * 6
+    k = 0
+    for e in range(n_emp):
+        inicio = k
+        for j in range(int(pag_por_emp[e])):
+            credor = nomes[e] if j == 0 else None
+            yield [datas[k].strftime("%d/%m/%Y"), f"{e + 1}/{ANO}", credor,
+                   f"{int(seqs[k]):07d}-{int(seqs[k]) % 10}", f"{k + 1:06d}", fontes[e], float(valores[k])]
+            k += 1
+        yield ["Total do empenho:", None, None, None, None, None, round(float(valores[inicio:k].sum()), 2)]
+    total = round(float(valores.sum()), 2)
+    yield ["Total da Unidade Gestora:", None, None, None, None, None, total]
+    yield ["Total Geral", None, None, None, None, None, total]
+
+
+def linhas_emitidos(rng, n):
+    """
+    Empenhos Emitidos por Data de Emissão: cada empenho ocupa 2 linhas —
+    a linha de dados e a linha "Objeto:" com o histórico na coluna do Nr emp.
+    """
+    cab = ["Data", "Nr emp.", "Espécie", "Despesa", "Unidade orçamentária", "Fonte de recursos", None,
+           "Credor/Fornecedor", "Valor (R$)", None]
+    datas = gerar_datas(rng, n)
+    nomes = gerar_nomes_credores(rng, n)
+    historicos = gerar_historicos(rng, n)
+    valores = gerar_valores(rng, n)
+    especies = _escolher(rng, ESPECIES, n)
+    despesas = _escolher(rng, DESPESAS, n)
+    unidades = _escolher(rng, UNIDADES_ORCAMENTARIAS, n)
+    fontes = _escolher(rng, FONTES, n)
+
+    yield cab
+    yield ["Unidade Gestora:", UNIDADES_GESTORAS[int(rng.integers(len(UNIDADES_GESTORAS)))]] + [None] * 8
+    ultima_data = None
+    for i in range(n):
+        mostrar_data = datas[i] if datas[i] != ultima_data else None
+        ultima_data = datas[i]
+        yield [mostrar_data, i + 1, especies[i], despesas[i], unidades[i], fontes[i], None,
+               nomes[i], float(valores[i]), None]
+        yield ["Objeto:", historicos[i]] + [None] * 8
+
+
+def linhas_liquidados(rng, n):
+    """
+    Empenhos Liquidados por Data de Movimento: bloco de linhas por liquidação
+    (dados, "Objeto:" + histórico do empenho, histórico da liquidação,
+    "Documento fiscal", documento), com colunas vazias intercaladas,
+    marcadores de unidade gestora e totais.
+    """
+    cab = ["Data", "Nr emp.", "Seq. liq.", "Espécie", "Unidade orçamentária", None, "Despesa", None,
+           "Fonte de recursos", "Beneficiário", None, None, "Valor (R$)", None]
+    largura = len(cab)
+    datas = gerar_datas(rng, n)
+    ug = _ug_por_registro(rng, n)
+    nomes = gerar_nomes_credores(rng, n)
+    hist_emp = gerar_historicos(rng, n)
+    hist_liq = gerar_historicos(rng, n)
+    valores = gerar_valores(rng, n)
+    especies = _escolher(rng, ESPECIES, n)
+    despesas = _escolher(rng, DESPESAS, n)
+    unidades = _escolher(rng, UNIDADES_ORCAMENTARIAS, n)
+    fontes = _escolher(rng, FONTES, n)
+    seqs = rng.integers(1, 9_999_999, n)
+    notas = rng.integers(1, 99_999, n)
+
+    def linha(**cols):
+        row = [None] * largura
+        for c, v in cols.items():
+            row[ord(c) - 65] = v
+        return row
+
+    yield cab
+    ultima_data = ultima_ug = None
+    total_dia = 0.0
+    for i in range(n):
+        if ug[i] != ultima_ug:
+            if ultima_ug is not None:
+                yield linha(A="Total da unidade gestora", M=round(total_dia, 2))
+            yield linha(A="Unidade gestora:", C=UNIDADES_GESTORAS[ug[i]])
+            ultima_ug = ug[i]
+        if datas[i] != ultima_data:
+            if ultima_data is not None:
+                yield linha(A="Total do dia", M=round(total_dia, 2))
+                total_dia = 0.0
+            ultima_data = datas[i]
+        total_dia += float(valores[i])
+        yield linha(A=datas[i].strftime("%d/%m/%Y"), B=f"{i + 1}/{ANO}",
+                    C=f"{int(seqs[i]):07d}-{int(seqs[i]) % 10}", D=especies[i], E=unidades[i],
+                    G=despesas[i], I=fontes[i], J=nomes[i], M=float(valores[i]))
+        yield linha(B="Objeto:", C=hist_emp[i])
+        yield linha(C=hist_liq[i])
+        yield linha(C="Documento fiscal", F="Série")
+        yield linha(C=f"NF {int(notas[i]):06d}", F=str(int(notas[i]) % 9 + 1))
+    yield linha(A="Total do mês", M=round(float(valores.sum()), 2))
+    yield linha(A="Total geral", M=round(float(valores.sum()), 2))
+
+
+def _aba_retencoes(rng, n, tipos):
+    """Uma aba do relatório de Retenções/Consignações (cabeçalho na 3ª linha, 26 colunas)."""
+    largura = 26
+
+    def linha(**cols):
+        row = [None] * largura
+        for c, v in cols.items():
+            row[ord(c) - 65] = v
+        return row
+
+    cab = linha(A="Data", C="Sequência", D="Seq. estor.", E="Fonte recursos", H="Nr. empenho",
+                J="Credor/Fornecedor", O="Av. liquid.", P="Protocolo", V="Doc. fiscal", Y="Valor")
+    datas = gerar_datas(rng, n)
+    nomes = gerar_nomes_credores(rng, n)
+    docs = gerar_coluna_cpf_cnpj(n, int(rng.integers(1 << 31)))
+    tipo = _escolher(rng, tipos, n, pesos=np.arange(len(tipos), 0, -1))
+    sem_tipo = rng.random(n) < 0.02            # linhas sem retenção -> aba TOTAL
+    brutos = gerar_valores(rng, n)
+    retido = np.round(brutos * rng.choice([0.02, 0.05, 0.11, 0.015], n), 2)
+    fontes = _escolher(rng, FONTES, n)
+    liq = rng.integers(1, 9_999_999, n)
+
+    # título, linha em branco e cabeçalho (descartado pelo filtro de "valor")
+    yield linha(A="Relação de Retenções e Consignações — Valores em R$")
+    yield linha()
+    yield cab
+    ordem = np.argsort(tipo, kind="stable")
+    ultimo_tipo = None
+    for i in ordem:
+        if tipo[i] != ultimo_tipo:
+            yield linha(A=f"Conta contábil: 2.1.8.8.1.01.{int(rng.integers(1, 99)):02d} - {tipo[i]}")
+            ultimo_tipo = tipo[i]
+        yield linha(A=datas[i].strftime("%d/%m/%Y"), B=None if sem_tipo[i] else tipo[i],
+                    C=str(int(i) + 1), E=fontes[i], H=f"{int(i) + 1}/{ANO}", J=nomes[i],
+                    L=docs[i] or None, M=float(retido[i]),
+                    O=f"{int(liq[i]):07d}-{int(liq[i]) % 10}/{ANO}", P=f"PROT-{int(i):06d}",
+                    V=f"NF {int(liq[i]) % 99_999:05d}", W=f"DE-{int(i) % 997:03d}", Y=float(brutos[i]))
+        if i % 50 == 0:
+            yield linha(A="Doc. extraorçamentário", C="Valor")
+    yield linha(A="Total geral", M=round(float(retido.sum()), 2), Y=round(float(brutos.sum()), 2))
+
+
+LAYOUTS = {
+    "credores": [("Credores", linhas_credores)],
+    "liquidados": [("Sheet1", linhas_liquidados)],
+    "a-pagar": [("Sheet1", linhas_a_pagar)],
+    "emitidos": [("Sheet1", linhas_emitidos)],
+    "pagos": [("Sheet1", linhas_pagos)],
+    # Retenções/Consignações: várias abas no layout de 26 colunas (NOVO_CABECALHO na saída)
+    "retidos": [
+        ("Retenções", lambda rng, n: _aba_retencoes(rng, n, RETENCOES)),
+        ("Consignações", lambda rng, n: _aba_retencoes(rng, max(1, n // 4), CONSIGNACOES)),
+    ],
+}
+
+
+# ==========================================================
+# Gravação
+# ==========================================================
+def gravar_xlsx(caminho, abas):
+    """
+    Grava [(nome_aba, linhas)] com xlsxwriter (constant_memory), consumindo
+    cada iterável de linhas uma única vez. Datas em dd/mm/yyyy.
+    A 1ª linha sai em negrito: as células vazias formatadas entram na dimensão
+    da aba, como no SIGEF (alguns scripts dependem de ws.max_column).
+    """
+    import xlsxwriter
+
+    wb = xlsxwriter.Workbook(str(caminho), {"constant_memory": True, "default_date_format": "dd/mm/yyyy"})
+    try:
+        negrito = wb.add_format({"bold": True})
+        total = 0
+        for nome, linhas in abas:
+            ws = wb.add_worksheet(nome[:31])
+            for r, row in enumerate(linhas):
+                ws.write_row(r, 0, row, negrito if r == 0 else None)
+                total += 1
+    finally:
+        wb.close()
+    return total
+
+
+def gerar(layout, registros, seed=42, saida=PASTA_PADRAO):
+    """Gera <saida>/<layout>.xlsx. Retorna (caminho, linhas físicas)."""
+    rng = np.random.default_rng(seed)
+    os.makedirs(saida, exist_ok=True)
+    caminho = os.path.join(saida, f"{layout}.xlsx")
+    abas = [(nome, linhas(rng, registros)) for nome, linhas in LAYOUTS[layout]]
+    return caminho, gravar_xlsx(caminho, abas)
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Gera relatórios SIGEF sintéticos (.xlsx).")
+    ap.add_argument("layout", help=f"{', '.join(LAYOUTS)} ou todos")
+    ap.add_argument("registros", nargs="?", type=int, default=1000)
+    ap.add_argument("--seed", type=int, default=42)
+    ap.add_argument("--saida", default=PASTA_PADRAO, help="pasta de saída (padrão: fixtures/)")
+    args = ap.parse_args()
+
+    layouts = list(LAYOUTS) if args.layout == "todos" else [args.layout]
+    for lay in layouts:
+        if lay not in LAYOUTS:
+            ap.error(f"layout desconhecido: {lay}")
+        t0 = time.perf_counter()
+        caminho, linhas = gerar(lay, args.registros, args.seed, args.saida)
+        print(f"✅ {lay:<11} {args.registros:>12,} registros {linhas:>12,} linhas "
+              f"{time.perf_counter() - t0:>7.1f}s  {caminho}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+﻿/**
+ * Leitura do pacote de importação gerado pelos scripts Python (--pacote)
+ * Formato: pipeline-dados/scripts/pacote_importacao.py
+ *
+ * <saida>.pacote.json.gz = gzip de linhas JSON:
+ *   1ª linha: cabeçalho { store, colunas, dicionarios, total, lote, ... }
+ *   demais:   um lote colunar { n, colunas: [[...], ...] } por linha
+ * Os registros já vêm com as chaves canônicas e datas em DD/MM/AAAA:
+ * nada de XLSX.read / sheet_to_json, só descompactar e montar objetos.
+ */
+
+const SUFIXO_PACOTE_IMPORTACAO = '.pacote.json.gz';
+
+/** O arquivo é um pacote de importação? */
+function ehPacoteImportacao(nomeArquivo) {
+  return String(nomeArquivo || '').toLowerCase().endsWith(SUFIXO_PACOTE_IMPORTACAO);
+}
+
+/** Nome do .xlsx que gerou o pacote (pagos_SAIDA.pacote.json.gz -> pagos_SAIDA.xlsx) */
+function xlsxDoPacote(nomeArquivo) {
+  return String(nomeArquivo).slice(0, -SUFIXO_PACOTE_IMPORTACAO.length) + '.xlsx';
+}
+
+/** Linhas de texto de um File/Blob gzip, descompactadas em streaming */
+async function* linhasGzip(arquivo) {
+  const leitor = arquivo.stream()
+    .pipeThrough(new DecompressionStream('gzip'))
+    .pipeThrough(new TextDecoderStream())
+    .getReader();
+  let resto = '';
+  while (true) {
+    const { value, done } = await leitor.read();
+    if (done) break;
+    resto += value;
+    let fim;
+    while ((fim = resto.indexOf('\n')) >= 0) {
+      const linha = resto.slice(0, fim);
+      resto = resto.slice(fim + 1);
+      if (linha) yield linha;
+    }
+  }
+  if (resto) yield resto;
+}
+
+/**
+ * Monta os registros de um lote colunar
+ * @param {Object} cabecalho - 1ª linha do pacote
+ * @param {Object} lote - { n, colunas }
+ * @returns {Object[]}
+ */
+function decodificarLotePacote(cabecalho, lote) {
+  const chaves = cabecalho.colunas;
+  const dicionarios = chaves.map((_, k) => cabecalho.dicionarios[k] || null);
+  const registros = new Array(lote.n);
+  for (let r = 0; r < lote.n; r++) {
+    const obj = {};
+    for (let k = 0; k < chaves.length; k++) {
+      let v = lote.colunas[k][r];
+      if (v === null || v === undefined) v = '';
+      else if (dicionarios[k]) v = dicionarios[k][v];
+      obj[chaves[k]] = v;
+    }
+    registros[r] = obj;
+  }
+  return registros;
+}
+
+/**
+ * Lê um pacote de importação inteiro
+ * @param {File|Blob} arquivo
+ * @param {Function} [aoLote] - async (registros, cabecalho); sem ele os registros são acumulados
+ * @returns {Promise<{store: string, total: number, cabecalho: Object, registros: Object[]}>}
+ */
+async function lerPacoteImportacao(arquivo, aoLote) {
+  let cabecalho = null;
+  const registros = [];
+  for await (const linha of linhasGzip(arquivo)) {
+    const obj = JSON.parse(linha);
+    if (!cabecalho) {
+      if (obj.formato !== 'pacote-importacao' || obj.versao !== 1) {
+        throw new Error('Pacote de importação em formato desconhecido: ' + (arquivo.name || ''));
+      }
+      cabecalho = obj;
+      continue;
+    }
+    const lote = decodificarLotePacote(cabecalho, obj);
+    if (aoLote) await aoLote(lote, cabecalho);
+    else for (let i = 0; i < lote.length; i++) registros.push(lote[i]);
+  }
+  if (!cabecalho) throw new Error('Pacote de importação vazio: ' + (arquivo.name || ''));
+  return { store: cabecalho.store, total: cabecalho.total, cabecalho: cabecalho, registros: registros };
+}
@@ -5,9 +5,9 @@
  * Pipeline:
  * 1. Ler planilha como texto (preservar zeros à esquerda)
  * 2. Extrair CPF/CNPJ da coluna "CPF/CNPJ" â†’ apenas 11 ou 14 dígitos
- * 3. Criar coluna Tipo (CPF ou CNPJ)
+ * 3. Criar coluna Tipo (CPF ou CNPJ) e CPF_CNPJ_Valido (dígitos verificadores)
  * 4. Remover linhas sem CPF/CNPJ válido
- * 5. Manter apenas colunas: Código, Credor/Fornecedor, CPF/CNPJ, Cidade - UF, CPF_CNPJ, Tipo
+ * 5. Manter apenas colunas: Código, Credor/Fornecedor, CPF/CNPJ, Cidade - UF, CPF_CNPJ, Tipo, CPF_CNPJ_Valido
  * 6. Retornar resultado
  */
 function transformarCredores(workbook) {
@@ -32,8 +32,27 @@ function transformarCredores(workbook) {
     return (digits.length === 11 || digits.length === 14) ? digits : null;
   }
 
-  // Adicionar CPF_CNPJ e Tipo, filtrando linhas sem CPF/CNPJ válido
-  const resultado = [[...header, 'CPF_CNPJ', 'Tipo']];
+  /** Confere os 2 dígitos verificadores (mesma regra de CPFECNPJ.py) */
+  function dvValido(doc) {
+    if (/^(\d)\1*$/.test(doc)) return false; // 000.000.000-00, 111..., etc.
+    const d = doc.split('').map(Number);
+    function dv(n, pesos) {
+      let soma = 0;
+      for (let i = 0; i < n; i++) soma += d[i] * pesos[i];
+      if (doc.length === 11) return (soma * 10) % 11 % 10;
+      const r = soma % 11;
+      return r < 2 ? 0 : 11 - r;
+    }
+    if (doc.length === 11) {
+      return dv(9, [10, 9, 8, 7, 6, 5, 4, 3, 2]) === d[9] &&
+        dv(10, [11, 10, 9, 8, 7, 6, 5, 4, 3, 2]) === d[10];
+    }
+    return dv(12, [5, 4, 3, 2, 9, 8, 7, 6, 5, 4, 3, 2]) === d[12] &&
+      dv(13, [6, 5, 4, 3, 2, 9, 8, 7, 6, 5, 4, 3, 2]) === d[13];
+  }
+
+  // Adicionar CPF_CNPJ, Tipo e CPF_CNPJ_Valido, filtrando linhas sem CPF/CNPJ
+  const resultado = [[...header, 'CPF_CNPJ', 'Tipo', 'CPF_CNPJ_Valido']];
 
   for (let r = 1; r < matrix.length; r++) {
     const row = matrix[r];
@@ -42,12 +61,12 @@ function transformarCredores(workbook) {
     if (cpfCnpj === null) continue; // Remove linhas sem CPF/CNPJ
 
     const tipo = cpfCnpj.length === 11 ? 'CPF' : 'CNPJ';
-    resultado.push([...row, cpfCnpj, tipo]);
+    resultado.push([...row, cpfCnpj, tipo, dvValido(cpfCnpj)]);
   }
 
   // Manter apenas colunas desejadas por nome (abordagem keep-by-name)
   const headerComExtras = resultado[0];
-  const colunasDesejadas = ['Código', 'Credor/Fornecedor', 'CPF/CNPJ', 'Cidade - UF', 'CPF_CNPJ', 'Tipo'];
+  const colunasDesejadas = ['Código', 'Credor/Fornecedor', 'CPF/CNPJ', 'Cidade - UF', 'CPF_CNPJ', 'Tipo', 'CPF_CNPJ_Valido'];
   const final = keepColumns(resultado, headerComExtras, colunasDesejadas);
 
   const outSheet = matrixToSheet(final);
@@ -0,0 +1,167 @@
+# -*- coding: utf-8 -*-
+"""
+Orquestrador: roda os seis scripts do pipeline sobre uma árvore "Pipeline V2/<ano>/".
+
+Percorre as pastas de ano, identifica o relatório de cada planilha pelo
+cabeçalho (não pelo nome do arquivo) e agenda o script correspondente num
+pool do tamanho da máquina. Cada script roda no seu próprio processo
+(python "scripts/X.py" arquivo, como na linha de comando), então o tempo
+total fica perto do relatório mais lento, não da soma.
+
+Uso:
+  python orquestrador.py "Pipeline V2" [--anos 2024 2025] [--workers N] [--dry-run]
+
+Entradas: .xlsx ou .arrow (Arrow IPC, ver scripts/ipc_arrow.py). Saídas já
+geradas (_FINAL, _Final, _SAIDA, _FILTRADO, _FILTRADO_TIPO,
+Retenção_Final_Separada, em .xlsx ou .arrow), temporários do Excel (~$) e
+pastas ocultas (.checkpoints) são ignorados. Scripts que gravam a mesma saída (dois
+arquivos de retidos na mesma pasta geram o mesmo Retenção_Final_Separada.xlsx)
+rodam um depois do outro, com aviso.
+
+Variáveis PIPELINE_* (PIPELINE_ORIGEM, PIPELINE_TRACE, PIPELINE_MAX_MEMORY...)
+passam para todos os scripts. Com PIPELINE_CACHE=1, arquivos que não mudaram
+desde a última rodada saem do cache de resultados dos scripts.
+
+Código de saída 1 se algum script falhar.
+"""
+
+import argparse
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+
+from regressao import CASOS, PASTA_SCRIPTS, executar_medindo
+from sonda import identificar
+
+SUFIXOS_SAIDA = ("_FINAL", "_SAIDA", "_FILTRADO", "_FILTRADO_TIPO")
+NOMES_SAIDA = {"Retenção_Final_Separada.xlsx", "Retenção_Final_Separada.arrow"}
+EXTENSOES_ENTRADA = (".xlsx", ".arrow")     # .arrow: planilha convertida (scripts/ipc_arrow.py)
+
+
+# ==========================================================
+# Descoberta
+# ==========================================================
+def eh_saida(nome) -> bool:
+    stem = os.path.splitext(nome)[0]
+    return nome in NOMES_SAIDA or stem.upper().endswith(SUFIXOS_SAIDA)
+
+
+def descobrir(raiz, anos=None):
+    """[(ano, caminho, tipo)] das planilhas de entrada em raiz/<ano>/ (tipo None = não reconhecida)."""
+    raiz = Path(raiz)
+    pastas = sorted(p for p in raiz.iterdir() if p.is_dir() and not p.name.startswith("."))
+    if anos:
+        pastas = [p for p in pastas if p.name in anos]
+    achados = []
+    for pasta in pastas:
+        for dirpath, dirnames, arquivos in os.walk(pasta):
+            dirnames[:] = sorted(d for d in dirnames if not d.startswith("."))
+            for nome in sorted(arquivos):
+                if not nome.lower().endswith(EXTENSOES_ENTRADA) or nome.startswith("~$") or eh_saida(nome):
+                    continue
+                caminho = Path(dirpath) / nome
+                achados.append((pasta.name, caminho, identificar(caminho)))
+    return achados
+
+
+# ==========================================================
+# Execução
+# ==========================================================
+def saidas_de(caminho, tipo):
+    return [caminho.parent / s.format(stem=caminho.stem) for s in CASOS[tipo]["saidas"]]
+
+
+def rodar(caminho, tipo, trava):
+    """Roda o script do tipo sobre o arquivo (processo próprio). Retorna o resultado medido."""
+    cmd = [sys.executable, str(PASTA_SCRIPTS / CASOS[tipo]["script"]), str(caminho)]
+    with trava:
+        inicio = time.perf_counter()
+        codigo, segundos, pico, log = executar_medindo(cmd, caminho.parent)
+    faltando = [s.name for s in saidas_de(caminho, tipo) if not s.exists()]
+    if codigo != 0:
+        status = f"ERRO (código {codigo})"
+    elif faltando:
+        status = f"SAÍDA AUSENTE: {', '.join(faltando)}"
+    else:
+        status = "OK"
+    return {"inicio": inicio, "tempo_s": segundos, "pico_rss_mb": pico / 2**20 if pico else None,
+            "status": status, "ok": status == "OK", "log": log}
+
+
+def planejar(achados):
+    """Trabalhos reconhecidos, maiores primeiro (os lentos não ficam para o fim), e uma trava por saída."""
+    trabalhos = sorted(((a, c, t) for a, c, t in achados if t), key=lambda x: -x[1].stat().st_size)
+    travas, donos = {}, {}
+    for _, caminho, tipo in trabalhos:
+        chave = tuple(sorted(str(s) for s in saidas_de(caminho, tipo)))
+        if chave in travas:
+            print(f"⚠️ {caminho.name} e {donos[chave].name} gravam {', '.join(Path(s).name for s in chave)}: "
+                  "rodam em sequência e a última execução sobrescreve")
+        travas.setdefault(chave, threading.Lock())
+        donos.setdefault(chave, caminho)
+    return [(a, c, t, travas[tuple(sorted(str(s) for s in saidas_de(c, t)))]) for a, c, t in trabalhos]
+
+
+def main():
+    ap = argparse.ArgumentParser(description='Roda os scripts do pipeline sobre uma árvore "Pipeline V2/<ano>/".')
+    ap.add_argument("raiz", type=Path, help='pasta com as subpastas de ano (ex.: "Pipeline V2")')
+    ap.add_argument("--anos", nargs="+", help="só estes anos (nomes das subpastas)")
+    ap.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                    help="scripts rodando ao mesmo tempo (padrão: núcleos da máquina)")
+    ap.add_argument("--dry-run", action="store_true", help="só mostra o que seria rodado")
+    args = ap.parse_args()
+
+    if not args.raiz.is_dir():
+        ap.error(f"pasta não encontrada: {args.raiz}")
+
+    achados = descobrir(args.raiz, args.anos)
+    for ano, caminho, tipo in achados:
+        if tipo is None:
+            print(f"⚠️ {ano}/{caminho.name}: cabeçalho não reconhecido, ignorado")
+    trabalhos = planejar(achados)
+    if not trabalhos:
+        print("Nenhuma planilha de relatório encontrada.")
+        return
+
+    workers = max(1, min(args.workers, len(trabalhos)))
+    print(f"▶ {len(trabalhos)} arquivo(s) em {len(set(a for a, *_ in trabalhos))} ano(s), {workers} em paralelo")
+    if args.dry_run:
+        for ano, caminho, tipo, _ in trabalhos:
+            print(f"  {ano}  {tipo:<11} {CASOS[tipo]['script']:<24} {caminho.relative_to(args.raiz)}")
+        return
+
+    t0 = time.perf_counter()
+    resultados = []
+    # threads bastam: cada uma só espera o processo do seu script
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futuros = {pool.submit(rodar, c, t, trava): (a, c, t) for a, c, t, trava in trabalhos}
+        for futuro in as_completed(futuros):
+            ano, caminho, tipo = futuros[futuro]
+            r = futuro.result()
+            resultados.append((ano, caminho, tipo, r))
+            print(f"{'✅' if r['ok'] else '❌'} {ano}/{caminho.name} ({tipo}): {r['tempo_s']:.1f}s", flush=True)
+            if not r["ok"]:
+                print(r["log"][-3000:])
+    total = time.perf_counter() - t0
+
+    largura = min(48, max(len(str(c.relative_to(args.raiz))) for _, c, _, _ in resultados))
+    print(f"\n{'='*(largura + 62)}")
+    print(f"{'Arquivo':<{largura}}  {'Tipo':<11}{'Início (s)':>11}{'Tempo (s)':>11}{'Pico RSS (MB)':>15}  Status")
+    print(f"{'='*(largura + 62)}")
+    for ano, caminho, tipo, r in sorted(resultados, key=lambda x: (x[0], str(x[1]))):
+        rss = f"{r['pico_rss_mb']:,.1f}" if r["pico_rss_mb"] else "-"
+        rotulo = str(caminho.relative_to(args.raiz))[-largura:]
+        print(f"{rotulo:<{largura}}  {tipo:<11}{r['inicio'] - t0:>11.1f}{r['tempo_s']:>11.2f}{rss:>15}  {r['status']}")
+    print(f"{'='*(largura + 62)}")
+    soma = sum(r["tempo_s"] for *_, r in resultados)
+    maior = max(r["tempo_s"] for *_, r in resultados)
+    print(f"Tempo total: {total:.1f}s  (soma dos scripts {soma:.1f}s, mais lento {maior:.1f}s, {workers} em paralelo)")
+
+    sys.exit(0 if all(r["ok"] for *_, r in resultados) else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+"""
+Ponto de entrada único dos scripts do pipeline: um subcomando por relatório.
+
+Uso:
+  python pipeline_dados.py <relatório> [arquivo] [opções do script]
+  python pipeline_dados.py pagos pagos.xlsx --pacote --arrow
+  python pipeline_dados.py retidos                    (sem arquivo: janela de seleção)
+
+Relatórios: credores, liquidados, a-pagar, emitidos, pagos, retidos.
+Tudo depois do relatório vai para o script como se ele fosse chamado direto
+(--origem, --ndjson, --pacote, --parquet, --arrow, --max-memory, ...).
+
+O script roda neste mesmo processo, como __main__ (runpy, igual ao vigia.py).
+Os scripts só importam pandas/numpy na etapa que usa, tkinter só quando abrem
+a janela e win32com só no caminho do Excel: pela linha de comando, a partida
+fica nos módulos leves. A regressão (regressao.py) confere o orçamento de
+partida de cada relatório com -X importtime.
+
+--partida carrega o script (imports e definições) e para antes do main():
+  python -X importtime pipeline_dados.py --partida pagos
+"""
+
+import argparse
+import runpy
+import sys
+from pathlib import Path
+
+PASTA_SCRIPTS = Path(__file__).resolve().parent / "scripts"
+
+# caso -> script e saídas geradas ao lado da entrada ({stem} = nome da entrada sem extensão)
+CASOS = {
+    "credores": {
+        "script": "CPFECNPJ.py",
+        "saidas": ["{stem}_FILTRADO_TIPO.xlsx"],
+    },
+    "liquidados": {
+        "script": "Empenhos Liquidados.py",
+        "saidas": ["{stem}_FINAL.xlsx"],
+    },
+    "a-pagar": {
+        "script": "Empenhos a pagar.py",
+        "saidas": ["{stem}_FILTRADO.xlsx"],
+    },
+    "emitidos": {
+        "script": "Empenhos emitidos.py",
+        "saidas": ["{stem}_SAIDA.xlsx"],
+    },
+    "pagos": {
+        "script": "Empenhos pagos.py",
+        "saidas": ["{stem}_SAIDA.xlsx"],
+    },
+    "retidos": {
+        "script": "Empenhos retidos.py",
+        "saidas": ["Retenção_Final_Separada.xlsx"],
+    },
+}
+
+
+def rodar(relatorio, argumentos=(), partida=False):
+    """
+    Roda o script do relatório neste processo com argv = [script, *argumentos].
+    partida: só executa o módulo (imports e definições), sem o bloco __main__.
+    """
+    script = str(PASTA_SCRIPTS / CASOS[relatorio]["script"])
+    if str(PASTA_SCRIPTS) not in sys.path:
+        sys.path.insert(0, str(PASTA_SCRIPTS))
+    sys.argv = [script, *argumentos]
+    return runpy.run_path(script, run_name="__partida__" if partida else "__main__")
+
+
+def main():
+    ap = argparse.ArgumentParser(
+        description="Scripts do pipeline de dados do SIGEF, um subcomando por relatório.",
+        epilog="relatórios: " + ", ".join(f"{c} ({cfg['script']})" for c, cfg in CASOS.items()),
+    )
+    ap.add_argument("--partida", action="store_true",
+                    help="só carrega o script e para antes do processamento (mede a partida)")
+    ap.add_argument("relatorio", choices=list(CASOS), metavar="relatório", help="relatório a processar")
+    ap.add_argument("argumentos", nargs=argparse.REMAINDER,
+                    help="arquivo e opções, repassados ao script do relatório")
+    args = ap.parse_args()
+    rodar(args.relatorio, args.argumentos, args.partida)
+
+
+if __name__ == "__main__":
+    main()
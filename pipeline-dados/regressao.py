@@ -0,0 +1,572 @@
+# -*- coding: utf-8 -*-
+"""
+Regressão "golden" + desempenho dos seis scripts do pipeline.
+
+Roda cada script (sem interface, arquivo pela linha de comando) sobre a
+planilha de fixture, compara TODAS as abas das saídas com as saídas golden
+guardadas (mesma regra do comparar.py) e registra tempo, linhas/s e pico de
+memória (RSS) num histórico JSON.
+
+Uso:
+  python regressao.py [casos ...] [--fixtures PASTA] [--atualizar-golden]
+                      [--limite 0.25] [--historico ARQ]
+                      [--trace PASTA [--trace-memoria]] [--origem] [--ndjson]
+                      [--orcamento-partida 150]
+
+Estrutura da pasta de fixtures (padrão: pipeline-dados/fixtures, versionada):
+  fixtures/<caso>.xlsx                 entrada bruta
+  fixtures/golden/<caso>/<saida>.xlsx  saídas esperadas
+
+As fixtures versionadas são sintéticas e reproduzíveis (nenhum dado real):
+  python gerador_sintetico.py todos 300 --seed 42
+Depois de uma mudança de saída intencional: regressao.py --atualizar-golden.
+
+Casos: credores, liquidados, a-pagar, emitidos, pagos, retidos (padrão: todos).
+
+Falha (código de saída 1) quando falta a fixture ou o golden de um caso,
+quando alguma saída diverge do golden, quando o script termina com erro,
+quando tempo / pico de memória passam da mediana das últimas execuções em
+mais de --limite (padrão 25%) ou quando a partida passa do orçamento (medida
+sempre, mesmo sem fixture ou com o caso já falhando).
+
+Partida: python -X importtime pipeline_dados.py --partida <caso> (Python +
+imports do script, parando antes do main()); a soma dos imports de 1º nível,
+a menor de 3 execuções, tem de ficar abaixo de --orcamento-partida ms (padrão
+150). Acima dele, o status mostra os imports mais caros (pandas, tkinter...
+no topo de um script voltam a aparecer aqui).
+
+--trace grava PASTA/<caso>.trace.json por script (etapas do rastreio.py,
+abre no chrome://tracing ou Perfetto). Execuções com rastreio não entram no
+histórico nem na checagem de regressão.
+
+--origem roda cada caso de novo com PIPELINE_ORIGEM=1, confere a coluna
+"Linha origem" nas saídas e mede o custo de tempo sobre a execução normal:
+MEDIDAS_ORIGEM pares seguidos (sem, com), vale a mediana das razões de cada
+par (a lentidão passageira da máquina pega os dois lados do par). Custo
+acima de LIMITE_ORIGEM (5%) é falha se uma segunda rodada de pares confirmar.
+
+--ndjson roda cada caso de novo com a saída NDJSON em stdout (--ndjson -),
+confere aba a aba, linha a linha, contra o golden .xlsx e mostra quanto
+tempo levou até o primeiro lote de linhas chegar.
+"""
+
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+
+BASE = Path(__file__).resolve().parent
+from pipeline_dados import CASOS, PASTA_SCRIPTS  # noqa: E402
+sys.path.insert(0, str(PASTA_SCRIPTS))
+from comparar import AMOSTRAS_PADRAO, _imprimir_resultado, casar_abas, comparar_aba  # noqa: E402
+from utils_transformacao import COLUNA_ORIGEM, ler_linhas_xlsx, listar_abas_xlsx, valor_json  # noqa: E402
+
+FIXTURES_PADRAO = BASE / "fixtures"
+LIMITE_PADRAO = 0.25        # 25% acima da mediana = regressão
+JANELA_HISTORICO = 5        # execuções anteriores usadas na mediana
+LIMITE_ORIGEM = 0.05        # custo aceitável do --origem sobre o tempo normal
+MEDIDAS_ORIGEM = 5          # pares sem/com --origem; vale a mediana das razões
+ORCAMENTO_PARTIDA_MS = 150  # imports (-X importtime) até o script poder começar a processar
+MEDIDAS_PARTIDA = 3         # execuções do --partida; vale a menor (partida a frio é ruído)
+IMPORTS_MOSTRADOS = 5
+INTERVALO_RSS = 0.02        # s entre leituras do VmHWM do filho
+
+
+# ==========================================================
+# Execução medida (tempo + pico de RSS do processo filho)
+# ==========================================================
+def _pico_rss_windows(handle):
+    import ctypes
+    from ctypes import wintypes
+
+    class PROCESS_MEMORY_COUNTERS(ctypes.Structure):
+        _fields_ = [("cb", wintypes.DWORD), ("PageFaultCount", wintypes.DWORD),
+                    ("PeakWorkingSetSize", ctypes.c_size_t), ("WorkingSetSize", ctypes.c_size_t),
+                    ("QuotaPeakPagedPoolUsage", ctypes.c_size_t), ("QuotaPagedPoolUsage", ctypes.c_size_t),
+                    ("QuotaPeakNonPagedPoolUsage", ctypes.c_size_t), ("QuotaNonPagedPoolUsage", ctypes.c_size_t),
+                    ("PagefileUsage", ctypes.c_size_t), ("PeakPagefileUsage", ctypes.c_size_t)]
+
+    pmc = PROCESS_MEMORY_COUNTERS()
+    pmc.cb = ctypes.sizeof(pmc)
+    if ctypes.windll.psapi.GetProcessMemoryInfo(int(handle), ctypes.byref(pmc), pmc.cb):
+        return pmc.PeakWorkingSetSize
+    return None
+
+
+def _vmhwm(pid):
+    """VmHWM (pico de RSS deste programa, em bytes) de /proc/<pid>/status; None sem /proc ou já encerrado."""
+    try:
+        with open(f"/proc/{pid}/status", "rb") as f:
+            for linha in f:
+                if linha.startswith(b"VmHWM:"):
+                    return int(linha.split()[1]) * 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    return None
+
+
+def _acompanhar_vmhwm(p, picos):
+    # VmHWM só cresce: a última leitura antes do fim é o pico até ali (processo zumbi já não tem Vm*)
+    while p.poll() is None:
+        valor = _vmhwm(p.pid)
+        if valor is not None:
+            picos.append(valor)
+        time.sleep(INTERVALO_RSS)
+
+
+def _pico_relatado(arquivo, pid):
+    """Pico que o próprio filho gravou ao sair (memoria.py, PIPELINE_PICO_RSS); None se não gravou."""
+    try:
+        dono, valor = Path(arquivo).read_text(encoding="ascii").split()
+        return int(valor) if int(dono) == pid else None
+    except (OSError, ValueError):
+        return None
+
+
+def executar_medindo(cmd, cwd, env_extra=None):
+    """
+    Roda cmd e retorna (código de saída, segundos, pico de RSS em bytes ou None, saída).
+
+    O pico é só do filho. Scripts do pipeline gravam o próprio pico ao sair
+    (PIPELINE_PICO_RSS, memoria.py). Sem esse relato (erro antes dos imports):
+    Linux: VmHWM de /proc/<pid>/status, lido enquanto o filho roda; Windows:
+    PeakWorkingSetSize. O ru_maxrss do os.wait4 não serve: no Linux ele herda
+    o pico do processo que fez o fork (este, com pandas e as fixtures carregados).
+    """
+    fd, relato = tempfile.mkstemp(prefix="pico_rss_", suffix=".txt")
+    os.close(fd)
+    env = dict(os.environ, PYTHONIOENCODING="utf-8", PIPELINE_PICO_RSS=relato, **(env_extra or {}))
+    try:
+        t0 = time.perf_counter()
+        p = subprocess.Popen(cmd, cwd=cwd, env=env, stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+        picos = []
+        vigia = None
+        if sys.platform.startswith("linux"):
+            vigia = threading.Thread(target=_acompanhar_vmhwm, args=(p, picos), daemon=True)
+            vigia.start()
+        saida, _ = p.communicate()
+        segundos = time.perf_counter() - t0
+        if vigia is not None:
+            vigia.join()
+        pico = _pico_relatado(relato, p.pid)
+        if pico is None and picos:
+            pico = picos[-1]
+        elif pico is None and sys.platform == "win32":
+            try:
+                pico = _pico_rss_windows(p._handle)
+            except Exception:
+                pico = None
+    finally:
+        os.unlink(relato)
+    return p.returncode, segundos, pico, saida.decode("utf-8", errors="replace")
+
+
+def contar_linhas(xlsx):
+    """Linhas de dados da primeira aba (sem o cabeçalho)."""
+    return max(sum(1 for _ in ler_linhas_xlsx(xlsx, 0)) - 1, 0)
+
+
+# ==========================================================
+# Comparação com o golden
+# ==========================================================
+def comparar_com_golden(saida, golden):
+    """Compara todas as abas; retorna (ok, [resultados de comparar_aba com diferença], abas faltando)."""
+    pares, so_saida, so_golden = casar_abas([n for n, _ in listar_abas_xlsx(saida)],
+                                            [n for n, _ in listar_abas_xlsx(golden)])
+    diferentes = []
+    for a, b in pares:
+        r = comparar_aba(saida, golden, a, b)
+        if not r["ok"]:
+            diferentes.append(r)
+    faltando = [f"{n} (só na saída)" for n in so_saida] + [f"{n} (só no golden)" for n in so_golden]
+    return not diferentes and not faltando, diferentes, faltando
+
+
+def _sem_vazios_no_fim(linha):
+    linha = list(linha)
+    while linha and linha[-1] in (None, ""):
+        linha.pop()
+    return linha
+
+
+def _mesmo_valor(a, b):
+    if isinstance(a, (int, float)) and isinstance(b, (int, float)) and not isinstance(a, bool):
+        return abs(a - b) <= 1e-9 * max(1.0, abs(a), abs(b))
+    return a == b
+
+
+def comparar_ndjson(abas, golden):
+    """
+    abas: [(nome, colunas, linhas)] lidas do NDJSON. Compara com as abas do golden
+    (openpyxl, valores normalizados como na saída NDJSON). Retorna lista de diferenças.
+    """
+    from openpyxl import load_workbook
+
+    wb = load_workbook(golden, read_only=True)
+    try:
+        esperadas = [ws.title for ws in wb.worksheets]
+        if [nome for nome, _, _ in abas] != esperadas:
+            return [f"abas {[nome for nome, _, _ in abas]} != golden {esperadas}"]
+        diferencas = []
+        for (nome, colunas, linhas), ws in zip(abas, wb.worksheets):
+            gold = [_sem_vazios_no_fim(valor_json(v) for v in r) for r in ws.iter_rows(values_only=True)]
+            while gold and not gold[-1]:
+                gold.pop()
+            obtidas = [_sem_vazios_no_fim(colunas)] + [_sem_vazios_no_fim(r) for r in linhas]
+            if len(obtidas) != len(gold):
+                diferencas.append(f"{nome}: {len(obtidas) - 1} linhas, golden {len(gold) - 1}")
+                continue
+            for i, (a, b) in enumerate(zip(obtidas, gold)):
+                if len(a) != len(b) or not all(_mesmo_valor(x, y) for x, y in zip(a, b)):
+                    diferencas.append(f"{nome} linha {i + 1}: {a[:8]} != golden {b[:8]}")
+                    break
+        return diferencas
+    finally:
+        wb.close()
+
+
+def executar_ndjson(cmd, cwd, env_extra=None):
+    """
+    Roda cmd com a saída NDJSON em stdout. Retorna (código, segundos até o 1º lote
+    ou None, segundos totais, [(aba, colunas, linhas)], log de stderr).
+    """
+    env = dict(os.environ, PYTHONIOENCODING="utf-8", **(env_extra or {}))
+    with tempfile.TemporaryFile() as log:
+        t0 = time.perf_counter()
+        p = subprocess.Popen(cmd + ["--ndjson", "-"], cwd=cwd, env=env, stdout=subprocess.PIPE, stderr=log)
+        primeiro, abas = None, []
+        for linha in p.stdout:
+            obj = json.loads(linha)
+            if isinstance(obj, dict):
+                abas.append((obj["aba"], obj["colunas"], []))
+            else:
+                if primeiro is None:
+                    primeiro = time.perf_counter() - t0
+                abas[-1][2].extend(obj)
+        codigo = p.wait()
+        segundos = time.perf_counter() - t0
+        log.seek(0)
+        return codigo, primeiro, segundos, abas, log.read().decode("utf-8", errors="replace")
+
+
+# ==========================================================
+# Partida (-X importtime)
+# ==========================================================
+def imports_de(importtime):
+    """Saída do -X importtime -> {módulo de 1º nível: segundos acumulados}."""
+    modulos = {}
+    for linha in importtime.splitlines():
+        if not linha.startswith("import time:") or "cumulative" in linha:
+            continue
+        _, acumulado, nome = linha.split("|")
+        if not nome[1:].startswith(" "):          # submódulos vêm indentados
+            modulos[nome.strip()] = int(acumulado) / 1e6
+    return modulos
+
+
+def medir_partida(caso):
+    """
+    Imports até o script do caso poder começar a processar (pipeline_dados.py
+    --partida: Python + módulos do script, sem o main()). Mede MEDIDAS_PARTIDA
+    vezes e fica com a menor. Retorna (segundos, {módulo: segundos}) ou (None, log).
+    """
+    cmd = [sys.executable, "-X", "importtime", str(BASE / "pipeline_dados.py"), "--partida", caso]
+    env = dict(os.environ, PYTHONIOENCODING="utf-8")
+    melhor = None
+    for _ in range(MEDIDAS_PARTIDA):
+        p = subprocess.run(cmd, cwd=BASE, env=env, capture_output=True, text=True, encoding="utf-8")
+        if p.returncode != 0:
+            return None, p.stderr[-3000:]
+        modulos = imports_de(p.stderr)
+        if melhor is None or sum(modulos.values()) < sum(melhor.values()):
+            melhor = modulos
+    return sum(melhor.values()), melhor
+
+
+# ==========================================================
+# Histórico
+# ==========================================================
+def carregar_historico(caminho):
+    if not caminho.exists():
+        return []
+    with open(caminho, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def salvar_historico(caminho, historico):
+    caminho.parent.mkdir(parents=True, exist_ok=True)
+    tmp = caminho.with_suffix(".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(historico, f, ensure_ascii=False, indent=2)
+    os.replace(tmp, caminho)
+
+
+def _commit_atual():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BASE, capture_output=True,
+                              text=True, timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def verificar_regressao(historico, caso, medida, limite):
+    """Compara tempo e pico de RSS com a mediana das últimas execuções ok do caso. Retorna lista de avisos."""
+    anteriores = [h["resultados"][caso] for h in historico
+                  if caso in h.get("resultados", {}) and h["resultados"][caso].get("ok")
+                  and h["resultados"][caso].get("linhas") == medida["linhas"]][-JANELA_HISTORICO:]
+    avisos = []
+    for campo, rotulo in (("tempo_s", "tempo"), ("pico_rss_mb", "pico RSS")):
+        valores = [a[campo] for a in anteriores if a.get(campo)]
+        if not valores or not medida.get(campo):
+            continue
+        mediana = statistics.median(valores)
+        if medida[campo] > mediana * (1 + limite):
+            avisos.append(f"{rotulo} {medida[campo]:.2f} > mediana {mediana:.2f} (+{limite:.0%})")
+    return avisos
+
+
+# ==========================================================
+# Caso
+# ==========================================================
+def rodar_caso(caso, fixtures, atualizar_golden, trace=None, trace_memoria=False, origem=False):
+    """origem: roda com PIPELINE_ORIGEM=1 e confere a coluna de origem em vez do golden."""
+    cfg = CASOS[caso]
+    entrada = fixtures / f"{caso}.xlsx"
+    if not entrada.exists():
+        return {"status": f"SEM FIXTURE: {entrada}", "ok": False}
+
+    pasta_golden = fixtures / "golden" / caso
+    with tempfile.TemporaryDirectory(prefix=f"regressao_{caso}_") as tmp:
+        copia = Path(tmp) / entrada.name
+        shutil.copy2(entrada, copia)
+        cmd = [sys.executable, str(PASTA_SCRIPTS / cfg["script"]), str(copia)]
+        # sem cache de resultados: a regressão mede e compara o processamento de verdade
+        env_extra = {"PIPELINE_ORIGEM": "1" if origem else "0", "PIPELINE_CACHE": "0"}
+        if trace:
+            env_extra.update({"PIPELINE_TRACE": str((trace / f"{caso}.trace.json").resolve()),
+                              "PIPELINE_TRACE_MEMORIA": "1" if trace_memoria else "0"})
+        codigo, segundos, pico, log = executar_medindo(cmd, tmp, env_extra)
+
+        linhas = contar_linhas(entrada)
+        medida = {
+            "tempo_s": round(segundos, 3),
+            "linhas": linhas,
+            "linhas_por_s": round(linhas / segundos, 1) if segundos > 0 else None,
+            "pico_rss_mb": round(pico / 2**20, 1) if pico else None,
+        }
+        if codigo != 0:
+            print(log[-3000:])
+            return {**medida, "status": f"ERRO (código {codigo})", "ok": False}
+
+        saidas = [Path(tmp) / s.format(stem=copia.stem) for s in cfg["saidas"]]
+        faltando = [s.name for s in saidas if not s.exists()]
+        if faltando:
+            print(log[-3000:])
+            return {**medida, "status": f"SAÍDA AUSENTE: {', '.join(faltando)}", "ok": False}
+
+        if origem:
+            sem_coluna = [s.name for s in saidas if COLUNA_ORIGEM not in next(ler_linhas_xlsx(s, 0), [])]
+            if sem_coluna:
+                return {**medida, "status": f"SEM {COLUNA_ORIGEM.upper()}: {', '.join(sem_coluna)}", "ok": False}
+            return {**medida, "status": "OK", "ok": True}
+
+        if atualizar_golden:
+            pasta_golden.mkdir(parents=True, exist_ok=True)
+            for s in saidas:
+                shutil.copy2(s, pasta_golden / s.name)
+            return {**medida, "status": "GOLDEN ATUALIZADO", "ok": True}
+
+        for s in saidas:
+            golden = pasta_golden / s.name
+            if not golden.exists():
+                return {**medida, "status": f"SEM GOLDEN: {s.name}", "ok": False}
+            ok, diferentes, abas_faltando = comparar_com_golden(s, golden)
+            if not ok:
+                print(f"\n--- {caso}: {s.name} diverge do golden ---")
+                for n in abas_faltando:
+                    print(f"  Aba {n}")
+                for r in diferentes:
+                    print(f"\n  Aba: {r['aba_js']}  (JS = saída atual, Python = golden)")
+                    _imprimir_resultado(r, AMOSTRAS_PADRAO)
+                return {**medida, "status": "DIVERGE DO GOLDEN", "ok": False}
+
+    return {**medida, "status": "OK", "ok": True}
+
+
+def _rodada_origem(caso, fixtures, tempo_normal=None):
+    """MEDIDAS_ORIGEM pares (sem, com): mediana das razões - 1, ou o status de erro."""
+    razoes = []
+    for i in range(MEDIDAS_ORIGEM):
+        normal = tempo_normal if i == 0 and tempo_normal else rodar_caso(caso, fixtures, False)["tempo_s"]
+        ro = rodar_caso(caso, fixtures, False, origem=True)
+        if not ro["ok"]:
+            return None, f"--origem: {ro['status']}"
+        razoes.append(ro["tempo_s"] / normal)
+    return statistics.median(razoes) - 1, None
+
+
+def medir_custo_origem(caso, fixtures, tempo_normal):
+    """
+    Custo do --origem: pares seguidos (sem, com; o 1º "sem" é a execução que
+    já rodou) e a mediana das razões. Acima de LIMITE_ORIGEM mede outra rodada
+    e fica a menor das duas: ruído de uma rodada não vira falha. Retorna os
+    campos a atualizar no resultado do caso.
+    """
+    custo, erro = _rodada_origem(caso, fixtures, tempo_normal)
+    if erro is None and custo > LIMITE_ORIGEM:
+        outra, erro = _rodada_origem(caso, fixtures)
+        custo = min(custo, outra) if erro is None else custo
+    if erro is not None:
+        return {"status": erro, "ok": False}
+    if custo > LIMITE_ORIGEM:
+        return {"custo_origem": custo, "ok": False, "status": f"--origem +{custo:.1%} > {LIMITE_ORIGEM:.0%}"}
+    return {"custo_origem": custo}
+
+
+def rodar_caso_ndjson(caso, fixtures):
+    """Roda o caso com --ndjson - e confere os lotes contra o golden."""
+    cfg = CASOS[caso]
+    entrada = fixtures / f"{caso}.xlsx"
+    with tempfile.TemporaryDirectory(prefix=f"regressao_{caso}_ndjson_") as tmp:
+        copia = Path(tmp) / entrada.name
+        shutil.copy2(entrada, copia)
+        cmd = [sys.executable, str(PASTA_SCRIPTS / cfg["script"]), str(copia)]
+        codigo, primeiro, segundos, abas, log = executar_ndjson(cmd, tmp, {"PIPELINE_ORIGEM": "0", "PIPELINE_CACHE": "0"})
+        medida = {"tempo_s": round(segundos, 3), "primeiro_lote_s": round(primeiro, 3) if primeiro else None}
+        if codigo != 0:
+            print(log[-3000:])
+            return {**medida, "status": f"ERRO (código {codigo})", "ok": False}
+        # todas as saídas do caso vão para o mesmo fluxo, uma depois da outra
+        golden = [fixtures / "golden" / caso / s.format(stem=copia.stem) for s in cfg["saidas"]]
+        for g in golden:
+            n = len(listar_abas_xlsx(g))
+            diferencas = comparar_ndjson(abas[:n], g)
+            abas = abas[n:]
+            if diferencas:
+                print(f"\n--- {caso}: NDJSON diverge de {g.name} ---")
+                for d in diferencas[:AMOSTRAS_PADRAO]:
+                    print(f"  {d}")
+                return {**medida, "status": "NDJSON DIVERGE DO GOLDEN", "ok": False}
+    return {**medida, "status": "OK", "ok": True}
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Regressão golden + desempenho dos scripts do pipeline.")
+    ap.add_argument("casos", nargs="*", help=f"casos a rodar: {', '.join(CASOS)} (padrão: todos)")
+    ap.add_argument("--fixtures", type=Path, default=FIXTURES_PADRAO)
+    ap.add_argument("--atualizar-golden", action="store_true",
+                    help="grava as saídas atuais como golden (não compara)")
+    ap.add_argument("--limite", type=float, default=LIMITE_PADRAO,
+                    help="regressão de tempo/memória tolerada sobre a mediana (padrão 0.25)")
+    ap.add_argument("--historico", type=Path, default=None,
+                    help="arquivo JSON do histórico (padrão: <fixtures>/historico_desempenho.json)")
+    ap.add_argument("--trace", type=Path, default=None,
+                    help="pasta para os trace.json de cada caso (Chrome trace-event)")
+    ap.add_argument("--trace-memoria", action="store_true",
+                    help="com --trace: mede alocações por etapa (tracemalloc, mais lento)")
+    ap.add_argument("--origem", action="store_true",
+                    help='roda de novo com a coluna "Linha origem" e mede o custo')
+    ap.add_argument("--ndjson", action="store_true",
+                    help="roda de novo com saída NDJSON, confere com o golden e mede o 1º lote")
+    ap.add_argument("--orcamento-partida", type=float, default=ORCAMENTO_PARTIDA_MS,
+                    help="ms de imports (-X importtime) até o 1º passo do script (padrão 150)")
+    args = ap.parse_args()
+
+    casos = args.casos or list(CASOS)
+    invalidos = [c for c in casos if c not in CASOS]
+    if invalidos:
+        ap.error(f"caso(s) desconhecido(s): {', '.join(invalidos)}")
+    if args.trace_memoria and not args.trace:
+        ap.error("--trace-memoria exige --trace")
+    if args.trace:
+        args.trace.mkdir(parents=True, exist_ok=True)
+    arq_historico = args.historico or args.fixtures / "historico_desempenho.json"
+    historico = carregar_historico(arq_historico)
+    medir = not args.atualizar_golden and not args.trace and not args.origem and not args.ndjson
+
+    resultados = {}
+    falhou = False
+    for caso in casos:
+        print(f"▶ {caso} ({CASOS[caso]['script']})...", flush=True)
+        r = rodar_caso(caso, args.fixtures, args.atualizar_golden, args.trace, args.trace_memoria)
+        if r["ok"] and medir:
+            avisos = verificar_regressao(historico, caso, r, args.limite)
+            if avisos:
+                r["status"] = "REGRESSÃO: " + "; ".join(avisos)
+                r["ok"] = False     # fora da mediana das próximas execuções
+                falhou = True
+        if r["ok"] and args.origem:
+            r.update(medir_custo_origem(caso, args.fixtures, r["tempo_s"]))
+        if r["ok"] and args.ndjson:
+            rn = rodar_caso_ndjson(caso, args.fixtures)
+            if not rn["ok"]:
+                r.update(status=f"--ndjson: {rn['status']}", ok=False)
+            else:
+                r["primeiro_lote_s"] = rn["primeiro_lote_s"]
+                r["tempo_ndjson_s"] = rn["tempo_s"]
+        if not args.atualizar_golden:
+            # a partida não depende da fixture: confere mesmo se o caso já falhou
+            partida, modulos = medir_partida(caso)
+            problema = None
+            if partida is None:
+                print(modulos)
+                problema = "--partida: ERRO"
+            else:
+                r["partida_ms"] = round(partida * 1000, 1)
+                if r["partida_ms"] > args.orcamento_partida:
+                    caros = sorted(modulos.items(), key=lambda m: -m[1])[:IMPORTS_MOSTRADOS]
+                    problema = (f"PARTIDA {r['partida_ms']:.0f} ms > {args.orcamento_partida:.0f} ms ("
+                                + ", ".join(f"{m} {t * 1000:.0f}" for m, t in caros) + ")")
+            if problema:
+                r.update(status=problema if r["ok"] else f"{r['status']}; {problema}", ok=False)
+        if r["ok"] is False:
+            falhou = True
+        resultados[caso] = r
+
+    print(f"\n{'='*100}")
+    print(f"{'Caso':<12}{'Linhas':>10}{'Tempo (s)':>11}{'Linhas/s':>12}{'Pico RSS (MB)':>15}{'Partida (ms)':>14}"
+          f"  Status")
+    print(f"{'='*100}")
+    for caso, r in resultados.items():
+        partida = f"{r['partida_ms']:,.0f}" if r.get("partida_ms") else "-"
+        if "linhas" not in r:                      # sem fixture: só a partida foi medida
+            print(f"{caso:<12}{'-':>10}{'-':>11}{'-':>12}{'-':>15}{partida:>14}  {r['status']}")
+            continue
+        lps = f"{r['linhas_por_s']:,.0f}" if r.get("linhas_por_s") else "-"
+        rss = f"{r['pico_rss_mb']:,.1f}" if r.get("pico_rss_mb") else "-"
+        print(f"{caso:<12}{r['linhas']:>10,}{r['tempo_s']:>11.2f}{lps:>12}{rss:>15}{partida:>14}  {r['status']}")
+    print(f"{'='*100}")
+    if args.origem:
+        custos = ", ".join(f"{c} {r['custo_origem']:+.1%}" for c, r in resultados.items() if "custo_origem" in r)
+        print(f"Custo do --origem (tempo): {custos or '-'}")
+    if args.ndjson:
+        lotes = ", ".join(f"{c} {r['primeiro_lote_s']:.2f}s (total {r['tempo_ndjson_s']:.2f}s)"
+                          for c, r in resultados.items() if r.get("primeiro_lote_s"))
+        print(f"NDJSON, primeiro lote: {lotes or '-'}")
+
+    medidos = {c: r for c, r in resultados.items() if "linhas" in r}
+    if medidos and medir:
+        historico.append({
+            "data": datetime.now().isoformat(timespec="seconds"),
+            "commit": _commit_atual(),
+            "python": platform.python_version(),
+            "plataforma": platform.platform(),
+            "resultados": {c: {k: v for k, v in r.items() if k != "status"} for c, r in medidos.items()},
+        })
+        salvar_historico(arq_historico, historico)
+        print(f"Histórico: {arq_historico}")
+
+    sys.exit(1 if falhou else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -5,22 +5,51 @@ CPF_CNPJ_PROCESSO_v3.2.py
 Pipeline em etapas:
 1) Selecionar arquivo
 2) Ler planilha como texto
-3) Extrair CPF/CNPJ da coluna F (gera coluna J)
-4) Criar coluna Tipo (CPF ou CNPJ)
+3) Extrair CPF/CNPJ da coluna F (gera coluna J) — vetorizado
+4) Criar coluna Tipo (CPF ou CNPJ) e CPF_CNPJ_Valido (dígitos verificadores)
 5) Remover linhas sem CPF/CNPJ
 6) Excluir colunas B, D, E, H e I (todas de uma vez)
 7) Salvar resultado na mesma pasta
+8) Atualizar banco local de credores (SQLite, só o que mudou)
 -------------------------------------
-Requisitos: pip install pandas openpyxl
+Uso:
+  python CPFECNPJ.py [arquivo.xlsx] [--banco credores.sqlite] [--exportar-lookup saida.csv] [--origem]
+                    [--ndjson DESTINO [--gzip]] [--parquet PASTA] [--arrow] [--probe [N]] [--preview N]
+
+Sem arquivo abre a janela de seleção. Só com --exportar-lookup (sem arquivo)
+apenas exporta o lookup do banco existente.
+O banco padrão é credores.sqlite na pasta do arquivo de entrada.
+--origem (ou PIPELINE_ORIGEM=1) grava a coluna oculta "Linha origem" com a
+linha de cada credor na planilha lida.
+--ndjson (ou PIPELINE_NDJSON=DESTINO) grava a aba "Resultado" em lotes NDJSON
+no lugar do _FILTRADO_TIPO.xlsx ("-" = stdout); o banco é atualizado igual.
+--parquet PASTA (ou PIPELINE_PARQUET=PASTA) copia também o resultado para o
+arquivo histórico em Parquet (PASTA/credores, partição sem data; ver arquivo_parquet).
+--arrow (ou PIPELINE_ARROW=1) grava também _FILTRADO_TIPO.arrow (Arrow IPC, ver
+ipc_arrow) para a etapa seguinte; a entrada também pode ser um .arrow.
+--probe [N] (ou PIPELINE_PROBE=1|N) só confere o cabeçalho (Código, Credor/Fornecedor,
+CPF/CNPJ nas colunas A, C e F) nas N primeiras linhas e projeta tempo/memória;
+--preview N (ou PIPELINE_PREVIEW=N) mostra as N primeiras linhas do resultado,
+processando só o começo da planilha (ver sonda). Nenhum dos dois mexe no banco.
+-------------------------------------
+Requisitos: pip install pandas numpy openpyxl
 """
 
-import re
+import argparse
 import os
+import re
+import sqlite3
 import time
-import pandas as pd
-from tkinter import Tk, filedialog
+import unicodedata
 from datetime import datetime
 
+from arquivo_parquet import arquivar_xlsx
+from ipc_arrow import caminho_arrow, gravar_arrow_dataframe, ler_excel
+from opcoes import ler_opcoes, parser_comum
+from rastreio import etapa
+from sonda import previa, sondar
+from utils_transformacao import COLUNA_ORIGEM, aba_de_dataframe, ocultar_coluna_origem
+
 # ======================
 # Funções utilitárias
 # ======================
@@ -34,97 +63,348 @@ def ok(n, t0, extra=""):
     dur = time.time() - t0
     print(f"{ts()} ✓ Etapa {n} concluída (tempo: {dur:.2f}s){' | ' + extra if extra else ''}\n")
 
-def extrair_digitos(texto):
-    """Extrai apenas dígitos (CPF 11 / CNPJ 14)."""
-    if pd.isna(texto):
-        return None
-    s = re.sub(r"\D", "", str(texto))
-    if len(s) in (11, 14):
-        return s
-    return None
-
-def tipo_doc(valor):
-    """Identifica se é CPF ou CNPJ."""
-    if pd.isna(valor) or not str(valor).strip():
-        return None
-    s = re.sub(r"\D", "", str(valor))
-    if len(s) == 11:
-        return "CPF"
-    elif len(s) == 14:
-        return "CNPJ"
-    return None
+# Pesos dos dígitos verificadores
+# (listas: o @ do NumPy converte; numpy/pandas só são importados ao processar)
+_PESOS_CPF_DV1 = list(range(10, 1, -1))                                # 10..2 (9 dígitos)
+_PESOS_CPF_DV2 = list(range(11, 1, -1))                                # 11..2 (10 dígitos)
+_PESOS_CNPJ_DV1 = [5, 4, 3, 2, 9, 8, 7, 6, 5, 4, 3, 2]                 # 12 dígitos
+_PESOS_CNPJ_DV2 = [6, 5, 4, 3, 2, 9, 8, 7, 6, 5, 4, 3, 2]              # 13 dígitos
+
+def _dv_cpf_valido(m):
+    """Valida os 2 DVs de CPF com somas ponderadas (m: linhas x 11)."""
+    dv1 = (m[:, :9] @ _PESOS_CPF_DV1) * 10 % 11 % 10
+    dv2 = (m[:, :10] @ _PESOS_CPF_DV2) * 10 % 11 % 10
+    repetido = (m == m[:, :1]).all(axis=1)  # 000.000.000-00, 111..., etc.
+    return (dv1 == m[:, 9]) & (dv2 == m[:, 10]) & ~repetido
+
+def _dv_cnpj_valido(m):
+    """Valida os 2 DVs de CNPJ com somas ponderadas (m: linhas x 14)."""
+    import numpy as np
+
+    r1 = (m[:, :12] @ _PESOS_CNPJ_DV1) % 11
+    r2 = (m[:, :13] @ _PESOS_CNPJ_DV2) % 11
+    dv1 = np.where(r1 < 2, 0, 11 - r1)
+    dv2 = np.where(r2 < 2, 0, 11 - r2)
+    repetido = (m == m[:, :1]).all(axis=1)
+    return (dv1 == m[:, 12]) & (dv2 == m[:, 13]) & ~repetido
+
+_re_digito = re.compile(r"\d")       # \d de str: qualquer dígito decimal Unicode
+
+def _digitos_ascii(texto):
+    """Dígitos Unicode (fullwidth, arábicos...) -> 0-9, como o \\D da versão anterior contava."""
+    texto = unicodedata.normalize("NFKC", texto)
+    if texto.isascii():
+        return texto
+    return _re_digito.sub(lambda m: str(unicodedata.decimal(m.group())), texto)
+
+def _digitos_por_linha(textos):
+    """
+    Extrai os dígitos de todas as linhas numa única passada NumPy:
+    junta tudo num buffer de bytes (separador \\x00), marca os bytes 0-9 e conta
+    por linha. Linhas com texto não-ASCII passam antes por _digitos_ascii (só elas:
+    o caso comum não paga a normalização).
+    Retorna (bytes dos dígitos concatenados, quantidade de dígitos por linha).
+    """
+    import numpy as np
+
+    textos = [t if t.isascii() else _digitos_ascii(t) for t in textos]
+    junto = "\x00".join(textos)
+    if junto.count("\x00") != max(len(textos) - 1, 0):     # \x00 dentro de alguma célula
+        junto = "\x00".join(t.replace("\x00", "") for t in textos)
+    buf = np.frombuffer(junto.encode("utf-8"), dtype=np.uint8)
+    linha = np.cumsum(buf == 0)
+    eh_digito = (buf >= 48) & (buf <= 57)
+    qtd = np.bincount(linha[eh_digito], minlength=len(textos))
+    return buf[eh_digito], qtd
+
+def extrair_cpf_cnpj(serie):
+    """
+    Versão vetorizada de extrair dígitos + tipo + validação (sem apply por linha).
+    Retorna (CPF_CNPJ, Tipo, Válido):
+    - CPF_CNPJ: só dígitos quando houver 11 (CPF) ou 14 (CNPJ); senão None
+    - Tipo: "CPF" / "CNPJ" / None
+    - Válido: True quando os dígitos verificadores conferem
+    """
+    import numpy as np
+    import pandas as pd
+
+    textos = serie.fillna("").astype(str).tolist()
+    digitos, qtd = _digitos_por_linha(textos)
+    inicio = np.concatenate(([0], np.cumsum(qtd)[:-1]))
+
+    cpf_cnpj = np.full(len(textos), None, dtype=object)
+    tipo = np.full(len(textos), None, dtype=object)
+    valido = np.zeros(len(textos), dtype=bool)
+
+    for n, nome, func in ((11, "CPF", _dv_cpf_valido), (14, "CNPJ", _dv_cnpj_valido)):
+        mask = qtd == n
+        if not mask.any():
+            continue
+        bytes_docs = digitos[inicio[mask][:, None] + np.arange(n)]      # linhas x n
+        cpf_cnpj[mask] = np.frombuffer(bytes_docs.tobytes(), dtype=f"S{n}").astype(str)
+        tipo[mask] = nome
+        valido[mask] = func(bytes_docs.astype(np.int32) - 48)
+
+    return (pd.Series(cpf_cnpj, index=serie.index),
+            pd.Series(tipo, index=serie.index),
+            pd.Series(valido, index=serie.index))
+
+# ======================
+# Banco local de credores (SQLite)
+# ======================
+NOME_BANCO_PADRAO = "credores.sqlite"
+
+_SQL_CRIAR = """
+CREATE TABLE IF NOT EXISTS credores (
+    cpf_cnpj     TEXT PRIMARY KEY,
+    codigo       TEXT,
+    nome         TEXT,
+    tipo         TEXT,
+    cidade_uf    TEXT,
+    valido       INTEGER,
+    hash         INTEGER NOT NULL,
+    primeira_vez TEXT NOT NULL,
+    ultima_vez   TEXT NOT NULL
+)
+"""
+
+_SQL_UPSERT = """
+INSERT INTO credores (cpf_cnpj, codigo, nome, tipo, cidade_uf, valido, hash, primeira_vez, ultima_vez)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT(cpf_cnpj) DO UPDATE SET
+    codigo = excluded.codigo,
+    nome = excluded.nome,
+    tipo = excluded.tipo,
+    cidade_uf = excluded.cidade_uf,
+    valido = excluded.valido,
+    hash = excluded.hash,
+    ultima_vez = excluded.ultima_vez
+"""
+
+_CAMPOS_HASH = ["codigo", "nome", "tipo", "cidade_uf", "valido"]
+
+def _coluna_por_nome(df, nome, fallback_idx=None):
+    """Procura coluna pelo nome (case-insensitive, contém); senão usa o índice de fallback."""
+    import pandas as pd
+
+    alvo = nome.lower()
+    for c in df.columns:
+        if alvo in str(c).strip().lower():
+            return df[c]
+    if fallback_idx is not None and fallback_idx < len(df.columns):
+        return df.iloc[:, fallback_idx]
+    return pd.Series("", index=df.index)
+
+def abrir_banco_credores(caminho):
+    con = sqlite3.connect(caminho)
+    con.execute("PRAGMA journal_mode=WAL")
+    con.execute(_SQL_CRIAR)
+    return con
+
+def atualizar_banco_credores(con, df, data_ref=None):
+    """
+    Upsert por CPF/CNPJ só das linhas novas ou alteradas (detectadas pelo hash
+    da linha). As inalteradas só têm a ultima_vez atualizada, em um único UPDATE.
+    Espera o df já processado (CPF_CNPJ, Tipo, CPF_CNPJ_Valido).
+    Retorna dict com novos / alterados / inalterados.
+    """
+    import numpy as np
+    import pandas as pd
+
+    data_ref = data_ref or datetime.now().strftime("%Y-%m-%d")
+    base = pd.DataFrame({
+        "cpf_cnpj": df["CPF_CNPJ"].astype(str),
+        "codigo": _coluna_por_nome(df, "código", 0).astype(str),
+        "nome": _coluna_por_nome(df, "credor", 1).astype(str),
+        "tipo": df["Tipo"].astype(str),
+        "cidade_uf": _coluna_por_nome(df, "cidade").astype(str),
+        "valido": df["CPF_CNPJ_Valido"].astype(int),
+    }).drop_duplicates("cpf_cnpj", keep="last")
+
+    # hash determinístico (chave fixa do pandas) -> int64 com sinal (INTEGER do SQLite)
+    base["hash"] = pd.util.hash_pandas_object(base[_CAMPOS_HASH], index=False).to_numpy().view(np.int64)
+
+    existentes = pd.read_sql_query("SELECT cpf_cnpj, hash AS hash_banco FROM credores", con)
+    base = base.merge(existentes, on="cpf_cnpj", how="left")
+    novo = base["hash_banco"].isna()
+    alterado = ~novo & (base["hash_banco"] != base["hash"])
+    delta = base[novo | alterado]
+
+    with con:
+        con.executemany(_SQL_UPSERT, (
+            (r.cpf_cnpj, r.codigo, r.nome, r.tipo, r.cidade_uf, int(r.valido), int(r.hash), data_ref, data_ref)
+            for r in delta.itertuples(index=False)
+        ))
+        inalterados = base.loc[~(novo | alterado), "cpf_cnpj"]
+        con.execute("CREATE TEMP TABLE IF NOT EXISTS _vistos (cpf_cnpj TEXT PRIMARY KEY)")
+        con.execute("DELETE FROM _vistos")
+        con.executemany("INSERT OR IGNORE INTO _vistos VALUES (?)", ((d,) for d in inalterados))
+        con.execute("UPDATE credores SET ultima_vez = ? WHERE cpf_cnpj IN (SELECT cpf_cnpj FROM _vistos)", (data_ref,))
+
+    return {"novos": int(novo.sum()), "alterados": int(alterado.sum()), "inalterados": int(len(inalterados))}
+
+def exportar_lookup_credores(con, caminho):
+    """Exporta o lookup compacto (CSV UTF-8) com as colunas usadas por cruzarComCredor."""
+    import pandas as pd
+
+    df = pd.read_sql_query(
+        'SELECT codigo AS "Código", nome AS "Credor/Fornecedor", cpf_cnpj AS "CPF_CNPJ", '
+        'tipo AS "Tipo", cidade_uf AS "Cidade - UF" FROM credores ORDER BY nome, cpf_cnpj',
+        con,
+    )
+    df.to_csv(caminho, index=False, encoding="utf-8-sig")
+    return len(df)
 
 # ======================
 # Pipeline principal
 # ======================
-def main():
-    # 1) Selecionar arquivo
+def _parse_args(argv=None):
+    """Opções comuns (opcoes) + --banco e --exportar-lookup; sem cache nem pacote."""
+    ap = argparse.ArgumentParser(description="Extrai CPF/CNPJ da relação de credores.",
+                                 parents=[parser_comum(cache=False, pacote=False)])
+    ap.add_argument("--banco", help=f"banco SQLite de credores (padrão: {NOME_BANCO_PADRAO} na pasta do arquivo)")
+    ap.add_argument("--exportar-lookup", metavar="CSV", help="exporta o lookup compacto do banco")
+    return ler_opcoes(ap, argv)   # NDJSON aberto antes dos logs: com "-" eles vão para stderr
+
+def main(argv=None):
+    args = _parse_args(argv)
+
+    # Só exportar o lookup de um banco existente
+    if not args.arquivo and args.exportar_lookup:
+        banco = args.banco or NOME_BANCO_PADRAO
+        if not os.path.exists(banco):
+            print(f"❌ Banco não encontrado: {banco}")
+            return
+        con = abrir_banco_credores(banco)
+        n = exportar_lookup_credores(con, args.exportar_lookup)
+        con.close()
+        print(f"{ts()} 📤 Lookup exportado: {args.exportar_lookup} ({n:,} credores)")
+        return
+
+    ndjson, parquet, arrow = args.ndjson, args.parquet, args.arrow
+
+    # 1) Selecionar arquivo (CMD tem prioridade)
     log(1, "Selecionar o arquivo Excel (.xlsx)")
-    Tk().withdraw()
-    file_path = filedialog.askopenfilename(
-        title="Selecione o arquivo Excel",
-        filetypes=[("Arquivos Excel", "*.xlsx *.xlsm *.xltx *.xltm")]
-    )
+    if args.arquivo:
+        file_path = os.path.abspath(args.arquivo)
+    else:
+        from tkinter import Tk, filedialog      # só com janela: a linha de comando não paga o Tk
+
+        Tk().withdraw()
+        file_path = filedialog.askopenfilename(
+            title="Selecione o arquivo Excel",
+            filetypes=[("Arquivos Excel", "*.xlsx *.xlsm *.xltx *.xltm"), ("Arrow IPC", "*.arrow")]
+        )
     if not file_path:
         print("Nenhum arquivo selecionado.")
         return
+    if args.probe:
+        sondar(file_path, "credores", args.probe)
+        return
+    if args.preview:
+        previa(file_path, "credores", args.preview, _previa)
+        return
     print(f"📂 Arquivo selecionado: {file_path}\n")
 
     # 2) Ler planilha como texto
-    t0 = time.time()
-    log(2, "Ler planilha (mantendo zeros à esquerda)")
-    df = pd.read_excel(file_path, dtype=str)
-    df = df.fillna("")
-    ok(2, t0, f"linhas={len(df):,} colunas={len(df.columns)}")
+    with etapa("Etapa 2 - Ler planilha", lambda: len(df)):
+        t0 = time.time()
+        log(2, "Ler planilha (mantendo zeros à esquerda)")
+        df = ler_excel(file_path, dtype=str)      # .xlsx ou .arrow
+        df = df.fillna("")
+        ok(2, t0, f"linhas={len(df):,} colunas={len(df.columns)}")
 
     # 3) Extrair CPF/CNPJ da coluna F (coluna índice 5 → 6ª)
-    t0 = time.time()
-    log(3, "Extrair CPF/CNPJ da coluna F (gerar coluna J)")
-    if df.shape[1] < 6:
-        print("⚠️ O arquivo não possui coluna F (mínimo 6 colunas).")
-        return
-    col_F = df.columns[5]
-    df["CPF_CNPJ"] = df[col_F].apply(extrair_digitos)
-    ok(3, t0)
+    with etapa("Etapa 3 - Extrair CPF/CNPJ da coluna F", lambda: len(df)):
+        t0 = time.time()
+        log(3, "Extrair CPF/CNPJ da coluna F (gerar coluna J)")
+        if df.shape[1] < 6:
+            print("⚠️ O arquivo não possui coluna F (mínimo 6 colunas).")
+            return
+        col_F = df.columns[5]
+        cpf_cnpj, tipo, valido = extrair_cpf_cnpj(df[col_F])
+        df["CPF_CNPJ"] = cpf_cnpj
+        ok(3, t0)
 
-    # 4) Criar coluna Tipo (CPF ou CNPJ)
-    t0 = time.time()
-    log(4, "Criar coluna Tipo (CPF ou CNPJ)")
-    df["Tipo"] = df["CPF_CNPJ"].apply(tipo_doc)
-    ok(4, t0)
+    # 4) Criar coluna Tipo (CPF ou CNPJ) + validação dos dígitos verificadores
+    with etapa("Etapa 4 - Tipo e CPF_CNPJ_Valido", lambda: len(df)):
+        t0 = time.time()
+        log(4, "Criar coluna Tipo (CPF ou CNPJ) e CPF_CNPJ_Valido (dígitos verificadores)")
+        df["Tipo"] = tipo
+        df["CPF_CNPJ_Valido"] = valido
+        ok(4, t0, f"DV inválido={int((cpf_cnpj.notna() & ~valido).sum()):,}")
 
     # 5) Remover linhas sem CPF/CNPJ
-    t0 = time.time()
-    log(5, "Remover linhas sem CPF/CNPJ (a partir de J2)")
-    antes = len(df)
-    df = df[df["CPF_CNPJ"].notna() & (df["CPF_CNPJ"] != "")]
-    ok(5, t0, f"linhas removidas={antes - len(df)} restantes={len(df)}")
+    with etapa("Etapa 5 - Remover linhas sem CPF/CNPJ", lambda: len(df)):
+        t0 = time.time()
+        log(5, "Remover linhas sem CPF/CNPJ (a partir de J2)")
+        antes = len(df)
+        df = df[df["CPF_CNPJ"].notna() & (df["CPF_CNPJ"] != "")]
+        ok(5, t0, f"linhas removidas={antes - len(df)} restantes={len(df)}")
 
     # 6) Excluir colunas B, D, E, H e I (todas de uma vez)
-    t0 = time.time()
-    log(6, "Excluir colunas B, D, E, H e I (execução simultânea)")
-    letras_excluir = ["B", "D", "E", "H", "I"]
-    # converte letras para índices numéricos (A=0, B=1, ...)
-    indices = [ord(l) - 65 for l in letras_excluir if ord(l) - 65 < len(df.columns)]
-    # pega nomes das colunas correspondentes aos índices
-    cols_excluir = [df.columns[i] for i in indices if i < len(df.columns)]
-    # exclui todas de uma vez
-    df.drop(columns=cols_excluir, inplace=True, errors="ignore")
-    ok(6, t0, f"colunas removidas={len(cols_excluir)} colunas finais={len(df.columns)}")
+    with etapa("Etapa 6 - Excluir colunas B, D, E, H e I", lambda: len(df)):
+        t0 = time.time()
+        log(6, "Excluir colunas B, D, E, H e I (execução simultânea)")
+        letras_excluir = ["B", "D", "E", "H", "I"]
+        # converte letras para índices numéricos (A=0, B=1, ...)
+        indices = [ord(l) - 65 for l in letras_excluir if ord(l) - 65 < len(df.columns)]
+        # pega nomes das colunas correspondentes aos índices
+        cols_excluir = [df.columns[i] for i in indices if i < len(df.columns)]
+        # exclui todas de uma vez
+        df.drop(columns=cols_excluir, inplace=True, errors="ignore")
+        ok(6, t0, f"colunas removidas={len(cols_excluir)} colunas finais={len(df.columns)}")
 
     # 7) Salvar resultado
-    t0 = time.time()
-    log(7, "Salvar resultado final na mesma pasta (_FILTRADO_TIPO.xlsx)")
-    pasta = os.path.dirname(file_path)
-    base = os.path.splitext(os.path.basename(file_path))[0]
-    novo_arquivo = os.path.join(pasta, f"{base}_FILTRADO_TIPO.xlsx")
-    df.to_excel(novo_arquivo, index=False, sheet_name="Resultado", engine="openpyxl")
-    ok(7, t0, f"arquivo={os.path.basename(novo_arquivo)}")
+    with etapa("Etapa 7 - Salvar _FILTRADO_TIPO.xlsx", lambda: len(df)):
+        t0 = time.time()
+        log(7, "Salvar resultado final na mesma pasta (_FILTRADO_TIPO.xlsx)")
+        pasta = os.path.dirname(file_path)
+        base = os.path.splitext(os.path.basename(file_path))[0]
+        novo_arquivo = os.path.join(pasta, f"{base}_FILTRADO_TIPO.xlsx")
+        if args.origem:
+            # índice do read_excel: 0 = linha 2 (a linha 1 é o cabeçalho)
+            df = df.assign(**{COLUNA_ORIGEM: (df.index + 2).astype("int32")})
+        if ndjson is not None:
+            novo_arquivo = ndjson.destino
+            with ndjson:
+                ndjson.gravar([aba_de_dataframe("Resultado", df)])
+        else:
+            import pandas as pd
+
+            with pd.ExcelWriter(novo_arquivo, engine="openpyxl") as writer:
+                df.to_excel(writer, index=False, sheet_name="Resultado")
+                ocultar_coluna_origem(writer.sheets["Resultado"], df.columns)
+            if arrow:
+                gravar_arrow_dataframe(caminho_arrow(novo_arquivo), df, "Resultado")
+            if parquet:
+                arquivar_xlsx(parquet, "credores", caminho_arrow(novo_arquivo) if arrow else novo_arquivo, file_path)
+        ok(7, t0, f"arquivo={os.path.basename(novo_arquivo)}")
+
+    # 8) Atualizar banco local de credores (só o delta)
+    with etapa("Etapa 8 - Atualizar banco de credores", lambda: len(df)):
+        t0 = time.time()
+        banco = args.banco or os.path.join(pasta, NOME_BANCO_PADRAO)
+        log(8, f"Atualizar banco de credores ({os.path.basename(banco)})")
+        con = abrir_banco_credores(banco)
+        try:
+            r = atualizar_banco_credores(con, df)
+            ok(8, t0, f"novos={r['novos']:,} alterados={r['alterados']:,} inalterados={r['inalterados']:,}")
+            if args.exportar_lookup:
+                n = exportar_lookup_credores(con, args.exportar_lookup)
+                print(f"{ts()} 📤 Lookup exportado: {args.exportar_lookup} ({n:,} credores)")
+        finally:
+            con.close()
 
     print(f"{ts()} ✅ Processo concluído com sucesso!")
     print(f"{ts()} 📁 Arquivo salvo em: {novo_arquivo}")
     print(f"{ts()} 🧾 Linhas finais: {len(df):,}\n")
 
+def _previa(entrada):
+    """main() sobre a amostra do --preview; saída e banco ficam na pasta da amostra."""
+    main([str(entrada)])
+    return os.path.join(os.path.dirname(entrada), f"{os.path.splitext(os.path.basename(entrada))[0]}_FILTRADO_TIPO.xlsx")
+
 # ======================
 # Execução direta
 # ======================
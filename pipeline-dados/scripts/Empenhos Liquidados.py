@@ -14,19 +14,42 @@ OTIMIZAÇÕES IMPLEMENTADAS (mantendo MESMO RESULTADO):
 8. Optimized filtering com list comprehensions mais eficientes
 
 Mantém exatamente a mesma ordem de etapas (1-39) e mesmo resultado final.
+
+--cache (ou PIPELINE_CACHE=1): entrada sem mudanças desde a última execução =
+_FINAL.xlsx copiado do cache de resultados (ver cache_resultados).
+--pacote (ou PIPELINE_PACOTE=1): grava também _FINAL.pacote.json.gz, a aba
+"Liquidados Final" pronta para o store "despesas-liquidados" da página de importação.
+--ndjson DESTINO [--gzip] (ou PIPELINE_NDJSON=DESTINO): as duas abas saem em
+lotes NDJSON em vez do _FINAL.xlsx ("-" = stdout).
+--parquet PASTA (ou PIPELINE_PARQUET=PASTA): copia também a aba "Liquidados Final"
+para o arquivo histórico em Parquet (PASTA/liquidados/ano=/mes=, ver arquivo_parquet).
+--arrow (ou PIPELINE_ARROW=1): grava também _FINAL.arrow (aba "Liquidados Final",
+Arrow IPC, ver ipc_arrow) para a etapa seguinte; a entrada também pode ser um .arrow.
+--probe [N] (ou PIPELINE_PROBE=1|N): só confere o cabeçalho nas N primeiras
+linhas e projeta tempo e memória pelo tamanho da planilha, sem gravar nada.
+--preview N (ou PIPELINE_PREVIEW=N): as N primeiras linhas da saída, processando
+só o começo da planilha (ver sonda).
 """
 
+import argparse
 import re
 import sys
+from array import array
 import time
 import unicodedata
 import zipfile
 import xml.etree.ElementTree as ET
-from datetime import datetime
+from datetime import datetime, timedelta
 from pathlib import Path
-import tkinter as tk
-from tkinter import filedialog
-import pandas as pd
+
+from arquivo_parquet import arquivar_xlsx
+from cache_resultados import CacheResultados
+from ipc_arrow import caminho_arrow, eh_arrow, gravar_arrow, matriz_arrow
+from opcoes import Opcoes, ler_opcoes, parser_comum
+from pacote_importacao import caminho_pacote, gravar_pacote
+from rastreio import etapa, rastrear
+from sonda import conferir_orcamento, previa, sondar
+from utils_transformacao import COLUNA_ORIGEM, lotes, ocultar_coluna_origem, valor_json
 
 # Pre-compiled regex patterns for better performance
 _coord_re = re.compile(r"^([A-Z]+)(\d+)$")
@@ -127,7 +150,7 @@ def _parse_to_ddmmyyyy_fast(val):
     
     if isinstance(val, (int, float)):
         try:
-            dt = datetime(1899, 12, 30) + pd.to_timedelta(val, "D")
+            dt = datetime(1899, 12, 30) + timedelta(days=val)
             return dt.strftime("%d/%m/%Y")
         except:
             return val
@@ -156,7 +179,7 @@ def _parse_to_datetime_excel_fast(val):
     
     if isinstance(val, (int, float)):
         try:
-            return datetime(1899, 12, 30) + pd.to_timedelta(val, "D")
+            return datetime(1899, 12, 30) + timedelta(days=val)
         except:
             return val
     
@@ -175,34 +198,39 @@ def _parse_to_datetime_excel_fast(val):
     
     return val
 
-def converter_datas_texto_matrix_fast(matrix):
-    """Vectorized date conversion for text columns"""
-    if not matrix:
-        return
-    
-    header = matrix[0]
-    date_cols = []
-    
-    # Find date columns once
-    for c in range(len(header)):
-        h = header[c]
-        if h and "data" in str(h).strip().lower():
-            date_cols.append(c)
-    
-    # Process all date columns in batch
+def colunas_data_fast(header):
+    """Date columns: header containing "data" """
+    return [c for c in range(len(header)) if header[c] and "data" in str(header[c]).strip().lower()]
+
+def converter_datas_linha_fast(row, date_cols):
+    """Date conversion for one data row (text dates -> dd/mm/yyyy, column A -> real date)"""
     for c in date_cols:
-        for r in range(1, len(matrix)):
-            if c < len(matrix[r]):
-                matrix[r][c] = _parse_to_ddmmyyyy_fast(matrix[r][c])
+        if c < len(row):
+            row[c] = _parse_to_ddmmyyyy_fast(row[c])
+    if row:
+        row[0] = _parse_to_datetime_excel_fast(row[0])
+    return row
 
-def formatar_coluna_a_data_real_matrix_fast(matrix):
-    """Optimized column A date formatting"""
-    if not matrix:
+def converter_datas_na_gravacao(mat, old_header: str, new_header: str):
+    """
+    Datas (linhas de dados) e renomeação do cabeçalho aplicadas linha a linha
+    quando a MatrizProjetada é gravada. Colunas de data vêm do cabeçalho antes
+    da renomeação.
+    """
+    if not len(mat):
         return
-    
-    for r in range(1, len(matrix)):
-        if matrix[r]:
-            matrix[r][0] = _parse_to_datetime_excel_fast(matrix[r][0])
+    date_cols = colunas_data_fast(mat[0])
+    montar_antes = mat.montar
+
+    def montar(i, row):
+        if montar_antes:
+            row = montar_antes(i, row)
+        if i == 0:
+            rename_header_fast([row], old_header, new_header)
+            return row
+        return converter_datas_linha_fast(row, date_cols)
+
+    mat.montar = montar
 
 # ==========================================================
 # OPTIMIZED Text Processing
@@ -296,18 +324,50 @@ def _load_shared_strings_fast(z: zipfile.ZipFile):
     return strings
 
 def _read_sheet1_xml_ultrafast(xlsx_path: Path):
-    """Ultra-optimized single-pass XML reading with streaming"""
+    """
+    Ultra-optimized single-pass XML reading with streaming: cada <row> vira
+    linha da matriz quando termina e sai da árvore do iterparse (a matriz é a
+    única cópia da planilha na memória; sem dicionário de células)
+    """
     with zipfile.ZipFile(xlsx_path, 'r') as z:
         sst = _load_shared_strings_fast(z)
         
-        cells = {}
-        max_row = max_col = 1
+        mat = []
+        linha_atual = []   # (coluna 0-based, valor) da <row> em leitura
+        r_atual = -1
+        textos = {}  # texto inline repetido -> um único str (sharedStrings já são únicos)
+        max_col = 1
+        dados = None  # <sheetData>: as <row> já lidas são removidas dele
+        
+        def fechar_linha():
+            # as linhas saem com o tamanho exato; o preenchimento até max_col é no fim
+            if not linha_atual:
+                return
+            if r_atual >= len(mat):
+                mat.extend([] for _ in range(r_atual + 1 - len(mat)))
+            row = mat[r_atual]
+            largura = max(len(row), max(c for c, _ in linha_atual) + 1)
+            if len(row) < largura:
+                row = mat[r_atual] = row + [None] * (largura - len(row))
+            for c0, v in linha_atual:
+                row[c0] = v
+            linha_atual.clear()
         
         with z.open("xl/worksheets/sheet1.xml") as f:
-            context = ET.iterparse(f, events=("end",))
+            context = ET.iterparse(f, events=("start", "end"))
             
-            for _, elem in context:
-                if not (elem.tag.endswith('}c') or elem.tag == 'c'):
+            for evento, elem in context:
+                tag = elem.tag
+                if evento == "start":
+                    if dados is None and (tag.endswith('}sheetData') or tag == 'sheetData'):
+                        dados = elem
+                    continue
+                if tag.endswith('}row') or tag == 'row':
+                    fechar_linha()
+                    if dados is not None:
+                        dados.clear()
+                    continue
+                if not (tag.endswith('}c') or tag == 'c'):
                     continue
                 
                 coord = elem.attrib.get('r')
@@ -363,24 +423,31 @@ def _read_sheet1_xml_ultrafast(xlsx_path: Path):
                         except:
                             val = v_text
                 
-                r0, c0 = row_num - 1, col_num - 1
-                cells[(r0, c0)] = val
+                if t != 's' and type(val) is str:
+                    val = textos.setdefault(val, val)
                 
-                max_row = max(max_row, row_num)
+                if row_num - 1 != r_atual:
+                    fechar_linha()
+                    r_atual = row_num - 1
+                linha_atual.append((col_num - 1, val))
                 max_col = max(max_col, col_num)
                 
                 elem.clear()  # Free memory immediately
+            fechar_linha()
     
-    # Build matrix efficiently
-    mat = [[None] * max_col for _ in range(max_row)]
-    for (r0, c0), v in cells.items():
-        if 0 <= r0 < max_row and 0 <= c0 < max_col:
-            mat[r0][c0] = v
+    # Matriz retangular (max_col colunas; linhas sem célula = vazias)
+    if not mat:
+        mat.append([])
+    for r, row in enumerate(mat):
+        if len(row) < max_col:
+            mat[r] = row + [None] * (max_col - len(row))
     
     return mat
 
 def read_first_sheet_matrix_ultrafast(xlsx_path: Path):
-    """Ultra-fast sheet reading with Windows COM optimization"""
+    """Ultra-fast sheet reading with Windows COM optimization (.arrow: direto do arquivo mapeado)"""
+    if eh_arrow(xlsx_path):
+        return matriz_arrow(xlsx_path)
     if sys.platform.startswith("win"):
         try:
             import win32com.client
@@ -473,6 +540,38 @@ def compute_max_col_util_fast(matrix):
             return c + 1
     
     return 1
+class MatrizProjetada:
+    """
+    Seleção de linhas + projeção de colunas sobre uma matriz, sem copiar nada:
+    m[i] monta a linha base[linhas[i]] com as colunas pedidas (-1 = coluna vazia)
+    e aplica montar(i, linha). As linhas só existem durante a gravação.
+    origem (array int32 paralelo a base): acrescenta a coluna COLUNA_ORIGEM.
+    """
+
+    def __init__(self, base, linhas=None, colunas=None, montar=None, origem=None):
+        self.base = base
+        self.linhas = linhas
+        self.colunas = colunas
+        self.montar = montar
+        self.origem = origem
+
+    def __len__(self):
+        return len(self.base) if self.linhas is None else len(self.linhas)
+
+    def __getitem__(self, i):
+        b = i if self.linhas is None else self.linhas[i]
+        row = self.base[b]
+        if self.colunas is None:
+            out = list(row)
+        else:
+            n = len(row)
+            out = [row[c] if 0 <= c < n else None for c in self.colunas]
+        if self.montar:
+            out = self.montar(i, out)
+        if self.origem is not None:
+            out.append(COLUNA_ORIGEM if i == 0 else self.origem[b])
+        return out
+
 # ==========================================================
 # ULTRA-FAST File Writing
 # ==========================================================
@@ -500,8 +599,10 @@ def save_two_sheets_xlsx_ultrafast(out_path: Path, sheet1_name: str, m1, sheet2_
             return
         
         # Write header row
-        if mat[0]:
-            ws.write_row(0, 0, mat[0], header_fmt)
+        header = mat[0]
+        if header:
+            ws.write_row(0, 0, header, header_fmt)
+            ocultar_coluna_origem(ws, header)
         
         # Batch write data rows
         for r in range(1, len(mat)):
@@ -521,15 +622,26 @@ def save_two_sheets_xlsx_ultrafast(out_path: Path, sheet1_name: str, m1, sheet2_
     write_matrix_fast(ws2, m2)
     wb.close()
 
+
+def abas_ndjson(*abas):
+    """(nome, colunas, lotes) de cada (nome, matriz): mesmas linhas que o write_matrix_fast grava."""
+    for nome, mat in abas:
+        if not len(mat):
+            continue
+        colunas = [valor_json(v) for v in mat[0]]
+        linhas = (mat[r] or [] for r in range(1, len(mat)))
+        yield nome, colunas, lotes(linhas)
+
 # ==========================================================
 # OPTIMIZED Filtering Operations
 # ==========================================================
 
-def filter_rows_batch(matrix, filters):
-    """Batch multiple row filters for efficiency"""
+def filter_rows_batch(matrix, filters, origem=None):
+    """Batch multiple row filters for efficiency (origem: array paralelo, filtrado no lugar)"""
     result = []
+    mantidas = []
     
-    for row in matrix:
+    for r, row in enumerate(matrix):
         keep_row = True
         for filter_func in filters:
             if not filter_func(row):
@@ -537,7 +649,10 @@ def filter_rows_batch(matrix, filters):
                 break
         if keep_row:
             result.append(row)
+            mantidas.append(r)
     
+    if origem is not None:
+        origem[:] = array("i", (origem[r] for r in mantidas))
     return result
 
 # Pre-compile filter patterns
@@ -588,316 +703,382 @@ def create_filter_functions():
 # MAIN ULTRA-FAST PROCESSING FUNCTION
 # ==========================================================
 
-def process_workbook_ultrafast(xlsx_path: Path):
-    """Ultra-optimized main processing function"""
+# Fases com checkpoint (--checkpoint / --resume), na ordem
+FASES_LIQUIDADOS = ["leitura", "filtros", "etapas_13_34", "classificacao"]
+
+@rastrear("Empenhos Liquidados")
+def process_workbook_ultrafast(xlsx_path: Path, opcoes=None):
+    """
+    Ultra-optimized main processing function.
+    opcoes (opcoes.Opcoes; padrão: tudo desligado):
+    orcamento (memoria.Orcamento): com limite de memória, o pico projetado é
+    conferido antes da leitura (acima do limite, não processa) e o medido no fim.
+    origem: grava a coluna oculta "Linha origem" (linha do arquivo de entrada)
+    nas duas abas; o nº da linha acompanha cada exclusão/filtro de linhas.
+    checkpoints (retomada.Checkpoints): grava o estado ao fim de cada fase de
+    FASES_LIQUIDADOS; com --resume, pula as fases já salvas.
+    cache (cache_resultados.CacheResultados): entrada já processada por esta
+    versão do script = _FINAL.xlsx copiado do cache, sem processar.
+    ndjson (utils_transformacao.SaidaNDJSON): as duas abas vão em lotes NDJSON
+    para o destino dele, no lugar do _FINAL.xlsx (sem cache).
+    pacote: grava também o pacote de importação (pacote_importacao) da aba final.
+    arrow: grava também a aba final em Arrow IPC (_FINAL.arrow, ipc_arrow).
+    """
     t0 = time.time()
-    print("🚀 ULTRA-FAST: Lendo 1ª aba com otimizações máximas...")
-    
-    # Step 1-3: Ultra-fast reading
-    matrix = read_first_sheet_matrix_ultrafast(xlsx_path)
-    matrix = trim_bottom_empty_rows_fast(matrix)
-    
-    # Ensure rectangular matrix
-    max_cols_init = compute_max_col_util_fast(matrix)
-    for r in matrix:
-        if len(r) < max_cols_init:
-            r.extend([None] * (max_cols_init - len(r)))
-        elif len(r) > max_cols_init:
-            del r[max_cols_init:]
-    
-    print(f"✅ Leitura: {len(matrix):,} linhas | {max_cols_init:,} colunas | {time.time()-t0:.1f}s")
-    
-    # Step 4: Delete row 2
-    if len(matrix) >= 2:
-        del matrix[1]
-    
-    # Step 5: Batch delete columns N and L
-    batch_column_operations(matrix, [('delete', 'N'), ('delete', 'L')])
-    
-    # Step 6: Optimized "Objeto:" removal
-    iB = col0("B")
-    for r in range(len(matrix)):
-        v = safe_get(matrix[r], iB)
-        if isinstance(v, str) and "objeto:" in v.lower():
-            novo = _objeto_re.sub("", v).strip()
-            safe_set(matrix[r], iB, novo if novo else None)
-    
-    # Steps 7-9: Batch filtering
-    print("🔄 Aplicando filtros em lote...")
-    filters = create_filter_functions()
-    matrix = filter_rows_batch(matrix, filters)
-    
-    # Step 10: Batch fill-down operations
-    print("🔄 Fill-down em lote...")
-    for letra in ["A", "B", "D", "E", "G", "I", "J"]:
-        fill_down_matrix_fast(matrix, letra, start_row=3)
-    
-    # Steps 13-34: Continue with optimized operations
-    print("🔄 Processando etapas 13-34...")
-    
-    # Step 13: Insert column C
-    insert_col_matrix_fast(matrix, "C")
-    
-    # Step 14: Optimized M,D -> C,D logic
-    iM, iD, iC = col0("M"), col0("D"), col0("C")
-    for r in range(len(matrix)):
-        m_val = safe_get(matrix[r], iM)
-        d_val = safe_get(matrix[r], iD)
-        if is_nonempty(m_val) and is_nonempty(d_val):
-            safe_set(matrix[r], iC, d_val)
-            safe_set(matrix[r], iD, None)
-    
-    # Step 15: Insert column D
-    insert_col_matrix_fast(matrix, "D")
-    
-    # Step 16: H,E -> D,E logic
-    iH, iE, iD = col0("H"), col0("E"), col0("D")
-    for r in range(len(matrix)):
-        h_val = safe_get(matrix[r], iH)
-        e_val = safe_get(matrix[r], iE)
-        if is_nonempty(h_val) and is_nonempty(e_val):
-            safe_set(matrix[r], iD, e_val)
-            safe_set(matrix[r], iE, None)
-    
-    # Step 17: N empty, E -> O logic
-    iN, iO = col0("N"), col0("O")
-    for r in range(len(matrix)):
-        n_val = safe_get(matrix[r], iN)
-        e_val = safe_get(matrix[r], iE)
-        if not is_nonempty(n_val) and is_nonempty(e_val):
-            safe_set(matrix[r], iO, e_val)
-            safe_set(matrix[r], iE, None)
-    
-    # Step 18: Fill-down C
-    fill_down_matrix_fast(matrix, "C", start_row=3)
-    
-    # Step 19: Delete column E
-    delete_col_matrix_fast(matrix, "E")
-    
-    # Step 20: Optimized text processing in column C
-    iC = col0("C")
-    for r in range(len(matrix)):
-        c_val = safe_get(matrix[r], iC)
-        if c_val is not None:
-            s = str(c_val)
-            pos = s.find("-")
-            novo_txt = s[:pos].strip() if pos > 0 else s.strip()
-            safe_set(matrix[r], iC, novo_txt if novo_txt else None)
-    
-    # Steps 21-28: Continue with remaining logic...
-    print("🔄 Processando etapas 21-28...")
-    
-    # Step 21: N(r+1) and N(r) logic
-    for r in range(len(matrix) - 1):
-        n_now = safe_get(matrix[r], iN)
-        n_next = safe_get(matrix[r + 1], iN)
-        if is_nonempty(n_now) and is_nonempty(n_next):
-            safe_set(matrix[r], iO, n_now)
-            safe_set(matrix[r], iN, None)
-    
-    # Step 22: Move N up 2 lines
-    for r in range(2, len(matrix)):
-        valN = safe_get(matrix[r], iN)
-        if is_nonempty(valN):
-            safe_set(matrix[r - 2], iN, valN)
-            safe_set(matrix[r], iN, None)
-    
-    # Step 23: Move O up 1 line
-    for r in range(1, len(matrix)):
-        valO = safe_get(matrix[r], iO)
-        if is_nonempty(valO):
-            safe_set(matrix[r - 1], iO, valO)
-            safe_set(matrix[r], iO, None)
-    
-    # Step 24: N and M -> P logic
-    iP = col0("P")
-    for r in range(len(matrix)):
-        n_val = safe_get(matrix[r], iN)
-        m_val = safe_get(matrix[r], iM)
-        if is_nonempty(n_val) and is_nonempty(m_val):
-            safe_set(matrix[r], iP, n_val)
-            safe_set(matrix[r], iN, None)
-    
-    # Step 25: Move N down 1 line (bottom-up)
-    for r in range(len(matrix) - 1, -1, -1):
-        n_val2 = safe_get(matrix[r], iN)
-        if is_nonempty(n_val2) and (r + 1) < len(matrix):
-            safe_set(matrix[r + 1], iN, n_val2)
-            safe_set(matrix[r], iN, None)
-    
-    # Step 26: Move D,G,I,L up 3 lines
-    for letra in ["D", "G", "I", "L"]:
-        ic = col0(letra)
-        for r in range(3, len(matrix)):
-            v = safe_get(matrix[r], ic)
-            if is_nonempty(v):
-                safe_set(matrix[r - 3], ic, v)
-                safe_set(matrix[r], ic, None)
-    
-    # Step 27: N logic for D
-    iD = col0("D")
-    for r in range(1, len(matrix)):
-        n_val = safe_get(matrix[r], iN)
-        d_prev = safe_get(matrix[r - 1], iD)
-        if is_nonempty(n_val) and is_nonempty(d_prev):
-            safe_set(matrix[r], iD, d_prev)
-            safe_set(matrix[r - 1], iD, None)
-    
-    # Step 28: Same logic for G and L
-    for letra in ["G", "L"]:
-        ic = col0(letra)
-        for r in range(1, len(matrix)):
-            n_val = safe_get(matrix[r], iN)
-            prev_val = safe_get(matrix[r - 1], ic)
-            if is_nonempty(n_val) and is_nonempty(prev_val):
-                safe_set(matrix[r], ic, prev_val)
-                safe_set(matrix[r - 1], ic, None)
-    
-    # Step 29: Insert new column D
-    insert_col_matrix_fast(matrix, "D")
-    
-    # Step 30: Build column D from E+J blocks
-    print("🔄 Construindo coluna D (E+J)...")
-    iD, iE, iJ = col0("D"), col0("E"), col0("J")
-    r = 0
-    while r < len(matrix):
-        e_val = safe_get(matrix[r], iE)
-        j_val = safe_get(matrix[r], iJ)
-        if is_nonempty(e_val) or is_nonempty(j_val):
-            inicio_bloco = r
-            partes = []
+    opcoes = opcoes or Opcoes()
+    orcamento, origem, ndjson = opcoes.orcamento, opcoes.origem, opcoes.ndjson
+    pacote, arrow = opcoes.pacote, opcoes.arrow
+    out_path = xlsx_path.with_name(f"{xlsx_path.stem}_FINAL.xlsx")
+    cache = opcoes.cache if ndjson is None else CacheResultados()   # o cache guarda o .xlsx, não o fluxo
+    saidas = [out_path] + ([caminho_pacote(out_path)] if pacote else []) + ([caminho_arrow(out_path)] if arrow else [])
+    chave = cache.chave(xlsx_path, __file__, origem=origem, pacote=pacote, arrow=arrow)
+    if cache.restaurar(chave, saidas):
+        return True
+    if orcamento:
+        conferir_orcamento(xlsx_path, "liquidados", orcamento)
+    ck = opcoes.checkpoints.abrir(xlsx_path, __file__, origem=origem)
+    fase = ck.retomar_de(FASES_LIQUIDADOS)
+    if fase:
+        # classificação pronta: a planilha bruta só é lida daqui em diante (fica no disco)
+        estado = ck.carregar(fase, lazy=("matrix",) if fase == "classificacao" else ())
+        matrix, linha_origem = estado["matrix"], estado["linha_origem"]
+        if fase == "classificacao":
+            matrix_main, linhas_m, colunas_m = matrix, estado["linhas_m"], estado["colunas_m"]
+            tipo_m, documento_m = estado["tipo_m"], estado["documento_m"]
+            iM = col0("M")
+        del estado
+    else:
+        print("🚀 ULTRA-FAST: Lendo 1ª aba com otimizações máximas...")
+    
+    if ck.pendente("leitura"):
+        with etapa("Step 1-3: Ultra-fast reading", lambda: len(matrix)):
+            matrix = read_first_sheet_matrix_ultrafast(xlsx_path)
+            matrix = trim_bottom_empty_rows_fast(matrix)
+    
+            # Ensure rectangular matrix
+            max_cols_init = compute_max_col_util_fast(matrix)
+            for r in matrix:
+                if len(r) < max_cols_init:
+                    r.extend([None] * (max_cols_init - len(r)))
+                elif len(r) > max_cols_init:
+                    del r[max_cols_init:]
+    
+            print(f"✅ Leitura: {len(matrix):,} linhas | {max_cols_init:,} colunas | {time.time()-t0:.1f}s")
+            # matrix[r] é a linha r + 1 da planilha de entrada
+            linha_origem = array("i", range(1, len(matrix) + 1)) if origem else None
+        ck.salvar("leitura", matrix=matrix, linha_origem=linha_origem)
+    
+    if ck.pendente("filtros"):
+        with etapa("Step 4: Delete row 2", lambda: len(matrix)):
+            if len(matrix) >= 2:
+                del matrix[1]
+                if linha_origem is not None:
+                    del linha_origem[1]
+    
+        with etapa("Step 5: Batch delete columns N and L", lambda: len(matrix)):
+            batch_column_operations(matrix, [('delete', 'N'), ('delete', 'L')])
+    
+        with etapa('Step 6: Optimized "Objeto:" removal', lambda: len(matrix)):
+            iB = col0("B")
+            for r in range(len(matrix)):
+                v = safe_get(matrix[r], iB)
+                if isinstance(v, str) and "objeto:" in v.lower():
+                    novo = _objeto_re.sub("", v).strip()
+                    safe_set(matrix[r], iB, novo if novo else None)
+    
+        with etapa("Steps 7-9: Batch filtering", lambda: len(matrix)):
+            print("🔄 Aplicando filtros em lote...")
+            filters = create_filter_functions()
+            matrix = filter_rows_batch(matrix, filters, linha_origem)
+    
+        with etapa("Step 10: Batch fill-down operations", lambda: len(matrix)):
+            print("🔄 Fill-down em lote...")
+            for letra in ["A", "B", "D", "E", "G", "I", "J"]:
+                fill_down_matrix_fast(matrix, letra, start_row=3)
+        ck.salvar("filtros", matrix=matrix, linha_origem=linha_origem)
+    
+    if ck.pendente("etapas_13_34"):
+        # Steps 13-34: Continue with optimized operations
+        print("🔄 Processando etapas 13-34...")
+    
+        with etapa("Step 13: Insert column C", lambda: len(matrix)):
+            insert_col_matrix_fast(matrix, "C")
+    
+        with etapa("Step 14: Optimized M,D -> C,D logic", lambda: len(matrix)):
+            iM, iD, iC = col0("M"), col0("D"), col0("C")
+            for r in range(len(matrix)):
+                m_val = safe_get(matrix[r], iM)
+                d_val = safe_get(matrix[r], iD)
+                if is_nonempty(m_val) and is_nonempty(d_val):
+                    safe_set(matrix[r], iC, d_val)
+                    safe_set(matrix[r], iD, None)
+    
+        with etapa("Step 15: Insert column D", lambda: len(matrix)):
+            insert_col_matrix_fast(matrix, "D")
+    
+        with etapa("Step 16: H,E -> D,E logic", lambda: len(matrix)):
+            iH, iE, iD = col0("H"), col0("E"), col0("D")
+            for r in range(len(matrix)):
+                h_val = safe_get(matrix[r], iH)
+                e_val = safe_get(matrix[r], iE)
+                if is_nonempty(h_val) and is_nonempty(e_val):
+                    safe_set(matrix[r], iD, e_val)
+                    safe_set(matrix[r], iE, None)
+    
+        with etapa("Step 17: N empty, E -> O logic", lambda: len(matrix)):
+            iN, iO = col0("N"), col0("O")
+            for r in range(len(matrix)):
+                n_val = safe_get(matrix[r], iN)
+                e_val = safe_get(matrix[r], iE)
+                if not is_nonempty(n_val) and is_nonempty(e_val):
+                    safe_set(matrix[r], iO, e_val)
+                    safe_set(matrix[r], iE, None)
+    
+        with etapa("Step 18: Fill-down C", lambda: len(matrix)):
+            fill_down_matrix_fast(matrix, "C", start_row=3)
+    
+        with etapa("Step 19: Delete column E", lambda: len(matrix)):
+            delete_col_matrix_fast(matrix, "E")
+    
+        with etapa("Step 20: Optimized text processing in column C", lambda: len(matrix)):
+            iC = col0("C")
+            for r in range(len(matrix)):
+                c_val = safe_get(matrix[r], iC)
+                if c_val is not None:
+                    s = str(c_val)
+                    pos = s.find("-")
+                    novo_txt = s[:pos].strip() if pos > 0 else s.strip()
+                    safe_set(matrix[r], iC, novo_txt if novo_txt else None)
+    
+        # Steps 21-28: Continue with remaining logic...
+        print("🔄 Processando etapas 21-28...")
+    
+        with etapa("Step 21: N(r+1) and N(r) logic", lambda: len(matrix)):
+            for r in range(len(matrix) - 1):
+                n_now = safe_get(matrix[r], iN)
+                n_next = safe_get(matrix[r + 1], iN)
+                if is_nonempty(n_now) and is_nonempty(n_next):
+                    safe_set(matrix[r], iO, n_now)
+                    safe_set(matrix[r], iN, None)
+    
+        with etapa("Step 22: Move N up 2 lines", lambda: len(matrix)):
+            for r in range(2, len(matrix)):
+                valN = safe_get(matrix[r], iN)
+                if is_nonempty(valN):
+                    safe_set(matrix[r - 2], iN, valN)
+                    safe_set(matrix[r], iN, None)
+    
+        with etapa("Step 23: Move O up 1 line", lambda: len(matrix)):
+            for r in range(1, len(matrix)):
+                valO = safe_get(matrix[r], iO)
+                if is_nonempty(valO):
+                    safe_set(matrix[r - 1], iO, valO)
+                    safe_set(matrix[r], iO, None)
+    
+        with etapa("Step 24: N and M -> P logic", lambda: len(matrix)):
+            iP = col0("P")
+            for r in range(len(matrix)):
+                n_val = safe_get(matrix[r], iN)
+                m_val = safe_get(matrix[r], iM)
+                if is_nonempty(n_val) and is_nonempty(m_val):
+                    safe_set(matrix[r], iP, n_val)
+                    safe_set(matrix[r], iN, None)
+    
+        with etapa("Step 25: Move N down 1 line (bottom-up)", lambda: len(matrix)):
+            for r in range(len(matrix) - 1, -1, -1):
+                n_val2 = safe_get(matrix[r], iN)
+                if is_nonempty(n_val2) and (r + 1) < len(matrix):
+                    safe_set(matrix[r + 1], iN, n_val2)
+                    safe_set(matrix[r], iN, None)
+    
+        with etapa("Step 26: Move D,G,I,L up 3 lines", lambda: len(matrix)):
+            for letra in ["D", "G", "I", "L"]:
+                ic = col0(letra)
+                for r in range(3, len(matrix)):
+                    v = safe_get(matrix[r], ic)
+                    if is_nonempty(v):
+                        safe_set(matrix[r - 3], ic, v)
+                        safe_set(matrix[r], ic, None)
+    
+        with etapa("Step 27: N logic for D", lambda: len(matrix)):
+            iD = col0("D")
+            for r in range(1, len(matrix)):
+                n_val = safe_get(matrix[r], iN)
+                d_prev = safe_get(matrix[r - 1], iD)
+                if is_nonempty(n_val) and is_nonempty(d_prev):
+                    safe_set(matrix[r], iD, d_prev)
+                    safe_set(matrix[r - 1], iD, None)
+    
+        with etapa("Step 28: Same logic for G and L", lambda: len(matrix)):
+            for letra in ["G", "L"]:
+                ic = col0(letra)
+                for r in range(1, len(matrix)):
+                    n_val = safe_get(matrix[r], iN)
+                    prev_val = safe_get(matrix[r - 1], ic)
+                    if is_nonempty(n_val) and is_nonempty(prev_val):
+                        safe_set(matrix[r], ic, prev_val)
+                        safe_set(matrix[r - 1], ic, None)
+    
+        with etapa("Step 29: Insert new column D", lambda: len(matrix)):
+            insert_col_matrix_fast(matrix, "D")
+    
+        with etapa("Step 30: Build column D from E+J blocks", lambda: len(matrix)):
+            print("🔄 Construindo coluna D (E+J)...")
+            iD, iE, iJ = col0("D"), col0("E"), col0("J")
+            r = 0
             while r < len(matrix):
-                ev_i = safe_get(matrix[r], iE)
-                jv_i = safe_get(matrix[r], iJ)
-                if not is_nonempty(ev_i) and not is_nonempty(jv_i):
-                    break
-                if is_nonempty(ev_i):
-                    partes.append(str(ev_i).strip())
-                if is_nonempty(jv_i):
-                    partes.append(str(jv_i).strip())
-                r += 1
-            safe_set(matrix[inicio_bloco], iD, ";".join(partes))
-        else:
-            r += 1
-    
-    # Step 31: Update headers
-    if matrix:
-        headers = {
-            "D": "Doc/nota fiscal",
-            "H": "Valor auxiliar 1", 
-            "J": "doc/nota fiscal auxiliar",
-            "M": "Valor auxiliar 2",
-            "P": "Hist.Empenho",
-            "Q": "Hist.Liq"
-        }
-        for letter, txt in headers.items():
-            idx = col0(letter)
-            safe_set(matrix[0], idx, txt)
-    
-    # Step 32: Delete column E
-    delete_col_matrix_fast(matrix, "E")
-    
-    # Step 33: N -> O logic
-    iN, iO = col0("N"), col0("O")
-    for r in range(len(matrix)):
-        n_val = safe_get(matrix[r], iN)
-        if is_nonempty(n_val):
-            safe_set(matrix[r], iO, n_val)
-            safe_set(matrix[r], iN, None)
-    
-    # Step 34: Delete column N
-    delete_col_matrix_fast(matrix, "N")
-    
-    # Matrix main is ready
-    matrix_main = [row[:] for row in matrix]  # Deep copy
-    
-    # Step 35: Create filtered matrix for M column processing
-    print("🔄 Criando matriz filtrada (coluna M)...")
-    matrix_main = trim_bottom_empty_rows_fast(matrix_main)
-    max_cols_34 = compute_max_col_util_fast(matrix_main)
-    
-    for row in matrix_main:
-        if len(row) < max_cols_34:
-            row.extend([None] * (max_cols_34 - len(row)))
-        elif len(row) > max_cols_34:
-            del row[max_cols_34:]
-    
-    iM = col0("M")
-    ws_m = []
-    for row in matrix_main:
-        v = safe_get(row, iM)
-        if isinstance(v, str) and v.strip():
-            ws_m.append(row[:])
-        elif v not in (None, ""):
-            ws_m.append(row[:])
-    
-    # Delete columns L, I, G from ws_m
-    for letra_del in ["L", "I", "G"]:
-        try:
-            delete_col_matrix_fast(ws_m, letra_del)
-        except:
-            pass
-    
-    # Steps 36-38: Process ws_m content
-    print("🔄 Processando conteúdo ws_m...")
-    for row in ws_m:
-        if len(row) < 15:
-            row.extend([None] * (15 - len(row)))
-    
-    iL, iM2, iN2, iO2 = col0("L"), col0("M"), col0("N"), col0("O")
-    
-    # Find last useful row
-    ultima_util = 0
-    for rr in range(len(ws_m)):
-        vL = safe_get(ws_m[rr], iL)
-        if isinstance(vL, str) and vL.strip():
-            ultima_util = rr
-    
-    # Process content
-    for rr in range(ultima_util + 1):
-        rawL = safe_get(ws_m[rr], iL)
-        texto2, categoria, numero_extraido = processar_linha_ws_m_conteudo_fast(rawL)
-        safe_set(ws_m[rr], iM2, texto2)
-        safe_set(ws_m[rr], iN2, categoria)
-        safe_set(ws_m[rr], iO2, numero_extraido)
-    
-    # Final post-processing
-    print("🔄 Pós-processamento final...")
-    ws_final = ws_m
-    
-    if ws_final:
-        # Update headers
-        if col0("N") < len(ws_final[0]):
-            ws_final[0][col0("N")] = "Tipo"
-        if col0("O") < len(ws_final[0]):
-            ws_final[0][col0("O")] = "Documento"
-        
-        # Remove column M
-        idxM = col0("M")
-        for rr in range(len(ws_final)):
-            if idxM < len(ws_final[rr]):
-                del ws_final[rr][idxM]
-    
-    # Convert dates
-    print("🔄 Convertendo datas...")
-    for mat in (ws_final, matrix_main):
-        converter_datas_texto_matrix_fast(mat)
-        formatar_coluna_a_data_real_matrix_fast(mat)
+                e_val = safe_get(matrix[r], iE)
+                j_val = safe_get(matrix[r], iJ)
+                if is_nonempty(e_val) or is_nonempty(j_val):
+                    inicio_bloco = r
+                    partes = []
+                    while r < len(matrix):
+                        ev_i = safe_get(matrix[r], iE)
+                        jv_i = safe_get(matrix[r], iJ)
+                        if not is_nonempty(ev_i) and not is_nonempty(jv_i):
+                            break
+                        if is_nonempty(ev_i):
+                            partes.append(str(ev_i).strip())
+                        if is_nonempty(jv_i):
+                            partes.append(str(jv_i).strip())
+                        r += 1
+                    safe_set(matrix[inicio_bloco], iD, ";".join(partes))
+                else:
+                    r += 1
+    
+        with etapa("Step 31: Update headers", lambda: len(matrix)):
+            if matrix:
+                headers = {
+                    "D": "Doc/nota fiscal",
+                    "H": "Valor auxiliar 1", 
+                    "J": "doc/nota fiscal auxiliar",
+                    "M": "Valor auxiliar 2",
+                    "P": "Hist.Empenho",
+                    "Q": "Hist.Liq"
+                }
+                for letter, txt in headers.items():
+                    idx = col0(letter)
+                    safe_set(matrix[0], idx, txt)
+    
+        with etapa("Step 32: Delete column E", lambda: len(matrix)):
+            delete_col_matrix_fast(matrix, "E")
+    
+        with etapa("Step 33: N -> O logic", lambda: len(matrix)):
+            iN, iO = col0("N"), col0("O")
+            for r in range(len(matrix)):
+                n_val = safe_get(matrix[r], iN)
+                if is_nonempty(n_val):
+                    safe_set(matrix[r], iO, n_val)
+                    safe_set(matrix[r], iN, None)
+    
+        with etapa("Step 34: Delete column N", lambda: len(matrix)):
+            delete_col_matrix_fast(matrix, "N")
+        ck.salvar("etapas_13_34", matrix=matrix, linha_origem=linha_origem)
+    
+    if ck.pendente("classificacao"):
+        with etapa("Step 35: Create filtered matrix (column M)", linhas=len(matrix)) as e:
+            # Step 35: Create filtered matrix for M column processing
+            print("🔄 Criando matriz filtrada (coluna M)...")
+            # Matrix main is ready: matrix não é mais alterada, então sem cópia profunda
+            # (e sem manter a lista antiga viva junto com a aparada)
+            matrix_main = trim_bottom_empty_rows_fast(matrix)
+            matrix = matrix_main
+            if linha_origem is not None:
+                del linha_origem[len(matrix_main):]
+            max_cols_34 = compute_max_col_util_fast(matrix_main)
+    
+            for row in matrix_main:
+                if len(row) < max_cols_34:
+                    row.extend([None] * (max_cols_34 - len(row)))
+                elif len(row) > max_cols_34:
+                    del row[max_cols_34:]
+    
+            # ws_m = seleção de linhas (M preenchida) + projeção sem L, I, G sobre
+            # matrix_main: nenhuma linha é copiada, a planilha só é montada na gravação
+            iM = col0("M")
+            linhas_m = array("i", (r for r, row in enumerate(matrix_main) if safe_get(row, iM) not in (None, "")))
+            sem_lig = {col0("L"), col0("I"), col0("G")}
+            colunas_m = [c for c in range(max_cols_34) if c not in sem_lig]
+            colunas_m += [-1] * (15 - len(colunas_m))   # -1 = coluna nova (vazia)
+            e.saida(len(linhas_m))
+    
+        with etapa("Steps 36-38: Process ws_m content", lambda: len(linhas_m)):
+            print("🔄 Processando conteúdo ws_m...")
+            iL = col0("L")
+            col_l = colunas_m[iL]
+    
+            # Find last useful row
+            ultima_util = 0
+            for rr, r in enumerate(linhas_m):
+                vL = safe_get(matrix_main[r], col_l)
+                if isinstance(vL, str) and vL.strip():
+                    ultima_util = rr
+    
+            # Process content (texto da coluna M é descartado no pós-processamento:
+            # só Tipo e Documento são guardados)
+            tipo_m, documento_m = [], []
+            for r in linhas_m[:ultima_util + 1]:
+                _, categoria, numero_extraido = processar_linha_ws_m_conteudo_fast(safe_get(matrix_main[r], col_l))
+                tipo_m.append(categoria)
+                documento_m.append(numero_extraido)
+        ck.salvar("classificacao", matrix=matrix_main, linha_origem=linha_origem, linhas_m=linhas_m,
+                  colunas_m=colunas_m, tipo_m=tipo_m, documento_m=documento_m)
+    
+    with etapa("Final post-processing", lambda: len(linhas_m)):
+        print("🔄 Pós-processamento final...")
+        # Remove column M; N e O recebem Tipo/Documento (Steps 36-38)
+        iN, iO = col0("N"), col0("O")
+        ws_final = MatrizProjetada(matrix_main, linhas_m, colunas_m[:iM] + colunas_m[iM + 1:],
+                                   origem=linha_origem)
+    
+        def montar_ws(i, row):
+            if i < len(tipo_m):
+                row[iN - 1] = tipo_m[i]
+                row[iO - 1] = documento_m[i]
+            if i == 0:
+                # Update headers
+                row[iN - 1] = "Tipo"
+                row[iO - 1] = "Documento"
+            return row
+    
+        ws_final.montar = montar_ws
+    
+    with etapa("Convert dates", lambda: len(ws_final)):
+        # Datas e cabeçalho aplicados linha a linha durante a gravação
+        print("🔄 Convertendo datas...")
+        matrix_main = MatrizProjetada(matrix_main, origem=linha_origem)
+        for mat in (ws_final, matrix_main):
+            # Renomear cabeçalho (apenas o nome da coluna)
+            converter_datas_na_gravacao(mat, "Beneficiário", "Credor/Fornecedor")
+    
+    if ndjson is not None:
+        out_path = ndjson.destino
+        t1 = time.time()
+        with etapa("Gravar NDJSON", lambda: len(matrix_main)), ndjson:
+            ndjson.gravar(abas_ndjson(("Liquidados Final", ws_final), ("Planilha Bruta Liq", matrix_main)))
+    else:
+        with etapa("Save _FINAL.xlsx", lambda: len(matrix_main)):
+            # Save final file
+            print("💾 Salvando arquivo final (ultra-otimizado)...")
+            t1 = time.time()
     
+            save_two_sheets_xlsx_ultrafast(out_path, "Liquidados Final", ws_final, "Planilha Bruta Liq", matrix_main)
 
-    # Renomear cabeçalho (apenas o nome da coluna)
-    rename_header_fast(ws_final, "Beneficiário", "Credor/Fornecedor")
-    rename_header_fast(matrix_main, "Beneficiário", "Credor/Fornecedor")
-
-    # Save final file
-    out_path = xlsx_path.with_name(f"{xlsx_path.stem}_FINAL.xlsx")
-    print("💾 Salvando arquivo final (ultra-otimizado)...")
-    t1 = time.time()
-    
-    save_two_sheets_xlsx_ultrafast(out_path, "Liquidados Final", ws_final, "Planilha Bruta Liq", matrix_main)
-    
+        if pacote:
+            with etapa("Pacote de importação", lambda: len(ws_final)):
+                gravar_pacote(caminho_pacote(out_path), "despesas-liquidados", ws_final[0],
+                              (ws_final[r] for r in range(1, len(ws_final))), out_path.name, "Liquidados Final")
+        if arrow:
+            with etapa("Arrow IPC", lambda: len(ws_final)):
+                gravar_arrow(caminho_arrow(out_path), ws_final[0],
+                             (ws_final[r] for r in range(1, len(ws_final))), "Liquidados Final")
+    
+    ck.concluir()
+    cache.guardar(chave, saidas)
     print(f"✅ Salvo em: {out_path}")
     print(f"⏱ Tempo salvar: {time.time()-t1:.1f}s | Tempo total: {time.time()-t0:.1f}s")
+    if orcamento:
+        orcamento.resumo()
     return True
 
 # ==========================================================
@@ -905,19 +1086,40 @@ def process_workbook_ultrafast(xlsx_path: Path):
 # ==========================================================
 
 if __name__ == "__main__":
-    if len(sys.argv) >= 2 and sys.argv[1].strip():
-        caminho = Path(sys.argv[1]).expanduser()
+    opcoes = ler_opcoes(argparse.ArgumentParser(
+        description="Gera a _FINAL.xlsx dos empenhos liquidados.",
+        parents=[parser_comum(checkpoints=True, max_memory=True)]))   # --max-memory, --checkpoint, --cache...
+    if opcoes.arquivo and opcoes.arquivo.strip():
+        caminho = Path(opcoes.arquivo).expanduser()
         if not caminho.is_absolute():
             caminho = (Path.cwd() / caminho).resolve()
         if not caminho.exists():
             raise FileNotFoundError(f"Arquivo não encontrado: {caminho}")
-        process_workbook_ultrafast(caminho)
+        if opcoes.probe:
+            sondar(caminho, "liquidados", opcoes.probe, opcoes.orcamento)
+        elif opcoes.preview:
+            def _previa(entrada):
+                process_workbook_ultrafast(entrada)
+                return entrada.with_name(f"{entrada.stem}_FINAL.xlsx")
+
+            previa(caminho, "liquidados", opcoes.preview, _previa)
+        else:
+            process_workbook_ultrafast(caminho, opcoes)
+            if opcoes.parquet and opcoes.ndjson is None:
+                final = caminho.with_name(f"{caminho.stem}_FINAL.xlsx")
+                arquivar_xlsx(opcoes.parquet, "liquidados", caminho_arrow(final) if opcoes.arrow else final, caminho)
     else:
+        import tkinter as tk                    # só com janela: a linha de comando não paga o Tk
+        from tkinter import filedialog
+
         root = tk.Tk()
         root.withdraw()
         file = filedialog.askopenfilename(
             title="Selecione o arquivo Excel",
-            filetypes=[("Excel files", "*.xlsx")]
+            filetypes=[("Excel files", "*.xlsx"), ("Arrow IPC", "*.arrow")]
         )
         if file:
-            process_workbook_ultrafast(Path(file))
\ No newline at end of file
+            process_workbook_ultrafast(Path(file), opcoes)
+            if opcoes.parquet and opcoes.ndjson is None:
+                final = Path(file).with_name(f"{Path(file).stem}_FINAL.xlsx")
+                arquivar_xlsx(opcoes.parquet, "liquidados", caminho_arrow(final) if opcoes.arrow else final, file)
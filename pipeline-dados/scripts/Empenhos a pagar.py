@@ -8,22 +8,81 @@ FILTRAR LINHAS E COLUNAS VAZIAS + CORTAR "Av. liquid." + PREENCHER DATAS + FORMA
 ✅ Preenche datas vazias com a última data válida (forward fill)
 ✅ Formata coluna A como data (dd/mm/aaaa)
 ✅ Rápido e simples usando pandas
+✅ Colunas vazias detectadas de uma vez (uma única máscara booleana)
+✅ Gravação com o escritor rápido compartilhado (formato de data por coluna)
+✅ Colunas de texto repetitivo lidas como dicionário (códigos + valores)
+✅ --origem: coluna oculta "Linha origem" com a linha de cada registro no arquivo lido
+✅ --cache: entrada sem mudanças desde a última execução = saída copiada do cache de resultados
+✅ --pacote: também <arquivo>_FILTRADO.pacote.json.gz, pronto para o store "despesas-a-pagar"
+✅ --ndjson DESTINO [--gzip]: linhas em lotes NDJSON em vez do .xlsx ("-" = stdout)
+✅ --parquet PASTA: também no arquivo histórico em Parquet (PASTA/a-pagar/ano=/mes=)
+✅ --arrow: também <arquivo>_FILTRADO.arrow (Arrow IPC, ver ipc_arrow); a entrada pode ser um .arrow
+✅ --probe [--probe=N]: confere o cabeçalho ("Av. liquid.") e projeta tempo/memória sem ler o arquivo todo
+✅ --preview N: as N primeiras linhas já filtradas, processando só o começo do arquivo (ver sonda)
 ✅ Salva como: <arquivo>_FILTRADO.xlsx
 """
 
-import pandas as pd
-import tkinter as tk
-from tkinter import filedialog
+import argparse
 from pathlib import Path
-import sys
 
+from arquivo_parquet import arquivar_xlsx
+from cache_resultados import CacheResultados
+from ipc_arrow import caminho_arrow, gravar_arrow_dataframe, ler_excel
+from opcoes import Opcoes, ler_opcoes, parser_comum
+from pacote_importacao import caminho_pacote, gravar_pacote_dataframe
+from rastreio import etapa
+from sonda import previa, sondar
+from utils_transformacao import (
+    COLUNA_ORIGEM,
+    FORMATO_DATA,
+    aba_de_dataframe,
+    codificar_colunas_repetidas,
+    escrever_xlsx_rapido,
+)
 
-def filtrar_av_liquid(arquivo_excel):
-    """Filtra e remove linhas vazias da coluna 'Av. liquid.' e remove colunas vazias"""
+
+def _mascara_vazios(df):
+    """
+    Máscara booleana (linhas x colunas) de células vazias, calculada de uma vez:
+    NaN/None/NaT ou texto só com espaços.
+    """
+    import pandas as pd
+
+    valores = df.to_numpy(dtype=object)
+    vazio = pd.isna(valores)
+    planas = pd.Series(valores.ravel(), dtype=object)
     try:
-        # Lê o arquivo Excel
-        print(f"📖 Lendo arquivo: {arquivo_excel}")
-        df = pd.read_excel(arquivo_excel)
+        vazio |= planas.str.strip().eq("").to_numpy(dtype=bool).reshape(valores.shape)
+    except AttributeError:
+        pass  # nenhuma célula de texto
+    return vazio
+
+
+def filtrar_av_liquid(arquivo_excel, opcoes=None):
+    """
+    Filtra e remove linhas vazias da coluna 'Av. liquid.' e remove colunas vazias.
+    opcoes (opcoes.Opcoes; padrão: tudo desligado):
+    ndjson: SaidaNDJSON no lugar do .xlsx. A regra das colunas vazias olha a aba
+    inteira, então o cabeçalho (e o 1º lote) só sai depois da leitura completa.
+    pacote: grava também o pacote de importação (pacote_importacao) ao lado da saída.
+    arrow: grava também a saída em Arrow IPC (_FILTRADO.arrow, ipc_arrow).
+    """
+    opcoes = opcoes or Opcoes()
+    origem, ndjson, pacote, arrow = opcoes.origem, opcoes.ndjson, opcoes.pacote, opcoes.arrow
+    arquivo_saida = Path(arquivo_excel).with_name(f"{Path(arquivo_excel).stem}_FILTRADO.xlsx")
+    cache = opcoes.cache if ndjson is None else CacheResultados()   # o cache guarda o .xlsx, não o fluxo
+    saidas = ([arquivo_saida] + ([caminho_pacote(arquivo_saida)] if pacote else [])
+              + ([caminho_arrow(arquivo_saida)] if arrow else []))
+    chave = cache.chave(arquivo_excel, __file__, origem=origem, pacote=pacote, arrow=arrow)
+    if cache.restaurar(chave, saidas):
+        return arquivo_saida
+    try:
+        with etapa("Ler planilha", lambda: len(df)):
+            # Lê o arquivo Excel
+            print(f"📖 Lendo arquivo: {arquivo_excel}")
+            df = ler_excel(arquivo_excel)      # .xlsx ou .arrow
+            # colunas de texto repetitivo (credor, fonte, despesa...) como dicionário
+            codificar_colunas_repetidas(df)
         
         print(f"📊 Total de linhas antes: {len(df)}")
         print(f"📊 Total de colunas antes: {len(df.columns)}")
@@ -42,90 +101,86 @@ def filtrar_av_liquid(arquivo_excel):
         
         print(f"✅ Coluna encontrada: '{coluna_av_liquid}'")
         
-        # Remove linhas onde a coluna está vazia (NaN, None, ou string vazia)
-        df_filtrado = df.dropna(subset=[coluna_av_liquid])
-        df_filtrado = df_filtrado[df_filtrado[coluna_av_liquid].astype(str).str.strip() != '']
-        
-        linhas_removidas = len(df) - len(df_filtrado)
-        print(f"🗑️  Linhas removidas: {linhas_removidas}")
-        print(f"📊 Total de linhas depois: {len(df_filtrado)}")
-        
-        # Remove colunas completamente vazias (ignora cabeçalho - linha 0)
-        colunas_antes = len(df_filtrado.columns)
-        
-        # Identifica colunas vazias (todas as células são NaN ou string vazia, exceto o cabeçalho)
-        colunas_para_manter = []
-        colunas_removidas = []
-        
-        for col in df_filtrado.columns:
-            # Verifica se a coluna tem pelo menos um valor não vazio (excluindo o cabeçalho)
-            valores_coluna = df_filtrado[col].dropna()  # Remove NaN
-            valores_coluna = valores_coluna.astype(str).str.strip()  # Remove espaços
-            valores_nao_vazios = valores_coluna[valores_coluna != '']  # Remove strings vazias
-            
-            if len(valores_nao_vazios) > 0:
-                colunas_para_manter.append(col)
+        with etapa("Remover linhas sem Av. liquid.", linhas=len(df)) as e:
+            # Remove linhas onde a coluna está vazia (NaN, None, ou string vazia)
+            df_filtrado = df.dropna(subset=[coluna_av_liquid])
+            df_filtrado = df_filtrado[df_filtrado[coluna_av_liquid].astype(str).str.strip() != '']
+        
+            linhas_removidas = len(df) - len(df_filtrado)
+            print(f"🗑️  Linhas removidas: {linhas_removidas}")
+            print(f"📊 Total de linhas depois: {len(df_filtrado)}")
+            e.saida(len(df_filtrado))
+        
+        with etapa("Remover colunas vazias", lambda: len(df_filtrado)):
+            # Remove colunas completamente vazias (ignora cabeçalho - linha 0)
+            colunas_antes = len(df_filtrado.columns)
+        
+            # Identifica colunas vazias (todas as células são NaN ou string vazia, exceto o cabeçalho)
+            coluna_vazia = _mascara_vazios(df_filtrado).all(axis=0)
+            colunas_para_manter = list(df_filtrado.columns[~coluna_vazia])
+            colunas_removidas = list(df_filtrado.columns[coluna_vazia])
+        
+            # Mantém apenas as colunas que têm dados
+            df_filtrado = df_filtrado[colunas_para_manter]
+        
+            colunas_depois = len(df_filtrado.columns)
+            print(f"🗑️  Colunas removidas: {len(colunas_removidas)}")
+            if colunas_removidas:
+                print(f"   Colunas removidas: {colunas_removidas}")
+            print(f"📊 Total de colunas depois: {colunas_depois}")
+        
+        with etapa("Cortar Av. liquid. em 7 caracteres", lambda: len(df_filtrado)):
+            # Pega apenas os 7 primeiros caracteres da coluna "Av. liquid."
+            print(f"✂️  Cortando coluna '{coluna_av_liquid}' para 7 primeiros caracteres...")
+            df_filtrado[coluna_av_liquid] = df_filtrado[coluna_av_liquid].astype(str).str[:7]
+        
+        with etapa("Preencher datas vazias (ffill)", lambda: len(df_filtrado)):
+            # Preenche datas vazias com a última data válida (forward fill)
+            print(f"📅 Preenchendo datas vazias...")
+            colunas_data = []
+        
+            # Identifica colunas que podem ser datas
+            for col in df_filtrado.columns:
+                col_name = str(col).lower()
+                if any(palavra in col_name for palavra in ['data', 'date', 'dt', 'emissao', 'vencimento']):
+                    colunas_data.append(col)
+        
+            if colunas_data:
+                print(f"   Colunas de data encontradas: {colunas_data}")
+                for col_data in colunas_data:
+                    # Preenche células vazias com a última data válida (forward fill)
+                    df_filtrado[col_data] = df_filtrado[col_data].ffill()
+                    print(f"   ✅ Preenchido: {col_data}")
             else:
-                colunas_removidas.append(col)
-        
-        # Mantém apenas as colunas que têm dados
-        df_filtrado = df_filtrado[colunas_para_manter]
-        
-        colunas_depois = len(df_filtrado.columns)
-        print(f"🗑️  Colunas removidas: {len(colunas_removidas)}")
-        if colunas_removidas:
-            print(f"   Colunas removidas: {colunas_removidas}")
-        print(f"📊 Total de colunas depois: {colunas_depois}")
-        
-        # Pega apenas os 7 primeiros caracteres da coluna "Av. liquid."
-        print(f"✂️  Cortando coluna '{coluna_av_liquid}' para 7 primeiros caracteres...")
-        df_filtrado[coluna_av_liquid] = df_filtrado[coluna_av_liquid].astype(str).str[:7]
-        
-        # Preenche datas vazias com a última data válida (forward fill)
-        print(f"📅 Preenchendo datas vazias...")
-        colunas_data = []
-        
-        # Identifica colunas que podem ser datas
-        for col in df_filtrado.columns:
-            col_name = str(col).lower()
-            if any(palavra in col_name for palavra in ['data', 'date', 'dt', 'emissao', 'vencimento']):
-                colunas_data.append(col)
-        
-        if colunas_data:
-            print(f"   Colunas de data encontradas: {colunas_data}")
-            for col_data in colunas_data:
-                # Preenche células vazias com a última data válida (forward fill)
-                df_filtrado[col_data] = df_filtrado[col_data].ffill()
-                print(f"   ✅ Preenchido: {col_data}")
-        else:
-            print("   ⚠️  Nenhuma coluna de data identificada automaticamente")
-            # Se não encontrou colunas de data automaticamente, tenta preencher a primeira coluna
-            if len(df_filtrado.columns) > 0:
-                primeira_col = df_filtrado.columns[0]
-                print(f"   📅 Tentando preencher primeira coluna: {primeira_col}")
-                df_filtrado[primeira_col] = df_filtrado[primeira_col].ffill()
-        
-        # Salva o arquivo filtrado
-        arquivo_saida = Path(arquivo_excel).with_name(f"{Path(arquivo_excel).stem}_FILTRADO.xlsx")
-        
-        # Salva com formatação de data na coluna A
-        print(f"📅 Formatando coluna A como data (dd/mm/aaaa)...")
-        with pd.ExcelWriter(arquivo_saida, engine='openpyxl') as writer:
-            df_filtrado.to_excel(writer, index=False, sheet_name='Sheet1')
-            
-            # Acessa a planilha para aplicar formatação
-            worksheet = writer.sheets['Sheet1']
-            
-            # Aplica formato de data abreviada na coluna A (dd/mm/aa)
-            from openpyxl.styles import NamedStyle
-            
-            # Cria estilo de data abreviada
-            date_style = NamedStyle(name='date_short', number_format='DD/MM/YYYY')
-            
-            # Aplica o formato na coluna A (exceto cabeçalho)
-            for row in range(2, len(df_filtrado) + 2):  # Começa da linha 2 (pula cabeçalho)
-                cell = worksheet[f'A{row}']
-                cell.style = date_style
+                print("   ⚠️  Nenhuma coluna de data identificada automaticamente")
+                # Se não encontrou colunas de data automaticamente, tenta preencher a primeira coluna
+                if len(df_filtrado.columns) > 0:
+                    primeira_col = df_filtrado.columns[0]
+                    print(f"   📅 Tentando preencher primeira coluna: {primeira_col}")
+                    df_filtrado[primeira_col] = df_filtrado[primeira_col].ffill()
+        
+        if origem:
+            # índice do read_excel: 0 = linha 2 (a linha 1 é o cabeçalho)
+            df_filtrado = df_filtrado.assign(**{COLUNA_ORIGEM: (df_filtrado.index + 2).astype("int32")})
+        if ndjson is not None:
+            with etapa("Gravar NDJSON", lambda: len(df_filtrado)), ndjson:
+                ndjson.gravar([aba_de_dataframe("Sheet1", df_filtrado)])
+            print(f"✅ NDJSON gravado: {ndjson.destino}")
+            return ndjson.destino
+
+        with etapa("Salvar _FILTRADO.xlsx", lambda: len(df_filtrado)):
+            # Salva o arquivo filtrado
+            # Salva com formatação de data na coluna A (formato de coluna, na gravação)
+            print(f"📅 Formatando coluna A como data (dd/mm/aaaa)...")
+            escrever_xlsx_rapido(arquivo_saida, [("Sheet1", df_filtrado, {0: FORMATO_DATA})])
+        if pacote:
+            with etapa("Pacote de importação", lambda: len(df_filtrado)):
+                gravar_pacote_dataframe(caminho_pacote(arquivo_saida), "despesas-a-pagar", df_filtrado,
+                                        arquivo_saida.name, "Sheet1")
+        if arrow:
+            with etapa("Arrow IPC", lambda: len(df_filtrado)):
+                gravar_arrow_dataframe(caminho_arrow(arquivo_saida), df_filtrado, "Sheet1")
+        cache.guardar(chave, saidas)
         
         print(f"✅ Arquivo salvo: {arquivo_saida}")
         return arquivo_saida
@@ -135,27 +190,44 @@ def filtrar_av_liquid(arquivo_excel):
         return None
 
 
-def main():
+def main(argv=None):
+    ap = argparse.ArgumentParser(description='Filtra os empenhos a pagar pela coluna "Av. liquid.".',
+                                 parents=[parser_comum()])
+    opcoes = ler_opcoes(ap, argv)   # --origem, --cache, --ndjson, --parquet, --arrow, --probe, --preview...
+
     # Se passou arquivo por parâmetro
-    if len(sys.argv) >= 2 and sys.argv[1].strip():
-        arquivo = sys.argv[1]
-        filtrar_av_liquid(arquivo)
+    if opcoes.arquivo and opcoes.arquivo.strip():
+        arquivo = opcoes.arquivo
+        if opcoes.probe:
+            sondar(arquivo, "a-pagar", opcoes.probe)
+            return
+        if opcoes.preview:
+            previa(arquivo, "a-pagar", opcoes.preview, filtrar_av_liquid)
+            return
+        saida = filtrar_av_liquid(arquivo, opcoes)
+        if opcoes.parquet and saida and opcoes.ndjson is None:
+            arquivar_xlsx(opcoes.parquet, "a-pagar", caminho_arrow(saida) if opcoes.arrow else saida, arquivo)
         return
     
     # Senão, abre dialog para selecionar arquivo
+    import tkinter as tk                        # só com janela: a linha de comando não paga o Tk
+    from tkinter import filedialog
+
     root = tk.Tk()
     root.withdraw()
     
     arquivo = filedialog.askopenfilename(
         title="Selecione o arquivo Excel",
-        filetypes=[("Excel files", "*.xlsx *.xls *.xlsm")]
+        filetypes=[("Excel files", "*.xlsx *.xls *.xlsm"), ("Arrow IPC", "*.arrow")]
     )
     
     if not arquivo:
         print("❌ Nenhum arquivo selecionado")
         return
     
-    filtrar_av_liquid(arquivo)
+    saida = filtrar_av_liquid(arquivo, opcoes)
+    if opcoes.parquet and saida and opcoes.ndjson is None:
+        arquivar_xlsx(opcoes.parquet, "a-pagar", caminho_arrow(saida) if opcoes.arrow else saida, arquivo)
 
 
 if __name__ == "__main__":
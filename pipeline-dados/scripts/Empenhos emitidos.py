@@ -13,13 +13,40 @@ Melhorias de performance aplicadas:
 Mantém TODAS as etapas do script original e o resultado final idêntico.
 
 Saída: <ARQUIVO>_SAIDA.xlsx
+--origem (ou PIPELINE_ORIGEM=1): coluna oculta "Linha origem" com a linha de
+cada registro na planilha lida (só no caminho openpyxl).
+--cache (ou PIPELINE_CACHE=1): entrada sem mudanças desde a última execução =
+_SAIDA.xlsx copiado do cache de resultados (ver cache_resultados).
+--pacote (ou PIPELINE_PACOTE=1): grava também _SAIDA.pacote.json.gz, os
+registros prontos para o store "despesas-empenhados" da página de importação.
+--ndjson DESTINO [--gzip] (ou PIPELINE_NDJSON=DESTINO): as abas finais saem em
+lotes NDJSON em vez do _SAIDA.xlsx ("-" = stdout; só no caminho openpyxl).
+--parquet PASTA (ou PIPELINE_PARQUET=PASTA): copia também a _SAIDA.xlsx para o
+arquivo histórico em Parquet (PASTA/emitidos/ano=/mes=, ver arquivo_parquet).
+--arrow (ou PIPELINE_ARROW=1): grava também _SAIDA.arrow (Arrow IPC, ver
+ipc_arrow) para a etapa seguinte; a entrada também pode ser um .arrow.
+--probe [N] (ou PIPELINE_PROBE=1|N): só confere o cabeçalho nas N primeiras
+linhas e projeta tempo e memória pelo tamanho da planilha, sem gravar nada.
+--preview N (ou PIPELINE_PREVIEW=N): as N primeiras linhas da saída, processando
+só o começo da planilha (ver sonda).
 """
 
+import argparse
 import sys
 import re
+from array import array
 from pathlib import Path
-import tkinter as tk
-from tkinter import filedialog
+
+from arquivo_parquet import arquivar_xlsx
+from ipc_arrow import caminho_arrow, eh_arrow, gravar_arrow_worksheet, gravar_arrow_xlsx, workbook_arrow
+from opcoes import Opcoes, ler_opcoes, parser_comum
+from pacote_importacao import caminho_pacote, gravar_pacote_worksheet, gravar_pacote_xlsx
+from rastreio import etapa, rastrear
+from sonda import previa, sondar
+from utils_transformacao import COLUNA_ORIGEM, abas_de_workbook
+
+
+PACOTE_STORE = "despesas-empenhados"   # store do IndexedDB (pacote_importacao)
 
 
 # ==========================================================
@@ -139,6 +166,7 @@ def extrair_tipo_documento_colI(val, despesa_val=None) -> tuple[str, str]:
     return ("", "")
 
 
+@rastrear("Empenhos emitidos (Excel COM)")
 def _processar_com(xlsx_path: Path) -> Path:
     import win32com.client  # type: ignore
 
@@ -580,9 +608,15 @@ def _processar_com(xlsx_path: Path) -> Path:
             pass
 
 
-def _processar_openpyxl(xlsx_path: Path) -> Path:
+@rastrear("Empenhos emitidos (openpyxl)")
+def _processar_openpyxl(xlsx_path: Path, origem: bool = False, ndjson=None, pacote: bool = False,
+                        arrow: bool = False) -> Path:
     """
     Versão otimizada do fallback openpyxl
+    (origem: última coluna, oculta, com a linha de entrada de cada registro;
+    ndjson: SaidaNDJSON que recebe as abas finais no lugar do _SAIDA.xlsx;
+    pacote: grava também o pacote de importação da 1ª aba ao lado da saída;
+    arrow: grava também a 1ª aba em Arrow IPC, _SAIDA.arrow)
     """
     from openpyxl import load_workbook
     from openpyxl.styles import Font, PatternFill, Border, Alignment, Protection, Side
@@ -590,7 +624,11 @@ def _processar_openpyxl(xlsx_path: Path) -> Path:
     from datetime import datetime, date
 
     out_path = xlsx_path.with_name(f"{xlsx_path.stem}_SAIDA.xlsx")
-    wb = load_workbook(xlsx_path, data_only=False, keep_links=False)
+    with etapa("Abrir planilha (openpyxl)"):
+        if eh_arrow(xlsx_path):
+            wb = workbook_arrow(xlsx_path)
+        else:
+            wb = load_workbook(xlsx_path, data_only=False, keep_links=False)
 
     # OTIMIZAÇÃO: Criar estilos default uma vez
     default_font = Font()
@@ -603,313 +641,382 @@ def _processar_openpyxl(xlsx_path: Path) -> Path:
     default_protection = Protection()
 
     for ws in wb.worksheets:
-        # Desmesclar
-        merges = list(ws.merged_cells.ranges)
-        for rng in merges:
-            ws.unmerge_cells(str(rng))
+        with etapa(f"{ws.title}: limpar formatos", lambda: ws.max_row):
+            # Desmesclar
+            merges = list(ws.merged_cells.ranges)
+            for rng in merges:
+                ws.unmerge_cells(str(rng))
 
-        # Remove CF
-        try:
-            ws.conditional_formatting._cf_rules.clear()
-        except Exception:
-            pass
+            # Remove CF
+            try:
+                ws.conditional_formatting._cf_rules.clear()
+            except Exception:
+                pass
 
-        # OTIMIZAÇÃO: Limpa estilos em batch
-        max_row = ws.max_row or 1
-        max_col = ws.max_column or 1
+            # OTIMIZAÇÃO: Limpa estilos em batch
+            max_row = ws.max_row or 1
+            max_col = ws.max_column or 1
         
-        for row in ws.iter_rows(min_row=1, max_row=max_row, min_col=1, max_col=max_col):
-            for cell in row:
-                cell.font = default_font
-                cell.fill = default_fill
-                cell.border = default_border
-                cell.alignment = default_alignment
-                cell.protection = default_protection
-                cell.number_format = "General"
-                if cell.hyperlink:
-                    cell.hyperlink = None
-                if cell.comment:
-                    cell.comment = None
-
-        # Excluir linha 2
-        if max_row >= 2:
-            ws.delete_rows(2, 1)
-
-        max_row2 = ws.max_row or 1
-        max_col2 = ws.max_column or 1
-
-        # OTIMIZAÇÃO: Cache de colunas
-        col_cache = {}
-        def find_col_ws(header_text: str) -> int:
-            if header_text in col_cache:
-                return col_cache[header_text]
-            for c in range(1, max_col2 + 1):
-                v = ws.cell(row=1, column=c).value
-                if isinstance(v, str) and v.strip() == header_text:
-                    col_cache[header_text] = c
-                    return c
-            col_cache[header_text] = 0
-            return 0
-
-        valor_col = find_col_ws("Valor (R$)")
-        data_col = find_col_ws("Data")
-        especie_col = find_col_ws("Espécie")
-        nremp_col = find_col_ws("Nr emp.")
-
-        # H vazio -> limpar Valor
-        if valor_col != 0 and max_row2 >= 2:
-            for r in range(2, max_row2 + 1):
-                h_val = ws.cell(row=r, column=8).value
-                if h_val is None or (isinstance(h_val, str) and h_val.strip() == ""):
-                    ws.cell(row=r, column=valor_col).value = None
-
-        # Data contém "Objeto:" -> limpar
-        if data_col != 0 and max_row2 >= 2:
-            for r in range(2, max_row2 + 1):
-                v = ws.cell(row=r, column=data_col).value
-                if isinstance(v, str) and ("Objeto:" in v):
-                    ws.cell(row=r, column=data_col).value = None
-
-        # Espécie vazio -> mover Nr emp
-        if especie_col != 0 and nremp_col != 0 and max_row2 >= 2:
-            target_col = (ws.max_column or max_col2) + 1
-            for r in range(2, max_row2 + 1):
-                esp = ws.cell(row=r, column=especie_col).value
-                is_blank = (esp is None) or (isinstance(esp, str) and esp.strip() == "")
-                if is_blank:
-                    val = ws.cell(row=r, column=nremp_col).value
-                    if val is not None and val != "":
-                        ws.cell(row=r, column=target_col).value = val
-                        ws.cell(row=r, column=nremp_col).value = None
-
-        # Excluir coluna G
-        try:
-            ws.delete_cols(7, 1)
-        except Exception:
-            pass
+            for row in ws.iter_rows(min_row=1, max_row=max_row, min_col=1, max_col=max_col):
+                for cell in row:
+                    cell.font = default_font
+                    cell.fill = default_fill
+                    cell.border = default_border
+                    cell.alignment = default_alignment
+                    cell.protection = default_protection
+                    cell.number_format = "General"
+                    if cell.hyperlink:
+                        cell.hyperlink = None
+                    if cell.comment:
+                        cell.comment = None
+
+        with etapa(f"{ws.title}: excluir linha 2 e reposicionar colunas", lambda: ws.max_row):
+            # Excluir linha 2
+            if max_row >= 2:
+                ws.delete_rows(2, 1)
+
+            max_row2 = ws.max_row or 1
+            max_col2 = ws.max_column or 1
+
+            # OTIMIZAÇÃO: Cache de colunas
+            col_cache = {}
+            def find_col_ws(header_text: str) -> int:
+                if header_text in col_cache:
+                    return col_cache[header_text]
+                for c in range(1, max_col2 + 1):
+                    v = ws.cell(row=1, column=c).value
+                    if isinstance(v, str) and v.strip() == header_text:
+                        col_cache[header_text] = c
+                        return c
+                col_cache[header_text] = 0
+                return 0
 
-        # Subir J
-        max_row_final = ws.max_row or 1
-        if max_row_final >= 3:
-            for r in range(2, max_row_final):
-                ws.cell(row=r, column=10).value = ws.cell(row=r + 1, column=10).value
-            ws.cell(row=max_row_final, column=10).value = None
+            valor_col = find_col_ws("Valor (R$)")
+            data_col = find_col_ws("Data")
+            especie_col = find_col_ws("Espécie")
+            nremp_col = find_col_ws("Nr emp.")
+
+            # H vazio -> limpar Valor
+            if valor_col != 0 and max_row2 >= 2:
+                for r in range(2, max_row2 + 1):
+                    h_val = ws.cell(row=r, column=8).value
+                    if h_val is None or (isinstance(h_val, str) and h_val.strip() == ""):
+                        ws.cell(row=r, column=valor_col).value = None
+
+            # Data contém "Objeto:" -> limpar
+            if data_col != 0 and max_row2 >= 2:
+                for r in range(2, max_row2 + 1):
+                    v = ws.cell(row=r, column=data_col).value
+                    if isinstance(v, str) and ("Objeto:" in v):
+                        ws.cell(row=r, column=data_col).value = None
+
+            # Espécie vazio -> mover Nr emp
+            if especie_col != 0 and nremp_col != 0 and max_row2 >= 2:
+                target_col = (ws.max_column or max_col2) + 1
+                for r in range(2, max_row2 + 1):
+                    esp = ws.cell(row=r, column=especie_col).value
+                    is_blank = (esp is None) or (isinstance(esp, str) and esp.strip() == "")
+                    if is_blank:
+                        val = ws.cell(row=r, column=nremp_col).value
+                        if val is not None and val != "":
+                            ws.cell(row=r, column=target_col).value = val
+                            ws.cell(row=r, column=nremp_col).value = None
+
+            # Excluir coluna G
+            try:
+                ws.delete_cols(7, 1)
+            except Exception:
+                pass
 
-        # Excluir I
-        try:
-            ws.delete_cols(9, 1)
-        except Exception:
-            pass
+            # Subir J
+            max_row_final = ws.max_row or 1
+            if max_row_final >= 3:
+                for r in range(2, max_row_final):
+                    ws.cell(row=r, column=10).value = ws.cell(row=r + 1, column=10).value
+                ws.cell(row=max_row_final, column=10).value = None
+
+            # Excluir I
+            try:
+                ws.delete_cols(9, 1)
+            except Exception:
+                pass
 
         # OTIMIZAÇÃO: Processar matriz em uma única passada
         try:
-            max_row_clean = ws.max_row or 1
-            max_col_clean = ws.max_column or 1
+            with etapa(f"{ws.title}: filtrar, fill-down e Tipo/Documento (MEMO/PAD)", linhas=max_row2) as e:
+                max_row_clean = ws.max_row or 1
+                max_col_clean = ws.max_column or 1
+
+                matrix = []
+                for row in ws.iter_rows(min_row=1, max_row=max_row_clean, min_col=1, max_col=max_col_clean, values_only=True):
+                    matrix.append(list(row))
+
+                if matrix:
+                    header = matrix[0]
+                    body = matrix[1:]
+
+                    # Filtrar linhas vazias
+                    def filtro9(row):
+                        return any(
+                            (isinstance(v, str) and v.strip()) or (v not in (None, ""))
+                            for v in row
+                        )
+
+                    # body[k] = linha k + 3 da entrada (a linha 2 foi excluída);
+                    # sem --origem não guarda índice nenhum
+                    if origem:
+                        mantidas = array("l", (k for k, r in enumerate(body) if filtro9(r)))
+                        body = [body[k] for k in mantidas]
+                    else:
+                        body = [r for r in body if filtro9(r)]
 
-            matrix = []
-            for row in ws.iter_rows(min_row=1, max_row=max_row_clean, min_col=1, max_col=max_col_clean, values_only=True):
-                matrix.append(list(row))
+                    # Fill-down coluna A
+                    if body:
+                        for _r in range(len(body)):
+                            if len(body[_r]) < 1:
+                                body[_r].extend([None] * (1 - len(body[_r])))
 
-            if matrix:
-                header = matrix[0]
-                body = matrix[1:]
+                        a1 = header[0] if header else None
+                        start_r = 0
+                        ultimo = None
 
-                # Filtrar linhas vazias
-                def filtro9(row):
-                    return any(
-                        (isinstance(v, str) and v.strip()) or (v not in (None, ""))
-                        for v in row
-                    )
+                        if isinstance(a1, str) and a1.strip().lower().startswith("data"):
+                            start_r = 1
+                            ultimo = body[0][0] if body else None
+                        else:
+                            ultimo = a1
 
-                body = [r for r in body if filtro9(r)]
+                        for _r in range(start_r, len(body)):
+                            v = body[_r][0]
+                            if v is None or (isinstance(v, str) and v.strip() == ""):
+                                body[_r][0] = ultimo
+                            else:
+                                ultimo = v
 
-                # Fill-down coluna A
-                if body:
+                    # Extrair Tipo/Documento
+                    base_i = 8
                     for _r in range(len(body)):
-                        if len(body[_r]) < 1:
-                            body[_r].extend([None] * (1 - len(body[_r])))
-
-                    a1 = header[0] if header else None
-                    start_r = 0
-                    ultimo = None
+                        if len(body[_r]) <= base_i:
+                            body[_r].extend([None] * (base_i + 1 - len(body[_r])))
 
-                    if isinstance(a1, str) and a1.strip().lower().startswith("data"):
-                        start_r = 1
-                        ultimo = body[0][0] if body else None
-                    else:
-                        ultimo = a1
+                    # Detectar coluna Despesa
+                    idx_desp = None
+                    for c in range(len(header)):
+                        hv = header[c]
+                        if isinstance(hv, str) and hv.strip().lower() == "despesa":
+                            idx_desp = c
+                            break
 
-                    for _r in range(start_r, len(body)):
-                        v = body[_r][0]
-                        if v is None or (isinstance(v, str) and v.strip() == ""):
-                            body[_r][0] = ultimo
-                        else:
-                            ultimo = v
-
-                # Extrair Tipo/Documento
-                base_i = 8
-                for _r in range(len(body)):
-                    if len(body[_r]) <= base_i:
-                        body[_r].extend([None] * (base_i + 1 - len(body[_r])))
-
-                # Detectar coluna Despesa
-                idx_desp = None
-                for c in range(len(header)):
-                    hv = header[c]
-                    if isinstance(hv, str) and hv.strip().lower() == "despesa":
-                        idx_desp = c
-                        break
-
-                if idx_desp is None and len(body) >= 1:
-                    def _score_cell(x) -> int:
-                        if x is None:
+                    if idx_desp is None and len(body) >= 1:
+                        def _score_cell(x) -> int:
+                            if x is None:
+                                return 0
+                            s = str(x).strip()
+                            if not s or ".35." in s or ".79." in s:
+                                return 0
+                            if ".35" in s or ".79" in s:
+                                return 2
+                            if _REGEX_DESPESA_PATTERN.search(s):
+                                return 1
                             return 0
-                        s = str(x).strip()
-                        if not s or ".35." in s or ".79." in s:
-                            return 0
-                        if ".35" in s or ".79" in s:
-                            return 2
-                        if _REGEX_DESPESA_PATTERN.search(s):
-                            return 1
-                        return 0
-
-                    best_c = None
-                    best_score = 0
-                    for c in range(len(header)):
-                        sc = sum(_score_cell(body[rr][c]) for rr in range(min(len(body), 200)) if len(body[rr]) > c)
-                        if sc > best_score:
-                            best_score = sc
-                            best_c = c
 
-                    if best_c is not None and best_score >= 6:
-                        idx_desp = best_c
+                        best_c = None
+                        best_score = 0
+                        for c in range(len(header)):
+                            sc = sum(_score_cell(body[rr][c]) for rr in range(min(len(body), 200)) if len(body[rr]) > c)
+                            if sc > best_score:
+                                best_score = sc
+                                best_c = c
 
-                if idx_desp is not None:
-                    for _r in range(len(body)):
-                        if len(body[_r]) <= idx_desp:
-                            body[_r].extend([None] * (idx_desp + 1 - len(body[_r])))
-                    header[idx_desp] = "Despesa"
+                        if best_c is not None and best_score >= 6:
+                            idx_desp = best_c
+
+                    if idx_desp is not None:
+                        for _r in range(len(body)):
+                            if len(body[_r]) <= idx_desp:
+                                body[_r].extend([None] * (idx_desp + 1 - len(body[_r])))
+                        header[idx_desp] = "Despesa"
 
-                # Criar colunas Tipo/Documento
-                idx_tipo = len(header)
-                idx_doc = len(header) + 1
+                    # Criar colunas Tipo/Documento
+                    idx_tipo = len(header)
+                    idx_doc = len(header) + 1
                 
-                header.extend(["Tipo", "Documento"])
-                for _r in range(len(body)):
-                    body[_r].extend([None, None])
-
-                # Preencher
-                for _r in range(len(body)):
-                    desp_val = body[_r][idx_desp] if idx_desp is not None and len(body[_r]) > idx_desp else None
-                    val_i = body[_r][base_i] if len(body[_r]) > base_i else None
-                    t, d = extrair_tipo_documento_colI(val_i, desp_val)
-                    body[_r][idx_tipo] = t if t else None
-                    body[_r][idx_doc] = d if d else None
-
-                matrix = [header] + body
-
-            # Reescrever
-            if max_row_clean > 0:
-                ws.delete_rows(1, max_row_clean)
-            for r in matrix:
-                ws.append(r)
-
-            # Formatar coluna A + AutoAjuste
-            try:
-                last_row_real = len(matrix)
-                last_col_real = max(len(r) for r in matrix) if matrix else 0
-
-                if last_row_real >= 2:
-                    for rr in range(2, last_row_real + 1):
-                        cell = ws.cell(row=rr, column=1)
-                        v = cell.value
-
-                        if isinstance(v, str):
-                            sv = v.strip()
-                            if sv:
-                                parsed = None
-                                for fmt in ("%d/%m/%Y", "%Y-%m-%d"):
-                                    try:
-                                        parsed = datetime.strptime(sv, fmt)
-                                        break
-                                    except Exception:
-                                        pass
-                                if parsed is not None:
-                                    cell.value = parsed
-
-                        cell.number_format = "dd/mm/yyyy"
-
-                # OTIMIZAÇÃO: Autoajuste com cache
-                col_widths = {}
-                row_heights = {}
+                    header.extend(["Tipo", "Documento"])
+                    for _r in range(len(body)):
+                        body[_r].extend([None, None])
+
+                    # Preencher
+                    for _r in range(len(body)):
+                        desp_val = body[_r][idx_desp] if idx_desp is not None and len(body[_r]) > idx_desp else None
+                        val_i = body[_r][base_i] if len(body[_r]) > base_i else None
+                        t, d = extrair_tipo_documento_colI(val_i, desp_val)
+                        body[_r][idx_tipo] = t if t else None
+                        body[_r][idx_doc] = d if d else None
+
+                    if origem:
+                        header.append(COLUNA_ORIGEM)
+                        for r, k in zip(body, mantidas):
+                            r.append(k + 3)
+                        del mantidas
+
+                    matrix = [header] + body
+                e.saida(len(matrix))
+
+            with etapa(f"{ws.title}: reescrever", lambda: len(matrix)):
+                # Reescrever
+                if max_row_clean > 0:
+                    ws.delete_rows(1, max_row_clean)
+                for r in matrix:
+                    ws.append(r)
+
+            with etapa(f"{ws.title}: formatar datas e autoajuste", lambda: len(matrix)):
+                # Formatar coluna A + AutoAjuste
+                try:
+                    last_row_real = len(matrix)
+                    last_col_real = max(len(r) for r in matrix) if matrix else 0
+                    if origem and matrix:
+                        last_col_real -= 1          # coluna de origem: oculta, fica fora do autoajuste
+
+                    if last_row_real >= 2:
+                        for rr in range(2, last_row_real + 1):
+                            cell = ws.cell(row=rr, column=1)
+                            v = cell.value
+
+                            if isinstance(v, str):
+                                sv = v.strip()
+                                if sv:
+                                    parsed = None
+                                    for fmt in ("%d/%m/%Y", "%Y-%m-%d"):
+                                        try:
+                                            parsed = datetime.strptime(sv, fmt)
+                                            break
+                                        except Exception:
+                                            pass
+                                    if parsed is not None:
+                                        cell.value = parsed
+
+                            cell.number_format = "dd/mm/yyyy"
+
+                    # OTIMIZAÇÃO: Autoajuste com cache
+                    col_widths = {}
+                    row_heights = {}
                 
-                for rr in range(1, last_row_real + 1):
-                    max_lines = 1
-                    for c in range(1, last_col_real + 1):
-                        v = ws.cell(row=rr, column=c).value
-                        if v is not None:
-                            if c not in col_widths:
-                                col_widths[c] = 0
+                    for rr in range(1, last_row_real + 1):
+                        max_lines = 1
+                        for c in range(1, last_col_real + 1):
+                            v = ws.cell(row=rr, column=c).value
+                            if v is not None:
+                                if c not in col_widths:
+                                    col_widths[c] = 0
                             
-                            if c == 1 and isinstance(v, (datetime, date)):
-                                s = v.strftime("%d/%m/%Y")
-                            else:
-                                s = str(v)
+                                if c == 1 and isinstance(v, (datetime, date)):
+                                    s = v.strftime("%d/%m/%Y")
+                                else:
+                                    s = str(v)
                             
-                            if len(s) > col_widths[c]:
-                                col_widths[c] = len(s)
+                                if len(s) > col_widths[c]:
+                                    col_widths[c] = len(s)
                             
-                            lines = s.count("\n") + 1
-                            if lines > max_lines:
-                                max_lines = lines
+                                lines = s.count("\n") + 1
+                                if lines > max_lines:
+                                    max_lines = lines
                     
-                    row_heights[rr] = max(15, min(15 * max_lines, 120))
+                        row_heights[rr] = max(15, min(15 * max_lines, 120))
 
-                for c, width in col_widths.items():
-                    ws.column_dimensions[get_column_letter(c)].width = max(8, min(width + 2, 60))
+                    for c, width in col_widths.items():
+                        ws.column_dimensions[get_column_letter(c)].width = max(8, min(width + 2, 60))
                 
-                for rr, height in row_heights.items():
-                    ws.row_dimensions[rr].height = height
+                    for rr, height in row_heights.items():
+                        ws.row_dimensions[rr].height = height
+
+                    if origem and matrix:
+                        ws.column_dimensions[get_column_letter(len(matrix[0]))].hidden = True
                     
-            except Exception:
-                pass
+                except Exception:
+                    pass
         except Exception:
             pass
 
-    wb.save(out_path)
+    if ndjson is not None:
+        with etapa("Gravar NDJSON"), ndjson:
+            ndjson.gravar(abas_de_workbook(wb))
+        return ndjson.destino
+
+    with etapa("Salvar _SAIDA.xlsx"):
+        wb.save(out_path)
+    if pacote:
+        with etapa("Pacote de importação"):
+            gravar_pacote_worksheet(caminho_pacote(out_path), PACOTE_STORE, wb.worksheets[0], out_path.name)
+    if arrow:
+        with etapa("Arrow IPC"):
+            gravar_arrow_worksheet(caminho_arrow(out_path), wb.worksheets[0])
     return out_path
 
 
-def processar(xlsx_path: Path) -> Path:
-    if sys.platform.startswith("win"):
+def processar(xlsx_path: Path, opcoes=None) -> Path:
+    """opcoes (opcoes.Opcoes; padrão: tudo desligado): --origem, --cache, --ndjson, --pacote, --arrow."""
+    opcoes = opcoes or Opcoes()
+    origem, ndjson, pacote, arrow = opcoes.origem, opcoes.ndjson, opcoes.pacote, opcoes.arrow
+    if ndjson is not None:
+        return _processar_openpyxl(xlsx_path, origem, ndjson)
+    com = sys.platform.startswith("win") and not origem and not eh_arrow(xlsx_path)   # o Excel não abre .arrow
+    out_path = xlsx_path.with_name(f"{xlsx_path.stem}_SAIDA.xlsx")
+    saidas = [out_path] + ([caminho_pacote(out_path)] if pacote else []) + ([caminho_arrow(out_path)] if arrow else [])
+    cache = opcoes.cache
+    chave = cache.chave(xlsx_path, __file__, origem=origem, com=com, pacote=pacote, arrow=arrow)
+    if cache.restaurar(chave, saidas):
+        return out_path
+    if com:
         try:
-            return _processar_com(xlsx_path)
+            out = _processar_com(xlsx_path)
         except Exception:
-            return _processar_openpyxl(xlsx_path)
-    return _processar_openpyxl(xlsx_path)
-
-
-def main():
-    if len(sys.argv) >= 2 and sys.argv[1].strip():
-        p = Path(sys.argv[1]).expanduser()
+            return _processar_openpyxl(xlsx_path, pacote=pacote, arrow=arrow)   # fallback não vai para o cache do COM
+        if pacote:
+            gravar_pacote_xlsx(out, PACOTE_STORE)
+        if arrow:
+            gravar_arrow_xlsx(out)
+    else:
+        out = _processar_openpyxl(xlsx_path, origem, pacote=pacote, arrow=arrow)
+    cache.guardar(chave, saidas)
+    return out
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Gera a _SAIDA.xlsx dos empenhos emitidos.", parents=[parser_comum()])
+    opcoes = ler_opcoes(ap, argv)   # --origem, --cache, --ndjson, --parquet, --arrow, --probe, --preview...
+    if opcoes.arquivo and opcoes.arquivo.strip():
+        p = Path(opcoes.arquivo).expanduser()
         if not p.is_absolute():
             p = (Path.cwd() / p).resolve()
         if not p.exists():
             raise FileNotFoundError(f"Arquivo não encontrado: {p}")
-        out = processar(p)
+        if opcoes.probe:
+            sondar(p, "emitidos", opcoes.probe)
+            return
+        if opcoes.preview:
+            previa(p, "emitidos", opcoes.preview, processar)
+            return
+        out = processar(p, opcoes)
         print(f"✅ Gerado: {out}")
+        if opcoes.parquet and opcoes.ndjson is None:
+            arquivar_xlsx(opcoes.parquet, "emitidos", caminho_arrow(out) if opcoes.arrow else out, p)
         return
 
+    import tkinter as tk                        # só com janela: a linha de comando não paga o Tk
+    from tkinter import filedialog
+
     root = tk.Tk()
     root.withdraw()
     file = filedialog.askopenfilename(
         title="Selecione o arquivo Excel (.xlsx)",
-        filetypes=[("Excel files", "*.xlsx")]
+        filetypes=[("Excel files", "*.xlsx"), ("Arrow IPC", "*.arrow")]
     )
     if not file:
         return
-    out = processar(Path(file))
+    out = processar(Path(file), opcoes)
     print(f"✅ Gerado: {out}")
+    if opcoes.parquet and opcoes.ndjson is None:
+        arquivar_xlsx(opcoes.parquet, "emitidos", caminho_arrow(out) if opcoes.arrow else out, file)
 
 
 if __name__ == "__main__":
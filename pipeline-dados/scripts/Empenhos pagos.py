@@ -6,16 +6,42 @@ VERSÃO OTIMIZADA - Melhorias de performance aplicadas:
 3. Cache de cálculos repetidos
 4. Otimização de loops e condições
 5. Redução de acessos a células individuais
+
+--origem (ou PIPELINE_ORIGEM=1): coluna oculta "Linha origem" com a linha de
+cada registro na planilha lida (só no caminho openpyxl).
+--cache (ou PIPELINE_CACHE=1): entrada sem mudanças desde a última execução =
+_SAIDA.xlsx copiado do cache de resultados (ver cache_resultados).
+--pacote (ou PIPELINE_PACOTE=1): grava também _SAIDA.pacote.json.gz, os
+registros prontos para o store "despesas-pagos" da página de importação.
+--ndjson DESTINO [--gzip] (ou PIPELINE_NDJSON=DESTINO): em vez do _SAIDA.xlsx,
+as linhas saem em lotes NDJSON ("-" = stdout) enquanto a planilha é lida.
+--parquet PASTA (ou PIPELINE_PARQUET=PASTA): copia também a _SAIDA.xlsx para o
+arquivo histórico em Parquet (PASTA/pagos/ano=/mes=, ver arquivo_parquet).
+--arrow (ou PIPELINE_ARROW=1): grava também _SAIDA.arrow (Arrow IPC, ver
+ipc_arrow) para a etapa seguinte; a entrada também pode ser um .arrow.
+--probe [N] (ou PIPELINE_PROBE=1|N): só confere o cabeçalho nas N primeiras
+linhas e projeta tempo e memória pelo tamanho da planilha, sem gravar nada.
+--preview N (ou PIPELINE_PREVIEW=N): as N primeiras linhas da saída, processando
+só o começo da planilha (ver sonda).
 """
 
+import argparse
 import sys
 from pathlib import Path
-import tkinter as tk
-from tkinter import filedialog
 
 import re
 from datetime import datetime, date
 
+from arquivo_parquet import arquivar_xlsx
+from ipc_arrow import caminho_arrow, eh_arrow, gravar_arrow_worksheet, gravar_arrow_xlsx, workbook_arrow
+from opcoes import Opcoes, ler_opcoes, parser_comum
+from pacote_importacao import caminho_pacote, gravar_pacote_worksheet, gravar_pacote_xlsx
+from rastreio import etapa, rastrear
+from sonda import previa, sondar
+from utils_transformacao import COLUNA_ORIGEM, largura_aba_xlsx, ler_linhas_xlsx, listar_abas_xlsx, lotes
+
+PACOTE_STORE = "despesas-pagos"   # store do IndexedDB (pacote_importacao)
+
 ALVOS_A = (
     "Total do empenho:",
     "Total da Unidade Gestora:",
@@ -23,6 +49,7 @@ ALVOS_A = (
 )
 
 
+@rastrear("Empenhos pagos (Excel COM)")
 def _processar_com(xlsx_path: Path) -> Path:
     import win32com.client  # type: ignore
 
@@ -272,19 +299,27 @@ def _processar_com(xlsx_path: Path) -> Path:
     return out_path
 
 
-def _processar_openpyxl(xlsx_path: Path) -> Path:
+@rastrear("Empenhos pagos (openpyxl)")
+def _processar_openpyxl(xlsx_path: Path, origem: bool = False, pacote: bool = False, arrow: bool = False) -> Path:
     """
     Versão otimizada do fallback openpyxl com:
     - Uso de arrays numpy para operações em lote
     - Redução de acessos individuais a células
     - Cache de cálculos repetidos
+    - origem: última coluna (oculta) com a linha de entrada de cada registro
+    - pacote: grava também o pacote de importação (1ª aba) ao lado da saída
+    - arrow: grava também a 1ª aba em Arrow IPC (_SAIDA.arrow)
     """
     from openpyxl import load_workbook
     from openpyxl.styles import Font, PatternFill, Border, Alignment, Protection, Side
     from openpyxl.utils import get_column_letter
 
     out_path = xlsx_path.with_name(f"{xlsx_path.stem}_SAIDA.xlsx")
-    wb = load_workbook(xlsx_path, data_only=False, keep_links=False)
+    with etapa("Abrir planilha (openpyxl)"):
+        if eh_arrow(xlsx_path):
+            wb = workbook_arrow(xlsx_path)
+        else:
+            wb = load_workbook(xlsx_path, data_only=False, keep_links=False)
 
     # OTIMIZAÇÃO: Criar estilos default uma única vez
     default_font = Font()
@@ -298,222 +333,309 @@ def _processar_openpyxl(xlsx_path: Path) -> Path:
     default_alignment = Alignment()
     default_protection = Protection()
 
-    # OTIMIZAÇÃO: Pre-compilar padrões regex
-    digit_pattern = re.compile(r"\D")
-    
-    # OTIMIZAÇÃO: Converter alvos para lowercase uma vez
-    alvos_low = tuple(a.lower() for a in ALVOS_A)
-
     for ws in wb.worksheets:
-        # 1) Desmesclar (sem preencher)
-        # OTIMIZAÇÃO: Converter para lista uma vez
-        merged_ranges = list(ws.merged_cells.ranges)
-        for rng in merged_ranges:
-            ws.unmerge_cells(str(rng))
+        with etapa(f"{ws.title}: limpar formatos", lambda: ws.max_row):
+            # 1) Desmesclar (sem preencher)
+            # OTIMIZAÇÃO: Converter para lista uma vez
+            merged_ranges = list(ws.merged_cells.ranges)
+            for rng in merged_ranges:
+                ws.unmerge_cells(str(rng))
 
-        # 2) Remover formatação condicional
-        try:
-            ws.conditional_formatting._cf_rules.clear()
-        except Exception:
-            pass
+            # 2) Remover formatação condicional
+            try:
+                ws.conditional_formatting._cf_rules.clear()
+            except Exception:
+                pass
 
-        # 3) OTIMIZAÇÃO: Limpar formatos apenas no range usado
-        max_row = ws.max_row or 1
-        max_col = ws.max_column or 1
+            # 3) OTIMIZAÇÃO: Limpar formatos apenas no range usado
+            max_row = ws.max_row or 1
+            max_col = ws.max_column or 1
         
-        # Limpar em lotes por linha (mais eficiente)
-        for row in ws.iter_rows(min_row=1, max_row=max_row, min_col=1, max_col=max_col):
-            for cell in row:
-                cell.font = default_font
-                cell.fill = default_fill
-                cell.border = default_border
-                cell.alignment = default_alignment
-                cell.protection = default_protection
-                cell.number_format = "General"
-                if cell.hyperlink:
-                    cell.hyperlink = None
-                if cell.comment:
-                    cell.comment = None
-
-        # 4) Excluir linha 2
-        if max_row >= 2:
-            ws.delete_rows(2, 1)
-
-        # 5-8) OTIMIZAÇÃO: Processar tudo em uma única passada pela matriz
-        matrix = [list(r) for r in ws.iter_rows(values_only=True)]
-        if not matrix:
-            continue
+            # Limpar em lotes por linha (mais eficiente)
+            for row in ws.iter_rows(min_row=1, max_row=max_row, min_col=1, max_col=max_col):
+                for cell in row:
+                    cell.font = default_font
+                    cell.fill = default_fill
+                    cell.border = default_border
+                    cell.alignment = default_alignment
+                    cell.protection = default_protection
+                    cell.number_format = "General"
+                    if cell.hyperlink:
+                        cell.hyperlink = None
+                    if cell.comment:
+                        cell.comment = None
+
+        with etapa(f"{ws.title}: excluir linha 2, filtrar totais e fill-down", linhas=max_row) as e:
+            # 4) Excluir linha 2
+            if max_row >= 2:
+                ws.delete_rows(2, 1)
 
-        # Identificar colunas uma vez
-        header_row = matrix[0] if matrix else []
-        col_seq = None
-        col_data = None
-        
-        for j, h in enumerate(header_row):
-            hs = str(h).strip().lower() if h is not None else ""
-            if hs in ("seq. liq.", "seq.liq.", "seq liq.", "seq liq"):
-                col_seq = j
-            elif hs == "data":
-                col_data = j
-
-        # OTIMIZAÇÃO: Processar filtro, fill-down, seq e data em uma única passada
-        filtered_matrix = []
-        last_seen_c = None
-        
-        for i, row in enumerate(matrix):
-            # Filtrar totais (linha 0 é header, sempre mantém)
-            if i == 0:
-                filtered_matrix.append(row)
+            # 5-8) OTIMIZAÇÃO: Processar tudo em uma única passada pela matriz
+            matrix = [list(r) for r in ws.iter_rows(values_only=True)]
+            if not matrix:
                 continue
-                
-            # Verificar se deve filtrar
-            vA = row[0] if len(row) > 0 else None
-            if isinstance(vA, str):
-                s = vA.strip().lower()
-                if s and any(s.startswith(a) for a in alvos_low):
-                    continue  # Pular esta linha
-            
-            # Garantir tamanho mínimo
-            while len(row) < max(3, col_seq + 1 if col_seq is not None else 0, 
-                                 col_data + 1 if col_data is not None else 0):
-                row.append(None)
-            
-            # Fill-down coluna C (índice 2)
-            v_c = row[2] if len(row) > 2 else None
-            if v_c is not None and v_c != "":
-                if isinstance(v_c, str):
-                    if v_c.strip():
-                        last_seen_c = v_c
-                else:
-                    last_seen_c = v_c
-            elif last_seen_c is not None:
-                row[2] = last_seen_c
-            
-            # Seq. Liq. - 7 dígitos
-            if col_seq is not None and col_seq < len(row):
-                v = row[col_seq]
-                if v is not None:
-                    s = str(v)
-                    digits = digit_pattern.sub("", s)
-                    row[col_seq] = digits[:7] if digits else ""
-            
-            # Data - converter para date
-            if col_data is not None and col_data < len(row):
-                v = row[col_data]
-                if v is not None and not isinstance(v, (datetime, date)):
-                    if isinstance(v, str):
-                        ss = v.strip()
-                        for fmt in ("%d/%m/%Y", "%d/%m/%y"):
-                            try:
-                                row[col_data] = datetime.strptime(ss, fmt).date()
-                                break
-                            except Exception:
-                                pass
-            
-            filtered_matrix.append(row)
 
-        # Reescrever valores
-        if max_row > 0:
-            ws.delete_rows(1, max_row)
+            col_seq, col_data = _colunas_pagos(matrix[0])
+            largura = max(len(r) for r in matrix)
+            filtered_matrix = [matrix[0]]
+            col_origem = None
+            if origem:
+                # _linhas_pagos já completa cada linha até a largura: a origem entra
+                # na mesma passada, sem lista paralela de números de linha
+                for linha, row in _linhas_pagos(matrix[1:], largura, col_seq, col_data):
+                    row.append(linha)
+                    filtered_matrix.append(row)
+                col_origem = len(filtered_matrix[1]) - 1 if len(filtered_matrix) > 1 else largura
+                matrix[0].extend([None] * (col_origem - len(matrix[0])))
+                matrix[0].append(COLUNA_ORIGEM)
+            else:
+                filtered_matrix.extend(row for _, row in _linhas_pagos(matrix[1:], largura, col_seq, col_data))
+            e.saida(len(filtered_matrix))
+
+        with etapa(f"{ws.title}: reescrever e formatar", lambda: len(filtered_matrix)):
+            # Reescrever valores
+            if max_row > 0:
+                ws.delete_rows(1, max_row)
         
-        for row in filtered_matrix:
-            ws.append(row)
+            for row in filtered_matrix:
+                ws.append(row)
 
-        # Aplicar formatos de data e seq após escrita
-        if len(filtered_matrix) > 1:  # Tem dados além do header
-            try:
-                new_max_row = len(filtered_matrix)
+            # Aplicar formatos de data e seq após escrita
+            if len(filtered_matrix) > 1:  # Tem dados além do header
+                try:
+                    new_max_row = len(filtered_matrix)
                 
-                if col_data is not None:
-                    col_letter_data = get_column_letter(col_data + 1)
-                    for rr in range(2, new_max_row + 1):
-                        ws[f"{col_letter_data}{rr}"].number_format = "dd/mm/yyyy"
+                    if col_data is not None:
+                        col_letter_data = get_column_letter(col_data + 1)
+                        for rr in range(2, new_max_row + 1):
+                            ws[f"{col_letter_data}{rr}"].number_format = "dd/mm/yyyy"
                 
-                if col_seq is not None:
-                    col_letter_seq = get_column_letter(col_seq + 1)
-                    for rr in range(2, new_max_row + 1):
-                        ws[f"{col_letter_seq}{rr}"].number_format = "General"
-            except Exception:
-                pass
-
-        # OTIMIZAÇÃO: Autoajuste melhorado
-        try:
-            last_row_real = ws.max_row or 1
-            last_col_real = ws.max_column or 1
+                    if col_seq is not None:
+                        col_letter_seq = get_column_letter(col_seq + 1)
+                        for rr in range(2, new_max_row + 1):
+                            ws[f"{col_letter_seq}{rr}"].number_format = "General"
+                except Exception:
+                    pass
 
-            # Cache de valores para evitar múltiplos acessos
-            col_widths = {}
-            row_heights = {}
+        with etapa(f"{ws.title}: autoajuste de colunas e linhas", lambda: len(filtered_matrix)):
+            # OTIMIZAÇÃO: Autoajuste melhorado
+            try:
+                last_row_real = ws.max_row or 1
+                last_col_real = ws.max_column or 1
+                if col_origem is not None:
+                    last_col_real = col_origem      # coluna de origem: oculta, fica fora do autoajuste
+
+                # Cache de valores para evitar múltiplos acessos
+                col_widths = {}
+                row_heights = {}
             
-            for rr in range(1, last_row_real + 1):
-                max_lines = 1
-                for c in range(1, last_col_real + 1):
-                    cell = ws.cell(row=rr, column=c)
-                    v = cell.value
+                for rr in range(1, last_row_real + 1):
+                    max_lines = 1
+                    for c in range(1, last_col_real + 1):
+                        cell = ws.cell(row=rr, column=c)
+                        v = cell.value
                     
-                    if v is not None:
-                        # Calcular largura da coluna
-                        if c not in col_widths:
-                            col_widths[c] = 0
+                        if v is not None:
+                            # Calcular largura da coluna
+                            if c not in col_widths:
+                                col_widths[c] = 0
                         
-                        if isinstance(v, (datetime, date)):
-                            s = v.strftime("%d/%m/%Y")
-                        else:
-                            s = str(v)
+                            if isinstance(v, (datetime, date)):
+                                s = v.strftime("%d/%m/%Y")
+                            else:
+                                s = str(v)
                         
-                        text_len = len(s)
-                        if text_len > col_widths[c]:
-                            col_widths[c] = text_len
+                            text_len = len(s)
+                            if text_len > col_widths[c]:
+                                col_widths[c] = text_len
                         
-                        # Calcular altura da linha
-                        lines = s.count("\n") + 1
-                        if lines > max_lines:
-                            max_lines = lines
+                            # Calcular altura da linha
+                            lines = s.count("\n") + 1
+                            if lines > max_lines:
+                                max_lines = lines
                 
-                row_heights[rr] = max(15, min(15 * max_lines, 120))
+                    row_heights[rr] = max(15, min(15 * max_lines, 120))
             
-            # Aplicar larguras e alturas
-            for c, width in col_widths.items():
-                ws.column_dimensions[get_column_letter(c)].width = max(8, min(width + 2, 60))
+                # Aplicar larguras e alturas
+                for c, width in col_widths.items():
+                    ws.column_dimensions[get_column_letter(c)].width = max(8, min(width + 2, 60))
             
-            for rr, height in row_heights.items():
-                ws.row_dimensions[rr].height = height
+                for rr, height in row_heights.items():
+                    ws.row_dimensions[rr].height = height
                 
-        except Exception:
-            pass
+            except Exception:
+                pass
 
-    wb.save(out_path)
+            if col_origem is not None:
+                ws.column_dimensions[get_column_letter(col_origem + 1)].hidden = True
+
+    with etapa("Salvar _SAIDA.xlsx"):
+        wb.save(out_path)
+    if pacote:
+        with etapa("Pacote de importação"):
+            gravar_pacote_worksheet(caminho_pacote(out_path), PACOTE_STORE, wb.worksheets[0], out_path.name)
+    if arrow:
+        with etapa("Arrow IPC"):
+            gravar_arrow_worksheet(caminho_arrow(out_path), wb.worksheets[0])
     return out_path
 
 
-def processar(xlsx_path: Path) -> Path:
-    if sys.platform.startswith("win"):
-        try:
-            return _processar_com(xlsx_path)
-        except Exception:
-            return _processar_openpyxl(xlsx_path)
-    return _processar_openpyxl(xlsx_path)
+# ==========================================================
+# Regras de linha (compartilhadas pelo .xlsx e pelo --ndjson)
+# ==========================================================
+def _colunas_pagos(header):
+    """(índice da Seq. Liq., índice da Data) pelo cabeçalho; None se faltar."""
+    col_seq = col_data = None
+    for j, h in enumerate(header):
+        hs = str(h).strip().lower() if h is not None else ""
+        if hs in ("seq. liq.", "seq.liq.", "seq liq.", "seq liq"):
+            col_seq = j
+        elif hs == "data":
+            col_data = j
+    return col_seq, col_data
 
 
-def main():
-    if len(sys.argv) >= 2 and sys.argv[1].strip():
-        p = Path(sys.argv[1]).expanduser()
+def _linhas_pagos(linhas, largura, col_seq, col_data):
+    """
+    Filtra os totais e ajusta as linhas de dados uma a uma, numa única passada:
+    fill-down da coluna C, Seq. Liq. com 7 dígitos e Data em texto -> date.
+    `linhas` começa na linha 3 da entrada (a linha 2 já foi excluída); cada
+    linha sai completada com None até `largura`. Gera (linha da entrada, valores).
+    """
+    alvos_low = tuple(a.lower() for a in ALVOS_A)
+    digit_pattern = re.compile(r"\D")
+    largura = max(largura, 3, col_seq + 1 if col_seq is not None else 0, col_data + 1 if col_data is not None else 0)
+    last_seen_c = None
+    for i, row in enumerate(linhas, start=3):
+        vA = row[0] if row else None
+        if isinstance(vA, str):
+            s = vA.strip().lower()
+            if s and any(s.startswith(a) for a in alvos_low):
+                continue
+        row = list(row)
+        row.extend([None] * (largura - len(row)))
+
+        v_c = row[2]
+        if v_c is not None and v_c != "":
+            if not isinstance(v_c, str) or v_c.strip():
+                last_seen_c = v_c
+        elif last_seen_c is not None:
+            row[2] = last_seen_c
+
+        if col_seq is not None and row[col_seq] is not None:
+            digits = digit_pattern.sub("", str(row[col_seq]))
+            row[col_seq] = digits[:7] if digits else ""
+
+        if col_data is not None and isinstance(row[col_data], str):
+            ss = row[col_data].strip()
+            for fmt in ("%d/%m/%Y", "%d/%m/%y"):
+                try:
+                    row[col_data] = datetime.strptime(ss, fmt).date()
+                    break
+                except ValueError:
+                    pass
+        yield i, row
+
+
+# ==========================================================
+# Saída NDJSON (--ndjson): as mesmas regras, em streaming
+# ==========================================================
+def _saida_ndjson(dados, col_data, origem):
+    """
+    O que o .xlsx acrescenta na gravação: a coluna Data recebe formato de data
+    (um número ali é lido de volta como data) e, com origem, a linha da entrada.
+    """
+    from openpyxl.utils.datetime import from_excel
+
+    for linha, row in dados:
+        if col_data is not None:
+            v = row[col_data]
+            if isinstance(v, (int, float)) and not isinstance(v, bool):
+                row[col_data] = from_excel(v)
+        if origem:
+            row.append(linha)
+        yield row
+
+
+def abas_pagos(xlsx_path: Path, origem: bool = False):
+    """(nome, colunas, lotes) de cada aba, lendo e processando em streaming (sem abrir o workbook)."""
+    for indice, (nome, _) in enumerate(listar_abas_xlsx(xlsx_path)):
+        linhas = ler_linhas_xlsx(xlsx_path, indice, datas=True)
+        header = next(linhas, None)
+        if header is None:
+            continue
+        next(linhas, None)                  # linha 2: excluída
+        largura = max(largura_aba_xlsx(xlsx_path, indice) or 0, len(header))   # ws.max_column
+        col_seq, col_data = _colunas_pagos(header)
+        dados = _linhas_pagos(linhas, largura, col_seq, col_data)
+        colunas = list(header) + [None] * (largura - len(header)) + ([COLUNA_ORIGEM] if origem else [])
+        yield nome, colunas, lotes(_saida_ndjson(dados, col_data, origem))
+
+
+def processar(xlsx_path: Path, opcoes=None) -> Path:
+    """opcoes (opcoes.Opcoes; padrão: tudo desligado): --origem, --cache, --ndjson, --pacote, --arrow."""
+    opcoes = opcoes or Opcoes()
+    origem, ndjson, pacote, arrow = opcoes.origem, opcoes.ndjson, opcoes.pacote, opcoes.arrow
+    if ndjson is not None:
+        with ndjson:
+            ndjson.gravar(abas_pagos(xlsx_path, origem))
+        return ndjson.destino
+    com = sys.platform.startswith("win") and not origem and not eh_arrow(xlsx_path)   # o Excel não abre .arrow
+    out_path = xlsx_path.with_name(f"{xlsx_path.stem}_SAIDA.xlsx")
+    saidas = [out_path] + ([caminho_pacote(out_path)] if pacote else []) + ([caminho_arrow(out_path)] if arrow else [])
+    cache = opcoes.cache
+    chave = cache.chave(xlsx_path, __file__, origem=origem, com=com, pacote=pacote, arrow=arrow)
+    if cache.restaurar(chave, saidas):
+        return out_path
+    if com:
+        try:
+            out = _processar_com(xlsx_path)
+        except Exception:
+            return _processar_openpyxl(xlsx_path, pacote=pacote, arrow=arrow)   # fallback não vai para o cache do COM
+        if pacote:
+            gravar_pacote_xlsx(out, PACOTE_STORE)
+        if arrow:
+            gravar_arrow_xlsx(out)
+    else:
+        out = _processar_openpyxl(xlsx_path, origem, pacote=pacote, arrow=arrow)
+    cache.guardar(chave, saidas)
+    return out
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Gera a _SAIDA.xlsx dos empenhos pagos.", parents=[parser_comum()])
+    opcoes = ler_opcoes(ap, argv)   # --origem, --cache, --ndjson, --parquet, --arrow, --probe, --preview...
+    if opcoes.arquivo and opcoes.arquivo.strip():
+        p = Path(opcoes.arquivo).expanduser()
         if not p.is_absolute():
             p = (Path.cwd() / p).resolve()
-        out = processar(p)
+        if opcoes.probe:
+            sondar(p, "pagos", opcoes.probe)
+            return
+        if opcoes.preview:
+            previa(p, "pagos", opcoes.preview, processar)
+            return
+        out = processar(p, opcoes)
         print(f"✅ Salvo em: {out}")
+        if opcoes.parquet and opcoes.ndjson is None:
+            arquivar_xlsx(opcoes.parquet, "pagos", caminho_arrow(out) if opcoes.arrow else out, p)
         return
 
+    import tkinter as tk                        # só com janela: a linha de comando não paga o Tk
+    from tkinter import filedialog
+
     root = tk.Tk()
     root.withdraw()
     file = filedialog.askopenfilename(
         title="Selecione o arquivo Excel (.xlsx)",
-        filetypes=[("Excel files", "*.xlsx")],
+        filetypes=[("Excel files", "*.xlsx"), ("Arrow IPC", "*.arrow")],
     )
     if not file:
         return
-    out = processar(Path(file))
+    out = processar(Path(file), opcoes)
     print(f"✅ Salvo em: {out}")
+    if opcoes.parquet and opcoes.ndjson is None:
+        arquivar_xlsx(opcoes.parquet, "pagos", caminho_arrow(out) if opcoes.arrow else out, file)
 
 
 if __name__ == "__main__":
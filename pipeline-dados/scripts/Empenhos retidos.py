@@ -9,16 +9,50 @@ Mantém o MESMO resultado e a MESMA ordem lógica do seu script, porém:
 ✅ Formatação é aplicada DURANTE a gravação (sem reabrir o arquivo)
 ✅ Usa argumento no CMD se existir (senão abre janela)
 ✅ NO FINAL apaga o intermediário <base>_Final.xlsx (se o final existir)
+✅ --cache: entrada sem mudanças desde a última execução = saídas copiadas do cache de resultados
+✅ --pacote: também Retenção_Final_Separada.pacote.json.gz (aba GERAL), pronto para o store "despesas-retidos"
+✅ --ndjson DESTINO [--gzip]: abas da Retenção_Final_Separada em lotes NDJSON ("-" = stdout)
+✅ --parquet PASTA: aba GERAL também no arquivo histórico em Parquet (PASTA/retidos/ano=/mes=)
+✅ --arrow: aba GERAL também em Retenção_Final_Separada.arrow (Arrow IPC); a entrada pode ser um .arrow
+✅ --probe [N]: confere o cabeçalho (linha 3) de todas as abas e projeta tempo/memória, sem gravar nada
+✅ --preview N: as N primeiras linhas da aba GERAL, processando só o começo de cada aba (ver sonda)
 """
 
+from __future__ import annotations
+
+import argparse
 import os
 import re
-import sys
-import pandas as pd
-from tkinter import Tk, filedialog
+from typing import TYPE_CHECKING
+
+from arquivo_parquet import arquivar_xlsx
+from cache_resultados import CacheResultados
+from ipc_arrow import abrir_planilha, caminho_arrow, gravar_arrow_dataframe, ler_excel
+from opcoes import Opcoes, ler_opcoes, parser_comum
+from pacote_importacao import caminho_pacote, gravar_pacote_dataframe
+from rastreio import etapa, rastrear
+from sonda import conferir_orcamento, previa, sondar
+from utils_transformacao import (
+    COLUNA_ORIGEM,
+    aba_de_dataframe,
+    centavos_da_coluna,
+    centavos_para_reais,
+    codificar_colunas_repetidas,
+    definir_coluna_monetaria,
+    monetario_para_escrita,
+    ocultar_coluna_origem,
+    preencher_abaixo,
+    somar_centavos_por_grupo,
+)
+
+if TYPE_CHECKING:
+    import pandas as pd
 
 INVALID_SHEET_CHARS_PATTERN = r'[:\\/\?\*\[\]]'
 
+# Colunas guardadas como int64 em centavos (ver utils_transformacao)
+COLUNAS_MONETARIAS = ["Valor retido", "Valor"]
+
 # ==========================================================
 # Utilitários
 # ==========================================================
@@ -31,23 +65,6 @@ def nome_aba_seguro(txt):
         nome = "RETENCAO"
     return nome[:31]
 
-def valor_para_float_sem_erro(v):
-    if pd.isna(v):
-        return 0.0
-    if isinstance(v, (int, float)):
-        return float(v)
-    s = str(v).strip().replace("R$", "").replace(" ", "")
-    if "," in s:
-        s = s.replace(".", "").replace(",", ".")
-        try:
-            return float(s)
-        except:
-            return 0.0
-    try:
-        return float(s)
-    except:
-        return 0.0
-
 def _normalizar_df_para_busca(df: pd.DataFrame) -> pd.DataFrame:
     """
     Equivalente prático do limpar_texto em massa:
@@ -56,26 +73,52 @@ def _normalizar_df_para_busca(df: pd.DataFrame) -> pd.DataFrame:
     - strip e lower
     (usado SOMENTE para criar máscaras; não altera o df final)
     """
+    import pandas as pd
+
     out = df.copy()
     for c in out.columns:
-        s = out[c].astype(str)
-        s = s.str.replace("\xa0", " ", regex=False)
-        s = s.str.replace(r"[\r\n\t]+", " ", regex=True)
-        s = s.str.strip().str.lower()
-        out[c] = s
+        if isinstance(out[c].dtype, pd.CategoricalDtype):
+            out[c] = _normalizar_categorias(out[c])
+        else:
+            out[c] = _normalizar_texto(out[c])
     return out
 
+def _normalizar_texto(s: pd.Series) -> pd.Series:
+    s = s.astype(str)
+    s = s.str.replace("\xa0", " ", regex=False)
+    s = s.str.replace(r"[\r\n\t]+", " ", regex=True)
+    return s.str.strip().str.lower()
+
+def _normalizar_categorias(s: pd.Series) -> pd.Series:
+    """Coluna em dicionário: normaliza só a tabela de valores e remapeia os códigos."""
+    import numpy as np
+    import pandas as pd
+
+    cod_norm, valores = pd.factorize(_normalizar_texto(pd.Series(s.cat.categories.astype(str))))
+    valores = pd.Index(valores)
+    codigos = s.cat.codes.to_numpy()
+    novos = np.where(codigos >= 0, cod_norm[codigos], -1)
+    if (codigos < 0).any():  # NaN vira "nan", como no astype(str)
+        if "nan" not in valores:
+            valores = valores.append(pd.Index(["nan"]))
+        novos[codigos < 0] = valores.get_loc("nan")
+    return pd.Series(pd.Categorical.from_codes(novos, categories=valores), index=s.index, name=s.name)
+
 def _mask_any_contains(df_norm: pd.DataFrame, termo: str) -> pd.Series:
     """
     Retorna máscara por linha: True se QUALQUER célula da linha contém 'termo'
     (busca por coluna, vetorizada).
     """
+    import pandas as pd
+
     m = pd.Series(False, index=df_norm.index)
     for c in df_norm.columns:
         m = m | df_norm[c].str.contains(termo, regex=False, na=False)
     return m
 
 def _mask_any_contains_any(df_norm: pd.DataFrame, termos: list[str]) -> pd.Series:
+    import pandas as pd
+
     m = pd.Series(False, index=df_norm.index)
     for t in termos:
         m = m | _mask_any_contains(df_norm, t)
@@ -85,26 +128,6 @@ def _linha_vazia_mask(df_norm: pd.DataFrame) -> pd.Series:
     # linha vazia = todas as células vazias depois de strip/lower
     return df_norm.eq("").all(axis=1)
 
-def _converter_num_script_like(col: pd.Series) -> pd.Series:
-    """
-    Replica a lógica do openpyxl do seu script (sem mexer em datas):
-    val_str = str(val).replace(".", ",")
-    try: float(val_str.replace(",", "."))
-    except: mantém valor original
-    """
-    def conv(v):
-        if v is None:
-            return v
-        s = str(v).strip()
-        if s == "":
-            return v
-        s2 = s.replace(".", ",")
-        try:
-            return float(s2.replace(",", "."))
-        except:
-            return v
-    return col.map(conv)
-
 # ==========================================================
 # Escrita rápida com xlsxwriter
 # ==========================================================
@@ -119,6 +142,7 @@ def _write_df_xlsxwriter(writer, sheet_name: str, df: pd.DataFrame,
     - Largura 18
     - Formato numérico "#,##0.00" nas colunas informadas (1-based)
     """
+    df = monetario_para_escrita(df)
     df.to_excel(writer, sheet_name=sheet_name, index=False, header=False, startrow=1)
     ws = writer.sheets[sheet_name]
 
@@ -144,13 +168,26 @@ def _write_df_xlsxwriter(writer, sheet_name: str, df: pd.DataFrame,
                     writer.book.add_format({"num_format": "#,##0.00"})
                 )
 
+    ocultar_coluna_origem(ws, df.columns)
+
 def _write_df_plain(writer, sheet_name: str, df: pd.DataFrame):
+    df = monetario_para_escrita(df)
     df.to_excel(writer, sheet_name=sheet_name, index=False)
+    ocultar_coluna_origem(writer.sheets[sheet_name], df.columns)
 
 # ==========================================================
 # PARTE 2 — Retenção_Final_Separada.xlsx (rápido)
 # ==========================================================
-def gerar_arquivo_final_unico_xlsxwriter(df_bruta: pd.DataFrame, pasta_final: str):
+def gerar_arquivo_final_unico_xlsxwriter(df_bruta: pd.DataFrame, pasta_final: str, ndjson=None, pacote=False,
+                                         arrow=False):
+    """
+    ndjson (SaidaNDJSON): mesmas abas, na mesma ordem, em lotes NDJSON no lugar do .xlsx.
+    pacote: grava também o pacote de importação da aba GERAL (a 1ª, a que a página importa).
+    arrow: grava também a aba GERAL em Arrow IPC (Retenção_Final_Separada.arrow).
+    """
+    import numpy as np
+    import pandas as pd
+
     if "Retenção" not in df_bruta.columns:
         print("❌ ERRO: coluna 'Retenção' não encontrada.")
         print("Colunas:", list(df_bruta.columns))
@@ -160,81 +197,108 @@ def gerar_arquivo_final_unico_xlsxwriter(df_bruta: pd.DataFrame, pasta_final: st
         print("Colunas:", list(df_bruta.columns))
         return None
 
-    df_base = df_bruta.copy()
-    df_base["Retenção"] = df_base["Retenção"].astype(str).str.strip()
-    df_base.loc[df_base["Retenção"].str.lower().isin(["nan", "none", "null", ""]), "Retenção"] = ""
-
-    df_validas = df_base[df_base["Retenção"] != ""].copy()
-    df_vazias  = df_base[df_base["Retenção"] == ""].copy()
-
-    tipos_retencao = sorted(df_validas["Retenção"].unique().tolist())
-
-    resumo_geral = []
-    resumo_individuais = []
-
-    for ret_texto in tipos_retencao:
-        bloco = df_validas[df_validas["Retenção"] == ret_texto]
-        qtd_linhas = len(bloco)
-        soma_geral = bloco["Valor retido"].apply(valor_para_float_sem_erro).sum()
-        resumo_geral.append({"Retenção": ret_texto, "Qtd Linhas": qtd_linhas, "Soma Geral": soma_geral})
-
-        soma_indiv = bloco["Valor retido"].apply(valor_para_float_sem_erro).sum()
-        resumo_individuais.append({"Retenção": ret_texto, "Soma Individuais": soma_indiv})
-
-    df_g = pd.DataFrame(resumo_geral)
-    df_i = pd.DataFrame(resumo_individuais)
-    df_lista = pd.merge(df_g, df_i, on="Retenção", how="outer").fillna(0.0)
-
-    total_qtd = int(df_g["Qtd Linhas"].sum()) if not df_g.empty else 0
-    total_geral_val = float(df_g["Soma Geral"].sum()) if not df_g.empty else 0.0
-    total_indiv_val = float(df_i["Soma Individuais"].sum()) if not df_i.empty else 0.0
-
-    df_lista.loc[len(df_lista)] = ["TOTAL GERAL", total_qtd, total_geral_val, total_indiv_val]
+    with etapa("Separar retenções e somar (centavos)", lambda: len(df_bruta)):
+        # Retenção normalizada numa Series (a Planilha Bruta continua como veio);
+        # take() já devolve cópias: sem cópia inteira da df_bruta
+        retencao = df_bruta["Retenção"].astype(str).str.strip()
+        retencao = retencao.mask(retencao.str.lower().isin(["nan", "none", "null", ""]), "").to_numpy()
+        com_retencao = retencao != ""
+
+        df_validas = df_bruta.take(np.flatnonzero(com_retencao))
+        df_validas["Retenção"] = retencao[com_retencao]
+        df_vazias = df_bruta.take(np.flatnonzero(~com_retencao))
+        df_vazias["Retenção"] = retencao[~com_retencao]
+        del retencao, com_retencao
+
+        # Somas exatas em centavos (int64), agrupadas numa única passada
+        centavos = centavos_da_coluna(df_validas, "Valor retido")
+        tipos_retencao, qtd_linhas, soma_centavos = somar_centavos_por_grupo(df_validas["Retenção"], centavos)
+
+        # "Soma Geral" e "Soma Individuais" somam a mesma coluna (mantidas as duas)
+        df_lista = pd.DataFrame({
+            "Retenção": tipos_retencao,
+            "Qtd Linhas": qtd_linhas,
+            "Soma Geral": centavos_para_reais(soma_centavos),
+            "Soma Individuais": centavos_para_reais(soma_centavos),
+        })
+
+        total_qtd = int(qtd_linhas.sum())
+        total_centavos = int(soma_centavos.sum())
+        total_reais = float(centavos_para_reais(total_centavos))
+
+        df_lista.loc[len(df_lista)] = ["TOTAL GERAL", total_qtd, total_reais, total_reais]
 
     saida_final = os.path.join(pasta_final, "Retenção_Final_Separada.xlsx")
 
-    with pd.ExcelWriter(saida_final, engine="xlsxwriter") as writer:
-        book = writer.book
-
-        header_fmt = book.add_format({"bold": True, "bg_color": "#E6E6E6", "align": "center", "valign": "vcenter"})
-        num_fmt = book.add_format({"num_format": "#,##0.00"})
-
-        # GERAL
-        _write_df_plain(writer, "GERAL", df_validas)
-
-        # TOTAL
-        if not df_vazias.empty:
-            _write_df_plain(writer, "TOTAL", df_vazias)
-
-        # abas por retenção
-        for ret_texto in tipos_retencao:
-            nome_aba = nome_aba_seguro(ret_texto)
-            bloco = df_validas[df_validas["Retenção"] == ret_texto].copy()
-            _write_df_plain(writer, nome_aba, bloco)
-
-        # LISTA (C e D numéricas com formato)
-        df_lista_out = df_lista.copy()
-        df_lista_out.to_excel(writer, sheet_name="LISTA", index=False)
-        ws_lista = writer.sheets["LISTA"]
-        ws_lista.set_column(2, 3, 18, num_fmt)  # C e D (0-based: 2 e 3)
-
-        # Planilha Bruta (cabeçalho cinza, freeze, filtro, largura auto)
-        df_bruta.to_excel(writer, sheet_name="Planilha Bruta", index=False, header=False, startrow=1)
-        ws_pb = writer.sheets["Planilha Bruta"]
-
-        # cabeçalho
-        ws_pb.write_row(0, 0, list(df_bruta.columns), header_fmt)
-        ws_pb.freeze_panes(1, 0)
-        ws_pb.autofilter(0, 0, 0, len(df_bruta.columns) - 1)
-
-        # largura automática (rápida por coluna, sem openpyxl)
-        for ci, col_name in enumerate(df_bruta.columns):
-            try:
-                max_len = int(df_bruta.iloc[:, ci].astype(str).str.len().max())
-            except Exception:
-                max_len = 0
-            w = min(max(max_len, len(str(col_name))) + 4, 60)
-            ws_pb.set_column(ci, ci, w)
+    if ndjson is not None:
+        def abas():
+            yield aba_de_dataframe("GERAL", monetario_para_escrita(df_validas))
+            if not df_vazias.empty:
+                yield aba_de_dataframe("TOTAL", monetario_para_escrita(df_vazias))
+            for ret_texto in tipos_retencao:
+                bloco = df_validas[df_validas["Retenção"] == ret_texto]
+                yield aba_de_dataframe(nome_aba_seguro(ret_texto), monetario_para_escrita(bloco))
+            yield aba_de_dataframe("LISTA", df_lista)
+            yield aba_de_dataframe("Planilha Bruta", monetario_para_escrita(df_bruta))
+
+        with etapa("Gravar NDJSON", lambda: len(df_bruta)), ndjson:
+            ndjson.gravar(abas())
+        print(f"\n📄 NDJSON gravado: {ndjson.destino}")
+        return ndjson.destino
+
+    with etapa("Gravar Retenção_Final_Separada.xlsx", lambda: len(df_bruta)):
+        with pd.ExcelWriter(saida_final, engine="xlsxwriter") as writer:
+            book = writer.book
+
+            header_fmt = book.add_format({"bold": True, "bg_color": "#E6E6E6", "align": "center", "valign": "vcenter"})
+            num_fmt = book.add_format({"num_format": "#,##0.00"})
+
+            # GERAL
+            _write_df_plain(writer, "GERAL", df_validas)
+
+            # TOTAL
+            if not df_vazias.empty:
+                _write_df_plain(writer, "TOTAL", df_vazias)
+
+            # abas por retenção
+            for ret_texto in tipos_retencao:
+                nome_aba = nome_aba_seguro(ret_texto)
+                bloco = df_validas[df_validas["Retenção"] == ret_texto]
+                _write_df_plain(writer, nome_aba, bloco)
+
+            # LISTA (C e D numéricas com formato)
+            df_lista_out = df_lista.copy()
+            df_lista_out.to_excel(writer, sheet_name="LISTA", index=False)
+            ws_lista = writer.sheets["LISTA"]
+            ws_lista.set_column(2, 3, 18, num_fmt)  # C e D (0-based: 2 e 3)
+
+            # Planilha Bruta (cabeçalho cinza, freeze, filtro, largura auto)
+            df_bruta = monetario_para_escrita(df_bruta)
+            df_bruta.to_excel(writer, sheet_name="Planilha Bruta", index=False, header=False, startrow=1)
+            ws_pb = writer.sheets["Planilha Bruta"]
+
+            # cabeçalho
+            ws_pb.write_row(0, 0, list(df_bruta.columns), header_fmt)
+            ws_pb.freeze_panes(1, 0)
+            ws_pb.autofilter(0, 0, 0, len(df_bruta.columns) - 1)
+
+            # largura automática (rápida por coluna, sem openpyxl)
+            for ci, col_name in enumerate(df_bruta.columns):
+                try:
+                    max_len = int(df_bruta.iloc[:, ci].astype(str).str.len().max())
+                except Exception:
+                    max_len = 0
+                w = min(max(max_len, len(str(col_name))) + 4, 60)
+                ws_pb.set_column(ci, ci, w)
+            ocultar_coluna_origem(ws_pb, df_bruta.columns)
+
+    if pacote:
+        with etapa("Pacote de importação", lambda: len(df_validas)):
+            gravar_pacote_dataframe(caminho_pacote(saida_final), "despesas-retidos",
+                                    monetario_para_escrita(df_validas), os.path.basename(saida_final), "GERAL")
+    if arrow:
+        with etapa("Arrow IPC", lambda: len(df_validas)):
+            gravar_arrow_dataframe(caminho_arrow(saida_final), monetario_para_escrita(df_validas), "GERAL")
 
     print(f"\n📄 Arquivo final salvo em: {saida_final}")
     return saida_final
@@ -242,29 +306,79 @@ def gerar_arquivo_final_unico_xlsxwriter(df_bruta: pd.DataFrame, pasta_final: st
 # ==========================================================
 # PARTE 1 — Limpeza e padronização
 # ==========================================================
-def main():
+@rastrear("Empenhos retidos")
+def main(opcoes=None):
+    """
+    opcoes (opcoes.Opcoes; padrão: tudo desligado):
+    arquivo: planilha de entrada; sem ela, abre a janela de seleção.
+    orcamento (memoria.Orcamento): com limite de memória, o pico projetado é conferido
+    antes da leitura (acima do limite, não processa) e o medido no fim.
+    origem: acrescenta a coluna oculta "Linha origem" (linha da aba de entrada) em todas as abas.
+    checkpoints (retomada.Checkpoints): cada aba lida e limpa fica salva; com --resume
+    só as abas que faltam são lidas (as gravações sempre refazem os arquivos).
+    cache (cache_resultados.CacheResultados): entrada já processada por esta
+    versão do script = Retenção_Final_Separada.xlsx copiado do cache, sem processar.
+    ndjson (utils_transformacao.SaidaNDJSON): as abas finais vão em lotes NDJSON
+    no lugar da Retenção_Final_Separada.xlsx (sem cache).
+    pacote: grava também Retenção_Final_Separada.pacote.json.gz (pacote_importacao).
+    parquet: pasta do arquivo histórico; a aba GERAL vai para PASTA/retidos (arquivo_parquet).
+    arrow: grava também Retenção_Final_Separada.arrow (ipc_arrow); a entrada pode ser um .arrow.
+    probe: linhas da amostra do --probe; só confere o layout e projeta tempo/memória (sonda).
+    preview: N do --preview; processa o começo de cada aba e mostra N linhas da GERAL (sonda).
+    """
+    opcoes = opcoes or Opcoes()
+    orcamento, origem, ndjson = opcoes.orcamento, opcoes.origem, opcoes.ndjson
+    pacote, parquet, arrow = opcoes.pacote, opcoes.parquet, opcoes.arrow
+
     # 1) Seleção do arquivo (CMD tem prioridade)
-    if len(sys.argv) >= 2 and sys.argv[1].strip():
-        src_path = sys.argv[1].strip().strip('"').strip("'")
+    if opcoes.arquivo and opcoes.arquivo.strip():
+        src_path = opcoes.arquivo.strip().strip('"').strip("'")
         if not os.path.isabs(src_path):
             src_path = os.path.abspath(src_path)
     else:
+        from tkinter import Tk, filedialog      # só com janela: a linha de comando não paga o Tk
+
         Tk().withdraw()
         src_path = filedialog.askopenfilename(
             title="Selecione o arquivo Excel (.xlsx)",
-            filetypes=[("Arquivos Excel", "*.xlsx")]
+            filetypes=[("Arquivos Excel", "*.xlsx"), ("Arrow IPC", "*.arrow")]
         )
 
     if not src_path:
         raise SystemExit("❌ Nenhum arquivo selecionado.")
+    if opcoes.probe:
+        sondar(src_path, "retidos", opcoes.probe, orcamento)
+        return
+    if opcoes.preview:
+        previa(src_path, "retidos", opcoes.preview, _previa)
+        return
 
     base_dir = os.path.dirname(src_path)
     base_name = os.path.splitext(os.path.basename(src_path))[0]
+
+    cache = opcoes.cache if ndjson is None else CacheResultados()   # o cache guarda o .xlsx, não o fluxo
+    saida_xlsx = os.path.join(base_dir, "Retenção_Final_Separada.xlsx")
+    saidas = ([saida_xlsx] + ([str(caminho_pacote(saida_xlsx))] if pacote else [])
+              + ([str(caminho_arrow(saida_xlsx))] if arrow else []))
+    chave = cache.chave(src_path, __file__, origem=origem, pacote=pacote, arrow=arrow)
+    arquivada = str(caminho_arrow(saida_xlsx)) if arrow else saida_xlsx   # aba GERAL para o Parquet
+    if cache.restaurar(chave, saidas):
+        if parquet and ndjson is None:
+            arquivar_xlsx(parquet, "retidos", arquivada, src_path)
+        return
+    if orcamento:
+        conferir_orcamento(src_path, "retidos", orcamento)
+
+    import numpy as np          # só depois do cache: saída restaurada não importa o pandas
+    import pandas as pd
+
     final_path = os.path.join(base_dir, f"{base_name}_Final.xlsx")
 
     if os.path.exists(final_path):
         os.remove(final_path)
 
+    ck = opcoes.checkpoints.abrir(src_path, __file__, origem=origem)
+
     # Cabeçalho novo (12 colunas)
     NOVO_CABECALHO = [
         "Data", "Retenção", "Sequência", "Av.liquidação", "Fonte recursos",
@@ -273,7 +387,7 @@ def main():
     ]
 
     # 2) Ler abas e gravar DIRETO o _Final.xlsx (sem cópia e sem openpyxl pós)
-    xls = pd.ExcelFile(src_path, engine="openpyxl")
+    xls = abrir_planilha(src_path, engine="openpyxl")   # .xlsx ou .arrow
     abas = xls.sheet_names
 
     with pd.ExcelWriter(final_path, engine="xlsxwriter") as writer:
@@ -283,124 +397,150 @@ def main():
         df_bruta_primeira = None
 
         for idx_aba, aba in enumerate(abas):
-            # leitura rápida (sem NA parsing pesado)
-            df = pd.read_excel(
-                xls,
-                sheet_name=aba,
-                header=None,
-                dtype=str,
-                keep_default_na=False,
-                na_filter=False
-            )
-            df = df.fillna("")
-
-            # Inserir duas colunas em branco
-            df[df.shape[1]] = ""
-            df[df.shape[1]] = ""
-
-            # Copiar coluna O (índice 14) para última coluna
-            if df.shape[1] > 14:
-                df[df.shape[1]] = df.iloc[:, 14]
-
-            # Normalizar só para máscaras (não altera df final)
-            df_norm = _normalizar_df_para_busca(df)
-
-            # Remover "Total geral" (qualquer célula da linha)
-            mask_total = _mask_any_contains(df_norm, "total geral")
-            df = df.loc[~mask_total].copy()
-
-            # Excluir colunas F:G, I, K, N:U, X
-            letras_excluir = (
-                ["F", "G", "I", "K"]
-                + [chr(c) for c in range(ord("N"), ord("U") + 1)]
-                + ["X"]
-            )
-            idx_excluir = []
-            for x in letras_excluir:
-                j = ord(x) - 65
-                if 0 <= j < df.shape[1]:
-                    idx_excluir.append(j)
-            if idx_excluir:
-                df.drop(df.columns[idx_excluir], axis=1, inplace=True, errors="ignore")
-
-            # Recalcular normalização depois de excluir colunas (para os próximos filtros)
-            df_norm = _normalizar_df_para_busca(df)
-
-            # Excluir linhas com termos específicos (a partir da linha 3)
-            termos = ["conta contábil", "valor", "doc. extraorçamentário"]
-            if df.shape[0] > 2:
-                corpo = df.iloc[2:].copy()
-                corpo_norm = df_norm.iloc[2:].copy()
-                mask_txt = _mask_any_contains_any(corpo_norm, termos)
-                corpo = corpo.loc[~mask_txt]
-                df = pd.concat([df.iloc[:2], corpo], axis=0)
-
-            # Excluir linhas efetivamente vazias
-            df_norm = _normalizar_df_para_busca(df)
-            mask_vazias = _linha_vazia_mask(df_norm)
-            df = df.loc[~mask_vazias].copy()
-
-            # Excluir linha 1 (a linha de índice 0 do dataframe atual)
-            if df.shape[0] > 1:
-                df = df.iloc[1:].copy()
-
-            # Preencher lacunas A,C,E,F,G,J + última coluna
-            cols_fill = [ord(c) - 65 for c in ["A", "C", "E", "F", "G", "J"] if (ord(c) - 65) < df.shape[1]]
-            last_idx = df.shape[1] - 1
-            if last_idx >= 0 and last_idx not in cols_fill:
-                cols_fill.append(last_idx)
-
-            for c in cols_fill:
-                df.iloc[:, c] = df.iloc[:, c].replace("", pd.NA).ffill().fillna("")
-
-            # Trocar posição da coluna D (índice 3) com a última coluna
-            if df.shape[1] > 3:
-                cols = list(df.columns)
-                last = len(cols) - 1
-                cols[3], cols[last] = cols[last], cols[3]
-                df = df[cols]
-
-            df = df.reset_index(drop=True)
-
-            # Ajustar para 12 colunas e renomear
-            if df.shape[1] > len(NOVO_CABECALHO):
-                df = df.iloc[:, :len(NOVO_CABECALHO)].copy()
-            while df.shape[1] < len(NOVO_CABECALHO):
-                df[df.shape[1]] = ""
-
-            df.columns = NOVO_CABECALHO
-
-            # Converter colunas I e L (9 e 12) -> número (script-like)
-            # (sem mexer em datas)
-            if "Valor retido" in df.columns:
-                df["Valor retido"] = _converter_num_script_like(df["Valor retido"])
-            if "Valor" in df.columns:
-                df["Valor"] = _converter_num_script_like(df["Valor"])
-
-            # Guardar a primeira aba como df_bruta (para a PARTE 2)
+            fase = f"aba_{idx_aba}"
+            if ck.concluida(fase):
+                df = ck.carregar(fase)["df"]
+            else:
+                with etapa(f"{aba}: ler") as e:
+                    # leitura rápida (sem NA parsing pesado)
+                    df = ler_excel(
+                        xls,
+                        sheet_name=aba,
+                        header=None,
+                        dtype=str,
+                        keep_default_na=False,
+                        na_filter=False
+                    )
+                    df = df.fillna("")
+                    # colunas repetitivas (retenção, credor, fonte, datas...) como dicionário
+                    codificar_colunas_repetidas(df)
+                    e.saida(len(df))
+
+                with etapa(f"{aba}: limpar e padronizar", lambda: len(df)):
+                    # Inserir duas colunas em branco
+                    df[df.shape[1]] = ""
+                    df[df.shape[1]] = ""
+
+                    # Copiar coluna O (índice 14) para última coluna
+                    if df.shape[1] > 14:
+                        df[df.shape[1]] = df.iloc[:, 14]
+
+                    # Normalizar só para máscaras (não altera df final)
+                    df_norm = _normalizar_df_para_busca(df)
+
+                    # Remover "Total geral" (qualquer célula da linha)
+                    mask_total = _mask_any_contains(df_norm, "total geral")
+                    df = df.loc[~mask_total].copy()
+
+                    # Excluir colunas F:G, I, K, N:U, X
+                    letras_excluir = (
+                        ["F", "G", "I", "K"]
+                        + [chr(c) for c in range(ord("N"), ord("U") + 1)]
+                        + ["X"]
+                    )
+                    idx_excluir = []
+                    for x in letras_excluir:
+                        j = ord(x) - 65
+                        if 0 <= j < df.shape[1]:
+                            idx_excluir.append(j)
+                    if idx_excluir:
+                        df.drop(df.columns[idx_excluir], axis=1, inplace=True, errors="ignore")
+
+                    # Recalcular normalização depois de excluir colunas (para os próximos filtros)
+                    df_norm = _normalizar_df_para_busca(df)
+
+                    # Excluir linhas com termos específicos (a partir da linha 3)
+                    termos = ["conta contábil", "valor", "doc. extraorçamentário"]
+                    if df.shape[0] > 2:
+                        corpo = df.iloc[2:].copy()
+                        corpo_norm = df_norm.iloc[2:].copy()
+                        mask_txt = _mask_any_contains_any(corpo_norm, termos)
+                        corpo = corpo.loc[~mask_txt]
+                        df = pd.concat([df.iloc[:2], corpo], axis=0)
+
+                    # Excluir linhas efetivamente vazias
+                    df_norm = _normalizar_df_para_busca(df)
+                    mask_vazias = _linha_vazia_mask(df_norm)
+                    del df_norm
+                    df = df.loc[~mask_vazias].copy()
+
+                    # Excluir linha 1 (a linha de índice 0 do dataframe atual)
+                    if df.shape[0] > 1:
+                        df = df.iloc[1:].copy()
+
+                    # Preencher lacunas A,C,E,F,G,J + última coluna
+                    cols_fill = [ord(c) - 65 for c in ["A", "C", "E", "F", "G", "J"] if (ord(c) - 65) < df.shape[1]]
+                    last_idx = df.shape[1] - 1
+                    if last_idx >= 0 and last_idx not in cols_fill:
+                        cols_fill.append(last_idx)
+
+                    for c in cols_fill:
+                        df.isetitem(c, preencher_abaixo(df.iloc[:, c]))
+
+                    # Trocar posição da coluna D (índice 3) com a última coluna
+                    if df.shape[1] > 3:
+                        cols = list(df.columns)
+                        last = len(cols) - 1
+                        cols[3], cols[last] = cols[last], cols[3]
+                        df = df[cols]
+
+                    # o índice ainda é a linha da aba lida (0 = linha 1)
+                    linha_origem = (df.index.to_numpy() + 1).astype(np.int32)
+                    df = df.reset_index(drop=True)
+
+                    # Ajustar para 12 colunas e renomear
+                    if df.shape[1] > len(NOVO_CABECALHO):
+                        df = df.iloc[:, :len(NOVO_CABECALHO)].copy()
+                    while df.shape[1] < len(NOVO_CABECALHO):
+                        df[df.shape[1]] = ""
+
+                    df.columns = NOVO_CABECALHO
+
+                    # Converter colunas I e L (9 e 12) -> centavos int64
+                    # (sem mexer em datas; volta a número com 2 casas só na escrita)
+                    for col_monetaria in COLUNAS_MONETARIAS:
+                        if col_monetaria in df.columns:
+                            definir_coluna_monetaria(df, col_monetaria)
+
+                    if origem:
+                        df[COLUNA_ORIGEM] = linha_origem
+                ck.salvar(fase, df=df)
+
+            # Guardar a primeira aba como df_bruta (para a PARTE 2): sem cópia, a
+            # gravação abaixo não altera o df e a próxima aba monta um df novo
             if idx_aba == 0:
-                df_bruta_primeira = df.copy()
-
-            # Gravar aba no _Final.xlsx com formatação pedida
-            _write_df_xlsxwriter(
-                writer,
-                sheet_name=aba[:31],
-                df=df,
-                header_fmt=header_fmt,
-                header_filter=True,
-                freeze_header=True,
-                col_width=18,
-                num_cols_1based=[9, 12]  # I e L
-            )
+                df_bruta_primeira = df
+
+            with etapa(f"{aba}: gravar no _Final.xlsx", lambda: len(df)):
+                # Gravar aba no _Final.xlsx com formatação pedida
+                _write_df_xlsxwriter(
+                    writer,
+                    sheet_name=aba[:31],
+                    df=df,
+                    header_fmt=header_fmt,
+                    header_filter=True,
+                    freeze_header=True,
+                    col_width=18,
+                    num_cols_1based=[9, 12]  # I e L
+                )
 
     print(f"✅ Arquivo intermediário gerado:\n{final_path}")
+    df = None   # a última aba não fica viva durante a PARTE 2
 
     # PARTE 2 — Montar Retenção_Final_Separada.xlsx
     if df_bruta_primeira is None:
         # fallback (não deveria acontecer)
         df_bruta_primeira = pd.read_excel(final_path)
 
-    saida_final = gerar_arquivo_final_unico_xlsxwriter(df_bruta_primeira, base_dir)
+    saida_final = gerar_arquivo_final_unico_xlsxwriter(df_bruta_primeira, base_dir, ndjson, pacote, arrow)
+    if saida_final:
+        ck.concluir()
+        cache.guardar(chave, saidas)
+        if parquet and ndjson is None:
+            arquivar_xlsx(parquet, "retidos", arquivada, src_path)
+
+    if orcamento:
+        orcamento.resumo()
 
     print("\n🏁 Processo concluído.")
     print(f"📄 Planilha intermediária : {final_path}")
@@ -419,5 +559,14 @@ def main():
     except Exception as e:
         print(f"⚠️ Falha ao apagar intermediário: {e}")
 
+
+def _previa(entrada):
+    """main() sobre a amostra do --preview; a saída fica na pasta da amostra."""
+    main(Opcoes(arquivo=str(entrada)))
+    return os.path.join(os.path.dirname(entrada), "Retenção_Final_Separada.xlsx")
+
+
 if __name__ == "__main__":
-    main()
+    main(ler_opcoes(argparse.ArgumentParser(
+        description="Limpa a planilha de retenções e gera a Retenção_Final_Separada.xlsx.",
+        parents=[parser_comum(checkpoints=True, max_memory=True)])))   # --max-memory, --checkpoint, --cache...
@@ -0,0 +1,325 @@
+# -*- coding: utf-8 -*-
+"""
+Arquivo histórico em Parquet: as saídas processadas num dataset particionado por ano/mês.
+
+Cada script, com --parquet PASTA, copia a 1ª aba da sua saída (a que a página
+de importação lê) para PASTA/<relatório>/ano=AAAA/mes=M/<relatório>-<hash>.parquet,
+com colunas tipadas:
+  - datas (colunas "Data...", "Dt. ...")  -> date32
+  - dinheiro (colunas "Valor...")         -> int64 em centavos (metadado unidade=centavos)
+  - demais                                -> texto; com até 50% de valores
+                                             distintos, dicionário (categoria)
+A partição vem da coluna "Data" (ou da 1ª coluna de data); linhas sem data e
+relatórios sem data (credores) ficam na partição nula (__HIVE_DEFAULT_PARTITION__).
+O <hash> é a impressão digital do conteúdo da entrada (abas e textos do
+.xlsx, como no cache_resultados): rodar de novo sobre a mesma exportação, de
+qualquer pasta ou cópia, troca os arquivos dela e não mexe nos das outras.
+
+Liga por argumento (ver opcoes) ou variável de ambiente:
+  python "scripts/Empenhos pagos.py" arquivo.xlsx --parquet D:\\historico
+  PIPELINE_PARQUET=D:\\historico
+
+Consulta (só lê as partições e colunas pedidas; filtros descem até o Parquet):
+  from arquivo_parquet import consultar
+  df = consultar(r"D:\\historico", "pagos", colunas=["Data", "Credor/Fornecedor", "Valor (R$)"],
+                 anos=[2024, 2025], meses=[1, 2, 3], onde={"Fonte de recursos": "1.500.0000"})
+
+  python scripts/arquivo_parquet.py D:\\historico pagos --anos 2025 --meses 1 2 \\
+      --colunas "Credor/Fornecedor" "Valor (R$)" --onde "Fonte de recursos=1.500.0000" --somar "Valor (R$)"
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import os
+import re
+import unicodedata
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+from cache_resultados import impressao_xlsx
+from utils_transformacao import ler_linhas_xlsx, texto_para_centavos
+
+MAX_DISTINTOS = 0.5                     # texto com até 50% de valores distintos vira dicionário
+PARTICAO_NULA = "__HIVE_DEFAULT_PARTITION__"
+COMPRESSAO = "zstd"
+UNIDADE_CENTAVOS = {b"unidade": b"centavos"}
+_EPOCA_EXCEL = "1899-12-30"
+
+if TYPE_CHECKING:
+    import numpy as np
+    import pandas as pd
+
+
+def _pyarrow():
+    """pyarrow só quando o arquivo é usado: script sem --parquet não paga a importação."""
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.dataset as ds
+    import pyarrow.parquet as pq
+
+    return pa, pc, ds, pq
+
+
+def _particionamento():
+    pa, _, ds, _ = _pyarrow()
+    return ds.partitioning(pa.schema([("ano", pa.int16()), ("mes", pa.int8())]), flavor="hive")
+
+
+def _nome_normalizado(coluna) -> str:
+    s = unicodedata.normalize("NFKD", str(coluna).strip().casefold())
+    return "".join(c for c in s if not unicodedata.combining(c))
+
+
+def eh_coluna_data(coluna) -> bool:
+    return re.match(r"(data|dt)\b", _nome_normalizado(coluna)) is not None
+
+
+def eh_coluna_dinheiro(coluna) -> bool:
+    return _nome_normalizado(coluna).startswith("valor")
+
+
+def _vazios(valores: pd.Series) -> np.ndarray:
+    return (valores.isna() | (valores.astype(str).str.strip() == "")).to_numpy()
+
+
+# ==========================================================
+# Colunas tipadas
+# ==========================================================
+def coluna_data(valores: pd.Series):
+    """Datas como o .xlsx traz: datetime, número serial do Excel ou texto DD/MM/AAAA."""
+    import pandas as pd
+
+    pa = _pyarrow()[0]
+    numeros = pd.to_numeric(valores.where(valores.map(lambda v: isinstance(v, (int, float)))), errors="coerce")
+    datas = pd.Timestamp(_EPOCA_EXCEL) + pd.to_timedelta(numeros.round(), unit="D")
+    textos = valores.where(valores.map(lambda v: isinstance(v, str)))
+    datas = datas.fillna(pd.to_datetime(textos, format="%d/%m/%Y", errors="coerce"))
+    datas = datas.fillna(pd.to_datetime(valores.where(valores.map(lambda v: hasattr(v, "year"))), errors="coerce"))
+    return pa.array(datas.dt.date, type=pa.date32(), from_pandas=True)
+
+
+def coluna_dinheiro(valores: pd.Series):
+    """Reais -> int64 em centavos (mesmo parser tolerante dos scripts; vazio = nulo)."""
+    pa = _pyarrow()[0]
+    centavos = texto_para_centavos(valores)
+    return pa.array(centavos, type=pa.int64(), mask=_vazios(valores))
+
+
+def coluna_texto(valores: pd.Series):
+    """Identificadores e descrições como texto (1.0 -> "1"); repetitivo -> dicionário."""
+    pa, pc, _, _ = _pyarrow()
+    def texto(v):
+        if isinstance(v, float) and v.is_integer():
+            return str(int(v))
+        return v if isinstance(v, str) else str(v)
+
+    textos = valores.where(~_vazios(valores)).map(texto, na_action="ignore")
+    arr = pa.array(textos, type=pa.string(), from_pandas=True)
+    validos = len(arr) - arr.null_count
+    if validos and len(pc.unique(arr.drop_null())) <= MAX_DISTINTOS * validos:
+        arr = arr.dictionary_encode()
+    return arr
+
+
+def tabela_tipada(df: pd.DataFrame):
+    """DataFrame lido da planilha de saída -> tabela Arrow com os tipos do arquivo."""
+    import pandas as pd
+
+    pa = _pyarrow()[0]
+    campos, colunas = [], []
+    for nome in df.columns:
+        valores = df[nome]
+        if eh_coluna_data(nome):
+            arr, meta = coluna_data(valores), None
+        elif eh_coluna_dinheiro(nome):
+            arr, meta = coluna_dinheiro(valores), UNIDADE_CENTAVOS
+        elif pd.api.types.is_integer_dtype(valores.dtype):       # "Linha origem"
+            arr, meta = pa.array(valores, type=pa.int64()), None
+        elif valores.notna().any() and valores.dropna().map(lambda v: isinstance(v, bool)).all():
+            arr, meta = pa.array(valores, type=pa.bool_(), from_pandas=True), None   # CPF_CNPJ_Valido
+        else:
+            arr, meta = coluna_texto(valores), None
+        campos.append(pa.field(str(nome), arr.type, metadata=meta))
+        colunas.append(arr)
+    return pa.Table.from_arrays(colunas, schema=pa.schema(campos))
+
+
+# ==========================================================
+# Gravação
+# ==========================================================
+def _coluna_particao(colunas):
+    datas = [c for c in colunas if eh_coluna_data(c)]
+    for c in datas:
+        if _nome_normalizado(c) == "data":
+            return c
+    return datas[0] if datas else None
+
+
+def _nome_arquivo(relatorio, entrada) -> str:
+    """
+    <relatório>-<hash do conteúdo da entrada>: a mesma exportação cai sempre no
+    mesmo nome, venha de onde vier. Só abas e textos contam (docProps guarda a
+    data de gravação: salvar de novo sem mexer nos dados não muda o nome).
+    """
+    partes = [p for p in impressao_xlsx(entrada)
+              if p[0] == "arrow" or p[0].startswith(("xl/worksheets/", "xl/sharedStrings"))]
+    return f"{relatorio}-{hashlib.sha1(repr(partes).encode('utf-8')).hexdigest()[:12]}.parquet"
+
+
+def gravar_parquet(pasta, relatorio, df, nome):
+    """Grava df (uma aba de saída) nas partições ano=/mes= de pasta/relatorio. Retorna os arquivos."""
+    import numpy as np
+
+    pa, pc, _, pq = _pyarrow()
+    base = Path(pasta) / relatorio
+    tabela = tabela_tipada(df)
+    coluna = _coluna_particao(tabela.column_names)
+    if coluna is None or len(tabela) == 0:
+        anos = meses = pa.nulls(len(tabela), pa.int16())
+    else:
+        anos = pc.cast(pc.year(tabela[coluna]), pa.int16())
+        meses = pc.cast(pc.month(tabela[coluna]), pa.int16())
+
+    # troca os arquivos desta saída: partições antigas que não vierem de novo também saem
+    for antigo in base.glob(f"ano=*/mes=*/{nome}"):
+        antigo.unlink()
+
+    chaves = pa.table({"ano": anos, "mes": meses, "i": pa.array(np.arange(len(tabela)))})
+    grupos = chaves.group_by(["ano", "mes"], use_threads=False).aggregate([("i", "list")])
+    gravados = []
+    for ano, mes, indices in zip(grupos["ano"].to_pylist(), grupos["mes"].to_pylist(), grupos["i_list"].to_pylist()):
+        destino = base / f"ano={PARTICAO_NULA if ano is None else ano}" / f"mes={PARTICAO_NULA if mes is None else mes}" / nome
+        destino.parent.mkdir(parents=True, exist_ok=True)
+        tmp = destino.with_name(destino.name + ".tmp")
+        pq.write_table(tabela.take(indices), tmp, compression=COMPRESSAO)
+        os.replace(tmp, destino)       # consulta concorrente nunca lê um arquivo pela metade
+        gravados.append(destino)
+    print(f"🗄️ Parquet ({relatorio}, {len(tabela):,} linhas em {len(gravados)} partição(ões)): {base}")
+    return gravados
+
+
+def arquivar_xlsx(pasta, relatorio, saida_xlsx, entrada, aba=0):
+    """
+    Arquiva uma aba de uma saída já gravada (.xlsx ou .arrow; 1ª linha = cabeçalho;
+    colunas sem nome ficam de fora). `entrada`: a planilha que o script leu (nome do arquivo).
+    """
+    import pandas as pd
+
+    linhas = ler_linhas_xlsx(saida_xlsx, aba)
+    cabecalho = list(next(linhas, ()))
+    manter = {}
+    for j, c in enumerate(cabecalho):
+        if c is not None and str(c).strip() and str(c) not in manter:
+            manter[str(c)] = j
+    registros = [[linha[j] if j < len(linha) else None for j in manter.values()] for linha in linhas]
+    df = pd.DataFrame(registros, columns=list(manter), dtype=object)
+    if "Linha origem" in df.columns:
+        df["Linha origem"] = pd.to_numeric(df["Linha origem"], errors="coerce").astype("Int64")
+    return gravar_parquet(pasta, relatorio, df, _nome_arquivo(relatorio, entrada))
+
+
+# ==========================================================
+# Consulta
+# ==========================================================
+def _tipo_comum(tipos):
+    pa = _pyarrow()[0]
+    tipos = [t for t in tipos if not pa.types.is_null(t)]
+    if not tipos:
+        return pa.null()
+    if any(pa.types.is_dictionary(t) for t in tipos):
+        return pa.dictionary(pa.int32(), pa.string())
+    return tipos[0]
+
+
+def _esquema_comum(esquemas):
+    """Um esquema para arquivos de entradas diferentes (texto dicionário em uns, simples em outros)."""
+    pa = _pyarrow()[0]
+    nomes, tipos, metas = [], {}, {}
+    for esquema in esquemas:
+        for campo in esquema:
+            if campo.name not in tipos:
+                nomes.append(campo.name)
+                tipos[campo.name] = []
+            tipos[campo.name].append(campo.type)
+            metas.setdefault(campo.name, campo.metadata)
+    campos = [pa.field(n, _tipo_comum(tipos[n]), metadata=metas[n]) for n in nomes]
+    return pa.schema(campos + [pa.field("ano", pa.int16()), pa.field("mes", pa.int8())])
+
+
+def consultar(pasta, relatorio, colunas=None, anos=None, meses=None, onde=None, filtro=None, centavos=False):
+    """
+    Lê do arquivo só as partições (anos/meses) e colunas pedidas.
+    onde: {coluna: valor ou lista de valores}; filtro: expressão pyarrow.dataset
+    extra (ex.: ds.field("Valor (R$)") > 100_000, em centavos). Os dois descem até
+    o leitor Parquet (estatísticas dos row groups). Dinheiro volta em reais
+    (float, 2 casas); centavos=True mantém int64.
+    """
+    _, _, ds, pq = _pyarrow()
+    base = Path(pasta) / relatorio
+    if not base.is_dir():
+        raise FileNotFoundError(f"Relatório sem arquivo Parquet: {base}")
+
+    expressao = None
+
+    def e(cond):
+        nonlocal expressao
+        expressao = cond if expressao is None else expressao & cond
+
+    if anos:
+        e(ds.field("ano").isin([int(a) for a in anos]))
+    if meses:
+        e(ds.field("mes").isin([int(m) for m in meses]))
+
+    descoberto = ds.dataset(base, format="parquet", partitioning=_particionamento())
+    arquivos = [f.path for f in descoberto.get_fragments(filter=expressao)]   # poda de partições
+    esquema = _esquema_comum(pq.read_schema(a) for a in arquivos) if arquivos else descoberto.schema
+    dataset = ds.dataset(arquivos, schema=esquema, format="parquet",
+                         partitioning=_particionamento(), partition_base_dir=str(base))
+
+    for coluna, valor in (onde or {}).items():
+        valores = valor if isinstance(valor, (list, tuple, set)) else [valor]
+        e(ds.field(coluna).isin(list(valores)))
+    if filtro is not None:
+        e(filtro)
+
+    tabela = dataset.to_table(columns=list(colunas) if colunas else None, filter=expressao)
+    df = tabela.to_pandas(date_as_object=False)
+    if not centavos:
+        for campo in tabela.schema:
+            if campo.metadata == UNIDADE_CENTAVOS:
+                df[campo.name] = (df[campo.name] / 100).round(2)
+    return df
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Consulta o arquivo Parquet das saídas do pipeline.")
+    ap.add_argument("pasta", type=Path, help="pasta do arquivo (a mesma do --parquet)")
+    ap.add_argument("relatorio", help="pagos, liquidados, emitidos, a-pagar, retidos, credores")
+    ap.add_argument("--anos", nargs="+", type=int)
+    ap.add_argument("--meses", nargs="+", type=int)
+    ap.add_argument("--colunas", nargs="+")
+    ap.add_argument("--onde", nargs="+", default=[], metavar="COLUNA=VALOR", help="igualdade (repetível)")
+    ap.add_argument("--somar", metavar="COLUNA", help="mostra só o total da coluna (por ano/mês)")
+    args = ap.parse_args()
+
+    onde = {}
+    for item in args.onde:
+        coluna, _, valor = item.partition("=")
+        onde.setdefault(coluna, []).append(valor)
+
+    colunas = args.colunas
+    if args.somar and colunas:
+        colunas = list(dict.fromkeys(colunas + [args.somar, "ano", "mes"]))
+    df = consultar(args.pasta, args.relatorio, colunas, args.anos, args.meses, onde)
+    if args.somar:
+        print(df.groupby(["ano", "mes"], dropna=False)[args.somar].sum().round(2).to_string())
+        print(f"Total: {df[args.somar].sum():,.2f}  ({len(df):,} linhas)")
+    else:
+        print(df.to_string(max_rows=50))
+        print(f"{len(df):,} linhas")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,205 @@
+# -*- coding: utf-8 -*-
+"""
+Cache de resultados endereçado pelo conteúdo: entrada que não mudou não é processada de novo.
+
+Antes de qualquer trabalho o script calcula uma impressão digital barata da
+entrada: nome, CRC-32 e tamanho de cada parte do .xlsx (lidos do diretório
+central do zip, sem descompactar nada; num .arrow, hash do conteúdo) +
+versão dos scripts (hash do código-fonte da pasta scripts/) + opções que
+mudam a saída. Se o cache tem as saídas dessa impressão (_FINAL.xlsx,
+_SAIDA.xlsx, _FILTRADO.xlsx, Retenção_Final_Separada.xlsx e, com --arrow, os
+.arrow), elas são copiadas para o destino e o script termina ali.
+
+Cada entrada é uma pasta <cache>/<chave>/ com as saídas e um meta.json; o
+mtime do meta.json marca o último uso. Passando do limite de tamanho, as
+entradas usadas há mais tempo saem primeiro (LRU). Acertos e faltas vão para
+<cache>/cache.log.
+
+Desligado por padrão: o cache guarda cópias das saídas (dados do município)
+fora da pasta do arquivo. Liga por argumento (ver opcoes) ou variável de
+ambiente; no 1º uso o script mostra onde fica e quanto ocupa:
+  python "scripts/Empenhos Liquidados.py" arquivo.xlsx --cache
+  PIPELINE_CACHE=1                      liga
+  PIPELINE_CACHE=D:\\cache               liga, nesta pasta (padrão: %LOCALAPPDATA% ou ~/.cache)
+  PIPELINE_CACHE_MAX=2G                 limite de tamanho (padrão 2G)
+  --no-cache / PIPELINE_CACHE=0         desliga (vence PIPELINE_CACHE=1)
+
+Uso:
+  cache = opcoes.cache                 # opcoes.ler_opcoes; CacheResultados() = desligado
+  chave = cache.chave(entrada, __file__, origem=origem)
+  if cache.restaurar(chave, [saida]):
+      return saida
+  ...
+  cache.guardar(chave, [saida])
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import sys
+import zipfile
+from datetime import datetime
+
+from memoria import mb, tamanho_em_bytes
+
+LIMITE_PADRAO = "2G"
+META = "meta.json"
+LOG = "cache.log"
+
+
+def _pasta_padrao():
+    if sys.platform == "win32" and os.environ.get("LOCALAPPDATA"):
+        base = os.environ["LOCALAPPDATA"]
+    else:
+        base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "pipeline-dados", "resultados")
+
+
+def versao_scripts(script) -> str:
+    """Hash do código-fonte de todos os .py da pasta do script (ele e os módulos que importa)."""
+    pasta = os.path.dirname(os.path.abspath(script))
+    h = hashlib.sha256()
+    for nome in sorted(os.listdir(pasta)):
+        if nome.endswith(".py"):
+            h.update(nome.encode())
+            with open(os.path.join(pasta, nome), "rb") as f:
+                h.update(f.read())
+    return h.hexdigest()[:12]
+
+
+def impressao_xlsx(caminho) -> list:
+    """
+    [(parte, CRC-32, tamanho)] do diretório central do zip: muda se qualquer célula mudar.
+    .arrow (ipc_arrow) não tem diretório: hash do conteúdo, lido do arquivo mapeado.
+    """
+    if str(caminho).lower().endswith(".arrow"):
+        import mmap
+
+        with open(caminho, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m:
+            return [("arrow", hashlib.blake2b(m, digest_size=16).hexdigest(), len(m))]
+    with zipfile.ZipFile(caminho) as z:
+        return sorted((i.filename, i.CRC, i.file_size) for i in z.infolist())
+
+
+class CacheResultados:
+    """Saídas já geradas, por impressão digital da entrada. Desligado (padrão), tudo vira no-op."""
+
+    def __init__(self, ligado=False, pasta=None, limite=None):
+        self.ligado = bool(ligado)
+        self.pasta = pasta or _pasta_padrao()
+        self.limite = limite if limite is not None else tamanho_em_bytes(LIMITE_PADRAO)
+        self._entrada = self._script = None
+        self._avisado = False
+
+    # ---------- chave ----------
+    def chave(self, entrada, script, **opcoes):
+        """Impressão digital da execução (None se desligado ou se a entrada não é um .xlsx/.arrow legível)."""
+        if not self.ligado:
+            return None
+        if not self._avisado:
+            self._avisado = True
+            ocupado = sum(tamanho for _, tamanho, _ in self._entradas())
+            print(f"🗄️ Cache de resultados: {self.pasta} ({mb(ocupado)} de {mb(self.limite)} MB)")
+        self._entrada, self._script = os.path.abspath(str(entrada)), os.path.basename(script)
+        try:
+            partes = impressao_xlsx(entrada)
+        except (OSError, ValueError, zipfile.BadZipFile):    # ValueError: .arrow vazio (mmap)
+            return None
+        h = hashlib.sha256()
+        h.update(self._script.encode())
+        h.update(versao_scripts(script).encode())
+        h.update(json.dumps(opcoes, sort_keys=True, default=str).encode())
+        h.update(json.dumps(partes).encode())
+        return h.hexdigest()[:32]
+
+    # ---------- leitura ----------
+    def restaurar(self, chave, saidas) -> bool:
+        """Copia as saídas guardadas para os caminhos `saidas` (mesma ordem do guardar). False = falta."""
+        if chave is None:
+            return False
+        pasta = os.path.join(self.pasta, chave)
+        guardadas = [os.path.join(pasta, f"saida_{i}{os.path.splitext(str(s))[1]}") for i, s in enumerate(saidas)]
+        if not os.path.exists(os.path.join(pasta, META)) or not all(map(os.path.exists, guardadas)):
+            self._registrar("FALTA", chave)
+            return False
+        try:
+            for origem, destino in zip(guardadas, saidas):
+                tmp = f"{destino}.tmp"
+                shutil.copyfile(origem, tmp)       # tmp + rename: o destino nunca fica pela metade
+                os.replace(tmp, destino)
+            os.utime(os.path.join(pasta, META))   # último uso (LRU)
+        except OSError as e:
+            print(f"⚠️ Cache: falha ao restaurar ({e}); processando normalmente")
+            self._registrar("FALTA", chave)
+            return False
+        self._registrar("ACERTO", chave)
+        print(f"♻️ Entrada sem mudanças desde a última execução: saída reaproveitada do cache ({chave[:12]})")
+        for s in saidas:
+            print(f"   {s}")
+        return True
+
+    # ---------- gravação ----------
+    def guardar(self, chave, saidas):
+        """Guarda as saídas (pasta temporária + rename) e aplica o limite de tamanho."""
+        if chave is None or not all(s and os.path.exists(s) for s in saidas):
+            return
+        tamanho = sum(os.path.getsize(s) for s in saidas)
+        if tamanho > self.limite:
+            print(f"⚠️ Cache: saídas ({mb(tamanho)} MB) maiores que o limite ({mb(self.limite)} MB), não guardadas")
+            return
+        destino = os.path.join(self.pasta, chave)
+        tmp = f"{destino}.tmp-{os.getpid()}"
+        try:
+            shutil.rmtree(tmp, ignore_errors=True)
+            os.makedirs(tmp)
+            for i, s in enumerate(saidas):
+                shutil.copyfile(s, os.path.join(tmp, f"saida_{i}{os.path.splitext(str(s))[1]}"))
+            with open(os.path.join(tmp, META), "w", encoding="utf-8") as f:
+                json.dump({"tamanho": tamanho, "script": self._script, "entrada": self._entrada,
+                           "criado": datetime.now().isoformat(timespec="seconds")}, f, ensure_ascii=False)
+            shutil.rmtree(destino, ignore_errors=True)
+            os.rename(tmp, destino)
+        except OSError as e:               # disco cheio, outra execução guardou a mesma chave...
+            shutil.rmtree(tmp, ignore_errors=True)
+            print(f"⚠️ Cache: saída não guardada ({e})")
+            return
+        self.despejar()
+
+    def _entradas(self):
+        """[(último uso, tamanho, pasta)] das entradas guardadas."""
+        entradas = []
+        try:
+            nomes = os.listdir(self.pasta)
+        except OSError:                    # cache ainda não criado
+            return entradas
+        for nome in nomes:
+            meta = os.path.join(self.pasta, nome, META)
+            try:
+                with open(meta, encoding="utf-8") as f:
+                    tamanho = json.load(f)["tamanho"]
+                entradas.append((os.path.getmtime(meta), tamanho, nome))
+            except (OSError, ValueError, KeyError):
+                continue
+        return entradas
+
+    def despejar(self):
+        """Remove as entradas usadas há mais tempo até o cache caber no limite."""
+        entradas = self._entradas()
+        total = sum(tamanho for _, tamanho, _ in entradas)
+        for _, tamanho, nome in sorted(entradas):
+            if total <= self.limite:
+                break
+            shutil.rmtree(os.path.join(self.pasta, nome), ignore_errors=True)
+            total -= tamanho
+            self._registrar("REMOVIDO", nome, "")
+
+    def _registrar(self, evento, chave, detalhe=None):
+        try:
+            os.makedirs(self.pasta, exist_ok=True)
+            with open(os.path.join(self.pasta, LOG), "a", encoding="utf-8") as f:
+                if detalhe is None:
+                    detalhe = f"{self._script or ''}\t{self._entrada or ''}"
+                f.write(f"{datetime.now().isoformat(timespec='seconds')}\t{evento}\t{chave}\t{detalhe}\n")
+        except OSError:
+            pass
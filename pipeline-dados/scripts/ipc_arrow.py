@@ -0,0 +1,446 @@
+# -*- coding: utf-8 -*-
+"""
+Arrow IPC (Feather v2) como formato de troca entre as etapas, no lugar do .xlsx.
+
+Cada passagem por .xlsx paga uma codificação e uma decodificação completas
+(zip + XML). Um .arrow sem compressão é lido por mapeamento de memória: quem
+recebe o arquivo enxerga as colunas direto do disco, sem cópia e sem parser.
+
+Entrada: todo script aceita um .arrow no lugar da planilha. A planilha bruta
+do SIGEF vira .arrow uma vez (todas as abas, célula a célula, sem perder tipo):
+  python scripts/ipc_arrow.py relatorio.xlsx [destino.arrow]
+  python "scripts/Empenhos pagos.py" relatorio.arrow
+
+Saída: com --arrow (ver opcoes) ou PIPELINE_ARROW=1, o
+script grava também <saida>.arrow com a 1ª aba da saída (a que a página de
+importação, o comparar.py e o arquivo Parquet leem). O .xlsx continua sendo
+gravado: é o entregável para quem abre a planilha.
+
+Formato:
+  - aba de saída ("tabela"): 1ª linha da aba = nomes das colunas;
+  - planilha bruta ("bruta"): colunas A, B, C... e as abas empilhadas (cada
+    uma numa faixa de linhas), porque os relatórios têm título e cabeçalho
+    em qualquer linha;
+  - metadado b"pipeline" do esquema: {"tipo", "abas": [{"nome", "inicio", "linhas",
+    "colunas"}]} ("colunas" = largura da aba no Excel, com as colunas vazias);
+  - coluna com um só tipo de valor -> tipo Arrow dele (string, int64, float64,
+    bool, timestamp, date32...); coluna com tipos misturados (ex.: título em
+    texto sobre uma coluna de datas) -> união densa, uma variante por tipo.
+Um Feather qualquer, sem o metadado, é lido como uma aba "tabela".
+
+Leitura:
+  from ipc_arrow import ler_tabela_arrow
+  tabela = ler_tabela_arrow("pagos_SAIDA.arrow")     # pyarrow.Table, colunas sem cópia
+"""
+
+import itertools
+import json
+import os
+import sys
+from datetime import date, datetime, time, timedelta
+from pathlib import Path
+
+SUFIXO = ".arrow"
+META = b"pipeline"
+_EPOCA_EXCEL = datetime(1899, 12, 30)
+_LOTE_LINHAS = 50_000
+
+
+def _pyarrow():
+    """pyarrow só quando um .arrow aparece: script sem --arrow não paga a importação."""
+    import pyarrow as pa
+    import pyarrow.feather as feather
+
+    return pa, feather
+
+
+def eh_arrow(caminho) -> bool:
+    return str(caminho).lower().endswith(SUFIXO)
+
+
+def caminho_arrow(saida) -> Path:
+    """pagos_SAIDA.xlsx -> pagos_SAIDA.arrow (mesma pasta)."""
+    return Path(saida).with_suffix(SUFIXO)
+
+
+# ==========================================================
+# Colunas: valores de célula <-> arrays Arrow
+# ==========================================================
+# Variantes da união (tipos misturados), na ordem dos códigos de tipo
+_VARIANTES = ["texto", "logico", "inteiro", "real", "data_hora", "data", "hora", "duracao", "nulo"]
+_NULO = _VARIANTES.index("nulo")
+
+
+def _tipos_arrow():
+    pa = _pyarrow()[0]
+    return [pa.string(), pa.bool_(), pa.int64(), pa.float64(), pa.timestamp("us"),
+            pa.date32(), pa.time64("us"), pa.duration("us"), pa.null()]
+
+
+def _classe(v):
+    """(código da variante, valor Python) de uma célula; vazio/""/NaN/NaT = (None, None)."""
+    if v is None:
+        return None, None
+    if hasattr(v, "item") and not isinstance(v, (str, bytes)):   # escalares numpy
+        try:
+            v = v.item()
+        except (TypeError, ValueError):
+            pass
+    if isinstance(v, bool):
+        return 1, v
+    if isinstance(v, int):
+        return (2, v) if -(1 << 63) <= v < (1 << 63) else (0, str(v))
+    if isinstance(v, float):
+        return (None, None) if v != v else (3, v)
+    if isinstance(v, datetime):
+        return (None, None) if v != v else (4, v)        # NaT
+    if isinstance(v, date):
+        return 5, v
+    if isinstance(v, time):
+        return 6, v
+    if isinstance(v, timedelta):
+        return (None, None) if v != v else (7, v)
+    if isinstance(v, str):
+        return (0, v) if v else (None, None)       # "" = célula vazia, como no .xlsx
+    if v is getattr(sys.modules.get("pandas"), "NA", object()):
+        return None, None
+    return 0, str(v)
+
+
+def coluna_arrow(valores):
+    """Lista de valores de célula -> array Arrow (tipo único ou união densa)."""
+    pa = _pyarrow()[0]
+    tipos = _tipos_arrow()
+    codigos, convertidos = [], []
+    for v in valores:
+        c, v = _classe(v)
+        codigos.append(c)
+        convertidos.append(v)
+    presentes = sorted({c for c in codigos if c is not None})
+    if not presentes:
+        return pa.nulls(len(convertidos))
+    if len(presentes) == 1:
+        return pa.array(convertidos, type=tipos[presentes[0]])
+
+    filhos = {c: [] for c in presentes + [_NULO]}
+    ids, offsets = [], []
+    for c, v in zip(codigos, convertidos):
+        c = _NULO if c is None else c
+        ids.append(c)
+        offsets.append(len(filhos[c]))
+        filhos[c].append(v)
+    codigos_uniao = presentes + [_NULO]
+    arrays = [pa.array(filhos[c], type=tipos[c]) for c in codigos_uniao]
+    return pa.UnionArray.from_dense(pa.array(ids, type=pa.int8()), pa.array(offsets, type=pa.int32()),
+                                    arrays, [_VARIANTES[c] for c in codigos_uniao], codigos_uniao)
+
+
+def _letra_coluna(j: int) -> str:
+    letras = ""
+    j += 1
+    while j:
+        j, r = divmod(j - 1, 26)
+        letras = chr(65 + r) + letras
+    return letras
+
+
+def _serial(v):
+    """Data/hora -> número serial do Excel (inteiro quando é dia cheio), como o XML da planilha guarda."""
+    if isinstance(v, datetime):
+        dias = (v - _EPOCA_EXCEL) / timedelta(days=1)
+    elif isinstance(v, date):
+        dias = float((v - _EPOCA_EXCEL.date()).days)
+    elif isinstance(v, time):
+        dias = (v.hour * 3600 + v.minute * 60 + v.second + v.microsecond / 1e6) / 86400
+    elif isinstance(v, timedelta):
+        dias = v / timedelta(days=1)
+    else:
+        return v
+    return int(dias) if dias.is_integer() else dias
+
+
+# ==========================================================
+# Gravação
+# ==========================================================
+def _gravar(destino, tabela, metadado, descricao):
+    _, feather = _pyarrow()
+    tabela = tabela.replace_schema_metadata({META: json.dumps(metadado, ensure_ascii=False).encode("utf-8")})
+    destino = Path(destino)
+    tmp = destino.with_name(destino.name + ".tmp")
+    # sem compressão: é o que permite ler por mapeamento de memória, sem cópia
+    feather.write_feather(tabela, tmp, compression="uncompressed")
+    os.replace(tmp, destino)      # tmp + rename: a etapa seguinte nunca lê um arquivo pela metade
+    print(f"🏹 Arrow IPC ({descricao}, {len(tabela):,} linhas): {destino}")
+    return destino
+
+
+def gravar_arrow(destino, colunas, linhas, aba="Sheet1"):
+    """
+    Grava uma aba de saída: `colunas` = cabeçalho, `linhas` = iterável de listas
+    de valores (como na planilha). Colunas sem nome ficam como "".
+    """
+    pa = _pyarrow()[0]
+    nomes = ["" if c is None else str(c) for c in colunas]
+    dados = [[] for _ in nomes]
+    for linha in linhas:
+        for j in range(len(nomes)):
+            dados[j].append(linha[j] if j < len(linha) else None)
+    tabela = pa.Table.from_arrays([coluna_arrow(d) for d in dados], names=nomes)
+    abas = [{"nome": aba, "inicio": 0, "linhas": len(tabela)}]
+    return _gravar(destino, tabela, {"tipo": "tabela", "abas": abas}, aba)
+
+
+def gravar_arrow_dataframe(destino, df, aba="Sheet1"):
+    """gravar_arrow de um DataFrame (NaN/NaT = vazio, como no to_excel)."""
+    linhas = df.astype(object).where(df.notna(), None).to_numpy().tolist()
+    return gravar_arrow(destino, list(df.columns), linhas, aba)
+
+
+def gravar_arrow_worksheet(destino, ws):
+    """gravar_arrow de uma aba do openpyxl (1ª linha = cabeçalho)."""
+    linhas = ws.iter_rows(values_only=True)
+    colunas = list(next(linhas, ()))
+    return gravar_arrow(destino, colunas, linhas, ws.title)
+
+
+def gravar_arrow_xlsx(saida_xlsx, aba=0):
+    """.arrow de uma saída já gravada (caminho do Excel COM, sem workbook em memória)."""
+    from openpyxl import load_workbook
+
+    wb = load_workbook(saida_xlsx, read_only=True, data_only=True)
+    try:
+        ws = wb.worksheets[aba] if isinstance(aba, int) else wb[aba]
+        return gravar_arrow_worksheet(caminho_arrow(saida_xlsx), ws)
+    finally:
+        wb.close()
+
+
+def _abas_brutas(planilha, max_linhas=None):
+    """(nome, largura no Excel, linhas) de cada aba de um .xlsx ou de um .arrow "bruta"."""
+    if eh_arrow(planilha):
+        for i, a in enumerate(_abrir(planilha)[1]["abas"]):
+            yield a["nome"], a.get("colunas", 0), itertools.islice(linhas_arrow(planilha, i), max_linhas)
+        return
+    from openpyxl import load_workbook
+
+    wb = load_workbook(planilha, read_only=True, data_only=True)
+    try:
+        for ws in wb.worksheets:
+            colunas = ws.max_column or 0       # <dimension>: conta células vazias formatadas
+            ws.reset_dimensions()          # <dimension> errado não corta linhas nem colunas
+            linhas = (list(linha) for linha in ws.iter_rows(max_row=max_linhas, values_only=True))
+            yield ws.title, colunas, linhas
+    finally:
+        wb.close()
+
+
+def converter_xlsx(planilha, destino=None, max_linhas=None):
+    """
+    Planilha bruta (todas as abas) -> .arrow "bruta", sem perder o tipo de nenhuma célula.
+    max_linhas: só as primeiras linhas de cada aba (amostra para o --preview, ver sonda).
+    """
+    pa = _pyarrow()[0]
+    destino = Path(destino) if destino else caminho_arrow(planilha)
+    linhas, abas = [], []
+    for nome, colunas, linhas_aba in _abas_brutas(planilha, max_linhas):
+        inicio = len(linhas)
+        for linha in linhas_aba:
+            while linha and linha[-1] is None:
+                linha.pop()
+            linhas.append(linha)
+        largura = max((len(l) for l in linhas[inicio:]), default=0)
+        abas.append({"nome": nome, "inicio": inicio, "linhas": len(linhas) - inicio,
+                     "colunas": max(colunas, largura)})
+
+    largura = max((len(l) for l in linhas), default=0)
+    colunas = [coluna_arrow([l[j] if j < len(l) else None for l in linhas]) for j in range(largura)]
+    tabela = pa.Table.from_arrays(colunas, names=[_letra_coluna(j) for j in range(largura)])
+    if not largura:
+        tabela = pa.table({"A": pa.nulls(len(linhas))})
+    return _gravar(destino, tabela, {"tipo": "bruta", "abas": abas}, Path(planilha).name)
+
+
+# ==========================================================
+# Leitura (mapeamento de memória)
+# ==========================================================
+def _abrir(caminho):
+    """(tabela inteira, metadado) com os buffers apontando para o arquivo mapeado."""
+    pa = _pyarrow()[0]
+    with pa.memory_map(str(caminho), "r") as fonte:
+        tabela = pa.ipc.open_file(fonte).read_all()
+    bruto = (tabela.schema.metadata or {}).get(META)
+    if bruto is None:
+        return tabela, {"tipo": "tabela", "abas": [{"nome": Path(caminho).stem, "inicio": 0, "linhas": len(tabela)}]}
+    return tabela, json.loads(bruto)
+
+
+def _aba(meta, aba):
+    abas = meta["abas"]
+    if isinstance(aba, int):
+        return abas[aba]
+    for a in abas:
+        if a["nome"] == aba:
+            return a
+    raise KeyError(f"Aba não encontrada no .arrow: {aba}")
+
+
+def abas_arrow(caminho) -> list:
+    return [a["nome"] for a in _abrir(caminho)[1]["abas"]]
+
+
+def linhas_por_aba(caminho) -> list:
+    return [a["linhas"] for a in _abrir(caminho)[1]["abas"]]
+
+
+def colunas_por_aba(caminho) -> list:
+    """Largura de cada aba (max_column da planilha original; tabela = nº de colunas)."""
+    tabela, meta = _abrir(caminho)
+    return [a.get("colunas", tabela.num_columns) for a in meta["abas"]]
+
+
+def ler_tabela_arrow(caminho, aba=0):
+    """pyarrow.Table de uma aba (fatia da tabela mapeada: nada é copiado)."""
+    tabela, meta = _abrir(caminho)
+    a = _aba(meta, aba)
+    return tabela.slice(a["inicio"], a["linhas"])
+
+
+def linhas_arrow(caminho, aba=0, serial=False):
+    """
+    Linhas de uma aba como listas de valores (None = vazio, sem as células vazias
+    do fim), como ler_linhas_xlsx / iter_rows: a aba "tabela" começa pelo
+    cabeçalho. serial=True: datas como número serial do Excel.
+    """
+    tabela, meta = _abrir(caminho)
+    a = _aba(meta, aba)
+    if meta["tipo"] == "tabela":
+        yield [c if c != "" else None for c in tabela.column_names]
+    for inicio in range(a["inicio"], a["inicio"] + a["linhas"], _LOTE_LINHAS):
+        bloco = tabela.slice(inicio, min(_LOTE_LINHAS, a["inicio"] + a["linhas"] - inicio))
+        colunas = [c.to_pylist() for c in bloco.columns]
+        for linha in zip(*colunas):
+            linha = list(linha)
+            while linha and linha[-1] is None:
+                linha.pop()
+            if serial:
+                linha = [_serial(v) for v in linha]
+            yield linha
+
+
+def matriz_arrow(caminho):
+    """1ª aba como matriz retangular (datas em número serial), como o leitor XML do Empenhos Liquidados."""
+    mat = list(linhas_arrow(caminho, 0, serial=True))
+    while mat and not any(v is not None for v in mat[-1]):
+        mat.pop()
+    largura = max((len(l) for l in mat), default=0)
+    if not mat or not largura:
+        return [[None]]
+    return [l + [None] * (largura - len(l)) for l in mat]
+
+
+def workbook_arrow(caminho):
+    """openpyxl.Workbook com as abas do .arrow (para os scripts que trabalham célula a célula)."""
+    from openpyxl import Workbook
+
+    wb = Workbook()
+    wb.remove(wb.active)
+    for i, a in enumerate(_abrir(caminho)[1]["abas"]):
+        ws = wb.create_sheet(a["nome"])
+        for linha in linhas_arrow(caminho, i):
+            ws.append(linha)
+        # mesmas dimensões da planilha original (max_row/max_column contam células vazias)
+        linhas, colunas = a["linhas"], a.get("colunas", 0)
+        if linhas and colunas and (ws.max_row < linhas or ws.max_column < colunas):
+            ws.cell(row=linhas, column=colunas)
+    return wb
+
+
+# ==========================================================
+# read_excel / ExcelFile sobre .arrow
+# ==========================================================
+def _celula_pandas(v):
+    # mesmo _convert_cell do leitor openpyxl do pandas: vazio = "", número inteiro = int
+    if v is None:
+        return ""
+    if isinstance(v, float) and v.is_integer():
+        return int(v)
+    return v
+
+
+def _dados_pandas(caminho, aba):
+    dados = []
+    for linha in linhas_arrow(caminho, aba):
+        linha = [_celula_pandas(v) for v in linha]
+        while linha and linha[-1] == "":
+            linha.pop()
+        dados.append(linha)
+    while dados and not dados[-1]:
+        dados.pop()
+    largura = max((len(l) for l in dados), default=0)
+    return [l + [""] * (largura - len(l)) for l in dados]
+
+
+class PlanilhaArrow:
+    """O que os scripts usam do pd.ExcelFile (sheet_names, parse), para um .arrow."""
+
+    def __init__(self, caminho):
+        self.caminho = Path(caminho)
+        self.sheet_names = abas_arrow(caminho)
+
+    def parse(self, sheet_name=0, **kwargs):
+        return ler_excel(self, sheet_name=sheet_name, **kwargs)
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+def abrir_planilha(caminho, **kwargs):
+    """pd.ExcelFile(caminho, **kwargs), ou PlanilhaArrow se for um .arrow."""
+    if eh_arrow(caminho):
+        return PlanilhaArrow(caminho)
+    import pandas as pd
+
+    return pd.ExcelFile(caminho, **kwargs)
+
+
+def ler_excel(fonte, sheet_name=0, header=0, **kwargs):
+    """
+    pd.read_excel que também lê .arrow: as células passam pelas mesmas regras do
+    leitor openpyxl do pandas e pelo mesmo TextParser, então dtype, header,
+    keep_default_na etc. dão o mesmo DataFrame que a planilha daria.
+    """
+    import pandas as pd
+
+    if isinstance(fonte, PlanilhaArrow):
+        caminho = fonte.caminho
+    elif isinstance(fonte, (str, os.PathLike)) and eh_arrow(fonte):
+        caminho = fonte
+    else:
+        return pd.read_excel(fonte, sheet_name=sheet_name, header=header, **kwargs)
+
+    from pandas.io.parsers import TextParser
+
+    dados = _dados_pandas(caminho, sheet_name)
+    if not dados:
+        return pd.DataFrame()
+    return TextParser(dados, header=header, skip_blank_lines=False, **kwargs).read()
+
+
+def main():
+    import argparse
+
+    ap = argparse.ArgumentParser(description="Converte uma planilha (.xlsx) em Arrow IPC para os scripts do pipeline.")
+    ap.add_argument("planilha", type=Path)
+    ap.add_argument("destino", type=Path, nargs="?", help="padrão: mesmo nome, com .arrow")
+    args = ap.parse_args()
+    converter_xlsx(args.planilha, args.destino)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,316 @@
+# -*- coding: utf-8 -*-
+"""
+Memória dos scripts do pipeline: medição de RSS, limite (--max-memory) e
+matrizes/tabelas em Arrow IPC no disco (usadas pelos checkpoints, ver retomada).
+
+--max-memory confere o limite; não despeja nada no disco. Nos scripts que o
+aceitam (Liquidados, Retidos) a etapa de pico precisa da planilha inteira na
+memória (Steps 4-34 / PARTE 2), então gravar uma estrutura pronta e lê-la de
+volta só somava o pyarrow e um lote decodificado ao pico. O limite é conferido
+antes de processar, pelo pico projetado (sonda.conferir_orcamento: acima do limite o
+script não começa, em vez de entrar em swap no meio), e no fim, pelo pico medido.
+
+Liga por argumento (ver opcoes) ou por variável de ambiente:
+  python "scripts/Empenhos Liquidados.py" arquivo.xlsx --max-memory 6G
+  PIPELINE_MAX_MEMORY=6G               mesmo efeito, sem mudar a linha de comando
+  PIPELINE_PICO_RSS=ARQ                grava "<pid> <pico de RSS em bytes>" em ARQ ao sair
+                                       (regressao.py / orquestrador.py medem o filho assim)
+
+Uso:
+  orcamento = opcoes.orcamento                         # opcoes.ler_opcoes; None = sem limite
+  ...
+  if orcamento:
+      orcamento.resumo()                               # pico medido x limite
+"""
+
+import atexit
+import os
+import pickle
+import re
+import sys
+from datetime import date, datetime
+
+LINHAS_POR_LOTE = 65_536
+
+# ==========================================================
+# RSS do próprio processo
+# ==========================================================
+if sys.platform == "win32":
+    import ctypes
+    from ctypes import wintypes
+
+    class _PROCESS_MEMORY_COUNTERS(ctypes.Structure):
+        _fields_ = [("cb", wintypes.DWORD), ("PageFaultCount", wintypes.DWORD),
+                    ("PeakWorkingSetSize", ctypes.c_size_t), ("WorkingSetSize", ctypes.c_size_t),
+                    ("QuotaPeakPagedPoolUsage", ctypes.c_size_t), ("QuotaPagedPoolUsage", ctypes.c_size_t),
+                    ("QuotaPeakNonPagedPoolUsage", ctypes.c_size_t), ("QuotaNonPagedPoolUsage", ctypes.c_size_t),
+                    ("PagefileUsage", ctypes.c_size_t), ("PeakPagefileUsage", ctypes.c_size_t)]
+
+    def _contadores():
+        pmc = _PROCESS_MEMORY_COUNTERS()
+        pmc.cb = ctypes.sizeof(pmc)
+        processo = ctypes.windll.kernel32.GetCurrentProcess()
+        if ctypes.windll.psapi.GetProcessMemoryInfo(processo, ctypes.byref(pmc), pmc.cb):
+            return pmc
+        return None
+
+    def rss_atual():
+        """RSS atual em bytes (WorkingSetSize)."""
+        pmc = _contadores()
+        return pmc.WorkingSetSize if pmc else 0
+
+    def pico_rss():
+        """Pico de RSS do processo em bytes (PeakWorkingSetSize)."""
+        pmc = _contadores()
+        return pmc.PeakWorkingSetSize if pmc else 0
+else:
+    import resource
+
+    _PAGINA = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+    def pico_rss():
+        """
+        Pico de RSS do processo em bytes. Linux: VmHWM de /proc/self/status (só
+        deste programa; o ru_maxrss herda o pico do processo que fez o fork).
+        Sem /proc: ru_maxrss (KB no Linux, bytes no macOS).
+        """
+        try:
+            with open("/proc/self/status", "rb") as f:
+                for linha in f:
+                    if linha.startswith(b"VmHWM:"):
+                        return int(linha.split()[1]) * 1024
+        except (OSError, ValueError, IndexError):
+            pass
+        pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return pico if sys.platform == "darwin" else pico * 1024
+
+    def rss_atual():
+        """RSS atual em bytes (/proc/self/statm; sem /proc, o pico serve de aproximação)."""
+        try:
+            with open("/proc/self/statm", "rb") as f:
+                return int(f.read().split()[1]) * _PAGINA
+        except OSError:
+            return pico_rss()
+
+
+def mb(n_bytes):
+    return round(n_bytes / (1024 * 1024), 1)
+
+
+def _relatar_pico(caminho):
+    try:
+        with open(caminho, "w", encoding="ascii") as f:
+            f.write(f"{os.getpid()} {pico_rss()}")
+    except OSError:
+        pass
+
+
+_arquivo_pico = os.environ.get("PIPELINE_PICO_RSS", "").strip()
+if _arquivo_pico:
+    atexit.register(_relatar_pico, _arquivo_pico)
+
+
+_UNIDADES = {"": 1, "K": 1024, "M": 1024 ** 2, "G": 1024 ** 3, "T": 1024 ** 4}
+
+
+def tamanho_em_bytes(texto) -> int:
+    """'6G', '512M', '1.5GB', '800000000' -> bytes."""
+    m = re.fullmatch(r"\s*(\d+(?:[.,]\d+)?)\s*([KMGT]?)(?:I?B)?\s*", str(texto), re.IGNORECASE)
+    if not m:
+        raise ValueError(f"Tamanho inválido para --max-memory: {texto!r} (ex.: 6G, 512M)")
+    return int(float(m.group(1).replace(",", ".")) * _UNIDADES[m.group(2).upper()])
+
+
+# ==========================================================
+# Matriz (lista de linhas) <-> Arrow IPC
+# ==========================================================
+# Células de uma matriz têm tipos misturados (texto, número, data, None). Cada
+# coluna vira uma coluna de tags int8 + uma coluna Arrow por tipo presente; o
+# que o Arrow não representa sem perda vai em pickle (pickle_permitido=False:
+# erro ao gravar e ao ler, para arquivos que outros podem ter escrito).
+_NONE, _STR, _FLOAT, _INT, _DATETIME, _DATE, _BOOL, _PICKLE = range(8)
+_TAG_POR_TIPO = {str: _STR, float: _FLOAT, int: _INT, datetime: _DATETIME, date: _DATE, bool: _BOOL}
+
+
+def _tipo_arrow(tag):
+    import pyarrow as pa
+    return {_STR: pa.string(), _FLOAT: pa.float64(), _INT: pa.int64(),
+            _DATETIME: pa.timestamp("us"), _DATE: pa.date32(), _BOOL: pa.bool_()}[tag]
+
+
+def _tag(v):
+    if v is None:
+        return _NONE
+    tag = _TAG_POR_TIPO.get(type(v), _PICKLE)
+    if tag == _DATETIME and v.tzinfo is not None:
+        return _PICKLE
+    return tag
+
+
+def _lote_para_tabela(linhas, pickle_permitido=True):
+    import numpy as np
+    import pyarrow as pa
+
+    tamanhos = [len(r) for r in linhas]
+    largura = max(tamanhos, default=0)
+    arrays = {"__len": pa.array(tamanhos, type=pa.int32())}
+    for j in range(largura):
+        coluna = [r[j] if j < len(r) else None for r in linhas]
+        tags = np.fromiter((_tag(v) for v in coluna), dtype=np.int8, count=len(coluna))
+        for tag in np.unique(tags).tolist():
+            if tag in (_NONE, _PICKLE):
+                continue
+            valores = [v if t == tag else None for v, t in zip(coluna, tags)]
+            try:
+                arrays[f"{j}:{tag}"] = pa.array(valores, type=_tipo_arrow(tag))
+            except (pa.ArrowInvalid, pa.ArrowTypeError, OverflowError):
+                tags[tags == tag] = _PICKLE           # ex.: int fora do int64
+        if (tags == _PICKLE).any():
+            if not pickle_permitido:
+                v = coluna[int(np.flatnonzero(tags == _PICKLE)[0])]
+                raise TypeError(f"coluna {j}: {type(v).__name__} não tem representação Arrow")
+            arrays[f"{j}:{_PICKLE}"] = pa.array(
+                [pickle.dumps(v) if t == _PICKLE else None for v, t in zip(coluna, tags)], type=pa.binary())
+        arrays[f"{j}:t"] = pa.array(tags)
+    return pa.table(arrays)
+
+
+def _tabela_para_lote(tabela, pickle_permitido=True):
+    import numpy as np
+
+    n = tabela.num_rows
+    tamanhos = tabela.column("__len").to_pylist()
+    colunas = []
+    j = 0
+    while f"{j}:t" in tabela.column_names:
+        tags = tabela.column(f"{j}:t").to_numpy()
+        coluna = [None] * n
+        for tag in np.unique(tags):
+            tag = int(tag)
+            if tag == _NONE:
+                continue
+            valores = tabela.column(f"{j}:{tag}").to_pylist()
+            if tag == _PICKLE:
+                if not pickle_permitido:
+                    raise ValueError(f"coluna {j}: valores em pickle recusados")
+                for i in np.flatnonzero(tags == tag):
+                    coluna[i] = pickle.loads(valores[i])
+            else:
+                for i in np.flatnonzero(tags == tag):
+                    coluna[i] = valores[i]
+        colunas.append(coluna)
+        j += 1
+    if not colunas:
+        return [[] for _ in range(n)]
+    return [list(linha[:k]) for linha, k in zip(zip(*colunas), tamanhos)]
+
+
+class MatrizDespejada:
+    """
+    Matriz gravada em lotes Arrow IPC; leitura lazy via memory-map.
+    Aceita len(), m[i] e iteração (um lote decodificado por vez). Somente leitura:
+    alterar uma linha devolvida não altera o arquivo.
+    """
+
+    def __init__(self, pasta, lotes, total, pickle_permitido=True):
+        self.pasta = pasta
+        self.lotes = lotes            # [(caminho, primeira_linha, n_linhas)]
+        self.total = total
+        self.pickle_permitido = pickle_permitido
+        self._cache = (None, None)    # (índice do lote, linhas)
+
+    def __len__(self):
+        return self.total
+
+    def _lote(self, k):
+        if self._cache[0] != k:
+            import pyarrow as pa
+            with pa.memory_map(self.lotes[k][0]) as fonte:
+                linhas = _tabela_para_lote(pa.ipc.open_file(fonte).read_all(), self.pickle_permitido)
+            self._cache = (k, linhas)
+        return self._cache[1]
+
+    def __getitem__(self, i):
+        if i < 0:
+            i += self.total
+        if not 0 <= i < self.total:
+            raise IndexError(i)
+        k = i // LINHAS_POR_LOTE
+        return self._lote(k)[i - self.lotes[k][1]]
+
+    def __iter__(self):
+        for k in range(len(self.lotes)):
+            yield from self._lote(k)
+        self._cache = (None, None)
+
+
+class TabelaDespejada:
+    """DataFrame gravado em Arrow IPC; .carregar() lê via memory-map."""
+
+    def __init__(self, caminho, formato):
+        self.caminho = caminho
+        self.formato = formato        # "arrow" ou "pickle" (colunas que o Arrow não aceita)
+
+    def carregar(self):
+        if self.formato == "pickle":
+            import pandas as pd
+            return pd.read_pickle(self.caminho)
+        import pyarrow as pa
+        with pa.memory_map(self.caminho) as fonte:
+            return pa.ipc.open_file(fonte).read_all().to_pandas()
+
+
+def gravar_matriz(matriz, pasta, nome, pickle_permitido=True):
+    """Grava a matriz em lotes Arrow IPC (pasta/nome_00000.arrow, ...) e devolve a MatrizDespejada."""
+    import pyarrow as pa
+
+    lotes = []
+    total = len(matriz)
+    for k, ini in enumerate(range(0, total, LINHAS_POR_LOTE)):
+        tabela = _lote_para_tabela(matriz[ini:ini + LINHAS_POR_LOTE], pickle_permitido)
+        caminho = os.path.join(pasta, f"{nome}_{k:05d}.arrow")
+        with pa.OSFile(caminho, "wb") as destino, pa.ipc.new_file(destino, tabela.schema) as w:
+            w.write_table(tabela)
+        lotes.append((caminho, ini, tabela.num_rows))
+        del tabela
+    return MatrizDespejada(pasta, lotes, total, pickle_permitido)
+
+
+def abrir_matriz(pasta, nome, total, pickle_permitido=True):
+    """MatrizDespejada de uma matriz gravada por gravar_matriz (leitura lazy)."""
+    lotes = [(os.path.join(pasta, f"{nome}_{k:05d}.arrow"), ini, min(LINHAS_POR_LOTE, total - ini))
+             for k, ini in enumerate(range(0, total, LINHAS_POR_LOTE))]
+    return MatrizDespejada(pasta, lotes, total, pickle_permitido)
+
+
+def gravar_tabela(df, pasta, nome):
+    """Grava o DataFrame em Arrow IPC (pickle se o Arrow não aceitar as colunas) e devolve a TabelaDespejada."""
+    import pyarrow as pa
+
+    caminho = os.path.join(pasta, f"{nome}.arrow")
+    try:
+        tabela = pa.Table.from_pandas(df, preserve_index=False)
+        with pa.OSFile(caminho, "wb") as destino, pa.ipc.new_file(destino, tabela.schema) as w:
+            w.write_table(tabela)
+        return TabelaDespejada(caminho, "arrow")
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        caminho = os.path.join(pasta, f"{nome}.pkl")
+        df.to_pickle(caminho)
+        return TabelaDespejada(caminho, "pickle")
+
+
+# ==========================================================
+# Orçamento de memória
+# ==========================================================
+class Orcamento:
+    """Limite do --max-memory: conferido antes (sonda.conferir_orcamento) e no fim (resumo)."""
+
+    def __init__(self, limite):
+        self.limite = int(limite)
+
+    def resumo(self):
+        pico = pico_rss()
+        if pico > self.limite:
+            print(f"⚠️ Pico de RSS: {mb(pico)} MB, ACIMA do limite de {mb(self.limite)} MB")
+        else:
+            print(f"📈 Pico de RSS: {mb(pico)} MB (limite {mb(self.limite)} MB)")
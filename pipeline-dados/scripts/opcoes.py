@@ -0,0 +1,124 @@
+# -*- coding: utf-8 -*-
+"""
+Opções de linha de comando comuns aos scripts do pipeline (um só argparse).
+
+Cada script monta o seu parser com o pai de parser_comum() (só os grupos que
+ele usa) e recebe de ler_opcoes() um objeto Opcoes, que vai inteiro para a
+função de processamento. Opção ausente na linha de comando = variável de
+ambiente (o orquestrador, o vigia e a regressão ligam as opções assim):
+
+  arquivo                     entrada (.xlsx ou .arrow); sem ele, janela de seleção
+  --origem                    PIPELINE_ORIGEM=1       coluna oculta "Linha origem"
+  --ndjson DESTINO [--gzip]   PIPELINE_NDJSON=DESTINO lotes NDJSON ("-" = stdout)
+  --parquet PASTA             PIPELINE_PARQUET=PASTA  arquivo histórico (arquivo_parquet)
+  --arrow                     PIPELINE_ARROW=1        saída também em .arrow (ipc_arrow)
+  --probe [N]                 PIPELINE_PROBE=1|N      só confere o layout (sonda)
+  --preview N                 PIPELINE_PREVIEW=N      prévia das N primeiras linhas (sonda)
+  --cache / --no-cache        PIPELINE_CACHE=1|PASTA  cache de resultados (cache_resultados)
+  --pacote                    PIPELINE_PACOTE=1       pacote de importação (pacote_importacao)
+  --checkpoint / --resume     PIPELINE_CHECKPOINT=1 / PIPELINE_RESUME=1 (retomada)
+  --max-memory TAM            PIPELINE_MAX_MEMORY=TAM limite de memória (memoria)
+
+Valor "0" na variável (ou no argumento) desliga. Opção com valor sem o valor
+(--preview no fim da linha) é erro do argparse, não vira nome de arquivo.
+
+Uso:
+  ap = argparse.ArgumentParser(description="...", parents=[parser_comum(checkpoints=True)])
+  opcoes = ler_opcoes(ap)
+  processar(Path(opcoes.arquivo), opcoes)
+
+Opcoes() sem argumentos = tudo desligado (prévia do --preview, testes).
+"""
+
+import argparse
+import os
+from pathlib import Path
+
+from cache_resultados import LIMITE_PADRAO, CacheResultados
+from memoria import Orcamento, mb, tamanho_em_bytes
+from retomada import Checkpoints
+from sonda import AMOSTRA_PADRAO
+from utils_transformacao import SaidaNDJSON
+
+
+class Opcoes(argparse.Namespace):
+    """Opções resolvidas de uma execução; as que não vierem ficam desligadas."""
+
+    def __init__(self, **opcoes):
+        padrao = dict(arquivo=None, origem=False, ndjson=None, parquet=None, arrow=False, probe=None,
+                      preview=None, cache=CacheResultados(), pacote=False, checkpoints=Checkpoints(),
+                      orcamento=None)
+        super().__init__(**{**padrao, **opcoes})
+
+
+def parser_comum(cache=True, pacote=True, checkpoints=False, max_memory=False) -> argparse.ArgumentParser:
+    """Parser pai (parents=[...]) com as opções comuns e os grupos opcionais pedidos."""
+    ap = argparse.ArgumentParser(add_help=False)
+    ap.add_argument("arquivo", nargs="?", help="planilha de entrada (.xlsx ou .arrow); sem ela, abre a janela")
+    ap.add_argument("--origem", action="store_true", help='grava a coluna oculta "Linha origem"')
+    ap.add_argument("--ndjson", metavar="DESTINO", help='grava o resultado em lotes NDJSON ("-" = stdout)')
+    ap.add_argument("--gzip", action="store_true", help="com --ndjson: compacta com gzip")
+    ap.add_argument("--parquet", metavar="PASTA", help="copia o resultado para o arquivo histórico em Parquet")
+    ap.add_argument("--arrow", action="store_true", help="grava também o resultado em Arrow IPC (.arrow)")
+    ap.add_argument("--probe", nargs="?", const=AMOSTRA_PADRAO, type=int, metavar="N",
+                    help="só confere o layout nas N primeiras linhas e projeta tempo/memória")
+    ap.add_argument("--preview", type=int, metavar="N", help="mostra as N primeiras linhas do resultado")
+    if cache:
+        ap.add_argument("--cache", dest="ligar_cache", action="store_true", help="usa o cache de resultados")
+        ap.add_argument("--no-cache", dest="sem_cache", action="store_true",
+                        help="desliga o cache (vence --cache e PIPELINE_CACHE)")
+    if pacote:
+        ap.add_argument("--pacote", action="store_true", help="grava também o pacote de importação (.pacote.json.gz)")
+    if checkpoints:
+        ap.add_argument("--checkpoint", action="store_true", help="salva o estado ao fim de cada fase")
+        ap.add_argument("--resume", action="store_true", help="retoma da última fase salva (também grava)")
+    if max_memory:
+        ap.add_argument("--max-memory", metavar="TAM", help="limite de memória (ex.: 6G); acima dele não processa")
+    return ap
+
+
+def _env(nome) -> str:
+    return os.environ.get(nome, "").strip()
+
+
+def _env_ligado(nome) -> bool:
+    return _env(nome) not in ("", "0")
+
+
+def ler_opcoes(parser, argv=None) -> Opcoes:
+    """Lê argv (padrão: sys.argv[1:]) e completa com as variáveis PIPELINE_*."""
+    a = vars(parser.parse_args(argv))
+    o = Opcoes(arquivo=a.pop("arquivo"))
+    # NDJSON primeiro: com "-", o que vem depois (ex.: o limite de memória) já sai no stderr
+    destino, gzip = a.pop("ndjson") or _env("PIPELINE_NDJSON"), a.pop("gzip")
+    if destino and destino != "0":
+        o.ndjson = SaidaNDJSON(destino, True if gzip else None)
+    o.origem = a.pop("origem") or _env_ligado("PIPELINE_ORIGEM")
+    pasta = a.pop("parquet") or _env("PIPELINE_PARQUET")
+    o.parquet = Path(pasta).expanduser() if pasta and pasta != "0" else None
+    o.arrow = a.pop("arrow") or _env_ligado("PIPELINE_ARROW")
+    probe = a.pop("probe")
+    if probe is None:
+        env = _env("PIPELINE_PROBE")
+        probe = AMOSTRA_PADRAO if env == "1" else int(env or 0)
+    o.probe = probe or None
+    preview = a.pop("preview")
+    o.preview = (int(_env("PIPELINE_PREVIEW") or 0) if preview is None else preview) or None
+    if "ligar_cache" in a:
+        env = _env("PIPELINE_CACHE")
+        ligar, sem = a.pop("ligar_cache"), a.pop("sem_cache")
+        ligado = (ligar or env not in ("", "0")) and not sem
+        o.cache = CacheResultados(ligado, pasta=env if env not in ("", "0", "1") else None,
+                                  limite=tamanho_em_bytes(_env("PIPELINE_CACHE_MAX") or LIMITE_PADRAO))
+    if "pacote" in a:
+        o.pacote = a.pop("pacote") or _env_ligado("PIPELINE_PACOTE")
+    if "checkpoint" in a:
+        o.checkpoints = Checkpoints(a.pop("checkpoint") or _env_ligado("PIPELINE_CHECKPOINT"),
+                                    a.pop("resume") or _env_ligado("PIPELINE_RESUME"))
+    if "max_memory" in a:
+        valor = a.pop("max_memory") or _env("PIPELINE_MAX_MEMORY")
+        if valor and valor != "0":
+            o.orcamento = Orcamento(tamanho_em_bytes(valor))
+            print(f"🧮 Limite de memória: {mb(o.orcamento.limite)} MB")
+    vars(o).update(a)      # opções só do script (ex.: --banco do CPFECNPJ)
+    return o
@@ -0,0 +1,161 @@
+# -*- coding: utf-8 -*-
+"""
+Pacote de importação: a saída pronta para o IndexedDB, sem planilha no meio.
+
+Ao lado do .xlsx de saída, o script grava <saida>.pacote.json.gz com os
+registros que a página de importação (banco-importar-dados.html, "Importar
+Processados") montaria lendo a planilha: mesmas chaves (já canonizadas como
+em normalizarRegistroProcessado), datas em DD/MM/AAAA, valores numéricos
+como número, célula vazia = "". A página só descompacta e faz os put() em
+lote; nada de XLSX.read / sheet_to_json.
+
+Formato (gzip, uma linha JSON por registro de controle ou lote):
+  {"formato": "pacote-importacao", "versao": 1, "store": "despesas-pagos",
+   "origem": "pagos_SAIDA.xlsx", "aba": "Sheet1", "colunas": [...],
+   "dicionarios": {"2": ["FULANO", ...]}, "total": 24960, "lote": 2000}
+  {"n": 2000, "colunas": [[...], [...], ...]}      um lote por linha, colunar
+Colunas em "dicionarios" (texto repetitivo) trazem índices no dicionário em
+vez do texto; null = vazio. Cada lote tem o tamanho do BATCH do
+salvarDadosDB, uma transação por linha do arquivo.
+
+Leitura no navegador: pipeline-dados/js/ler-pacote-importacao.js.
+
+Liga por argumento (ver opcoes) ou variável de ambiente:
+  python "scripts/Empenhos pagos.py" arquivo.xlsx --pacote
+  PIPELINE_PACOTE=1
+"""
+
+import gzip
+import json
+import os
+import re
+import unicodedata
+from datetime import date, datetime
+from pathlib import Path
+
+from utils_transformacao import valor_json
+
+FORMATO = "pacote-importacao"
+VERSAO = 1
+LOTE_IMPORTADOR = 2000      # BATCH do salvarDadosDB (banco-importar-dados.html)
+MAX_DISTINTOS = 0.5         # texto com até 50% de valores distintos vai para dicionário
+SUFIXO = ".pacote.json.gz"
+
+# normalizarRegistroProcessado: apelidos de colunas -> chave canônica do store
+APELIDOS = {
+    "seq liq": "Seq. Liq.",
+    "seq liquidacao": "Seq. Liq.",
+    "seq liquid": "Seq. Liq.",
+    "av liquid": "Seq. Liq.",
+    "av liquidacao": "Seq. Liq.",
+    "cnpj cpf": "CNPJ&CPF",
+    "cpf cnpj": "CNPJ&CPF",
+    "cnpj cpf do credor": "CNPJ&CPF",
+    "detalhamento despesa": "Detalhamento despesa",
+}
+
+
+def caminho_pacote(saida_xlsx) -> Path:
+    """pagos_SAIDA.xlsx -> pagos_SAIDA.pacote.json.gz (mesma pasta)."""
+    saida_xlsx = Path(saida_xlsx)
+    return saida_xlsx.with_name(saida_xlsx.stem + SUFIXO)
+
+
+def _chave_normalizada(chave) -> str:
+    # mesmo normalizarChaveColuna da página
+    s = unicodedata.normalize("NFD", str(chave or "").lower().strip())
+    s = "".join(c for c in s if not unicodedata.combining(c))
+    s = re.sub(r"[^\w\s]", " ", s, flags=re.ASCII).replace("_", " ")
+    return re.sub(r"\s+", " ", s)
+
+
+def _valor(v):
+    if isinstance(v, (datetime, date)) and v == v:
+        return v.strftime("%d/%m/%Y")
+    return valor_json(v)
+
+
+def _vazio(v) -> bool:
+    return v is None or v == ""
+
+
+def gravar_pacote(destino, store, colunas, linhas, origem="", aba=""):
+    """
+    Grava o pacote de `linhas` (iterável de listas na ordem de `colunas`, valores
+    como na planilha). Colunas sem nome ficam de fora, como no importador.
+    """
+    canonicas, fontes = [], {}
+    for j, c in enumerate(colunas):
+        if c is None or not str(c).strip():
+            continue
+        chave = APELIDOS.get(_chave_normalizada(c), str(c))
+        if chave not in fontes:
+            canonicas.append(chave)
+            fontes[chave] = []
+        fontes[chave].append(j)
+
+    dados = [[] for _ in canonicas]
+    for linha in linhas:
+        for k, chave in enumerate(canonicas):
+            v = None
+            for j in fontes[chave]:            # 1º valor não vazio, como no importador
+                v = _valor(linha[j]) if j < len(linha) else None
+                if not _vazio(v):
+                    break
+            if chave == "CNPJ&CPF" and v is not None:
+                v = str(v).strip()
+            dados[k].append(v)
+    total = len(dados[0]) if dados else 0
+
+    dicionarios = {}
+    for k, valores in enumerate(dados):
+        textos = [v for v in valores if v is not None]
+        if not textos or not all(isinstance(v, str) for v in textos):
+            continue
+        distintos = dict.fromkeys(textos)
+        if len(distintos) > MAX_DISTINTOS * len(textos):
+            continue
+        indice = {v: i for i, v in enumerate(distintos)}
+        dicionarios[str(k)] = list(distintos)
+        dados[k] = [None if v is None else indice[v] for v in valores]
+
+    destino = Path(destino)
+    tmp = destino.with_name(destino.name + ".tmp")
+    with gzip.open(tmp, "wt", encoding="utf-8", compresslevel=6) as f:
+        def escrever(obj):
+            f.write(json.dumps(obj, ensure_ascii=False, separators=(",", ":")))
+            f.write("\n")
+
+        escrever({"formato": FORMATO, "versao": VERSAO, "store": store, "origem": origem, "aba": aba,
+                  "colunas": canonicas, "dicionarios": dicionarios, "total": total, "lote": LOTE_IMPORTADOR})
+        for inicio in range(0, total, LOTE_IMPORTADOR):
+            fim = min(inicio + LOTE_IMPORTADOR, total)
+            escrever({"n": fim - inicio, "colunas": [col[inicio:fim] for col in dados]})
+    os.replace(tmp, destino)      # tmp + rename: a página nunca vê um pacote pela metade
+    print(f"📦 Pacote de importação ({store}, {total:,} registros): {destino}")
+    return destino
+
+
+def gravar_pacote_dataframe(destino, store, df, origem="", aba=""):
+    """gravar_pacote de um DataFrame (NaN/NaT = vazio, como no to_excel)."""
+    linhas = df.astype(object).where(df.notna(), None).to_numpy().tolist()
+    return gravar_pacote(destino, store, list(df.columns), linhas, origem, aba)
+
+
+def gravar_pacote_worksheet(destino, store, ws, origem=""):
+    """gravar_pacote de uma aba do openpyxl (1ª linha = cabeçalho)."""
+    linhas = ws.iter_rows(values_only=True)
+    colunas = list(next(linhas, ()))
+    return gravar_pacote(destino, store, colunas, linhas, origem, ws.title)
+
+
+def gravar_pacote_xlsx(saida_xlsx, store, aba=0):
+    """Pacote lido de uma saída já gravada (caminho do Excel COM, sem workbook em memória)."""
+    from openpyxl import load_workbook
+
+    wb = load_workbook(saida_xlsx, read_only=True, data_only=True)
+    try:
+        ws = wb.worksheets[aba] if isinstance(aba, int) else wb[aba]
+        return gravar_pacote_worksheet(caminho_pacote(saida_xlsx), store, ws, Path(saida_xlsx).name)
+    finally:
+        wb.close()
@@ -0,0 +1,236 @@
+# -*- coding: utf-8 -*-
+"""
+Rastreio por etapa dos scripts do pipeline (formato Chrome trace-event).
+
+Cada etapa nomeada registra início/fim, linhas de entrada/saída, RSS no fim e
+pico de RSS durante a etapa (amostrado a cada 20 ms, também gravado como
+contador "RSS (MB)") e, se ligado, alocações via tracemalloc. No fim do processo grava um trace.json que abre
+direto em chrome://tracing ou https://ui.perfetto.dev (etapas aninhadas
+aparecem empilhadas).
+
+Desligado por padrão (custo de uma chamada de função por etapa). Liga por
+variável de ambiente, sem mudar a linha de comando dos scripts:
+  PIPELINE_TRACE=trace.json           caminho do arquivo ("1" = ./trace.json)
+  PIPELINE_TRACE_MEMORIA=1            mede alocações com tracemalloc (mais lento)
+
+Uso:
+  from rastreio import etapa, rastrear
+
+  with etapa("Step 22: Move N up 2 lines", lambda: len(matrix)):
+      ...                                   # callable: contado na entrada e na saída
+
+  with etapa("Etapa 5 - Remover linhas", linhas=len(df)) as e:
+      df = df[...]
+      e.saida(len(df))
+
+  @rastrear("Salvar")                       # linhas = len(1º argumento) / len(retorno)
+  def salvar(matriz): ...
+"""
+
+import atexit
+import functools
+import json
+import os
+import sys
+import threading
+import time
+import tracemalloc
+
+from memoria import mb, pico_rss, rss_atual
+
+INTERVALO_RSS = 0.02   # s entre amostras de RSS
+
+_eventos = []
+_resumo = []           # (início, nível, nome, duração ns, pico de RSS) para o quadro final
+_pilha = []            # etapas abertas (para o pico de memória das etapas externas)
+_caminho = None
+_memoria = False
+_t0_ns = time.perf_counter_ns()
+_amostrador = None
+
+
+def ativar(caminho="trace.json", memoria=False):
+    """Liga o rastreio (grava em `caminho` ao sair). Idempotente."""
+    global _caminho, _memoria
+    primeira = _caminho is None
+    _caminho = os.path.abspath(caminho)
+    _memoria = bool(memoria)
+    if _memoria and not tracemalloc.is_tracing():
+        tracemalloc.start()
+    if primeira:
+        atexit.register(salvar)
+        _iniciar_amostrador()
+
+
+def _evento_rss(rss):
+    _eventos.append({"name": "RSS (MB)", "ph": "C", "ts": (time.perf_counter_ns() - _t0_ns) / 1000,
+                     "pid": os.getpid(), "args": {"MB": mb(rss)}})
+
+
+def _amostrar():
+    ultimo = 0
+    while True:
+        rss = rss_atual()
+        for e in tuple(_pilha):
+            if rss > e.rss_pico:
+                e.rss_pico = rss
+        if abs(rss - ultimo) >= 1024 * 1024:
+            _evento_rss(rss)
+            ultimo = rss
+        time.sleep(INTERVALO_RSS)
+
+
+def _iniciar_amostrador():
+    global _amostrador
+    _amostrador = threading.Thread(target=_amostrar, name="rastreio-rss", daemon=True)
+    _amostrador.start()
+
+
+def ativo() -> bool:
+    return _caminho is not None
+
+
+def reiniciar():
+    """Descarta etapas e eventos já registrados (processo que roda vários scripts: vigia, serviço)."""
+    _eventos.clear()
+    _resumo.clear()
+    _pilha.clear()
+    if _memoria:
+        tracemalloc.reset_peak()
+
+
+def _contar(linhas):
+    if callable(linhas):
+        try:
+            return linhas()
+        except Exception:
+            return None
+    return linhas
+
+
+class _Etapa:
+    __slots__ = ("nome", "linhas", "entrada", "_saida", "inicio", "mem_inicio", "pico", "rss_pico", "nivel")
+
+    def __init__(self, nome, linhas=None):
+        self.nome = nome
+        self.linhas = linhas
+        self._saida = None
+
+    def saida(self, n):
+        """Define as linhas de saída (quando `linhas` não é um callable)."""
+        self._saida = n
+
+    def __enter__(self):
+        if _caminho is None:
+            return self
+        self.entrada = _contar(self.linhas)
+        self.pico = 0
+        self.rss_pico = rss_atual()
+        self.nivel = len(_pilha)
+        if _memoria:
+            atual, pico = tracemalloc.get_traced_memory()
+            if _pilha:                          # o pico até aqui pertence à etapa externa
+                _pilha[-1].pico = max(_pilha[-1].pico, pico)
+            tracemalloc.reset_peak()
+            self.mem_inicio = atual
+        _pilha.append(self)
+        self.inicio = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, tipo, exc, tb):
+        if _caminho is None:
+            return False
+        fim = time.perf_counter_ns()
+        _pilha.pop()
+        rss = rss_atual()
+        self.rss_pico = max(self.rss_pico, rss)
+        if _pilha:
+            _pilha[-1].rss_pico = max(_pilha[-1].rss_pico, self.rss_pico)
+        args = {"rss_mb": mb(rss), "rss_pico_mb": mb(self.rss_pico)}
+        if self.entrada is not None:
+            args["linhas_entrada"] = self.entrada
+        saida = _contar(self.linhas) if callable(self.linhas) else self._saida
+        if saida is not None:
+            args["linhas_saida"] = saida
+        if _memoria:
+            atual, pico = tracemalloc.get_traced_memory()
+            pico = max(pico, self.pico)
+            if _pilha:
+                _pilha[-1].pico = max(_pilha[-1].pico, pico)
+            args["mem_liquida_kb"] = round((atual - self.mem_inicio) / 1024, 1)
+            args["mem_pico_kb"] = round((pico - self.mem_inicio) / 1024, 1)
+        if tipo is not None:
+            args["erro"] = f"{tipo.__name__}: {exc}"
+        _eventos.append({
+            "name": self.nome, "cat": "etapa", "ph": "X",
+            "ts": (self.inicio - _t0_ns) / 1000, "dur": (fim - self.inicio) / 1000,
+            "pid": os.getpid(), "tid": threading.get_native_id(), "args": args,
+        })
+        _resumo.append((self.inicio, self.nivel, self.nome, fim - self.inicio, self.rss_pico))
+        return False
+
+
+def etapa(nome, linhas=None):
+    """Context manager de uma etapa. `linhas`: int (entrada) ou callable (entrada e saída)."""
+    return _Etapa(nome, linhas)
+
+
+def _len(x):
+    try:
+        return len(x)
+    except TypeError:
+        return None
+
+
+def rastrear(nome=None):
+    """Decorator: a função inteira vira uma etapa (linhas = len do 1º argumento / do retorno)."""
+    def decorar(func):
+        rotulo = nome or func.__name__
+
+        @functools.wraps(func)
+        def envolver(*args, **kwargs):
+            if _caminho is None:
+                return func(*args, **kwargs)
+            with etapa(rotulo, _len(args[0]) if args else None) as e:
+                resultado = func(*args, **kwargs)
+                e.saida(_len(resultado))
+            return resultado
+        return envolver
+    return decorar
+
+
+def salvar(caminho=None):
+    """Grava os eventos no formato JSON Object do trace-event (chamado no atexit)."""
+    caminho = caminho or _caminho
+    if caminho is None or not _eventos:
+        return None
+    script = os.path.basename(sys.argv[0]) or "python"
+    meta = [{"name": "process_name", "ph": "M", "pid": os.getpid(), "args": {"name": script}}]
+    tmp = f"{caminho}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({"traceEvents": meta + sorted(_eventos, key=lambda e: e["ts"]),
+                   "displayTimeUnit": "ms",
+                   "otherData": {"script": script, "argv": sys.argv[1:], "memoria": _memoria}},
+                  f, ensure_ascii=False)
+    os.replace(tmp, caminho)
+    imprimir_resumo()
+    print(f"🧭 Trace salvo em: {caminho} ({len(_resumo):,} etapas)")
+    return caminho
+
+
+def imprimir_resumo():
+    """Quadro por etapa (ordem de início, aninhadas recuadas): tempo e pico de RSS."""
+    if not _resumo:
+        return
+    largura = min(70, max(2 * nivel + len(nome) for _, nivel, nome, _, _ in _resumo))
+    print(f"\n{'Etapa':<{largura}}  {'Tempo (s)':>10}  {'Pico RSS (MB)':>14}")
+    for _, nivel, nome, dur, pico in sorted(_resumo):
+        rotulo = ("  " * nivel + nome)[:largura]
+        print(f"{rotulo:<{largura}}  {dur / 1e9:>10.2f}  {mb(pico):>14,.1f}")
+    print(f"Pico de RSS do processo: {mb(pico_rss())} MB")
+
+
+_env = os.environ.get("PIPELINE_TRACE", "").strip()
+if _env and _env != "0":
+    ativar("trace.json" if _env == "1" else _env,
+           memoria=os.environ.get("PIPELINE_TRACE_MEMORIA", "").strip() not in ("", "0"))
@@ -0,0 +1,227 @@
+# -*- coding: utf-8 -*-
+"""
+Checkpoints por fase e retomada (--resume) dos scripts longos do pipeline.
+
+Com checkpoint ligado, o estado ao fim de cada fase cara (leitura, filtros,
+etapas 13-34, classificação...) vai para o disco; se a execução morrer depois
+(arquivo de saída aberto no Excel, disco cheio), --resume recomeça da última
+fase salva em vez do zero.
+
+Os snapshots ficam em <pasta da entrada>/.checkpoints/<entrada>_<chave>/, com
+chave = hash do arquivo de entrada + versão dos scripts (hash do código-fonte
+da pasta scripts/, a mesma regra do cache_resultados: mudar um módulo auxiliar
+também invalida) + opções que mudam a saída. Entrada ou código diferentes =
+chave nova, nada é reaproveitado por engano. A pasta é apagada quando o script
+termina bem.
+
+Formatos (lidos via memory-map):
+  matriz (lista de linhas)   lotes Arrow IPC (memoria.gravar_matriz)
+  DataFrame                  Arrow IPC (memoria.gravar_tabela)
+  array / numpy              .npy (sem objetos Python)
+  demais valores             JSON (None, números, texto, listas e dicts desses)
+Nada de pickle: .checkpoints/ costuma ficar na pasta compartilhada da rede, e
+o --resume não pode executar o que alguém deixou lá. Fase com valor fora
+desses formatos (ex.: DataFrame que o Arrow não aceita) não vira checkpoint e
+roda de novo na retomada.
+
+Liga por argumento (ver opcoes) ou variável de ambiente:
+  python "scripts/Empenhos Liquidados.py" arquivo.xlsx --checkpoint
+  python "scripts/Empenhos Liquidados.py" arquivo.xlsx --resume   (também grava)
+  PIPELINE_CHECKPOINT=1 / PIPELINE_RESUME=1
+  PIPELINE_CHECKPOINTS=D:\\ck                pasta base (padrão: .checkpoints ao lado da entrada)
+
+Uso:
+  ck = opcoes.checkpoints.abrir(entrada, __file__, origem=origem)   # opcoes.ler_opcoes
+  fase = ck.retomar_de(["leitura", "filtros"])   # última fase salva (só com --resume)
+  if fase:
+      matrix = ck.carregar(fase)["matrix"]
+  if ck.pendente("leitura"):
+      ...
+      ck.salvar("leitura", matrix=matrix)
+  ...
+  ck.concluir()                                  # saída gravada: apaga os checkpoints
+"""
+
+import hashlib
+import json
+import os
+import shutil
+from array import array
+
+from cache_resultados import versao_scripts
+from memoria import abrir_matriz, gravar_matriz, gravar_tabela, TabelaDespejada
+
+PASTA_PADRAO = ".checkpoints"
+MANIFESTO = "manifesto.json"
+
+
+def _hash_arquivo(caminho, h=None, bloco=1 << 20):
+    h = h or hashlib.sha256()
+    with open(caminho, "rb") as f:
+        for pedaco in iter(lambda: f.read(bloco), b""):
+            h.update(pedaco)
+    return h
+
+
+def _eh_matriz(v):
+    return isinstance(v, list) and (not v or isinstance(v[0], list))
+
+
+def _json_fiel(v) -> bool:
+    """v volta igual do JSON (sem tuplas, chaves não-texto, datas...)."""
+    try:
+        return json.loads(json.dumps(v)) == v
+    except (TypeError, ValueError):
+        return False
+
+
+class Checkpoints:
+    """Snapshots por fase de uma execução. Desligado (padrão), tudo vira no-op."""
+
+    def __init__(self, ligado=False, retomar=False, pasta_base=None):
+        self.ligado = bool(ligado or retomar)
+        self.retomar = bool(retomar)
+        self.pasta_base = pasta_base or os.environ.get("PIPELINE_CHECKPOINTS") or None
+        self.pasta = None
+        self.fases = []               # fases salvas, na ordem
+        self._ordem = []
+        self._retomada = None
+
+    # ---------- abertura ----------
+    def abrir(self, entrada, script, **opcoes):
+        """Amarra os checkpoints à entrada, ao script e às opções; sem --resume, começa do zero."""
+        if not self.ligado:
+            return self
+        entrada = os.path.abspath(str(entrada))
+        h = _hash_arquivo(entrada)
+        h.update(versao_scripts(script).encode())
+        h.update(json.dumps(opcoes, sort_keys=True, default=str).encode())
+        chave = h.hexdigest()[:16]
+
+        base = self.pasta_base or os.path.join(os.path.dirname(entrada), PASTA_PADRAO)
+        stem = os.path.splitext(os.path.basename(entrada))[0]
+        self.pasta = os.path.join(base, f"{stem}_{chave}")
+        os.makedirs(base, exist_ok=True)
+        # checkpoints da mesma entrada com outra chave (arquivo/script mudou) não servem mais
+        for nome in os.listdir(base):
+            if nome.startswith(f"{stem}_") and len(nome) == len(stem) + 17 and nome != os.path.basename(self.pasta):
+                shutil.rmtree(os.path.join(base, nome), ignore_errors=True)
+
+        if self.retomar and os.path.exists(os.path.join(self.pasta, MANIFESTO)):
+            with open(os.path.join(self.pasta, MANIFESTO), encoding="utf-8") as f:
+                self.fases = json.load(f)["fases"]
+            print(f"♻️ Checkpoints encontrados ({', '.join(self.fases) or 'nenhuma fase'}): {self.pasta}")
+        else:
+            if self.retomar:
+                print("♻️ Nenhum checkpoint desta entrada/versão do script: começando do zero.")
+            shutil.rmtree(self.pasta, ignore_errors=True)
+            self.fases = []
+        os.makedirs(self.pasta, exist_ok=True)
+        return self
+
+    # ---------- consulta ----------
+    def concluida(self, fase) -> bool:
+        """Fase salva numa execução anterior (só com --resume)."""
+        return self.retomar and fase in self.fases
+
+    def retomar_de(self, ordem):
+        """Última fase de `ordem` já salva (só com --resume), ou None. As anteriores a ela ficam puladas."""
+        feitas = [f for f in ordem if self.concluida(f)]
+        self._ordem = list(ordem)
+        self._retomada = feitas[-1] if feitas else None
+        return self._retomada
+
+    def pendente(self, fase) -> bool:
+        """A fase precisa rodar? (não: ela ou uma fase posterior de retomar_de() já foi salva)"""
+        if fase in self._ordem and self._retomada is not None:
+            return self._ordem.index(fase) > self._ordem.index(self._retomada)
+        return not self.concluida(fase)
+
+    # ---------- gravação / leitura ----------
+    def salvar(self, fase, **objetos):
+        """Grava os objetos da fase (pasta temporária + rename: uma fase nunca fica pela metade)."""
+        if not self.ligado:
+            return
+        destino = os.path.join(self.pasta, fase)
+        tmp = f"{destino}.tmp"
+        shutil.rmtree(tmp, ignore_errors=True)
+        os.makedirs(tmp)
+        meta = {}
+        for nome, v in objetos.items():
+            if _eh_matriz(v):
+                try:
+                    meta[nome] = {"tipo": "matriz", "total": len(gravar_matriz(v, tmp, nome, pickle_permitido=False))}
+                except TypeError as e:
+                    shutil.rmtree(tmp, ignore_errors=True)
+                    print(f"⚠️ Checkpoint da fase '{fase}' não gravado: '{nome}', {e}")
+                    return
+            elif hasattr(v, "to_parquet"):            # DataFrame (Series não tem)
+                if gravar_tabela(v, tmp, nome).formato != "arrow":
+                    shutil.rmtree(tmp, ignore_errors=True)
+                    print(f"⚠️ Checkpoint da fase '{fase}' não gravado: '{nome}' tem colunas que o Arrow não aceita")
+                    return
+                meta[nome] = {"tipo": "tabela"}
+            elif isinstance(v, array):
+                import numpy as np
+                np.save(os.path.join(tmp, f"{nome}.npy"), np.frombuffer(v, dtype=v.typecode), allow_pickle=False)
+                meta[nome] = {"tipo": "array", "typecode": v.typecode}
+            elif type(v).__module__ == "numpy" and hasattr(v, "dtype") and v.dtype != object:
+                import numpy as np
+                np.save(os.path.join(tmp, f"{nome}.npy"), v, allow_pickle=False)
+                meta[nome] = {"tipo": "numpy"}
+            elif _json_fiel(v):
+                with open(os.path.join(tmp, f"{nome}.json"), "w", encoding="utf-8") as f:
+                    json.dump(v, f, ensure_ascii=False)
+                meta[nome] = {"tipo": "json"}
+            else:
+                shutil.rmtree(tmp, ignore_errors=True)
+                print(f"⚠️ Checkpoint da fase '{fase}' não gravado: '{nome}' ({type(v).__name__}) não tem formato seguro")
+                return
+        with open(os.path.join(tmp, "fase.json"), "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+        shutil.rmtree(destino, ignore_errors=True)
+        os.replace(tmp, destino)
+
+        self.fases = [f for f in self.fases if f != fase] + [fase]
+        tmp = os.path.join(self.pasta, f"{MANIFESTO}.tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"fases": self.fases}, f, ensure_ascii=False)
+        os.replace(tmp, os.path.join(self.pasta, MANIFESTO))
+
+    def carregar(self, fase, lazy=()):
+        """
+        Objetos salvos da fase. Matrizes voltam como listas de listas (mutáveis),
+        ou MatrizDespejada (somente leitura, memory-map) se o nome estiver em `lazy`.
+        """
+        import numpy as np
+
+        pasta = os.path.join(self.pasta, fase)
+        with open(os.path.join(pasta, "fase.json"), encoding="utf-8") as f:
+            meta = json.load(f)
+        objetos = {}
+        for nome, m in meta.items():
+            if m["tipo"] == "matriz":
+                matriz = abrir_matriz(pasta, nome, m["total"], pickle_permitido=False)
+                objetos[nome] = matriz if nome in lazy else list(matriz)
+            elif m["tipo"] == "tabela":
+                objetos[nome] = TabelaDespejada(os.path.join(pasta, f"{nome}.arrow"), "arrow").carregar()
+            elif m["tipo"] == "array":
+                npy = np.load(os.path.join(pasta, f"{nome}.npy"), mmap_mode="r", allow_pickle=False)
+                objetos[nome] = array(m["typecode"], npy)
+            elif m["tipo"] == "numpy":
+                objetos[nome] = np.load(os.path.join(pasta, f"{nome}.npy"), mmap_mode="r", allow_pickle=False)
+            elif m["tipo"] == "json":
+                with open(os.path.join(pasta, f"{nome}.json"), encoding="utf-8") as f:
+                    objetos[nome] = json.load(f)
+            else:
+                raise ValueError(f"checkpoint '{fase}': formato desconhecido para '{nome}': {m['tipo']}")
+        print(f"♻️ Retomando depois da fase '{fase}'")
+        return objetos
+
+    def concluir(self):
+        """Execução terminou bem: os checkpoints não servem mais."""
+        if self.ligado and self.pasta:
+            shutil.rmtree(self.pasta, ignore_errors=True)
+            base = os.path.dirname(self.pasta)
+            if os.path.isdir(base) and not os.listdir(base):
+                os.rmdir(base)
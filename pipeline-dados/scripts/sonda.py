@@ -0,0 +1,335 @@
+# -*- coding: utf-8 -*-
+"""
+Sondagem da entrada (--probe) e prévia do resultado (--preview N).
+
+Layout errado aparecia tarde: o Empenhos a pagar lia a planilha inteira antes
+de dizer que falta a coluna "Av. liquid."; o retidos só reclamava depois de
+gravar o intermediário. Aqui a conferência lê só o começo do arquivo.
+
+--probe [--probe=N]: lê o cabeçalho e as N primeiras linhas (padrão 200) de
+cada aba que o script processa, confere as colunas que o script usa (nome e
+letra, como o SIGEF exporta), estima o total de linhas pelo <dimension> da aba
+(sem ele, pela amostra) e mostra tempo e memória projetados. Nada é gravado.
+Layout errado: código de saída 1 e, se o cabeçalho for de outro relatório, qual.
+
+--preview N: a mesma conferência; depois processa só o começo de cada aba
+(cópia .arrow numa pasta temporária, ver ipc_arrow) e mostra as N primeiras
+linhas da saída, já processadas. Sem cache, pacote, NDJSON, Parquet ou Arrow.
+O fim da amostra pode cortar um registro de várias linhas ao meio, e regras
+que olham a aba inteira (colunas vazias do a-pagar) só veem a amostra.
+
+Liga por argumento (ver opcoes) ou variável de ambiente:
+  python "scripts/Empenhos a pagar.py" arquivo.xlsx --probe
+  python "scripts/Empenhos pagos.py" arquivo.xlsx --preview 20
+  PIPELINE_PROBE=1 (ou =N)   PIPELINE_PREVIEW=N
+"""
+
+import contextlib
+import io
+import itertools
+import os
+import re
+import tempfile
+import time
+import unicodedata
+import zipfile
+from datetime import datetime
+from pathlib import Path
+
+import ipc_arrow
+from ipc_arrow import _letra_coluna
+from utils_transformacao import _letras_para_coluna, ler_linhas_xlsx, listar_abas_xlsx
+
+AMOSTRA_PADRAO = 200
+LINHAS_CABECALHO = 10       # retidos têm título antes do cabeçalho (linha 3)
+AMOSTRA_XML = 1 << 20       # bytes do XML da aba lidos para estimar as linhas sem <dimension>
+LARGURA_CELULA = 22         # caracteres por coluna na tabela da prévia
+TENTATIVAS_PREVIA = 3       # amostra x4 a cada tentativa, se a saída vier com menos de N linhas
+
+# tipo -> colunas que precisam aparecer juntas numa linha de cabeçalho.
+# Ordem importa: primeiro que casar ganha (liquidados, pagos e emitidos
+# dividem "Nr emp." / "Valor (R$)"; o que os separa vem antes).
+IMPRESSOES = [
+    ("credores",   {"codigo", "credor/fornecedor", "cpf/cnpj"}),
+    ("retidos",    {"sequencia", "seq. estor."}),
+    ("a-pagar",    {"av. liquid.", "valor a pagar"}),
+    ("pagos",      {"seq. liq.", "nr pagamento"}),
+    ("liquidados", {"seq. liq.", "beneficiario"}),
+    ("emitidos",   {"nr emp.", "especie", "unidade orcamentaria"}),
+]
+
+# relatório -> (linha do cabeçalho, [(letra, coluna)]): as colunas que o script
+# usa, na letra em que o SIGEF as exporta (os scripts trabalham por posição).
+# Letra None = em qualquer coluna (o script procura pelo nome).
+ESPERADAS = {
+    "credores":   (1, [("A", "Código"), ("C", "Credor/Fornecedor"), ("F", "CPF/CNPJ")]),
+    "liquidados": (1, [("A", "Data"), ("B", "Nr emp."), ("C", "Seq. liq."), ("J", "Beneficiário"),
+                       ("M", "Valor (R$)")]),
+    "a-pagar":    (1, [(None, "Av. liquid.")]),
+    "emitidos":   (1, [("A", "Data"), ("B", "Nr emp."), ("C", "Espécie"), ("H", "Credor/Fornecedor"),
+                       ("I", "Valor (R$)")]),
+    "pagos":      (1, [("A", "Data"), ("B", "Nr emp."), ("C", "Credor/Fornecedor"), ("D", "Seq. Liq."),
+                       ("E", "Nr pagamento"), ("G", "Valor (R$)")]),
+    "retidos":    (3, [("A", "Data"), ("C", "Sequência"), ("D", "Seq. estor."), ("J", "Credor/Fornecedor"),
+                       ("O", "Av. liquid."), ("Y", "Valor")]),
+}
+TODAS_AS_ABAS = {"retidos"}     # os outros scripts só leem a 1ª aba
+
+# relatório -> (s fixos, ms por linha, MB fixos, KB por linha), linhas = soma das
+# abas lidas. Medido com gerador_sintetico.py (fixtures, 20 e 30 mil registros, de 20
+# a 150 mil linhas), caminho openpyxl/pandas; em outra máquina muda a escala.
+DESEMPENHO = {
+    "credores":   (0.6, 0.18, 120, 2.6),
+    "liquidados": (0.1, 0.15, 26, 0.36),
+    "a-pagar":    (0.6, 0.20, 120, 1.2),
+    "emitidos":   (0.3, 0.80, 105, 4.4),
+    "pagos":      (0.2, 0.65, 105, 2.0),
+    "retidos":    (0.8, 0.86, 120, 6.7),
+}
+
+_re_dimensao = re.compile(rb"<(?:\w+:)?dimension\s+ref=\"(?:[A-Z]+\d+:)?[A-Z]+(\d+)\"")
+_re_linha = re.compile(rb"<(?:\w+:)?row[\s>]")
+
+
+# ==========================================================
+# Cabeçalho
+# ==========================================================
+def _normalizar(v) -> str:
+    s = unicodedata.normalize("NFKD", str(v).strip().casefold())
+    return "".join(c for c in s if not unicodedata.combining(c))
+
+
+def identificar(caminho):
+    """Tipo do relatório pela impressão digital do cabeçalho (None = não reconhecido)."""
+    try:
+        linhas = list(itertools.islice(ler_linhas_xlsx(caminho, 0), LINHAS_CABECALHO))
+    except Exception:
+        return None
+    return _tipo_das_linhas(linhas)
+
+
+def _tipo_das_linhas(linhas):
+    for linha in linhas:
+        celulas = {_normalizar(v) for v in linha if v is not None}
+        for tipo, colunas in IMPRESSOES:
+            if colunas <= celulas:
+                return tipo
+    return None
+
+
+def conferir_cabecalho(relatorio, cabecalho):
+    """Problemas do cabeçalho (lista de valores da linha) frente ao ESPERADAS do relatório."""
+    normalizado = [_normalizar(v) if v is not None else "" for v in cabecalho]
+    problemas = []
+    for letra, nome in ESPERADAS[relatorio][1]:
+        alvo = _normalizar(nome)
+        if letra is None:
+            if not any(alvo in c for c in normalizado):
+                problemas.append(f"coluna '{nome}' não encontrada")
+            continue
+        j = _letras_para_coluna(letra) - 1
+        if j < len(normalizado) and normalizado[j] == alvo:
+            continue
+        achada = [_letra_coluna(k) for k, c in enumerate(normalizado) if c == alvo]
+        if achada:
+            problemas.append(f"coluna '{nome}' na coluna {achada[0]}, esperada em {letra}")
+        else:
+            problemas.append(f"coluna '{nome}' (coluna {letra}) não encontrada")
+    return problemas
+
+
+# ==========================================================
+# Tamanho
+# ==========================================================
+def linhas_estimadas(caminho, parte):
+    """(linhas da aba, origem da estimativa): <dimension>, XML inteiro contado ou amostra do XML."""
+    if ipc_arrow.eh_arrow(caminho):
+        return None, None
+    with zipfile.ZipFile(caminho) as z:
+        total = z.getinfo(parte).file_size
+        with z.open(parte) as f:
+            inicio = f.read(AMOSTRA_XML)
+    m = _re_dimensao.search(inicio[:16384])
+    if m and int(m.group(1)) > 1:
+        return int(m.group(1)), "<dimension>"
+    contadas = len(_re_linha.findall(inicio))
+    if len(inicio) >= total or not contadas:
+        return contadas, "contagem"
+    return round(contadas * total / len(inicio)), "amostra do XML"
+
+
+def abas_estimadas(caminho, relatorio):
+    """[(nome, linhas, origem da estimativa)] das abas que o script do relatório processa."""
+    abas = listar_abas_xlsx(caminho)
+    if relatorio not in TODAS_AS_ABAS:
+        abas = abas[:1]
+    if ipc_arrow.eh_arrow(caminho):
+        tamanhos = ipc_arrow.linhas_por_aba(caminho)
+        return [(nome, tamanhos[i], "metadado do .arrow") for i, (nome, _) in enumerate(abas)]
+    return [(nome, *linhas_estimadas(caminho, parte)) for nome, parte in abas]
+
+
+def projetar(relatorio, linhas):
+    """(segundos, MB de pico) projetados para processar `linhas` linhas."""
+    s_fixos, ms_linha, mb_fixos, kb_linha = DESEMPENHO[relatorio]
+    return s_fixos + linhas * ms_linha / 1000, mb_fixos + linhas * kb_linha / 1024
+
+
+def conferir_orcamento(caminho, relatorio, orcamento):
+    """
+    --max-memory: projeta o pico pelo tamanho da entrada (só o <dimension> de
+    cada aba); acima do limite -> SystemExit(1) antes de processar.
+    """
+    linhas = sum(n or 0 for _, n, _ in abas_estimadas(caminho, relatorio))
+    _, pico_mb = projetar(relatorio, linhas)
+    if pico_mb * 2**20 <= orcamento.limite:
+        return
+    print(f"❌ Memória projetada: ~{pico_mb:,.0f} MB de pico para ~{linhas:,} linhas, "
+          f"acima do --max-memory ({orcamento.limite / 2**20:,.0f} MB)")
+    print("   Divida a entrada (ex.: por mês) ou rode com um limite maior.")
+    raise SystemExit(1)
+
+
+# ==========================================================
+# --probe
+# ==========================================================
+def examinar(caminho, relatorio, amostra=AMOSTRA_PADRAO):
+    """
+    Lê cabeçalho + `amostra` linhas de cada aba que o script processa.
+    Retorna {"abas": [{nome, linhas, origem, amostra, com_dados, problemas}], "tipo": tipo pelo cabeçalho}.
+    """
+    if not ipc_arrow.eh_arrow(caminho) and not zipfile.is_zipfile(caminho):
+        raise ValueError(f"--probe/--preview leem .xlsx ou .arrow: {caminho}")
+    linha_cabecalho = ESPERADAS[relatorio][0]
+    resultado = {"abas": [], "tipo": None}
+    for i, (nome, linhas, origem) in enumerate(abas_estimadas(caminho, relatorio)):
+        lidas = list(itertools.islice(ler_linhas_xlsx(caminho, i), max(linha_cabecalho, LINHAS_CABECALHO) + amostra))
+        if i == 0:
+            resultado["tipo"] = _tipo_das_linhas(lidas[:LINHAS_CABECALHO])
+        cabecalho = lidas[linha_cabecalho - 1] if len(lidas) >= linha_cabecalho else []
+        corpo = lidas[linha_cabecalho:linha_cabecalho + amostra]
+        resultado["abas"].append({
+            "nome": nome, "linhas": linhas, "origem": origem, "cabecalho": cabecalho,
+            "amostra": len(corpo), "com_dados": sum(1 for l in corpo if any(v not in (None, "") for v in l)),
+            "problemas": conferir_cabecalho(relatorio, cabecalho),
+        })
+    return resultado
+
+
+def _falhar_se_layout_errado(caminho, relatorio, exame):
+    erradas = [a for a in exame["abas"] if a["problemas"]]
+    if not erradas:
+        return
+    linha_cabecalho = ESPERADAS[relatorio][0]
+    print(f"❌ Layout inesperado para {relatorio}: {Path(caminho).name}")
+    for a in erradas:
+        print(f"   Aba '{a['nome']}' (cabeçalho na linha {linha_cabecalho}):")
+        for p in a["problemas"]:
+            print(f"     - {p}")
+        print(f"     cabeçalho lido: {[v for v in a['cabecalho'] if v is not None]}")
+    if exame["tipo"] and exame["tipo"] != relatorio:
+        print(f"   O cabeçalho é de um relatório de {exame['tipo']} (python pipeline_dados.py {exame['tipo']} ...).")
+    raise SystemExit(1)
+
+
+def sondar(caminho, relatorio, amostra=AMOSTRA_PADRAO, orcamento=None):
+    """--probe: confere o layout e projeta tempo/memória sem processar. Layout errado -> SystemExit(1)."""
+    t0 = time.perf_counter()
+    print(f"🔎 Sondagem ({relatorio}): {caminho}  ({os.path.getsize(caminho) / 2**20:.1f} MB)")
+    exame = examinar(caminho, relatorio, amostra)
+    _falhar_se_layout_errado(caminho, relatorio, exame)
+
+    total = 0
+    for a in exame["abas"]:
+        estimadas = a["linhas"] if a["linhas"] is not None else a["amostra"]
+        total += estimadas
+        print(f"   Aba '{a['nome']}': cabeçalho ok; amostra de {a['amostra']} linha(s), {a['com_dados']} com dados; "
+              f"~{estimadas:,} linhas ({a['origem']})")
+    segundos, pico_mb = projetar(relatorio, total)
+    print(f"⏱️  Tempo projetado: ~{segundos:,.1f} s para ~{total:,} linhas")
+    print(f"💾 Memória projetada: ~{pico_mb:,.0f} MB de pico")
+    if orcamento is not None and pico_mb * 2**20 > orcamento.limite:
+        print(f"   acima do --max-memory ({orcamento.limite / 2**20:,.0f} MB): sem --probe o script não processa")
+    print(f"✅ Layout ok ({time.perf_counter() - t0:.2f} s de sondagem, nada gravado)")
+    return exame
+
+
+# ==========================================================
+# --preview
+# ==========================================================
+@contextlib.contextmanager
+def _execucao_isolada():
+    """Variáveis PIPELINE_* do script guardadas: a prévia roda sem cache, pacote, NDJSON..."""
+    variaveis = {k: os.environ.pop(k) for k in list(os.environ) if k.startswith("PIPELINE_")}
+    try:
+        yield
+    finally:
+        os.environ.update(variaveis)
+
+
+def _texto(v) -> str:
+    if v is None:
+        return ""
+    if isinstance(v, datetime):
+        return v.strftime("%d/%m/%Y") if (v.hour, v.minute, v.second) == (0, 0, 0) else v.isoformat(" ", "seconds")
+    s = str(v)
+    return s if len(s) <= LARGURA_CELULA else s[:LARGURA_CELULA - 1] + "…"
+
+
+def _primeiras_linhas(saida, n):
+    from openpyxl import load_workbook
+
+    wb = load_workbook(saida, read_only=True, data_only=True)
+    try:
+        ws = wb.worksheets[0]
+        return ws.title, [list(l) for l in ws.iter_rows(max_row=n + 1, values_only=True)]
+    finally:
+        wb.close()
+
+
+def imprimir_tabela(linhas):
+    largura = max((len(l) for l in linhas), default=0)
+    textos = [[_texto(l[j]) if j < len(l) else "" for j in range(largura)] for l in linhas]
+    tamanhos = [max(len(t[j]) for t in textos) for j in range(largura)]
+    for i, t in enumerate(textos):
+        print("  " + "  ".join(c.ljust(tamanhos[j]) for j, c in enumerate(t)).rstrip())
+        if i == 0:
+            print("  " + "  ".join("-" * w for w in tamanhos))
+
+
+def previa(caminho, relatorio, n, processar):
+    """
+    --preview N: confere o layout (como o --probe) e roda `processar(entrada)` sobre
+    o começo de cada aba; processar devolve o caminho da saída .xlsx. Mostra as N
+    primeiras linhas da 1ª aba da saída.
+    """
+    t0 = time.perf_counter()
+    exame = examinar(caminho, relatorio, n)
+    _falhar_se_layout_errado(caminho, relatorio, exame)
+    tamanho = max((a["linhas"] or 0 for a in exame["abas"]), default=0)
+    # registros ocupam várias linhas físicas (histórico, totais): começa com 5 por linha de saída
+    max_linhas = ESPERADAS[relatorio][0] + 5 * n + 10
+    with tempfile.TemporaryDirectory(prefix="pipeline-previa-") as pasta:
+        entrada = Path(pasta) / (Path(caminho).stem + ipc_arrow.SUFIXO)
+        for tentativa in range(TENTATIVAS_PREVIA):
+            log = io.StringIO()
+            try:
+                with _execucao_isolada(), contextlib.redirect_stdout(log):
+                    ipc_arrow.converter_xlsx(caminho, entrada, max_linhas=max_linhas)
+                    saida = processar(entrada)
+            except BaseException:
+                print(log.getvalue()[-3000:])
+                raise
+            if saida is None or not Path(saida).exists():
+                print(log.getvalue()[-3000:])
+                print("❌ A prévia não gerou saída.")
+                raise SystemExit(1)
+            aba, linhas = _primeiras_linhas(saida, n)
+            if len(linhas) > n or max_linhas >= tamanho or tentativa == TENTATIVAS_PREVIA - 1:
+                break
+            max_linhas *= 4
+    print(f"👀 Prévia ({relatorio}): {len(linhas) - 1 if linhas else 0} primeira(s) linha(s) de "
+          f"'{aba}' em {Path(saida).name}, processando as {max_linhas:,} primeiras linhas de cada aba "
+          f"({time.perf_counter() - t0:.2f} s)")
+    imprimir_tabela(linhas)
+    return linhas
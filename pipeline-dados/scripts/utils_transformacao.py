@@ -0,0 +1,735 @@
+# -*- coding: utf-8 -*-
+"""
+Utilitários compartilhados pelos scripts do pipeline (versão Python de
+js/utils-transformacao.js).
+
+Os scripts são executados diretamente (python "scripts/<nome>.py"), então a
+pasta scripts/ já está no sys.path e basta `import utils_transformacao`.
+
+numpy e pandas são importados dentro das funções que os usam: só eles custam
+~0,4 s de partida, e o cache, a leitura de linhas e o NDJSON não precisam deles.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import re
+import sys
+import zipfile
+from datetime import date, datetime, time
+import xml.etree.ElementTree as ET
+from typing import TYPE_CHECKING
+
+import ipc_arrow
+
+if TYPE_CHECKING:
+    import numpy as np
+    import pandas as pd
+
+# ==========================================================
+# Valores monetários em centavos (int64)
+# ==========================================================
+# Colunas monetárias ficam no DataFrame como int64 em centavos: somas exatas,
+# vetorizadas e idênticas entre execuções. O texto original das células que
+# NÃO são número (ex.: cabeçalho repetido, "R$ 1.234,56") fica numa coluna
+# auxiliar oculta e volta para a célula só na escrita.
+PREFIXO_TEXTO_MONETARIO = "__texto__"
+
+
+def _texto_limpo(valores: pd.Series) -> pd.Series:
+    return valores.astype(str).str.strip()
+
+
+def _reais_para_centavos(reais: pd.Series) -> np.ndarray:
+    import numpy as np
+
+    arr = reais.to_numpy(dtype="float64", na_value=np.nan)
+    arr = np.where(np.isfinite(arr), arr, 0.0)
+    return np.rint(arr * 100.0).astype(np.int64)
+
+
+def texto_para_centavos(valores: pd.Series) -> np.ndarray:
+    """
+    Parser monetário tolerante (mesma regra do antigo valor_para_float_sem_erro):
+    - remove "R$" e espaços
+    - se houver vírgula: "." é milhar e "," é decimal (1.234,56)
+    - senão: float direto (1234.56)
+    - inválido / vazio -> 0
+    Retorna np.ndarray int64 em centavos.
+    """
+    import pandas as pd
+
+    s = _texto_limpo(valores).str.replace("R$", "", regex=False).str.replace(" ", "", regex=False)
+    tem_virgula = s.str.contains(",", regex=False)
+    br = s.str.replace(".", "", regex=False).str.replace(",", ".", regex=False)
+    s = s.where(~tem_virgula, br)
+    return _reais_para_centavos(pd.to_numeric(s, errors="coerce"))
+
+
+def coluna_monetaria(valores: pd.Series) -> tuple[np.ndarray, pd.Series]:
+    """
+    Converte uma coluna lida como texto em (centavos int64, texto residual).
+
+    A célula é numérica quando float(str(v).strip().replace(",", ".")) funciona
+    (regra do script original); o texto residual é None nessas células e guarda
+    o valor original nas demais. Os centavos usam sempre o parser tolerante,
+    então as somas continuam contando "1.234,56" mesmo quando a célula é texto.
+    """
+    import numpy as np
+    import pandas as pd
+
+    s = _texto_limpo(valores)
+    estrito = pd.to_numeric(s.str.replace(",", ".", regex=False), errors="coerce")
+    numerico = estrito.notna().to_numpy() & np.isfinite(estrito.to_numpy(dtype="float64", na_value=np.nan))
+    centavos = texto_para_centavos(valores)
+    residual = valores.astype(object).where(~numerico, None)
+    return centavos, residual
+
+
+def definir_coluna_monetaria(df: pd.DataFrame, coluna: str) -> None:
+    """Troca df[coluna] por centavos int64 (+ coluna auxiliar com o texto residual)."""
+    centavos, residual = coluna_monetaria(df[coluna])
+    df[coluna] = centavos
+    df[PREFIXO_TEXTO_MONETARIO + coluna] = residual.to_numpy()
+
+
+def eh_coluna_monetaria(df: pd.DataFrame, coluna: str) -> bool:
+    return (PREFIXO_TEXTO_MONETARIO + coluna) in df.columns
+
+
+def centavos_da_coluna(df: pd.DataFrame, coluna: str) -> np.ndarray:
+    """Centavos int64 de uma coluna, convertendo na hora se ela ainda não for monetária."""
+    import numpy as np
+
+    if eh_coluna_monetaria(df, coluna):
+        return df[coluna].to_numpy(dtype=np.int64)
+    return texto_para_centavos(df[coluna])
+
+
+def centavos_para_reais(centavos) -> np.ndarray:
+    """int64 centavos -> float com 2 casas (usar SOMENTE na escrita)."""
+    import numpy as np
+
+    return np.round(np.asarray(centavos, dtype=np.int64) / 100.0, 2)
+
+
+def monetario_para_escrita(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Volta as colunas monetárias para o formato de planilha: float com 2 casas
+    nas células numéricas e o texto original nas demais. Remove as auxiliares.
+    """
+    import numpy as np
+    import pandas as pd
+
+    aux = [c for c in df.columns if isinstance(c, str) and c.startswith(PREFIXO_TEXTO_MONETARIO)]
+    if not aux:
+        return df
+    out = df.drop(columns=aux)
+    for c in aux:
+        coluna = c[len(PREFIXO_TEXTO_MONETARIO):]
+        residual = df[c].to_numpy(dtype=object)
+        reais = centavos_para_reais(df[coluna].to_numpy()).astype(object)
+        out[coluna] = np.where(pd.isna(residual), reais, residual)
+    return out
+
+
+def somar_centavos_por_grupo(chaves: pd.Series, centavos: np.ndarray):
+    """
+    Soma exata de centavos por grupo (grupos ordenados).
+    Usa np.add.reduceat sobre int64 — np.bincount converteria os pesos para
+    float64 e perderia a exatidão.
+    Retorna (grupos, quantidade por grupo, soma em centavos por grupo).
+    """
+    import numpy as np
+    import pandas as pd
+
+    codigos, grupos = pd.factorize(chaves, sort=True)
+    if len(grupos) == 0:
+        return list(grupos), np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+    ordem = np.argsort(codigos, kind="stable")
+    codigos_ord = codigos[ordem]
+    inicios = np.flatnonzero(np.r_[True, codigos_ord[1:] != codigos_ord[:-1]])
+    somas = np.add.reduceat(np.asarray(centavos, dtype=np.int64)[ordem], inicios)
+    qtd = np.diff(np.r_[inicios, len(codigos_ord)])
+    return list(grupos), qtd.astype(np.int64), somas
+
+
+# ==========================================================
+# Colunas de texto repetitivo como dicionário (códigos + tabela de valores)
+# ==========================================================
+# Credor, fonte, retenção, unidade e as colunas propagadas por fill-down
+# repetem poucos valores em centenas de milhares de linhas. Como Categorical
+# cada célula é só um código inteiro (int8/16/32 conforme o nº de valores) e
+# os filtros .str/eq/isin rodam sobre a tabela de valores, não sobre as linhas.
+AMOSTRA_DICIONARIO = 20_000
+
+
+def _bytes_reais(valores: np.ndarray) -> int:
+    """Ponteiros + cada objeto distinto UMA vez (células podem compartilhar o mesmo str)."""
+    distintos = {id(v): v for v in valores}
+    return valores.nbytes + sum(sys.getsizeof(v) for v in distintos.values())
+
+
+def codificar_colunas_repetidas(df: pd.DataFrame, max_distintos=0.5, amostra=AMOSTRA_DICIONARIO,
+                                relatorio=True) -> dict:
+    """
+    Converte (no próprio df) as colunas de texto de baixa cardinalidade em
+    Categorical. Detecção por amostragem: linhas igualmente espaçadas; a coluna
+    é candidata se tiver só texto e distintos/amostra <= max_distintos, e é
+    confirmada na coluna inteira. Retorna {coluna: (bytes antes, bytes depois)}.
+    """
+    import numpy as np
+    import pandas as pd
+
+    n = len(df)
+    economia = {}
+    if n == 0:
+        return economia
+    passo = max(1, n // amostra)
+    for pos, col in enumerate(df.columns):
+        serie = df.iloc[:, pos]
+        if serie.dtype != object:
+            continue
+        parte = serie.iloc[::passo]
+        if pd.api.types.infer_dtype(parte, skipna=True) not in ("string", "empty"):
+            continue
+        if parte.nunique(dropna=False) > max_distintos * len(parte):
+            continue
+        valores = serie.to_numpy()
+        codigos, categorias = pd.factorize(valores)
+        if len(categorias) > max_distintos * n or pd.api.types.infer_dtype(categorias) != "string":
+            continue
+        cat = pd.Categorical.from_codes(codigos, categories=categorias)
+        antes = _bytes_reais(valores)
+        df.isetitem(pos, pd.Series(cat, index=serie.index, name=serie.name))
+        economia[col] = (antes, cat.codes.nbytes + _bytes_reais(np.asarray(categorias, dtype=object)))
+    if relatorio and economia:
+        total_antes = sum(a for a, _ in economia.values())
+        total_depois = sum(d for _, d in economia.values())
+        print(f"🗜️  Dicionário em {len(economia)} coluna(s): "
+              f"{total_antes / 2**20:.1f} MB -> {total_depois / 2**20:.1f} MB")
+        for col, (antes, depois) in economia.items():
+            print(f"   {str(col)[:30]:<30} {df[col].cat.categories.size:>8,} valores  "
+                  f"{antes / 2**20:>8.2f} MB -> {depois / 2**20:>6.2f} MB")
+    return economia
+
+
+def preencher_abaixo(serie: pd.Series, vazio="") -> pd.Series:
+    """
+    Fill-down tratando NA e `vazio` como lacuna; lacunas antes do 1º valor
+    ficam `vazio`. Mesmo resultado de serie.replace(vazio, pd.NA).ffill().fillna(vazio);
+    em Categorical trabalha só nos códigos.
+    """
+    import numpy as np
+    import pandas as pd
+
+    if not isinstance(serie.dtype, pd.CategoricalDtype):
+        return serie.replace(vazio, pd.NA).ffill().fillna(vazio)
+    if vazio not in serie.cat.categories:
+        serie = serie.cat.add_categories([vazio])
+    codigos = serie.cat.codes.to_numpy()
+    cod_vazio = serie.cat.categories.get_loc(vazio)
+    fonte = np.where((codigos >= 0) & (codigos != cod_vazio), np.arange(len(codigos)), -1)
+    np.maximum.accumulate(fonte, out=fonte)
+    novos = np.where(fonte >= 0, codigos[fonte], cod_vazio)
+    return pd.Series(pd.Categorical.from_codes(novos, dtype=serie.dtype), index=serie.index, name=serie.name)
+
+
+# ==========================================================
+# Linha de origem (proveniência) das linhas de saída
+# ==========================================================
+# Com --origem (ou PIPELINE_ORIGEM=1) as abas de saída ganham a coluna oculta
+# "Linha origem": o nº da linha no arquivo exportado do SIGEF (1 = 1ª linha da
+# planilha), para achar a linha de um valor contestado. Filtros, deslocamentos
+# e cópias carregam só um array int32 paralelo às linhas.
+COLUNA_ORIGEM = "Linha origem"
+
+
+def ocultar_coluna_origem(ws, colunas) -> None:
+    """Oculta a coluna COLUNA_ORIGEM (se existir) numa aba do xlsxwriter ou do openpyxl."""
+    colunas = list(colunas)
+    if COLUNA_ORIGEM not in colunas:
+        return
+    idx = colunas.index(COLUNA_ORIGEM)
+    if hasattr(ws, "set_column"):
+        ws.set_column(idx, idx, None, None, {"hidden": True})
+    else:
+        from openpyxl.utils import get_column_letter
+        ws.column_dimensions[get_column_letter(idx + 1)].hidden = True
+
+
+# ==========================================================
+# Escrita rápida de XLSX (xlsxwriter, constant_memory)
+# ==========================================================
+FORMATO_DATA = "DD/MM/YYYY"
+FORMATO_DATA_HORA = "YYYY-MM-DD HH:MM:SS"   # padrão do pandas.to_excel para datetime
+# cabeçalho como o pandas.to_excel grava: negrito, borda fina, centralizado no topo
+FORMATO_CABECALHO = {"bold": True, "border": 1, "align": "center", "valign": "top"}
+
+
+def _eh_coluna_data(serie: pd.Series) -> bool:
+    import pandas as pd
+
+    if pd.api.types.is_datetime64_any_dtype(serie):
+        return True
+    if serie.dtype == object:
+        return pd.api.types.infer_dtype(serie, skipna=True) in ("datetime", "datetime64", "date")
+    return False
+
+
+def escrever_xlsx_rapido(caminho, abas, cabecalho_pandas=True):
+    """
+    Grava uma ou mais abas com xlsxwriter em modo constant_memory.
+
+    abas: lista de (nome_aba, DataFrame, {indice_coluna_0based: num_format})
+    Os formatos são de COLUNA (set_column) e valem para todas as células da
+    coluna na própria gravação — nada de estilizar célula a célula depois.
+    Colunas de data sem formato informado recebem o formato padrão do pandas.
+    NaN/NaT viram célula vazia. A coluna COLUNA_ORIGEM, se houver, fica oculta.
+    cabecalho_pandas: cabeçalho com o estilo do to_excel (FORMATO_CABECALHO), para a
+    saída ficar com a mesma cara da gravação pelo pandas.
+    """
+    import xlsxwriter
+
+    wb = xlsxwriter.Workbook(str(caminho), {"constant_memory": True})
+    try:
+        fmt_header = wb.add_format(FORMATO_CABECALHO) if cabecalho_pandas else None
+        cache_fmt = {}
+
+        def fmt(num_format):
+            if num_format not in cache_fmt:
+                cache_fmt[num_format] = wb.add_format({"num_format": num_format})
+            return cache_fmt[num_format]
+
+        for nome_aba, df, formatos in abas:
+            ws = wb.add_worksheet(nome_aba)
+            formatos = dict(formatos or {})
+            for ci, col in enumerate(df.columns):
+                if ci not in formatos and _eh_coluna_data(df[col]):
+                    formatos[ci] = FORMATO_DATA_HORA
+            for ci, num_format in formatos.items():
+                ws.set_column(ci, ci, None, fmt(num_format))
+            ocultar_coluna_origem(ws, df.columns)
+
+            ws.write_row(0, 0, [str(c) for c in df.columns], fmt_header)
+            valores = df.astype(object).where(df.notna(), None).to_numpy()
+            for r, linha in enumerate(valores.tolist(), start=1):
+                ws.write_row(r, 0, linha)
+    finally:
+        wb.close()
+    return caminho
+
+
+# ==========================================================
+# Leitura rápida de XLSX (XML em streaming, linha a linha)
+# ==========================================================
+# Mesma leitura do _read_sheet1_xml_ultrafast (Empenhos Liquidados), mas para
+# qualquer aba e sem montar a matriz inteira: as linhas saem uma a uma e os
+# elementos já lidos são descartados, então a memória fica limitada às
+# sharedStrings + o bloco em uso.
+# Textos inline (células "inlineStr"/"str") repetidos viram um único str, até
+# este número de valores distintos por leitura (a memória continua limitada).
+LIMITE_TEXTOS_INTERNADOS = 100_000
+_ATTR_REL_ID = "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}id"
+_coord_re = re.compile(r"([A-Z]+)(\d+)")
+
+
+def _tag(elem):
+    return elem.tag.rsplit("}", 1)[-1]
+
+
+def _texto_inline(elem):
+    return "".join(t.text for t in elem.iter() if _tag(t) == "t" and t.text)
+
+
+def _letras_para_coluna(letras: str) -> int:
+    n = 0
+    for ch in letras:
+        n = n * 26 + (ord(ch) - 64)
+    return n
+
+
+def carregar_shared_strings(z: zipfile.ZipFile) -> list:
+    strings = []
+    try:
+        with z.open("xl/sharedStrings.xml") as f:
+            for _, elem in ET.iterparse(f, events=("end",)):
+                if _tag(elem) == "si":
+                    strings.append(_texto_inline(elem))
+                    elem.clear()
+    except KeyError:
+        pass
+    return strings
+
+
+def listar_abas_xlsx(caminho) -> list[tuple[str, str]]:
+    """[(nome_aba, parte XML no zip)] na ordem do workbook (.arrow: parte = índice da aba)."""
+    if ipc_arrow.eh_arrow(caminho):
+        return [(nome, str(i)) for i, nome in enumerate(ipc_arrow.abas_arrow(caminho))]
+    with zipfile.ZipFile(caminho) as z:
+        alvos = {}
+        try:
+            for rel in ET.fromstring(z.read("xl/_rels/workbook.xml.rels")):
+                alvo = rel.attrib.get("Target", "")
+                alvos[rel.attrib.get("Id")] = alvo.lstrip("/") if alvo.startswith("/") else "xl/" + alvo
+        except KeyError:
+            pass
+        abas = []
+        for el in ET.fromstring(z.read("xl/workbook.xml")).iter():
+            if _tag(el) == "sheet":
+                padrao = f"xl/worksheets/sheet{len(abas) + 1}.xml"
+                abas.append((el.attrib.get("name", ""), alvos.get(el.attrib.get(_ATTR_REL_ID), padrao)))
+    return abas
+
+
+_dimensao_re = re.compile(rb"<(?:\w+:)?dimension\s+ref=\"[A-Z]*\d*:?([A-Z]+)\d*\"")
+
+
+def largura_aba_xlsx(caminho, aba=0):
+    """
+    Largura da aba (max_column do openpyxl) sem ler as linhas: o <dimension>
+    do início do XML (.arrow: o metadado). None se a planilha não o tiver.
+    """
+    if ipc_arrow.eh_arrow(caminho):
+        larguras = ipc_arrow.colunas_por_aba(caminho)
+        return larguras[aba] if isinstance(aba, int) else dict(zip(ipc_arrow.abas_arrow(caminho), larguras))[aba]
+    abas = listar_abas_xlsx(caminho)
+    parte = abas[aba][1] if isinstance(aba, int) else dict(abas)[aba]
+    with zipfile.ZipFile(caminho) as z, z.open(parte) as f:
+        m = _dimensao_re.search(f.read(1 << 14))     # <dimension> vem antes de <sheetData>
+    return _letras_para_coluna(m.group(1).decode()) if m else None
+
+
+def _converter_celula(t, texto, sst):
+    if t == "s":
+        try:
+            return sst[int(texto)]
+        except (ValueError, IndexError):
+            return texto
+    if t in ("inlineStr", "str", "e"):
+        return texto
+    if t == "b":
+        return texto == "1"
+    try:
+        return int(texto) if texto.lstrip("-").isdigit() else float(texto)
+    except ValueError:
+        return texto
+
+
+def _formatos_data(z: zipfile.ZipFile):
+    """
+    (estilos de data, estilos de duração, época) do workbook, pelas mesmas
+    regras do openpyxl: índices de cellXfs cujo formato numérico é de data.
+    """
+    from openpyxl.styles.numbers import builtin_format_code, is_date_format, is_timedelta_format
+    from openpyxl.utils.datetime import CALENDAR_MAC_1904, CALENDAR_WINDOWS_1900
+
+    datas, duracoes = set(), set()
+    try:
+        raiz = ET.fromstring(z.read("xl/styles.xml"))
+    except KeyError:
+        raiz = None
+    if raiz is not None:
+        proprios = {}
+        for el in raiz.iter():
+            if _tag(el) == "numFmt":
+                proprios[int(el.attrib.get("numFmtId", -1))] = el.attrib.get("formatCode", "")
+        xfs = next((el for el in raiz if _tag(el) == "cellXfs"), ())
+        for idx, xf in enumerate(el for el in xfs if _tag(el) == "xf"):
+            num = int(xf.attrib.get("numFmtId", 0))
+            fmt = proprios[num] if num in proprios else builtin_format_code(num)
+            if fmt and is_date_format(fmt):
+                datas.add(idx)
+            if fmt and is_timedelta_format(fmt):
+                duracoes.add(idx)
+    epoca = CALENDAR_WINDOWS_1900
+    for el in ET.fromstring(z.read("xl/workbook.xml")).iter():
+        if _tag(el) == "workbookPr" and el.attrib.get("date1904", "").lower() in ("1", "true"):
+            epoca = CALENDAR_MAC_1904
+    return datas, duracoes, epoca
+
+
+def ler_linhas_xlsx(caminho, aba=0, tamanho_leitura=1 << 20, datas=False):
+    """
+    Gera as linhas de uma aba (lista de valores; None = célula vazia), em
+    ordem e sem buracos: linhas ausentes no XML saem como lista vazia.
+    aba: índice (0 = primeira) ou nome. Datas saem como número serial do Excel;
+    datas=True: células numéricas com formato de data saem como datetime, como
+    no openpyxl (load_workbook / iter_rows).
+
+    Usa o expat direto (callbacks em C, sem montar elementos) alimentado em
+    pedaços de `tamanho_leitura` bytes; as linhas completas de cada pedaço
+    saem antes do próximo ser lido. Um .arrow (ipc_arrow) sai com as mesmas
+    regras, direto do arquivo mapeado.
+    """
+    if ipc_arrow.eh_arrow(caminho):
+        yield from ipc_arrow.linhas_arrow(caminho, aba, serial=not datas)
+        return
+    from xml.parsers import expat
+
+    abas = listar_abas_xlsx(caminho)
+    parte = abas[aba][1] if isinstance(aba, int) else dict(abas)[aba]
+
+    with zipfile.ZipFile(caminho) as z:
+        sst = carregar_shared_strings(z)
+        if datas:
+            from openpyxl.utils.datetime import from_excel
+
+            estilos_data, estilos_duracao, epoca = _formatos_data(z)
+        else:
+            estilos_data = ()
+
+        prontas = []
+        textos = {}
+        estado = {"proxima": 1, "linha": None, "col": 0, "t": None, "texto": None}
+        tipos = {}
+
+        def tipo(nome):
+            # "row", "c", "v", "t", "is" com ou sem prefixo de namespace (x:row)
+            k = tipos.get(nome)
+            if k is None:
+                k = tipos[nome] = nome.rsplit(":", 1)[-1]
+            return k
+
+        def inicio(nome, attrs):
+            k = tipo(nome)
+            if k == "c":
+                r = attrs.get("r")
+                m = _coord_re.match(r) if r else None
+                estado["col"] = _letras_para_coluna(m.group(1)) if m else estado["col"] + 1
+                estado["t"] = attrs.get("t")
+                estado["s"] = attrs.get("s")
+                estado["texto"] = None
+            elif k == "v" or k == "t":
+                if estado["texto"] is None:
+                    estado["texto"] = []
+                estado["captura"] = True
+            elif k == "row":
+                num = int(attrs.get("r", estado["proxima"]))
+                while estado["proxima"] < num:
+                    prontas.append([])
+                    estado["proxima"] += 1
+                estado["linha"] = []
+                estado["col"] = 0
+
+        def fim(nome):
+            k = tipo(nome)
+            if k == "v" or k == "t":
+                estado["captura"] = False
+            elif k == "c":
+                partes = estado["texto"]
+                if partes is None or estado["linha"] is None:
+                    return
+                v = _converter_celula(estado["t"], "".join(partes), sst)
+                if estilos_data and estado["t"] in (None, "n") and type(v) is not str and estado["s"]:
+                    s = int(estado["s"])
+                    if s in estilos_data:
+                        try:
+                            v = from_excel(v, epoca, timedelta=s in estilos_duracao)
+                        except (OverflowError, ValueError):
+                            v = "#VALUE!"           # fora do intervalo de datas: o openpyxl também vira erro
+                elif estado["t"] != "s" and type(v) is str:
+                    v = textos.get(v, v)
+                    if len(textos) < LIMITE_TEXTOS_INTERNADOS:
+                        textos.setdefault(v, v)
+                linha, col = estado["linha"], estado["col"]
+                if len(linha) < col - 1:
+                    linha.extend([None] * (col - 1 - len(linha)))
+                if len(linha) == col - 1:
+                    linha.append(v)
+                else:
+                    linha[col - 1] = v
+            elif k == "row":
+                prontas.append(estado["linha"])
+                estado["linha"] = None
+                estado["proxima"] += 1
+
+        def texto(dados):
+            if estado.get("captura"):
+                estado["texto"].append(dados)
+
+        p = expat.ParserCreate()
+        p.buffer_text = True
+        p.StartElementHandler = inicio
+        p.EndElementHandler = fim
+        p.CharacterDataHandler = texto
+
+        with z.open(parte) as f:
+            while True:
+                pedaco = f.read(tamanho_leitura)
+                p.Parse(pedaco, not pedaco)
+                if prontas:
+                    yield from prontas
+                    prontas.clear()
+                if not pedaco:
+                    break
+
+
+def ler_blocos_xlsx(caminho, aba=0, tamanho=50_000):
+    """ler_linhas_xlsx em blocos de até `tamanho` linhas (listas de linhas)."""
+    bloco = []
+    for linha in ler_linhas_xlsx(caminho, aba):
+        bloco.append(linha)
+        if len(bloco) >= tamanho:
+            yield bloco
+            bloco = []
+    if bloco:
+        yield bloco
+
+
+# ==========================================================
+# Saída NDJSON em lotes (--ndjson)
+# ==========================================================
+# Em vez do .xlsx, as linhas processadas saem em lotes, uma linha JSON por
+# lote, na mesma ordem e com os mesmos valores das abas da planilha de saída:
+#   {"aba": "Sheet1", "colunas": ["Data", "Nr emp.", ...]}   cabeçalho da aba
+#   [["2025-01-02", "1/2025", ...], [...], ...]              lote (até LOTE_NDJSON linhas)
+# Datas viram "AAAA-MM-DD" ("AAAA-MM-DDTHH:MM:SS" com hora); célula vazia = null.
+# Cada lote é gravado (e, com gzip, descarregado) assim que fica pronto: a
+# importação começa no primeiro lote, sem esperar o arquivo inteiro.
+LOTE_NDJSON = 2000
+
+
+def valor_json(v):
+    """
+    Valor de célula -> valor JSON (datas em ISO, NaN/NaT = null, escalares numpy = Python).
+    Texto vazio vira null, como no .xlsx (openpyxl e xlsxwriter não gravam célula com "").
+    """
+    if v is None or isinstance(v, (bool, int)):
+        return v
+    if isinstance(v, str):
+        return v or None
+    if isinstance(v, float):
+        return None if v != v else v
+    if isinstance(v, datetime):
+        if v != v:                                   # NaT
+            return None
+        if (v.hour, v.minute, v.second, v.microsecond) == (0, 0, 0, 0):
+            return v.date().isoformat()
+        return v.isoformat(timespec="seconds")
+    if isinstance(v, (date, time)):
+        return v.isoformat()
+    # escalares do numpy/pandas só existem se eles já foram importados por alguém
+    np = sys.modules.get("numpy")
+    if np is not None and isinstance(v, np.generic):
+        return valor_json(v.item())
+    pd = sys.modules.get("pandas")
+    if pd is not None and (v is pd.NA or v is pd.NaT):
+        return None
+    return str(v)
+
+
+def lotes(linhas, tamanho=LOTE_NDJSON):
+    """Agrupa um iterável de linhas em lotes de valores JSON (gerador)."""
+    lote = []
+    for linha in linhas:
+        lote.append([valor_json(v) for v in linha])
+        if len(lote) >= tamanho:
+            yield lote
+            lote = []
+    if lote:
+        yield lote
+
+
+def aba_de_dataframe(nome, df, tamanho=LOTE_NDJSON):
+    """(nome, colunas, lotes) de um DataFrame, como o to_excel grava (NaN/NaT = vazio)."""
+    def gerar():
+        for inicio in range(0, len(df), tamanho):
+            bloco = df.iloc[inicio:inicio + tamanho]
+            yield [[valor_json(v) for v in linha]
+                   for linha in bloco.astype(object).where(bloco.notna(), None).to_numpy().tolist()]
+    return nome, [str(c) for c in df.columns], gerar()
+
+
+def abas_de_workbook(wb, tamanho=LOTE_NDJSON):
+    """(nome, colunas, lotes) de cada aba de um workbook do openpyxl (1ª linha = cabeçalho)."""
+    for ws in wb.worksheets:
+        linhas = ws.iter_rows(values_only=True)
+        cabecalho = next(linhas, ())
+        yield ws.title, [valor_json(v) for v in cabecalho], lotes(linhas, tamanho)
+
+
+class _TextoComoBinario:
+    """Recebe os bytes do NDJSON num stdout de texto sem .buffer (StringIO do vigia/sonda)."""
+
+    def __init__(self, texto):
+        self._texto = texto
+
+    def write(self, dados):
+        self._texto.write(dados.decode("utf-8"))    # cada escrita é um objeto JSON ou "\n" inteiro
+
+    def flush(self):
+        self._texto.flush()
+
+
+class SaidaNDJSON:
+    """
+    Destino NDJSON (arquivo ou stdout, opcionalmente gzip).
+
+    Com "-", sys.stdout fica desviado para stderr enquanto o fluxo está aberto
+    (mensagens dos scripts não se misturam com os lotes) e volta ao anterior em
+    fechar(). Se o stdout anterior é um descritor do SO, fechar() também encerra
+    o fluxo: o descritor passa a apontar para stderr, o consumidor recebe EOF e
+    as mensagens finais do script não entram no NDJSON.
+    """
+
+    def __init__(self, destino, compactar=None):
+        import gzip
+
+        self.destino = destino
+        self.compactar = str(destino).endswith(".gz") if compactar is None else compactar
+        self._stdout_anterior = None
+        if destino == "-":
+            bruto = getattr(sys.stdout, "buffer", None)
+            if bruto is None:
+                if self.compactar:
+                    raise ValueError("NDJSON com gzip precisa de um stdout binário; use um arquivo como destino")
+                bruto = _TextoComoBinario(sys.stdout)
+            self._stdout_anterior = sys.stdout
+            sys.stdout = sys.stderr
+        else:
+            bruto = open(destino, "wb")
+        self._bruto = bruto
+        self._arquivo = gzip.GzipFile(fileobj=bruto, mode="wb", compresslevel=6) if self.compactar else bruto
+        self.linhas = 0
+
+    def _escrever(self, obj):
+        self._arquivo.write(json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8"))
+        self._arquivo.write(b"\n")
+        self._arquivo.flush()                # gzip: Z_SYNC_FLUSH, o lote já pode ser lido
+
+    def gravar(self, abas):
+        """Consome (nome, colunas, lotes) por aba: cabeçalho e, em seguida, cada lote."""
+        for nome, colunas, lotes_aba in abas:
+            self._escrever({"aba": nome, "colunas": list(colunas)})
+            for lote in lotes_aba:
+                self._escrever(lote)
+                self.linhas += len(lote)
+        return self
+
+    def fechar(self):
+        if self._arquivo is None:
+            return
+        if self._arquivo is not self._bruto:
+            self._arquivo.close()
+        self._arquivo = None
+        if self._stdout_anterior is None:
+            self._bruto.close()
+            return
+        self._bruto.flush()
+        anterior, self._stdout_anterior = self._stdout_anterior, None
+        sys.stdout = anterior
+        try:
+            fd_saida, fd_erro = anterior.fileno(), sys.stderr.fileno()
+        except (AttributeError, OSError, ValueError):
+            return                    # stdout de texto (StringIO): só a troca de sys.stdout é desfeita
+        anterior.flush()
+        os.dup2(fd_erro, fd_saida)    # fim do fluxo: EOF para o consumidor, mensagens seguintes em stderr
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.fechar()
+        return False
@@ -0,0 +1,266 @@
+# -*- coding: utf-8 -*-
+"""
+Serviço HTTP local: a página de importação manda a planilha bruta e recebe a saída do script Python.
+
+As transformações em JS (pipeline-dados/js/transformar-*.js) travam a aba
+com arquivos grandes; aqui o mesmo trabalho roda nos scripts Python, num pool
+de processos aquecidos e já iniciados ao subir o serviço (o mesmo do
+vigia.py: Python, pandas e leitores importados uma vez por processo). Cada
+pedido paga só o processamento.
+
+Uso:
+  python servico.py [--porta 8765] [--workers N] [--origem-permitida http://localhost:8080 ...]
+
+Só escuta em 127.0.0.1 e, do navegador, só atende a página de importação:
+ou ela vem de uma origem liberada na partida (--origem-permitida ou
+PIPELINE_ORIGENS, separadas por vírgula; nenhuma por padrão, nem file://), ou
+manda o token desta execução (impresso ao subir) no cabeçalho X-Pipeline-Token.
+O token serve para a página aberta como file:// (Origin "null", a mesma de
+qualquer outro arquivo local ou iframe isolado). Sem um dos dois = 403, e o
+CORS só libera a origem do pedido: outra página aberta no navegador não lê
+jobs nem saídas. Pedido sem Origin (curl, scripts locais) passa. Rotas:
+  POST /processar                 multipart, campo "arquivo" (.xlsx)
+                                  tipo pelo cabeçalho (como no orquestrador.py);
+                                  202 + {"id", "tipo", "status", "saida"}
+  POST /processar?esperar=1       espera e devolve a saída direto (ou 500 com o log)
+  GET  /jobs/<id>                 na fila / processando / ok / erro, tempo, saídas, fim do log
+  GET  /jobs/<id>/saida[?n=0]     a n-ésima saída (.xlsx); 409 enquanto não terminar
+  GET  /saude                     workers e contagem de jobs
+
+Do navegador:
+  const dados = new FormData(); dados.append("arquivo", file);
+  const headers = {"X-Pipeline-Token": token};        // o impresso pelo serviço ao subir
+  const job = await (await fetch("http://127.0.0.1:8765/processar", {method: "POST", body: dados, headers})).json();
+  // GET job.status (com os mesmos headers) até estado "ok"; depois fetch(job.saida, {headers}) -> arrayBuffer
+
+Uploads e saídas ficam numa pasta temporária por job e são apagados
+RETENCAO segundos depois de terminar. O cache de resultados dos scripts fica
+desligado nos workers (mesmo com PIPELINE_CACHE=1): cópia guardada fora da pasta
+do job sobreviveria à limpeza.
+"""
+
+import argparse
+import hmac
+import os
+import secrets
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+from datetime import datetime
+from pathlib import Path
+
+from flask import Flask, jsonify, request, send_file
+
+from orquestrador import identificar, saidas_de
+from regressao import CASOS, PASTA_SCRIPTS
+from vigia import TAMANHO_LOG, criar_pool, executar
+
+PORTA_PADRAO = 8765
+RETENCAO = 3600                      # s que um job terminado (e seus arquivos) fica guardado
+TAMANHO_MAXIMO = 512 * 1024 * 1024   # upload
+NOME_ENTRADA = "entrada.xlsx"
+ORIGENS_PADRAO = ()                  # nenhuma: file:// usa o token da execução
+CABECALHO_TOKEN = "X-Pipeline-Token"
+
+
+class Jobs:
+    """Jobs do serviço: pasta temporária, future do pool e resultado."""
+
+    def __init__(self, pool, pasta, workers):
+        self.pool = pool
+        self.workers = workers
+        self.pasta = Path(pasta)
+        self.trava = threading.Lock()
+        self.jobs = {}
+
+    def criar(self, arquivo_enviado):
+        """Grava o upload, identifica o tipo e manda para o pool. (job, erro)"""
+        self.limpar()
+        job_id = uuid.uuid4().hex[:12]
+        pasta = self.pasta / job_id
+        pasta.mkdir(parents=True)
+        entrada = pasta / NOME_ENTRADA
+        arquivo_enviado.save(entrada)
+        tipo = identificar(entrada)
+        if tipo is None:
+            shutil.rmtree(pasta, ignore_errors=True)
+            return None, "cabeçalho não reconhecido (esperado: relatório do SIGEF em .xlsx)"
+        job = {"id": job_id, "tipo": tipo, "script": CASOS[tipo]["script"],
+               "arquivo": arquivo_enviado.filename or NOME_ENTRADA, "estado": "na fila",
+               "criado": datetime.now().isoformat(timespec="seconds"), "pasta": pasta,
+               "saidas": saidas_de(entrada, tipo), "terminado": None}
+        job["futuro"] = self.pool.submit(executar, str(PASTA_SCRIPTS / job["script"]), str(entrada))
+        job["futuro"].add_done_callback(lambda f, j=job: self._terminar(j, f))
+        with self.trava:
+            self.jobs[job_id] = job
+        return job, None
+
+    def _terminar(self, job, futuro):
+        try:
+            ok, segundos, log = futuro.result()
+        except Exception as e:                     # processo do pool morreu
+            ok, segundos, log = False, None, f"{type(e).__name__}: {e}"
+        faltando = [s.name for s in job["saidas"] if not s.exists()]
+        if ok and faltando:
+            ok, log = False, log + f"\nSaída ausente: {', '.join(faltando)}"
+        job.update(estado="ok" if ok else "erro", tempo_s=round(segundos, 3) if segundos is not None else None,
+                   log=log[-TAMANHO_LOG:], terminado=time.monotonic())
+
+    def obter(self, job_id):
+        with self.trava:
+            return self.jobs.get(job_id)
+
+    def limpar(self):
+        """Apaga jobs terminados há mais de RETENCAO segundos."""
+        agora = time.monotonic()
+        with self.trava:
+            velhos = [j for j in self.jobs.values() if j["terminado"] and agora - j["terminado"] > RETENCAO]
+            for job in velhos:
+                del self.jobs[job["id"]]
+        for job in velhos:
+            shutil.rmtree(job["pasta"], ignore_errors=True)
+
+
+def descrever(job):
+    """Status do job em JSON (sem caminhos locais)."""
+    estado = job["estado"]
+    if estado == "na fila" and job["futuro"].running():
+        estado = "processando"
+    return {
+        "id": job["id"], "tipo": job["tipo"], "script": job["script"], "arquivo": job["arquivo"],
+        "estado": estado, "criado": job["criado"], "tempo_s": job.get("tempo_s"),
+        "saidas": [nome_download(job, s) for s in job["saidas"] if estado == "ok"],
+        "log": job.get("log"),
+    }
+
+
+def nome_download(job, saida):
+    """entrada_FINAL.xlsx -> <nome enviado>_FINAL.xlsx (Retenção_Final_Separada.xlsx fica igual)."""
+    stem = Path(NOME_ENTRADA).stem
+    if saida.name.startswith(stem):
+        return Path(job["arquivo"]).stem + saida.name[len(stem):]
+    return saida.name
+
+
+def origens_permitidas(extras=()):
+    """ORIGENS_PADRAO + --origem-permitida + PIPELINE_ORIGENS (separadas por vírgula), sem barra final."""
+    env = os.environ.get("PIPELINE_ORIGENS", "").split(",")
+    return {o.strip().rstrip("/") for o in (*ORIGENS_PADRAO, *extras, *env) if o.strip()}
+
+
+def criar_app(jobs, origens=ORIGENS_PADRAO, token=None):
+    """
+    origens: liberadas sem token. token: o desta execução (None = só origens);
+    qualquer origem que o mande no cabeçalho X-Pipeline-Token é atendida.
+    """
+    app = Flask(__name__)
+    app.config["MAX_CONTENT_LENGTH"] = TAMANHO_MAXIMO
+    origens = set(origens)
+
+    def _autorizado():
+        origem = request.headers.get("Origin")
+        if origem is None or origem in origens:
+            return True
+        enviado = request.headers.get(CABECALHO_TOKEN, "")
+        return token is not None and hmac.compare_digest(enviado.encode(), token.encode())
+
+    @app.before_request
+    def _origem():
+        # o navegador manda Origin em todo fetch entre origens: página sem origem liberada nem token não passa.
+        # O preflight (OPTIONS) não leva o token e não devolve dados: responde só os cabeçalhos do CORS.
+        if request.method != "OPTIONS" and not _autorizado():
+            return jsonify(erro=f"origem não permitida: {request.headers.get('Origin')}"), 403
+
+    @app.after_request
+    def _cors(resposta):
+        origem = request.headers.get("Origin")
+        if origem is not None and (request.method == "OPTIONS" and token is not None or _autorizado()):
+            resposta.headers["Access-Control-Allow-Origin"] = origem
+            resposta.headers["Access-Control-Allow-Methods"] = "GET, POST, OPTIONS"
+            resposta.headers["Access-Control-Allow-Headers"] = CABECALHO_TOKEN
+        resposta.headers["Vary"] = "Origin"
+        return resposta
+
+    def _enviar_saida(job, n=0):
+        saida = job["saidas"][n]
+        return send_file(saida, as_attachment=True, download_name=nome_download(job, saida),
+                         mimetype="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")
+
+    @app.post("/processar")
+    def processar():
+        arquivo = request.files.get("arquivo")
+        if arquivo is None or not arquivo.filename:
+            return jsonify(erro='envie a planilha no campo "arquivo" (multipart/form-data)'), 400
+        job, erro = jobs.criar(arquivo)
+        if erro:
+            return jsonify(erro=erro), 422
+        if request.args.get("esperar") not in (None, "", "0"):
+            job["futuro"].result()
+            while job["estado"] == "na fila":    # callback do future ainda gravando o resultado
+                time.sleep(0.01)
+            if job["estado"] != "ok":
+                return jsonify(descrever(job)), 500
+            return _enviar_saida(job)
+        return jsonify(id=job["id"], tipo=job["tipo"], status=f"/jobs/{job['id']}",
+                       saida=f"/jobs/{job['id']}/saida"), 202
+
+    @app.get("/jobs/<job_id>")
+    def status(job_id):
+        job = jobs.obter(job_id)
+        if job is None:
+            return jsonify(erro="job não encontrado"), 404
+        return jsonify(descrever(job))
+
+    @app.get("/jobs/<job_id>/saida")
+    def saida(job_id):
+        job = jobs.obter(job_id)
+        if job is None:
+            return jsonify(erro="job não encontrado"), 404
+        if job["estado"] != "ok":
+            return jsonify(descrever(job)), 409
+        n = request.args.get("n", 0, type=int)
+        if not 0 <= n < len(job["saidas"]):
+            return jsonify(erro=f"saída {n} inexistente"), 404
+        return _enviar_saida(job, n)
+
+    @app.get("/saude")
+    def saude():
+        with jobs.trava:
+            estados = [descrever(j)["estado"] for j in jobs.jobs.values()]
+        return jsonify(ok=True, workers=jobs.workers,
+                       jobs={e: estados.count(e) for e in sorted(set(estados))})
+
+    return app
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Serviço local de processamento das planilhas do SIGEF.")
+    ap.add_argument("--porta", type=int, default=PORTA_PADRAO)
+    ap.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                    help="scripts rodando ao mesmo tempo (padrão: núcleos da máquina)")
+    ap.add_argument("--origem-permitida", action="append", default=[], metavar="URL",
+                    help='origem de página que pode usar o serviço sem o token ("null" = file://); repetível')
+    args = ap.parse_args()
+    origens = origens_permitidas(args.origem_permitida)
+    token = secrets.token_urlsafe(24)         # novo a cada execução
+
+    workers = max(1, args.workers)
+    os.environ["PIPELINE_CACHE"] = "0"       # herdado pelos workers: nada do upload fica no cache
+    print(f"🔥 Aquecendo {workers} processo(s)...", flush=True)
+    pool = criar_pool(workers)
+    pasta = tempfile.mkdtemp(prefix="pipeline-servico-")
+    try:
+        app = criar_app(Jobs(pool, pasta, workers), origens, token)
+        print(f"🌐 http://127.0.0.1:{args.porta}  (Ctrl+C para sair)", flush=True)
+        print(f"🔑 Token desta execução ({CABECALHO_TOKEN}): {token}", flush=True)
+        print(f"🔒 Origens sem token: {', '.join(sorted(origens)) or 'nenhuma'}", flush=True)
+        app.run(host="127.0.0.1", port=args.porta, threaded=True)
+    finally:
+        pool.shutdown(wait=True, cancel_futures=True)
+        shutil.rmtree(pasta, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
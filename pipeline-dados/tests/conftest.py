@@ -0,0 +1,24 @@
+# -*- coding: utf-8 -*-
+"""Testes unitários do pipeline (pytest). A regressão ponta a ponta é o regressao.py."""
+
+import runpy
+import sys
+from pathlib import Path
+
+import pytest
+
+BASE = Path(__file__).resolve().parent.parent
+PASTA_SCRIPTS = BASE / "scripts"
+for pasta in (BASE, PASTA_SCRIPTS):
+    if str(pasta) not in sys.path:
+        sys.path.insert(0, str(pasta))
+
+
+def carregar_script(nome):
+    """Globais de um script (nome com espaço, sem main()): como o pipeline_dados.py --partida."""
+    return runpy.run_path(str(PASTA_SCRIPTS / nome), run_name="__partida__")
+
+
+@pytest.fixture(scope="session")
+def liquidados():
+    return carregar_script("Empenhos Liquidados.py")
@@ -0,0 +1,51 @@
+# -*- coding: utf-8 -*-
+import numpy as np
+
+from comparar import alinhar_por_chave, alinhar_por_lcs
+
+
+def _listas(resultado):
+    return [r.tolist() for r in resultado]
+
+
+def test_alinhar_por_chave_casa_pela_chave():
+    h_js = np.array([3, 1, 2, 9], dtype=np.uint64)
+    h_py = np.array([1, 2, 3, 7], dtype=np.uint64)
+    pares_js, pares_py, so_js, so_py = _listas(alinhar_por_chave(h_js, h_py))
+    assert list(zip(pares_js, pares_py)) == [(1, 0), (2, 1), (0, 2)]   # na ordem do Python
+    assert so_js == [3]
+    assert so_py == [3]
+
+
+def test_alinhar_por_chave_repetidas_pela_ordem():
+    h_js = np.array([5, 5, 5], dtype=np.uint64)
+    h_py = np.array([5, 5], dtype=np.uint64)
+    pares_js, pares_py, so_js, so_py = _listas(alinhar_por_chave(h_js, h_py))
+    assert list(zip(pares_js, pares_py)) == [(0, 0), (1, 1)]
+    assert so_js == [2]
+    assert so_py == []
+
+
+def test_alinhar_por_lcs_insercao_e_remocao():
+    h_js = np.array([1, 2, 3, 4, 5], dtype=np.uint64)
+    h_py = np.array([1, 3, 4, 6, 5], dtype=np.uint64)
+    pares_js, pares_py, so_js, so_py = _listas(alinhar_por_lcs(h_js, h_py))
+    assert list(zip(pares_js, pares_py)) == [(0, 0), (2, 1), (3, 2), (4, 4)]
+    assert so_js == [1]           # linha 2 só no JS
+    assert so_py == [3]           # linha 6 só no Python
+
+
+def test_alinhar_por_lcs_alteradas_viram_pares():
+    h_js = np.array([1, 7, 8, 4], dtype=np.uint64)
+    h_py = np.array([1, 9, 4], dtype=np.uint64)
+    pares_js, pares_py, so_js, so_py = _listas(alinhar_por_lcs(h_js, h_py))
+    # bloco "replace" [7, 8] x [9]: 1 par (linha alterada) e o excedente fica só no JS
+    assert list(zip(pares_js, pares_py)) == [(0, 0), (1, 1), (3, 2)]
+    assert so_js == [2]
+    assert so_py == []
+
+
+def test_alinhar_vazio():
+    vazio = np.array([], dtype=np.uint64)
+    assert _listas(alinhar_por_lcs(vazio, vazio)) == [[], [], [], []]
+    assert _listas(alinhar_por_chave(vazio, np.array([4], dtype=np.uint64))) == [[], [], [], [0]]
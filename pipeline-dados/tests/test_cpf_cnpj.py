@@ -0,0 +1,41 @@
+# -*- coding: utf-8 -*-
+import pandas as pd
+import pytest
+
+from CPFECNPJ import extrair_cpf_cnpj
+
+
+def _extrair(texto):
+    cpf_cnpj, tipo, valido = extrair_cpf_cnpj(pd.Series([texto]))
+    return cpf_cnpj[0], tipo[0], bool(valido[0])
+
+
+@pytest.mark.parametrize("texto, esperado", [
+    ("529.982.247-25", ("52998224725", "CPF", True)),
+    ("52998224725", ("52998224725", "CPF", True)),
+    ("529.982.247-24", ("52998224724", "CPF", False)),        # 2º DV errado
+    ("529.982.247-35", ("52998224735", "CPF", False)),        # 1º DV errado
+    ("111.111.111-11", ("11111111111", "CPF", False)),        # DVs conferem, mas repetido
+    ("11.222.333/0001-81", ("11222333000181", "CNPJ", True)),
+    ("11.222.333/0001-80", ("11222333000180", "CNPJ", False)),
+    ("00.000.000/0000-00", ("00000000000000", "CNPJ", False)),
+    ("CNPJ: 04.252.011/0001-10 (matriz)", ("04252011000110", "CNPJ", True)),
+    ("1234567890", (None, None, False)),                       # nem 11 nem 14 dígitos
+    ("", (None, None, False)),
+])
+def test_digitos_verificadores(texto, esperado):
+    assert _extrair(texto) == esperado
+
+
+def test_digitos_unicode_contam():
+    # dígitos fullwidth e arábico-índicos contam como 0-9
+    assert _extrair("５２９.９８２.２４７-２５") == ("52998224725", "CPF", True)
+    assert _extrair("٥٢٩٩٨٢٢٤٧٢٥") == ("52998224725", "CPF", True)
+
+
+def test_varias_linhas_mantem_o_indice():
+    serie = pd.Series(["529.982.247-25", None, "11.222.333/0001-81"], index=[10, 20, 30])
+    cpf_cnpj, tipo, valido = extrair_cpf_cnpj(serie)
+    assert list(cpf_cnpj.index) == [10, 20, 30]
+    assert tipo.tolist() == ["CPF", None, "CNPJ"]
+    assert valido.tolist() == [True, False, True]
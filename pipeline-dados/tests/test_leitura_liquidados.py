@@ -0,0 +1,41 @@
+# -*- coding: utf-8 -*-
+import zipfile
+
+NS = 'xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"'
+
+
+def _xlsx(tmp_path, linhas_xml, sst=("s0",)):
+    caminho = tmp_path / "entrada.xlsx"
+    with zipfile.ZipFile(caminho, "w") as z:
+        z.writestr("xl/worksheets/sheet1.xml", f"<worksheet {NS}><sheetData>{linhas_xml}</sheetData></worksheet>")
+        z.writestr("xl/sharedStrings.xml", f"<sst {NS}>" + "".join(f"<si><t>{s}</t></si>" for s in sst) + "</sst>")
+    return caminho
+
+
+def test_linhas_e_colunas_sem_celula_ficam_vazias(liquidados, tmp_path):
+    caminho = _xlsx(tmp_path, '<row r="2"><c r="B2" t="inlineStr"><is><t>x</t></is></c></row>'
+                              '<row r="4"><c r="D4"><v>3</v></c><c r="A4" t="s"><v>0</v></c></row>'
+                              '<row r="5"><c r="A5"/></row>')
+    assert liquidados["_read_sheet1_xml_ultrafast"](caminho) == [
+        [None, None, None, None],
+        [None, "x", None, None],
+        [None, None, None, None],
+        ["s0", None, None, 3],
+    ]
+
+
+def test_tipos_das_celulas(liquidados, tmp_path):
+    caminho = _xlsx(tmp_path, '<row><c r="A1"><v>1.5</v></c><c r="B1" t="b"><v>1</v></c>'
+                              '<c r="C1"><v>-7</v></c><c r="D1" t="s"><v>9</v></c></row>')
+    assert liquidados["_read_sheet1_xml_ultrafast"](caminho) == [[1.5, True, -7, "9"]]
+
+
+def test_planilha_vazia(liquidados, tmp_path):
+    assert liquidados["_read_sheet1_xml_ultrafast"](_xlsx(tmp_path, "")) == [[None]]
+
+
+def test_texto_inline_repetido_e_um_so_objeto(liquidados, tmp_path):
+    celula = '<c r="{}" t="inlineStr"><is><t>Credor</t></is></c>'
+    caminho = _xlsx(tmp_path, f'<row r="1">{celula.format("A1")}</row><row r="2">{celula.format("A2")}</row>')
+    m = liquidados["_read_sheet1_xml_ultrafast"](caminho)
+    assert m[0][0] is m[1][0]
@@ -0,0 +1,43 @@
+# -*- coding: utf-8 -*-
+import numpy as np
+
+from utils_transformacao import COLUNA_ORIGEM
+
+BASE = [
+    ["Data", "Empenho", "Valor"],
+    ["01/01/2025", "1/2025", 10],
+    ["02/01/2025", "2/2025", 20],
+    ["03/01/2025", "3/2025", 30],
+]
+
+
+def test_sem_selecao_copia_as_linhas(liquidados):
+    m = liquidados["MatrizProjetada"](BASE)
+    assert len(m) == 4
+    assert m[2] == BASE[2]
+    m[2].append("x")                      # a linha montada é nova: a base não muda
+    assert BASE[2] == ["02/01/2025", "2/2025", 20]
+
+
+def test_linhas_e_colunas(liquidados):
+    m = liquidados["MatrizProjetada"](BASE, linhas=[0, 3, 1], colunas=[2, -1, 0, 7])
+    assert len(m) == 3
+    assert m[0] == ["Valor", None, "Data", None]      # -1 e fora da linha = vazia
+    assert m[1] == [30, None, "03/01/2025", None]
+    assert list(m) == [m[0], m[1], m[2]]
+
+
+def test_montar_recebe_o_indice_projetado(liquidados):
+    def montar(i, linha):
+        return linha + [f"#{i}"]
+
+    m = liquidados["MatrizProjetada"](BASE, linhas=[0, 2], colunas=[1], montar=montar)
+    assert m[1] == ["2/2025", "#1"]
+
+
+def test_origem_usa_a_linha_da_base(liquidados):
+    origem = np.array([0, 11, 12, 13], dtype=np.int32)
+    m = liquidados["MatrizProjetada"](BASE, linhas=[0, 3, 1], colunas=[1], origem=origem)
+    assert m[0] == ["Empenho", COLUNA_ORIGEM]
+    assert m[1] == ["3/2025", 13]
+    assert m[2] == ["1/2025", 11]
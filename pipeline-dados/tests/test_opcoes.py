@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+import argparse
+from pathlib import Path
+
+import pytest
+
+from opcoes import Opcoes, ler_opcoes, parser_comum
+from sonda import AMOSTRA_PADRAO
+
+
+@pytest.fixture(autouse=True)
+def _sem_variaveis(monkeypatch):
+    for nome in ("ORIGEM", "NDJSON", "PARQUET", "ARROW", "PROBE", "PREVIEW", "CACHE", "CACHE_MAX", "PACOTE",
+                 "CHECKPOINT", "RESUME", "MAX_MEMORY"):
+        monkeypatch.delenv(f"PIPELINE_{nome}", raising=False)
+
+
+def _ler(argv, **grupos):
+    return ler_opcoes(argparse.ArgumentParser(parents=[parser_comum(**grupos)]), argv)
+
+
+def test_arquivo_e_opcoes_em_qualquer_ordem():
+    o = _ler(["--origem", "pagos.xlsx", "--preview", "5", "--arrow"])
+    assert (o.arquivo, o.origem, o.preview, o.arrow, o.probe) == ("pagos.xlsx", True, 5, True, None)
+
+
+def test_preview_sem_numero_e_erro():
+    with pytest.raises(SystemExit):
+        _ler(["pagos.xlsx", "--preview"])
+
+
+def test_probe_sem_numero_usa_a_amostra_padrao():
+    assert _ler(["pagos.xlsx", "--probe"]).probe == AMOSTRA_PADRAO
+    assert _ler(["pagos.xlsx", "--probe=30"]).probe == 30
+
+
+def test_variaveis_de_ambiente(monkeypatch, tmp_path):
+    monkeypatch.setenv("PIPELINE_ORIGEM", "1")
+    monkeypatch.setenv("PIPELINE_PROBE", "1")
+    monkeypatch.setenv("PIPELINE_PREVIEW", "0")
+    monkeypatch.setenv("PIPELINE_PARQUET", str(tmp_path))
+    monkeypatch.setenv("PIPELINE_CACHE", str(tmp_path / "cache"))
+    o = _ler(["pagos.xlsx"])
+    assert (o.origem, o.probe, o.preview, o.parquet) == (True, AMOSTRA_PADRAO, None, Path(tmp_path))
+    assert o.cache.ligado and o.cache.pasta == str(tmp_path / "cache")
+
+
+def test_no_cache_vence(monkeypatch):
+    monkeypatch.setenv("PIPELINE_CACHE", "1")
+    assert not _ler(["pagos.xlsx", "--no-cache", "--cache"]).cache.ligado
+
+
+def test_grupo_ausente_fica_desligado(monkeypatch):
+    monkeypatch.setenv("PIPELINE_MAX_MEMORY", "1G")
+    monkeypatch.setenv("PIPELINE_PACOTE", "1")
+    o = _ler(["credores.xlsx"], cache=False, pacote=False)
+    assert o.orcamento is None and not o.pacote and not o.cache.ligado
+    with pytest.raises(SystemExit):
+        _ler(["credores.xlsx", "--pacote"], pacote=False)
+
+
+def test_checkpoints_e_limite_de_memoria():
+    o = _ler(["liquidados.xlsx", "--resume", "--max-memory", "2G"], checkpoints=True, max_memory=True)
+    assert o.checkpoints.ligado and o.checkpoints.retomar
+    assert o.orcamento.limite == 2 * 1024 ** 3
+
+
+def test_opcoes_padrao_tudo_desligado():
+    o = Opcoes()
+    assert (o.arquivo, o.origem, o.ndjson, o.pacote, o.arrow, o.orcamento) == (None, False, None, False, False, None)
+    assert not o.cache.ligado and not o.checkpoints.ligado
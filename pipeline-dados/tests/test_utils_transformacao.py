@@ -0,0 +1,29 @@
+# -*- coding: utf-8 -*-
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils_transformacao import texto_para_centavos
+
+
+@pytest.mark.parametrize("texto, centavos", [
+    ("1.234,56", 123456),          # vírgula: "." é milhar, "," é decimal
+    ("R$ 1.234,56", 123456),
+    ("1234.56", 123456),           # sem vírgula: float direto
+    ("0,1", 10),
+    ("-7,5", -750),
+    ("1.000.000,00", 100000000),
+    ("  12  ", 1200),
+    ("abc", 0),                    # inválido / vazio -> 0
+    ("", 0),
+    ("nan", 0),
+])
+def test_texto_para_centavos(texto, centavos):
+    assert texto_para_centavos(pd.Series([texto])).tolist() == [centavos]
+
+
+def test_texto_para_centavos_numeros_e_vazios():
+    valores = pd.Series([10.256, 3, None, float("nan"), 0.1 + 0.2], dtype=object)
+    resultado = texto_para_centavos(valores)
+    assert resultado.dtype == np.int64
+    assert resultado.tolist() == [1026, 300, 0, 0, 30]   # arredonda no centavo; 0.1 + 0.2 não vira 30.000000000000004
@@ -0,0 +1,325 @@
+# -*- coding: utf-8 -*-
+"""
+Vigia: processa as exportações do SIGEF assim que elas caem numa pasta.
+
+Fica rodando, observando a pasta (e subpastas, ex.: "Pipeline V2/2025/").
+Cada .xlsx novo ou alterado espera o arquivo parar de crescer (tamanho e data
+iguais por --espera segundos e zip completo: cópia pela rede ou "Salvar como"
+do Excel pela metade não é lida), tem o tipo identificado pelo cabeçalho
+(mesma regra do orquestrador.py) e vai para o script correspondente.
+
+Os scripts rodam num pool fixo de processos já aquecidos: Python, pandas,
+openpyxl, xlsxwriter, pyarrow e os módulos de scripts/ são importados uma vez
+por processo, e cada arquivo roda o script como __main__ (runpy) dentro dele.
+Do arquivo pronto até a saída, só o processamento.
+
+Ao lado de cada entrada ficam as saídas de sempre e <arquivo>.status.json
+(aguardando / na fila / processando / ok / erro / ignorado, tempos, saídas e
+o fim do log). Ao iniciar, arquivos da pasta sem status (ou alterados depois
+dele) também entram na fila.
+
+Uso:
+  python vigia.py "Pipeline V2" [--workers N] [--espera 1.0]
+
+Ctrl+C para sair (espera os arquivos em processamento terminarem).
+Usa o watchdog (requirements.txt); sem ele, varre a pasta a cada 2 s.
+Variáveis PIPELINE_* passam para os scripts, como no orquestrador.
+"""
+
+import argparse
+import contextlib
+import importlib
+import io
+import json
+import os
+import runpy
+import signal
+import sys
+import threading
+import time
+import traceback
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from pathlib import Path
+
+from orquestrador import eh_saida, identificar, saidas_de
+from regressao import CASOS, PASTA_SCRIPTS
+
+ESPERA_PADRAO = 1.0          # s com tamanho/data parados antes de ler
+LIMITE_INCOMPLETO = 30.0     # s parado sem ser um zip válido = arquivo inválido, ignorado
+INTERVALO = 0.25             # s entre passos do laço principal
+INTERVALO_VARREDURA = 2.0    # s entre varreduras sem watchdog
+TAMANHO_LOG = 4000           # caracteres finais do log no status
+SUFIXO_STATUS = ".status.json"
+SUFIXO_TRACE = ".trace.json"         # com PIPELINE_TRACE: rastreio de cada execução, ao lado da entrada
+MODULOS_AQUECIDOS = ("numpy", "pandas", "openpyxl", "xlsxwriter", "pyarrow",
+                     "cache_resultados", "memoria", "rastreio", "retomada", "utils_transformacao")
+
+
+# ==========================================================
+# Processo de trabalho (aquecido)
+# ==========================================================
+def _aquecer():
+    """Inicializador do pool: importa uma vez o que todos os scripts usam."""
+    signal.signal(signal.SIGINT, signal.SIG_IGN)   # Ctrl+C é do processo principal, que encerra o pool
+    sys.path.insert(0, str(PASTA_SCRIPTS))
+    for modulo in MODULOS_AQUECIDOS:
+        try:
+            importlib.import_module(modulo)
+        except ImportError:
+            pass
+
+
+def _pid():
+    time.sleep(0.05)          # segura o processo: cada tarefa de partida cai num processo diferente
+    return os.getpid()
+
+
+def criar_pool(workers):
+    """Pool de `workers` processos aquecidos, todos já iniciados (nenhuma partida no 1º arquivo)."""
+    pool = ProcessPoolExecutor(max_workers=workers, initializer=_aquecer)
+    for futuro in [pool.submit(_pid) for _ in range(workers)]:
+        futuro.result()
+    return pool
+
+
+def executar(script, arquivo):
+    """
+    Roda o script como __main__ sobre o arquivo, neste processo. Retorna (ok, segundos, log).
+
+    O rastreio (PIPELINE_TRACE) é por execução: começa vazio e, no fim, grava
+    <arquivo>.trace.json ao lado da entrada (o processo do pool roda muitos
+    arquivos; o trace.json único do atexit misturaria todos e só sairia no fim).
+    """
+    import rastreio
+
+    saida = io.StringIO()
+    argv = sys.argv
+    sys.argv = [script, arquivo]
+    ok = True
+    t0 = time.perf_counter()
+    try:
+        with contextlib.redirect_stdout(saida), contextlib.redirect_stderr(saida):
+            rastreio.reiniciar()
+            try:
+                runpy.run_path(script, run_name="__main__")
+            finally:
+                if rastreio.ativo():
+                    rastreio.salvar(f"{arquivo}{SUFIXO_TRACE}")
+                    rastreio.reiniciar()
+    except SystemExit as e:
+        ok = e.code in (None, 0)
+        if not ok:
+            saida.write(f"\nSystemExit: {e.code}\n")
+    except BaseException:
+        ok = False
+        saida.write(traceback.format_exc())
+    finally:
+        sys.argv = argv
+    return ok, time.perf_counter() - t0, saida.getvalue()
+
+
+# ==========================================================
+# Status ao lado da entrada
+# ==========================================================
+def caminho_status(arquivo):
+    return arquivo.with_name(arquivo.stem + SUFIXO_STATUS)
+
+
+def gravar_status(arquivo, **campos):
+    campos = {"arquivo": arquivo.name, "atualizado": datetime.now().isoformat(timespec="seconds"), **campos}
+    destino = caminho_status(arquivo)
+    tmp = destino.with_name(destino.name + ".tmp")
+    try:
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(campos, f, ensure_ascii=False, indent=2)
+        os.replace(tmp, destino)
+    except OSError as e:
+        print(f"⚠️ Status não gravado para {arquivo.name}: {e}")
+
+
+def _assinatura(arquivo):
+    try:
+        st = arquivo.stat()
+    except OSError:
+        return None
+    return st.st_size, st.st_mtime_ns
+
+
+# ==========================================================
+# Vigia
+# ==========================================================
+class Vigia:
+    def __init__(self, raiz, workers, espera=ESPERA_PADRAO):
+        self.raiz = Path(raiz).resolve()
+        self.espera = espera
+        self.pool = criar_pool(workers)
+        self.trava = threading.Lock()
+        self.pendentes = {}          # arquivo -> (assinatura, desde quando está parada)
+        self.rodando = {}            # future -> (arquivo, tipo, início, saídas)
+        self.iniciados = set()       # futures com status "processando" já gravado
+
+    def _relevante(self, arquivo):
+        """Entrada .xlsx (não saída, temporário do Excel ou pasta oculta como .checkpoints)."""
+        nome = arquivo.name
+        try:
+            partes = arquivo.relative_to(self.raiz).parts
+        except ValueError:
+            return False
+        return (nome.lower().endswith(".xlsx") and not nome.startswith("~$") and not eh_saida(nome)
+                and not any(p.startswith(".") for p in partes))
+
+    # ---------- eventos (thread do watchdog) ----------
+    def notificar(self, caminho):
+        arquivo = Path(caminho)
+        if not self._relevante(arquivo):
+            return
+        with self.trava:
+            if arquivo not in self.pendentes:
+                gravar_status(arquivo, estado="aguardando")
+            self.pendentes[arquivo] = (None, time.monotonic())
+
+    def varrer(self, so_novos=True):
+        """Arquivos da pasta sem status (ou alterados depois dele) entram como pendentes."""
+        for dirpath, dirnames, arquivos in os.walk(self.raiz):
+            dirnames[:] = [d for d in dirnames if not d.startswith(".")]
+            for nome in arquivos:
+                arquivo = Path(dirpath) / nome
+                if not self._relevante(arquivo) or arquivo in self.pendentes:
+                    continue
+                status = caminho_status(arquivo)
+                if so_novos and status.exists() and status.stat().st_mtime >= arquivo.stat().st_mtime:
+                    continue
+                self.notificar(arquivo)
+
+    # ---------- laço principal ----------
+    def _ocupadas(self):
+        return {s for _, _, _, saidas in self.rodando.values() for s in saidas}
+
+    def passo(self):
+        agora = time.monotonic()
+        prontos = []
+        with self.trava:
+            for arquivo, (assinatura, desde) in list(self.pendentes.items()):
+                atual = _assinatura(arquivo)
+                if atual is None:                       # apagado/renomeado antes de ficar pronto
+                    del self.pendentes[arquivo]
+                elif atual != assinatura:               # ainda mudando: recomeça a espera
+                    self.pendentes[arquivo] = (atual, agora)
+                elif agora - desde >= self.espera:
+                    if zipfile.is_zipfile(arquivo):
+                        prontos.append(arquivo)
+                    elif agora - desde >= LIMITE_INCOMPLETO:  # parado e ainda sem zip completo
+                        del self.pendentes[arquivo]
+                        gravar_status(arquivo, estado="ignorado", motivo="não é um .xlsx válido")
+                        print(f"⚠️ {arquivo.name}: não é um .xlsx válido, ignorado")
+
+        ocupadas = self._ocupadas()
+        for arquivo in prontos:
+            tipo = identificar(arquivo)
+            if tipo is None:
+                with self.trava:
+                    del self.pendentes[arquivo]
+                gravar_status(arquivo, estado="ignorado", motivo="cabeçalho não reconhecido")
+                print(f"⚠️ {arquivo.name}: cabeçalho não reconhecido, ignorado")
+                continue
+            saidas = saidas_de(arquivo, tipo)
+            if ocupadas & set(saidas):                  # mesma saída em processamento: espera ela
+                continue
+            with self.trava:
+                del self.pendentes[arquivo]
+            ocupadas |= set(saidas)
+            script = str(PASTA_SCRIPTS / CASOS[tipo]["script"])
+            futuro = self.pool.submit(executar, script, str(arquivo))
+            self.rodando[futuro] = (arquivo, tipo, datetime.now(), saidas)
+            gravar_status(arquivo, estado="na fila", tipo=tipo, script=CASOS[tipo]["script"])
+            print(f"▶ {arquivo.relative_to(self.raiz)} ({tipo})", flush=True)
+
+        for futuro, (arquivo, tipo, _, saidas) in self.rodando.items():
+            if futuro.running() and futuro not in self.iniciados:
+                self.iniciados.add(futuro)
+                gravar_status(arquivo, estado="processando", tipo=tipo, script=CASOS[tipo]["script"])
+        for futuro in [f for f in self.rodando if f.done()]:
+            self._concluir(futuro)
+
+    def _concluir(self, futuro):
+        arquivo, tipo, inicio, saidas = self.rodando.pop(futuro)
+        self.iniciados.discard(futuro)
+        try:
+            ok, segundos, log = futuro.result()
+        except Exception as e:                           # processo do pool morreu
+            ok, segundos, log = False, None, f"{type(e).__name__}: {e}"
+        faltando = [s.name for s in saidas if not s.exists()]
+        if ok and faltando:
+            ok, log = False, log + f"\nSaída ausente: {', '.join(faltando)}"
+        gravar_status(arquivo, estado="ok" if ok else "erro", tipo=tipo, script=CASOS[tipo]["script"],
+                      inicio=inicio.isoformat(timespec="seconds"),
+                      tempo_s=round(segundos, 3) if segundos is not None else None,
+                      saidas=[s.name for s in saidas if s.exists()], log=log[-TAMANHO_LOG:])
+        tempo = f"{segundos:.1f}s" if segundos is not None else "-"
+        print(f"{'✅' if ok else '❌'} {arquivo.relative_to(self.raiz)} ({tipo}): {tempo}", flush=True)
+
+    def encerrar(self):
+        self.pool.shutdown(wait=True, cancel_futures=True)
+        for futuro in list(self.rodando):
+            if futuro.done() and not futuro.cancelled():
+                self._concluir(futuro)
+
+
+def _observar(vigia):
+    """Liga o watchdog na pasta; None se ele não estiver instalado (o laço varre a pasta)."""
+    try:
+        from watchdog.events import FileSystemEventHandler
+        from watchdog.observers import Observer
+    except ImportError:
+        print("⚠️ watchdog não instalado: varrendo a pasta a cada "
+              f"{INTERVALO_VARREDURA:.0f} s (pip install -r requirements.txt)")
+        return None
+
+    class _Eventos(FileSystemEventHandler):
+        def on_any_event(self, evento):
+            if evento.is_directory or evento.event_type not in ("created", "modified", "moved", "closed"):
+                return
+            vigia.notificar(getattr(evento, "dest_path", "") or evento.src_path)
+
+    observador = Observer()
+    observador.schedule(_Eventos(), str(vigia.raiz), recursive=True)
+    observador.start()
+    return observador
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Processa as planilhas do SIGEF que chegam numa pasta.")
+    ap.add_argument("pasta", type=Path, help="pasta observada (subpastas incluídas)")
+    ap.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                    help="scripts rodando ao mesmo tempo (padrão: núcleos da máquina)")
+    ap.add_argument("--espera", type=float, default=ESPERA_PADRAO,
+                    help=f"segundos com o arquivo parado antes de ler (padrão {ESPERA_PADRAO})")
+    args = ap.parse_args()
+    if not args.pasta.is_dir():
+        ap.error(f"pasta não encontrada: {args.pasta}")
+
+    vigia = Vigia(args.pasta, max(1, args.workers), args.espera)
+    observador = _observar(vigia)
+    vigia.varrer()
+    print(f"👀 Observando {vigia.raiz} ({max(1, args.workers)} processo(s)). Ctrl+C para sair.", flush=True)
+    ultima_varredura = time.monotonic()
+    try:
+        while True:
+            if observador is None and time.monotonic() - ultima_varredura >= INTERVALO_VARREDURA:
+                vigia.varrer()
+                ultima_varredura = time.monotonic()
+            vigia.passo()
+            time.sleep(INTERVALO)
+    except KeyboardInterrupt:
+        print("\n⏹ Encerrando (esperando os arquivos em processamento)...")
+    finally:
+        if observador is not None:
+            observador.stop()
+            observador.join()
+        vigia.encerrar()
+
+
+if __name__ == "__main__":
+    main()